@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+启动耗时基准
+在全新的解释器中运行各处理脚本，测量从启动解释器到第一次读取输入文件的耗时，
+并记录此时已导入的重量级依赖，用于确认各脚本只在探测到的格式需要时才导入pandas/openpyxl等。
+
+用法：
+    python bench_startup.py [--repeat 5] [--budget-ms 0] [--json 结果文件]
+
+--budget-ms大于0时，任一场景的首次读取耗时中位数超过预算即以退出码1结束；
+不需要pandas的场景在首次读取前导入了pandas时同样以退出码1结束。
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HEAVY_MODULES = ('numpy', 'pandas', 'openpyxl', 'xlrd', 'lxml')
+
+# 子进程引导代码：通过审计钩子记录第一次打开输入文件的时刻，然后以__main__身份运行脚本
+_BOOTSTRAP = r'''
+import atexit, json, os, runpy, sys, time
+report_path, input_path, script = sys.argv[1], os.path.abspath(sys.argv[2]), sys.argv[3]
+report = {}
+def hook(event, args):
+    if event == 'open' and 'first_read' not in report and isinstance(args[0], str) \
+            and os.path.abspath(args[0]) == input_path:
+        report['first_read'] = time.time()
+        report['heavy'] = [m for m in %r if m in sys.modules]
+sys.addaudithook(hook)
+def save():
+    report['end'] = time.time()
+    with open(report_path, 'w') as f:
+        json.dump(report, f)
+atexit.register(save)
+sys.argv = sys.argv[3:]
+runpy.run_path(script, run_name='__main__')
+''' % (HEAVY_MODULES,)
+
+
+def _build_inputs(directory):
+    """生成只有一行数据的.xlsx文件和HTML表格.xls文件"""
+    from openpyxl import Workbook
+
+    xlsx_file = os.path.join(directory, 'one_row.xlsx')
+    wb = Workbook()
+    wb.active.append(['编号', '名称'])
+    wb.active.append(['A1', '名称1'])
+    wb.save(xlsx_file)
+
+    html_file = os.path.join(directory, 'one_row.xls')
+    with open(html_file, 'w', encoding='utf-8') as f:
+        f.write('<html><body><table><tr><th>编号</th><th>名称</th></tr>'
+                '<tr><td>A1</td><td>名称1</td></tr></table></body></html>')
+
+    merge_dir = os.path.join(directory, 'merge_inputs')
+    os.makedirs(merge_dir)
+    merge_file = os.path.join(merge_dir, 'one_row.xlsx')
+    wb.save(merge_file)
+    return xlsx_file, html_file, merge_dir, merge_file
+
+
+def _scenarios(directory):
+    """返回(名称, 脚本, 参数, 被监测的输入文件, 首次读取前是否允许导入pandas)列表"""
+    xlsx_file, html_file, merge_dir, merge_file = _build_inputs(directory)
+    out = os.path.join(directory, 'out')
+    split_args = ['--rows', '10', '--no-cache']
+    return [
+        ('split_excel 流式 .xlsx', 'split_excel.py',
+         ['--input', xlsx_file, '--output', out, '--streaming=true'] + split_args, xlsx_file, False),
+        ('split_excel 常规 .xlsx', 'split_excel.py',
+         ['--input', xlsx_file, '--output', out] + split_args, xlsx_file, False),
+        ('split_excel_format 行切片 .xlsx', 'split_excel_format.py',
+         ['--input', xlsx_file, '--output', out] + split_args, xlsx_file, False),
+        ('split_excel_format HTML .xls', 'split_excel_format.py',
+         ['--input', html_file, '--output', out] + split_args, html_file, False),
+        ('merge_excel .xlsx', 'merge_excel.py',
+         ['--input_dir', merge_dir, '--output_file', os.path.join(out, 'merged.xlsx'), '--no-cache'],
+         merge_file, False),
+        ('merge_excel_format .xlsx', 'merge_excel_format.py',
+         ['--input_dir', merge_dir, '--output_file', os.path.join(out, 'merged_format.xlsx'), '--no-cache'],
+         merge_file, False),
+    ]
+
+
+def measure(script, args, input_file, report_path):
+    """运行一次脚本，返回(首次读取耗时ms, 总耗时ms, 首次读取前已导入的重量级依赖)"""
+    command = [sys.executable, '-c', _BOOTSTRAP, report_path, input_file, os.path.join(HERE, script)] + args
+    start = time.time()
+    subprocess.run(command, cwd=HERE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    with open(report_path, 'r') as f:
+        report = json.load(f)
+    if 'first_read' not in report:
+        raise RuntimeError(f"{script} 未读取输入文件 {input_file}")
+    return (round((report['first_read'] - start) * 1000, 1), round((report['end'] - start) * 1000, 1),
+            report['heavy'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='测量各处理脚本从启动到首次读取输入文件的耗时')
+    parser.add_argument('--repeat', type=int, default=5, help='每个场景的运行次数，取中位数（默认：5）')
+    parser.add_argument('--budget-ms', type=float, default=0, help='首次读取耗时预算，0表示不检查（默认：0）')
+    parser.add_argument('--json', help='将结果写入JSON文件')
+    args = parser.parse_args(argv)
+
+    results = []
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        report_path = os.path.join(tmp, 'report.json')
+        for name, script, script_args, input_file, allow_pandas in _scenarios(tmp):
+            runs = [measure(script, script_args, input_file, report_path) for _ in range(args.repeat)]
+            first_read = statistics.median(run[0] for run in runs)
+            total = statistics.median(run[1] for run in runs)
+            heavy = runs[-1][2]
+            problems = []
+            if not allow_pandas and 'pandas' in heavy:
+                problems.append('首次读取前导入了pandas')
+            if args.budget_ms > 0 and first_read > args.budget_ms:
+                problems.append(f'超出预算{args.budget_ms:.0f}ms')
+            failed = failed or bool(problems)
+            results.append({'scenario': name, 'first_read_ms': first_read, 'total_ms': total,
+                            'heavy_modules_before_read': heavy, 'problems': problems})
+            print(f"{name:<34} 首次读取 {first_read:7.1f}ms  总计 {total:7.1f}ms  "
+                  f"已导入: {', '.join(heavy) or '无'}{'  ✗ ' + '；'.join(problems) if problems else ''}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'python': sys.version.split()[0], 'repeat': args.repeat, 'results': results},
+                      f, ensure_ascii=False, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
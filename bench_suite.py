@@ -0,0 +1,414 @@
+# -*- coding: utf-8 -*-
+"""
+端到端基准测试
+生成确定性的合成输入（OOXML .xlsx、OLE2 .xls、HTML表格.xls），覆盖不同的行数、列数和样式密度，
+对split_excel、split_excel_format、merge_excel、merge_excel_format逐一运行，
+记录墙钟耗时、每秒处理行数和峰值内存，结果写入JSON文件，并可与保存的基准结果对比。
+
+用法：
+    python bench_suite.py [--preset quick|full] [--output bench_results.json]
+                          [--baseline 基准结果.json] [--tolerance 0.25] [--data-dir 输入缓存目录]
+
+每个脚本都在新的解释器中以--events json --no-cache运行，峰值内存取自进度事件中的peak_rss_mb
+（仅主进程）。指定--baseline时，耗时超过基准(1+tolerance)倍或基准中成功的用例失败时以退出码1结束。
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SEED = 20240601
+MERGE_PARTS = 4
+SCRIPTS = ('split_excel.py', 'split_excel_format.py', 'merge_excel.py', 'merge_excel_format.py')
+CONTAINERS = ('xlsx', 'xls', 'html')
+
+# (容器类型, 数据行数, 列数, 样式密度)；样式密度为带样式的数据单元格比例，OLE2 .xls输入不带样式
+PRESETS = {
+    'quick': [
+        ('xlsx', 2000, 8, 0.0),
+        ('xlsx', 2000, 8, 0.5),
+        ('xls', 2000, 8, 0.0),
+        ('html', 2000, 8, 0.0),
+    ],
+    'full': [(container, rows, cols, density)
+             for rows in (5000, 50000)
+             for cols in (8, 30)
+             for container, density in (('xlsx', 0.0), ('xlsx', 0.3), ('xlsx', 1.0),
+                                        ('xls', 0.0), ('html', 0.0), ('html', 1.0))],
+}
+
+_STATUS = ('已发货', '运输中', '待处理', '已签收')
+_COLUMN_KINDS = ('序号', '箱号', '状态', '数量', '单价', '日期', '备注')
+
+
+def case_id(container, rows, cols, density):
+    return f"{container}-{rows}r-{cols}c-s{int(density * 100)}"
+
+
+class SyntheticTable:
+    """确定性的合成表格：相同参数总是生成相同的单元格值和样式分布
+
+    与业务系统导出的文件一样，每个文件的序号列都从1开始。
+    """
+
+    def __init__(self, rows, cols, density, part=0):
+        self.rows = rows
+        self.cols = cols
+        self.density = density
+        self.part = part
+        self._seed = f"{SEED}-{rows}-{cols}-{density}-{part}"
+
+    @property
+    def header(self):
+        kinds = len(_COLUMN_KINDS)
+        return [_COLUMN_KINDS[i % kinds] + (str(i // kinds) if i >= kinds else '') for i in range(self.cols)]
+
+    def iter_rows(self):
+        """产出(行值列表, 各单元格是否带样式)"""
+        rng = random.Random(self._seed)
+        base_date = datetime.date(2024, 1, 1)
+        for r in range(self.rows):
+            values = []
+            for c in range(self.cols):
+                kind = _COLUMN_KINDS[c % len(_COLUMN_KINDS)]
+                if kind == '序号':
+                    values.append(r + 1)
+                elif kind == '箱号':
+                    values.append(f'CTN{rng.randrange(100000):05d}')
+                elif kind == '状态':
+                    values.append(_STATUS[rng.randrange(len(_STATUS))])
+                elif kind == '数量':
+                    values.append(rng.randrange(1, 500))
+                elif kind == '单价':
+                    values.append(round(rng.uniform(0.5, 999), 2))
+                elif kind == '日期':
+                    values.append(base_date + datetime.timedelta(days=rng.randrange(365)))
+                else:
+                    values.append(f'备注{rng.randrange(1000)}-{self.part}-{r}')
+            styled = [self.density > 0 and rng.random() < self.density for _ in range(self.cols)]
+            yield values, styled
+
+
+def write_xlsx(path, table):
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Border, Font, PatternFill, Side
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Sheet1')
+    thin = Side(style='thin')
+    palette = [
+        {'font': Font(bold=True, color='FF0000')},
+        {'fill': PatternFill('solid', fgColor='FFF2CC')},
+        {'border': Border(left=thin, right=thin, top=thin, bottom=thin)},
+        {'number_format': '#,##0.00', 'font': Font(italic=True)},
+    ]
+
+    def cell(value, style):
+        result = WriteOnlyCell(ws, value=value)
+        for name, attr in (style or {}).items():
+            setattr(result, name, attr)
+        return result
+
+    header_style = None
+    if table.density:
+        header_style = {'font': Font(bold=True), 'fill': PatternFill('solid', fgColor='DDEBF7')}
+    ws.append([cell(value, header_style) for value in table.header])
+    for values, styled in table.iter_rows():
+        row = []
+        for c, value in enumerate(values):
+            style = palette[c % len(palette)] if styled[c] else None
+            if isinstance(value, datetime.date):
+                style = dict(style or {}, number_format='yyyy-mm-dd')
+            row.append(cell(value, style) if style else value)
+        ws.append(row)
+    wb.save(path)
+
+
+def write_html(path, table):
+    """写入HTML表格格式的.xls（常见于业务系统导出）"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<html><head><meta charset="utf-8"></head><body><table border="1">\n<tr>')
+        f.write(''.join(f'<th>{value}</th>' for value in table.header))
+        f.write('</tr>\n')
+        for values, styled in table.iter_rows():
+            f.write('<tr>')
+            for value, has_style in zip(values, styled):
+                style = ' style="font-weight:bold;background:#FFF2CC"' if has_style else ''
+                f.write(f'<td{style}>{value.isoformat() if isinstance(value, datetime.date) else value}</td>')
+            f.write('</tr>\n')
+        f.write('</table></body></html>\n')
+
+
+def _biff_record(record_type, data):
+    return struct.pack('<HH', record_type, len(data)) + data
+
+
+def _biff_string(text, length_format):
+    encoded = text.encode('utf-16-le')
+    return struct.pack(length_format, len(text)) + b'\x01' + encoded
+
+
+def write_xls(path, table):
+    """写入OLE2复合文档中的BIFF8工作簿（仅单元格值，只使用标准库）"""
+    epoch = datetime.date(1899, 12, 30)
+    bof = struct.pack('<HHHHII', 0x0600, 0x0005, 0x0DBB, 0x07CC, 0, 6)
+    style_xf = struct.pack('<HHHBBBBIiH', 0, 0, 0xFFF5, 0x20, 0, 0, 0, 0, 0, 0x20C0)
+    cell_xf = struct.pack('<HHHBBBBIiH', 0, 0, 0x0001, 0x20, 0, 0, 0, 0, 0, 0x20C0)
+    date_xf = struct.pack('<HHHBBBBIiH', 0, 14, 0x0001, 0x20, 0, 0, 0x04, 0, 0, 0x20C0)
+    font = struct.pack('<HHHHHBBBB', 200, 0, 0x7FFF, 400, 0, 0, 0, 0, 0) + _biff_string('Arial', '<B')
+
+    globals_records = [_biff_record(0x0809, bof), _biff_record(0x0042, struct.pack('<H', 1200))]
+    globals_records += [_biff_record(0x0031, font)] * 5
+    globals_records += [_biff_record(0x00E0, style_xf)] * 15
+    globals_records += [_biff_record(0x00E0, cell_xf), _biff_record(0x00E0, date_xf)]
+    sheet_name = _biff_string('Sheet1', '<B')
+    globals_size = sum(map(len, globals_records)) + 4 + 6 + len(sheet_name) + 4
+
+    sheet = [_biff_record(0x0809, struct.pack('<HHHHII', 0x0600, 0x0010, 0x0DBB, 0x07CC, 0, 6)),
+             _biff_record(0x0200, struct.pack('<IIHHH', 0, table.rows + 1, 0, table.cols, 0))]
+    sheet += [_biff_record(0x0204, struct.pack('<HHH', 0, c, 15) + _biff_string(value, '<H'))
+              for c, value in enumerate(table.header)]
+    for r, (values, _) in enumerate(table.iter_rows(), start=1):
+        for c, value in enumerate(values):
+            if isinstance(value, str):
+                sheet.append(_biff_record(0x0204, struct.pack('<HHH', r, c, 15) + _biff_string(value, '<H')))
+            elif isinstance(value, datetime.date):
+                sheet.append(_biff_record(0x0203, struct.pack('<HHHd', r, c, 16, (value - epoch).days)))
+            else:
+                sheet.append(_biff_record(0x0203, struct.pack('<HHHd', r, c, 15, value)))
+    sheet.append(_biff_record(0x000A, b''))
+
+    globals_records.append(_biff_record(0x0085, struct.pack('<IH', globals_size, 0) + sheet_name))
+    globals_records.append(_biff_record(0x000A, b''))
+    stream = b''.join(globals_records) + b''.join(sheet)
+    _write_compound_file(path, 'Workbook', stream)
+
+
+def _write_compound_file(path, stream_name, stream):
+    """写入只包含一个流的OLE2复合文档（512字节扇区，流不小于4096字节以避开迷你流）"""
+    end_of_chain, free, fat_sector, difat_sector = 0xFFFFFFFE, 0xFFFFFFFF, 0xFFFFFFFD, 0xFFFFFFFC
+    stream = stream.ljust(4096, b'\0')
+    data_sectors = (len(stream) + 511) // 512
+    fat_count = difat_count = 0
+    while True:
+        total = data_sectors + 1 + fat_count + difat_count
+        if fat_count * 128 >= total and difat_count * 127 >= max(0, fat_count - 109):
+            break
+        if fat_count * 128 < total:
+            fat_count += 1
+        else:
+            difat_count += 1
+    dir_start = data_sectors
+    fat_start = dir_start + 1
+    difat_start = fat_start + fat_count
+
+    fat = list(range(1, data_sectors)) + [end_of_chain, end_of_chain]
+    fat += [fat_sector] * fat_count + [difat_sector] * difat_count
+    fat += [free] * (fat_count * 128 - len(fat))
+    fat_ids = list(range(fat_start, fat_start + fat_count))
+
+    def dir_entry(name, entry_type, child, start, size):
+        encoded = (name + '\0').encode('utf-16-le') if name else b''
+        return (encoded.ljust(64, b'\0') + struct.pack('<HBB', len(encoded), entry_type, 1)
+                + struct.pack('<III', free, free, child) + b'\0' * 16 + struct.pack('<I', 0) + b'\0' * 16
+                + struct.pack('<IIi', start, size, 0))
+
+    directory = (dir_entry('Root Entry', 5, 1, end_of_chain, 0) + dir_entry(stream_name, 2, free, 0, len(stream))
+                 + dir_entry('', 0, free, free, 0) * 2)
+    header_difat = fat_ids[:109] + [free] * (109 - min(109, fat_count))
+    header = (b'\xD0\xCF\x11\xE0\xA1\xB1\x1A\xE1' + b'\0' * 16
+              + struct.pack('<HHHHH', 0x003E, 0x0003, 0xFFFE, 9, 6) + b'\0' * 6
+              + struct.pack('<IIIIIIIII', 0, fat_count, dir_start, 0, 4096, end_of_chain, 0,
+                            difat_start if difat_count else end_of_chain, difat_count)
+              + struct.pack('<109I', *header_difat))
+
+    with open(path, 'wb') as f:
+        f.write(header)
+        f.write(stream.ljust(data_sectors * 512, b'\0'))
+        f.write(directory)
+        f.write(struct.pack(f'<{len(fat)}I', *fat))
+        remaining = fat_ids[109:]
+        for i in range(difat_count):
+            ids, remaining = remaining[:127], remaining[127:]
+            next_sector = difat_start + i + 1 if i + 1 < difat_count else end_of_chain
+            f.write(struct.pack('<128I', *(ids + [free] * (127 - len(ids)) + [next_sector])))
+
+
+WRITERS = {'xlsx': (write_xlsx, '.xlsx'), 'xls': (write_xls, '.xls'), 'html': (write_html, '.xls')}
+
+
+def generate_inputs(data_dir, container, rows, cols, density):
+    """生成（或复用已生成的）单个拆分输入文件和合并输入目录，返回(拆分输入, 合并输入目录)"""
+    writer, extension = WRITERS[container]
+    case_dir = os.path.join(data_dir, case_id(container, rows, cols, density))
+    split_input = os.path.join(case_dir, f'input{extension}')
+    merge_dir = os.path.join(case_dir, 'merge')
+    done_marker = os.path.join(case_dir, '.done')
+    if os.path.exists(done_marker):
+        return split_input, merge_dir
+
+    shutil.rmtree(case_dir, ignore_errors=True)
+    os.makedirs(merge_dir)
+    writer(split_input, SyntheticTable(rows, cols, density))
+    part_rows = rows // MERGE_PARTS
+    for part in range(MERGE_PARTS):
+        writer(os.path.join(merge_dir, f'part{part + 1}{extension}'),
+               SyntheticTable(part_rows, cols, density, part=part + 1))
+    open(done_marker, 'w').close()
+    return split_input, merge_dir
+
+
+def run_script(script, args):
+    """在新的解释器中运行脚本，返回(墙钟耗时, 退出码, 进度事件列表, 最后一行输出)"""
+    command = [sys.executable, os.path.join(HERE, script)] + args + ['--events', 'json', '--no-cache']
+    start = time.perf_counter()
+    result = subprocess.run(command, cwd=HERE, capture_output=True, text=True, encoding='utf-8', errors='replace')
+    wall = time.perf_counter() - start
+    events = []
+    last_line = ''
+    for line in result.stdout.splitlines():
+        if line.startswith('{"type"'):
+            events.append(json.loads(line))
+        elif line.strip():
+            last_line = line.strip()
+    if result.returncode != 0 and result.stderr.strip():
+        last_line = result.stderr.strip().splitlines()[-1]
+    return wall, result.returncode, events, last_line
+
+
+def bench_case(data_dir, work_dir, container, rows, cols, density, repeat):
+    split_input, merge_dir = generate_inputs(data_dir, container, rows, cols, density)
+    merge_rows = rows // MERGE_PARTS * MERGE_PARTS
+    results = []
+    for script in SCRIPTS:
+        output = os.path.join(work_dir, 'output')
+        if script.startswith('split'):
+            args = ['--input', split_input, '--output', output, '--rows', str(max(1, rows // 4))]
+            data_rows = rows
+            expected_output = output
+        else:
+            expected_output = os.path.join(output, 'merged.xlsx')
+            args = ['--input_dir', merge_dir, '--output_file', expected_output]
+            data_rows = merge_rows
+
+        walls = []
+        for _ in range(repeat):
+            shutil.rmtree(output, ignore_errors=True)
+            wall, returncode, events, last_line = run_script(script, args)
+            if returncode == 0 and not os.path.exists(expected_output):
+                # 部分失败情况（例如所有输入都读取失败）脚本会正常退出但不产生输出
+                returncode = None
+            if returncode != 0:
+                break
+            walls.append(wall)
+        shutil.rmtree(output, ignore_errors=True)
+
+        entry = {'case': case_id(container, rows, cols, density), 'script': script, 'container': container,
+                 'rows': data_rows, 'cols': cols, 'style_density': density}
+        if returncode != 0:
+            entry.update(status='failed', exit_code=returncode, error=last_line)
+        else:
+            wall = statistics.median(walls)
+            rss = [event['peak_rss_mb'] for event in events if event.get('peak_rss_mb') is not None]
+            entry.update(status='ok', wall_sec=round(wall, 3), rows_per_sec=round(data_rows / wall, 1),
+                         peak_rss_mb=max(rss) if rss else None,
+                         phases={event['phase']: event['elapsed_sec'] for event in events
+                                 if event['type'] == 'phase_end'})
+        results.append(entry)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """按(用例, 脚本)与基准结果对比，返回回归说明列表"""
+    previous = {(entry['case'], entry['script']): entry for entry in baseline.get('results', [])}
+    regressions = []
+    for entry in results:
+        before = previous.get((entry['case'], entry['script']))
+        if before is None or before['status'] != 'ok':
+            continue
+        name = f"{entry['case']} {entry['script']}"
+        if entry['status'] != 'ok':
+            regressions.append(f"{name}: 基准中成功，本次失败")
+            continue
+        ratio = entry['wall_sec'] / before['wall_sec']
+        entry['baseline_wall_sec'] = before['wall_sec']
+        entry['change'] = round(ratio - 1, 3)
+        if ratio > 1 + tolerance:
+            regressions.append(f"{name}: {before['wall_sec']}s → {entry['wall_sec']}s (+{(ratio - 1) * 100:.0f}%)")
+    return regressions
+
+
+def _print_entry(entry):
+    name = f"{entry['case']:<24} {entry['script']:<22}"
+    if entry['status'] != 'ok':
+        exit_code = '无输出' if entry['exit_code'] is None else f"退出码 {entry['exit_code']}"
+        print(f"{name} 失败({exit_code}): {entry['error']}")
+        return
+    rss = f"{entry['peak_rss_mb']:.1f}MB" if entry['peak_rss_mb'] is not None else '-'
+    change = f"  {entry['change'] * 100:+.0f}%" if 'change' in entry else ''
+    print(f"{name} {entry['wall_sec']:8.3f}s {entry['rows_per_sec']:12.1f}行/秒  峰值内存 {rss}{change}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='生成合成输入并对拆分/合并脚本进行端到端基准测试')
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='quick', help='用例集合（默认：quick）')
+    parser.add_argument('--containers', nargs='+', choices=CONTAINERS, default=list(CONTAINERS),
+                        help='只运行指定容器类型的用例')
+    parser.add_argument('--repeat', type=int, default=1, help='每个脚本的运行次数，取耗时中位数（默认：1）')
+    parser.add_argument('--output', default='bench_results.json', help='结果JSON文件（默认：bench_results.json）')
+    parser.add_argument('--baseline', help='与之对比的基准结果JSON文件')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='允许的耗时增长比例（默认：0.25）')
+    parser.add_argument('--data-dir', help='合成输入的保存目录，已生成的输入会被复用（默认：临时目录）')
+    args = parser.parse_args(argv)
+
+    cases = [case for case in PRESETS[args.preset] if case[0] in args.containers]
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = args.data_dir or os.path.join(tmp, 'data')
+        for container, rows, cols, density in cases:
+            print(f"[基准] 用例 {case_id(container, rows, cols, density)}")
+            for entry in bench_case(data_dir, tmp, container, rows, cols, density, args.repeat):
+                results.append(entry)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+    for entry in results:
+        _print_entry(entry)
+
+    report = {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'preset': args.preset,
+        'seed': SEED,
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"[基准] 结果已写入: {args.output}")
+
+    if regressions:
+        print(f"[基准] 与基准相比出现 {len(regressions)} 项回归:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,10 +1,16 @@
-import pandas as pd
 import os
 import argparse
 import glob
 import sys
 import warnings
-from utils import ExcelFileProcessor
+from utils import (DataSelection, DtypeCompactor, ErrorHandler, ExcelFileProcessor, FileValidator, FormatProbe,
+                   ParallelFileParser, SequenceColumnTracker, StreamingExcelReader, StreamingTableSource,
+                   add_events_argument, add_memory_target_argument, add_output_format_argument, add_profile_argument,
+                   add_selection_arguments, add_sheets_argument, add_xlsx_writer_argument, events, open_table_writer,
+                   output_extension, profiler, reopen_table_writer, run_sheet_tasks, with_output_extension,
+                   xlsx_backends)
+from merge_manifest import MergeManifest
+from parse_cache import ParseCache, add_cache_arguments
 
 # 设置输出编码为UTF-8
 sys.stdout.reconfigure(encoding='utf-8')
@@ -14,7 +20,246 @@ sys.stderr.reconfigure(encoding='utf-8')
 warnings.filterwarnings('ignore', category=UserWarning, module='openpyxl')
 warnings.filterwarnings('ignore', category=FutureWarning, module='xlrd')
 
-def merge_excel_files(input_dir, output_file, remove_duplicate_headers=False):
+def _parse_merge_input(task):
+    """读取单个待合并文件（可在子进程中执行）
+
+    task为(序号, 文件总数, 文件路径, 解析缓存, 是否流式读取HTML, 内存目标, 工作表名, 列与行范围选择)。
+    返回(日志列表, DataFrame, 是否命中缓存)，
+    文件为空或读取失败时DataFrame为None，由调用方跳过该文件。
+    流式合并时HTML表格文件只做预扫描，返回StreamingTableSource代替DataFrame，由主进程流式写出。
+    """
+    i, total_files, file_path, cache, stream_html, memory_target, sheet, selection = task
+    messages = [f"[合并] 读取文件 {i}/{total_files}: {os.path.basename(file_path)}"]
+    hit = False
+    try:
+        if stream_html and FormatProbe.for_file(file_path).container == 'html':
+            source = StreamingTableSource(file_path, sheet=sheet, selection=selection)
+            if source.empty:
+                messages.append(f"警告：文件 {file_path} 为空，跳过")
+                return messages, None, hit
+            messages.append(f"HTML表格流式读取: {source.row_count}行 x {len(source.columns)}列")
+            return messages, source, hit
+
+        # 统一使用嗅探式读取，自动兼容"扩展名.xls但实际为.xlsx(Zip)"的文件，读取时按内存目标压缩数据类型
+        df, hit = ExcelFileProcessor.read_excel_cached(cache, file_path, memory_target, sheet, selection)
+        if df.empty:
+            messages.append(f"警告：文件 {file_path} 为空，跳过")
+            return messages, None, hit
+    except Exception as e:
+        if ErrorHandler.is_empty_data_error(e):
+            messages.append(f"警告：文件 {file_path} 为空或无有效数据，跳过")
+        else:
+            messages.append(f"错误：读取文件 {file_path} 失败: {e}")
+        return messages, None, hit
+    return messages, df, hit
+
+
+def _iter_parsed_inputs(excel_files, workers, cache, stream_html=False,
+                        memory_target=DtypeCompactor.DEFAULT_TARGET, sheet=None, selection=None):
+    """按文件顺序产出(文件路径, DataFrame或StreamingTableSource)，workers大于1时在进程池中并行解析
+
+    selection（见DataSelection）作用于每个输入文件，下推给各读取器。
+    """
+    total_files = len(excel_files)
+    if workers > 1:
+        print(f"[合并] 并行解析: {workers}个进程")
+    tasks = [(i, total_files, file_path, cache, stream_html, memory_target, sheet, selection)
+             for i, file_path in enumerate(excel_files, 1)]
+    results = ParallelFileParser(workers).imap(_parse_merge_input, tasks)
+    for file_path, (messages, df, hit) in zip(excel_files, results):
+        for message in messages:
+            print(message)
+        cache.record(hit)
+        if df is not None:
+            yield file_path, df
+
+
+def _ensure_output_extension(output_file, output_format='xlsx'):
+    """确保输出文件扩展名与输出格式一致（默认.xlsx，即使输入包含.xls文件）"""
+    extension = output_extension(output_format)
+    fixed = with_output_extension(output_file, output_format)
+    if fixed == output_file + extension:
+        print(f"输出文件已自动添加{extension}扩展名")
+    elif fixed != output_file:
+        print(f"输出文件格式已自动转换为{extension}格式")
+    return fixed
+
+
+def _drop_first_column(output_file, output_format='xlsx'):
+    """重写输出文件并去掉第一列"""
+    temp_file = os.path.splitext(output_file)[0] + '.tmp' + output_extension(output_format)
+    if output_format == 'parquet':
+        import pyarrow.parquet as pq
+
+        pq.write_table(pq.read_table(output_file).remove_column(0), temp_file, compression='snappy')
+    elif output_format == 'csv':
+        import csv
+
+        with open(output_file, encoding='utf-8-sig', newline='') as source, \
+                open(temp_file, 'w', encoding='utf-8-sig', newline='') as target:
+            writer = csv.writer(target)
+            for row in csv.reader(source):
+                writer.writerow(row[1:])
+    else:
+        writer = open_table_writer(temp_file, output_format)
+        for row in StreamingExcelReader.iter_xlsx_rows(output_file):
+            writer.append(row[1:])
+        writer.save()
+    os.replace(temp_file, output_file)
+
+
+def merge_excel_files_streaming(excel_files, output_file, remove_duplicate_headers=False, workers=1, cache=None,
+                                memory_target=DtypeCompactor.DEFAULT_TARGET, output_format='xlsx', sheet=None,
+                                manifest=None, selection=None):
+    """流式合并：逐个读取输入文件并立即追加到只写模式的输出工作簿（或CSV/Parquet文件）
+
+    内存占用只与最大的单个输入文件相关，与文件数量无关。输出内容与常规合并路径一致。
+    HTML表格文件不构建DataFrame，直接增量解析并逐行写出。
+    传入manifest时记录各文件写出的行范围并在完成后保存清单；清单中已有合并记录时在已有输出之后追加。
+    """
+    cache = cache or ParseCache(enabled=False)
+    header_mode = "去重表头" if remove_duplicate_headers else "保留表头"
+    print(f"[合并] 流式合并模式: {header_mode}")
+    output_file = _ensure_output_extension(output_file, output_format)
+
+    # Parquet的列名在创建文件时确定，读到第一个文件后再创建写入器
+    writer = None
+    tracker = SequenceColumnTracker()
+    column_count = None
+    total_files = len(excel_files)
+    if manifest is not None and manifest.inputs:
+        # 增量追加：已有输出的表头和数据行保持不变，新文件按非第一个文件处理
+        writer = reopen_table_writer(output_file, output_format, manifest.data_rows + 1)
+        column_count = manifest.column_count
+        tracker = manifest.sequence_tracker()
+
+    events.phase_start('merge', FormatProbe.estimate_data_rows(excel_files))
+    for i, (file_path, data) in enumerate(_iter_parsed_inputs(excel_files, workers, cache, True, memory_target,
+                                                              sheet, selection), 1):
+        if isinstance(data, StreamingTableSource):
+            source, cleaned_df = data, None
+            columns = source.columns
+            removed = source.sequence_column_removed
+        else:
+            # 使用增强的序号列检测逻辑
+            source, cleaned_df = None, ExcelFileProcessor._remove_sequence_columns(data)
+            columns = list(cleaned_df.columns)
+            removed = len(cleaned_df.columns) != len(data.columns)
+        if removed:
+            print(f"[合并] 文件{i}: 移除序号列")
+        del data
+        first_row = writer.rows_written - writer.header_rows if writer is not None else 0
+
+        if column_count is None:
+            column_count = len(columns)
+            writer = open_table_writer(output_file, output_format, columns)
+            writer.write_header(columns)
+        else:
+            # 其他文件的列必须与第一个文件一致（沿用第一个文件的列名）
+            if len(columns) != column_count:
+                raise ValueError(f"文件 {os.path.basename(file_path)} 的列数({len(columns)})"
+                                 f"与第一个文件({column_count})不一致")
+            if not remove_duplicate_headers:
+                # 关闭表头去重：将该文件的表头作为数据行写入
+                writer.append(list(columns))
+                tracker.update([columns[0]])
+
+        if source is not None:
+            row_count = 0
+            first_values = []
+            for row in source.iter_data_rows():
+                writer.append(row)
+                first_values.append(row[0] if row else None)
+                if len(first_values) >= 10000:
+                    tracker.update(first_values)
+                    events.advance(len(first_values))
+                    first_values = []
+                row_count += 1
+            tracker.update(first_values)
+            events.advance(len(first_values))
+        else:
+            writer.append_dataframe(cleaned_df)
+            if len(columns) > 0:
+                tracker.update(cleaned_df.iloc[:, 0].tolist())
+            row_count = len(cleaned_df)
+            events.advance(row_count)
+        print(f"[合并] 完成: {row_count}行 x {len(columns)}列")
+        if manifest is not None:
+            manifest.record(file_path, first_row, writer.rows_written - writer.header_rows)
+        del cleaned_df, source
+    events.phase_end()
+
+    if cache.enabled:
+        print(cache.summary())
+    if column_count is None:
+        print("错误：没有成功读取任何文件")
+        return
+
+    print(f"[合并] 保存文件: {os.path.basename(output_file)}")
+    events.phase_start('save')
+    writer.save()
+    if writer.output_file != output_file:
+        os.replace(writer.output_file, output_file)
+
+    # 最终检查：确保合并后的数据不包含序号列
+    drop_first_column = column_count > 1 and tracker.is_sequence()
+    if drop_first_column:
+        _drop_first_column(output_file, output_format)
+        print(f"[合并] 最终移除序号列")
+    data_rows = writer.rows_written - writer.header_rows
+    if manifest is not None:
+        manifest.finish(column_count, data_rows, tracker, drop_first_column)
+    events.output_written(output_file, data_rows)
+    events.phase_end()
+
+    print(f"[合并] 完成: {total_files}个文件 → {data_rows}行数据")
+
+
+def merge_excel_files_incremental(excel_files, output_file, remove_duplicate_headers=False, workers=1, cache=None,
+                                  memory_target=DtypeCompactor.DEFAULT_TARGET, output_format='xlsx', sheet=None,
+                                  selection=None):
+    """增量合并：根据输出文件旁的清单只解析并追加上次合并后新增的文件
+
+    已合并的文件被修改或删除、输出文件被改动、合并选项变化或上次合并移除了序号列时完整重建。
+    写出方式与流式合并相同；新文件追加在已有数据之后，因此文件顺序为加入目录的先后顺序。
+    """
+    output_file = _ensure_output_extension(output_file, output_format)
+    options = {'remove_duplicate_headers': remove_duplicate_headers, 'output_format': output_format, 'sheet': sheet}
+    if selection is not None and selection.active:
+        options['selection'] = selection.key()
+    manifest = MergeManifest.load(output_file, options)
+    new_files, rebuild_reason = manifest.plan(excel_files)
+    if rebuild_reason:
+        print(f"[合并] 增量合并: 完整重建（{rebuild_reason}）")
+        manifest.reset()
+    elif not new_files:
+        print("[合并] 增量合并: 没有新增的文件，输出保持不变")
+        # 保存内容未变但修改时间变化的文件的新状态，下次不必重新计算哈希
+        manifest.save()
+        return
+    else:
+        print(f"[合并] 增量合并: 已合并{len(manifest.inputs)}个文件，追加{len(new_files)}个新文件")
+    merge_excel_files_streaming(new_files, output_file, remove_duplicate_headers, workers, cache, memory_target,
+                                output_format, sheet, manifest, selection)
+
+
+def _list_excel_files(input_dir):
+    """获取目录中所有Excel文件"""
+    return glob.glob(os.path.join(input_dir, "*.xlsx")) + glob.glob(os.path.join(input_dir, "*.xls"))
+
+
+def merge_excel_files(input_dir, output_file, remove_duplicate_headers=False, streaming=False, workers=1,
+                      cache=None, memory_target=DtypeCompactor.DEFAULT_TARGET, output_format='xlsx', sheet=None,
+                      incremental=False, selection=None):
+    """合并目录中的Excel文件，sheet为要合并的工作表名（None为各文件的第一个工作表），不包含该工作表的文件被跳过
+
+    incremental为True时使用增量合并（见merge_excel_files_incremental），总是以流式方式写出。
+    selection（见DataSelection）为每个输入文件要读取的列和数据行范围。
+    """
+    cache = cache or ParseCache(enabled=False)
+    selection = selection or DataSelection()
+    if selection.active:
+        print(f"[合并] 只读取: {selection.describe()}")
     try:
         # 验证输入目录
         if not os.path.exists(input_dir):
@@ -23,6 +268,9 @@ def merge_excel_files(input_dir, output_file, remove_duplicate_headers=False):
         if not os.path.isdir(input_dir):
             raise ValueError(f"输入路径不是目录: {input_dir}")
         
+        FileValidator.validate_workers(workers)
+        FileValidator.validate_merge_output_format(output_format, remove_duplicate_headers)
+        
         # 验证输出文件路径
         output_dir = os.path.dirname(output_file)
         if output_dir and not os.path.exists(output_dir):
@@ -31,12 +279,17 @@ def merge_excel_files(input_dir, output_file, remove_duplicate_headers=False):
         
         print(f"[合并] 扫描目录: {os.path.basename(input_dir)}")
         # 获取所有Excel文件
-        excel_files = glob.glob(os.path.join(input_dir, "*.xlsx")) + glob.glob(os.path.join(input_dir, "*.xls"))
+        excel_files = _list_excel_files(input_dir)
         
         if not excel_files:
             raise ValueError(f"在目录 {input_dir} 中未找到Excel文件(.xlsx/.xls)")
         
         print(f"[合并] 找到 {len(excel_files)} 个Excel文件")
+        if sheet is not None:
+            excel_files = [file for file in excel_files if sheet in FormatProbe.for_file(file).sheet_names()]
+            print(f"[合并] 工作表“{sheet}”: {len(excel_files)}个文件包含该工作表")
+            if not excel_files:
+                raise ValueError(f"没有文件包含工作表: {sheet}")
         
     except FileNotFoundError as e:
         print(f"错误: {e}")
@@ -48,47 +301,45 @@ def merge_excel_files(input_dir, output_file, remove_duplicate_headers=False):
         print(f"初始化失败: {e}")
         sys.exit(1)
     
-    # 读取所有Excel文件并合并
-    all_data = []
-    total_files = len(excel_files)
-    
-    for i, file_path in enumerate(excel_files, 1):
+    if incremental:
+        try:
+            merge_excel_files_incremental(excel_files, output_file, remove_duplicate_headers, workers, cache,
+                                          memory_target, output_format, sheet, selection)
+        except Exception as e:
+            print(f"错误: 合并或保存文件失败: {e}")
+            sys.exit(1)
+        return
+
+    if streaming:
         try:
-            print(f"[合并] 读取文件 {i}/{total_files}: {os.path.basename(file_path)}")
-
-            # 统一使用嗅探式读取，自动兼容"扩展名.xls但实际为.xlsx(Zip)"的文件
-            df = ExcelFileProcessor.read_excel_with_optimization(file_path)
-
-            if df.empty:
-                print(f"警告：文件 {file_path} 为空，跳过")
-                continue
-                
-            # 内存优化：如果DataFrame很大，可以进行数据类型优化
-            if len(df) > 10000:  # 对于大于1万行的文件进行优化
-                print(f"检测到大文件({len(df)}行)，正在优化内存使用...")
-                # 尝试优化数据类型以减少内存使用
-                for col in df.select_dtypes(include=['object']).columns:
-                    try:
-                        df[col] = pd.to_numeric(df[col], downcast='integer', errors='ignore')
-                    except:
-                        pass
-            
-            all_data.append(df)
-            print(f"[合并] 完成: {len(df)}行 x {len(df.columns)}列")
-            
-        except pd.errors.EmptyDataError:
-            print(f"警告：文件 {file_path} 为空或无有效数据，跳过")
-            continue
+            merge_excel_files_streaming(excel_files, output_file, remove_duplicate_headers, workers, cache,
+                                        memory_target, output_format, sheet, selection=selection)
         except Exception as e:
-            print(f"错误：读取文件 {file_path} 失败: {e}")
-            continue
+            print(f"错误: 合并或保存文件失败: {e}")
+            sys.exit(1)
+        return
+    
+    # 读取所有Excel文件并合并
+    all_data = []
+    events.phase_start('read', FormatProbe.estimate_data_rows(excel_files))
+    for _, df in _iter_parsed_inputs(excel_files, workers, cache, memory_target=memory_target, sheet=sheet,
+                                     selection=selection):
+        all_data.append(df)
+        events.advance(len(df))
+        print(f"[合并] 完成: {len(df)}行 x {len(df.columns)}列")
+    events.phase_end()
+    if cache.enabled:
+        print(cache.summary())
     
     if not all_data:
         print("错误：没有成功读取任何文件")
         return
     
+    import pandas as pd
+    
     try:
         print(f"[合并] 开始数据合并处理")
+        events.phase_start('merge')
         
         # 在合并前对每个DataFrame进行序号列检测和移除
         cleaned_data = []
@@ -122,7 +373,8 @@ def merge_excel_files(input_dir, output_file, remove_duplicate_headers=False):
                         # 确保列名一致（使用第一个文件的列名）
                         data_only.columns = all_data[0].columns
                         processed_data.append(data_only)
-            merged_df = pd.concat(processed_data, ignore_index=True) if processed_data else pd.DataFrame()
+            with profiler.phase('concat'):
+                merged_df = pd.concat(processed_data, ignore_index=True) if processed_data else pd.DataFrame()
         else:
             # 关闭表头去重：保留所有文件的原始内容，包括各自的表头行
             processed_data = []
@@ -141,16 +393,10 @@ def merge_excel_files(input_dir, output_file, remove_duplicate_headers=False):
                         # 先添加表头行，再添加数据
                         processed_data.append(header_row)
                         processed_data.append(df_copy)
-            merged_df = pd.concat(processed_data, ignore_index=True) if processed_data else pd.DataFrame()
+            with profiler.phase('concat'):
+                merged_df = pd.concat(processed_data, ignore_index=True) if processed_data else pd.DataFrame()
         
-        # 确保输出文件为.xlsx格式（即使输入包含.xls文件）
-        if not output_file.lower().endswith('.xlsx'):
-            if output_file.lower().endswith('.xls'):
-                output_file = output_file[:-4] + '.xlsx'
-                print(f"输出文件格式已自动转换为.xlsx格式")
-            elif not output_file.lower().endswith(('.xlsx', '.xls')):
-                output_file += '.xlsx'
-                print(f"输出文件已自动添加.xlsx扩展名")
+        output_file = _ensure_output_extension(output_file, output_format)
         
         # 最终检查：确保合并后的DataFrame不包含序号列
         original_columns = len(merged_df.columns)
@@ -158,14 +404,18 @@ def merge_excel_files(input_dir, output_file, remove_duplicate_headers=False):
         if len(merged_df.columns) != original_columns:
             print(f"[合并] 最终移除序号列")
         
+        events.advance(len(merged_df))
+        events.phase_end()
+        
         print(f"[合并] 保存文件: {os.path.basename(output_file)}")
-        # 保存合并后的文件（统一使用openpyxl引擎确保.xlsx格式）
-        try:
-            with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-                merged_df.to_excel(writer, index=False)
-        except Exception as e:
-            print(f"警告：使用openpyxl引擎保存失败，尝试默认方法: {e}")
-            merged_df.to_excel(output_file, index=False)
+        events.phase_start('save', len(merged_df))
+        # .xlsx的表头使用与pandas.to_excel相同的表头格式，由最快的可用写入后端写出
+        writer = open_table_writer(output_file, output_format, list(merged_df.columns), needs=('header_style',))
+        writer.write_header(list(merged_df.columns), styled=True)
+        writer.append_dataframe(merged_df)
+        writer.save()
+        events.output_written(output_file, len(merged_df))
+        events.phase_end()
         
         print(f"[合并] 完成: {len(excel_files)}个文件 → {len(merged_df)}行数据")
         
@@ -173,12 +423,64 @@ def merge_excel_files(input_dir, output_file, remove_duplicate_headers=False):
         print(f"错误: 合并或保存文件失败: {e}")
         sys.exit(1)
 
-if __name__ == '__main__':
+
+def merge_excel_sheets(input_dir, output_file, sheets, workers=1, output_format='xlsx', **options):
+    """按--sheets合并多个工作表，options为merge_excel_files的其余参数
+
+    每个工作表分别合并所有包含该工作表的输入文件，输出到“输出文件名_工作表名”；
+    选中多个工作表且workers大于1时各工作表在进程池中并行合并（工作表内顺序解析）。
+    """
+    try:
+        names = FormatProbe.select_merge_sheets(_list_excel_files(input_dir), sheets)
+    except (OSError, ValueError) as e:
+        print(f"参数错误: {e}")
+        sys.exit(1)
+    print(f"[合并] 工作表: {', '.join(names)}")
+    root, extension = os.path.splitext(with_output_extension(output_file, output_format))
+    sheet_workers = 1 if len(names) > 1 else workers
+    tasks = [(merge_excel_files, (input_dir, f'{root}{ExcelFileProcessor.sheet_suffix(name)}{extension}'),
+              dict(options, workers=sheet_workers, output_format=output_format, sheet=name)) for name in names]
+    if not run_sheet_tasks(tasks, workers):
+        sys.exit(1)
+
+
+def main(argv=None):
+    """命令行入口，argv为None时解析sys.argv（常驻工作进程会直接传入参数列表）"""
     parser = argparse.ArgumentParser(description='合并Excel文件')
     parser.add_argument('--input_dir', required=True, help='输入Excel文件所在目录')
     parser.add_argument('--output_file', required=True, help='输出文件路径')
     parser.add_argument('--remove_duplicate_headers', type=lambda x: x.lower() == 'true', default=False, help='是否移除重复的表头')
+    parser.add_argument('--streaming', type=lambda x: x.lower() == 'true', default=False, help='是否使用流式合并（逐个文件追加写出，内存占用与文件数量无关）')
+    parser.add_argument('--workers', type=int, default=1, help='并行解析输入文件的进程数（默认：1）')
+    parser.add_argument('--incremental', type=lambda x: x.lower() == 'true', default=False,
+                        help='是否增量合并（只追加上次合并后新增的文件，清单保存在“输出文件.manifest.json”）')
+    add_output_format_argument(parser)
+    add_xlsx_writer_argument(parser)
+    add_selection_arguments(parser)
+    add_sheets_argument(parser)
+    add_cache_arguments(parser)
+    add_memory_target_argument(parser)
+    add_events_argument(parser)
+    add_profile_argument(parser)
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    events.configure(args.events)
+    xlsx_backends.configure(args.xlsx_writer)
     
-    merge_excel_files(args.input_dir, args.output_file, args.remove_duplicate_headers)
\ No newline at end of file
+    profiler.configure(args.profile)
+    try:
+        if args.sheets is not None:
+            merge_excel_sheets(args.input_dir, args.output_file, args.sheets, args.workers, args.output_format,
+                               remove_duplicate_headers=args.remove_duplicate_headers, streaming=args.streaming,
+                               cache=ParseCache.from_args(args), memory_target=args.memory_target,
+                               incremental=args.incremental, selection=DataSelection.from_args(args))
+        else:
+            merge_excel_files(args.input_dir, args.output_file, args.remove_duplicate_headers, args.streaming,
+                              args.workers, ParseCache.from_args(args), args.memory_target, args.output_format,
+                              incremental=args.incremental, selection=DataSelection.from_args(args))
+    finally:
+        profiler.finish(f'{os.path.splitext(args.output_file)[0]}_profile')
+
+
+if __name__ == '__main__':
+    main()
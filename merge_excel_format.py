@@ -1,11 +1,14 @@
-import pandas as pd
 import os
 import argparse
 import glob
 import sys
+import time
 import warnings
-from openpyxl import load_workbook, Workbook
-from openpyxl.utils import get_column_letter
+from utils import (DataSelection, DtypeCompactor, ExcelFileProcessor, FileValidator, FormatProbe, ParallelFileParser,
+                   StreamingTableSource, add_events_argument, add_memory_target_argument, add_output_format_argument,
+                   add_profile_argument, add_selection_arguments, add_sheets_argument, add_xlsx_writer_argument,
+                   events, open_table_writer, profiler, run_sheet_tasks, with_output_extension, xlsx_backends)
+from parse_cache import ParseCache, add_cache_arguments
 
 # 设置输出编码为UTF-8
 sys.stdout.reconfigure(encoding='utf-8')
@@ -16,7 +19,63 @@ warnings.filterwarnings('ignore', category=UserWarning, module='openpyxl')
 warnings.filterwarnings('ignore', category=FutureWarning, module='xlrd')
 
 
-def merge_excel_files(input_dir, output_file, remove_duplicate_headers=False):
+def _read_merge_input(task):
+    """读取单个待合并文件并移除序号列（可在子进程中执行）
+
+    task为(文件路径, 解析缓存, 内存目标, 工作表名, 列与行范围选择)。返回(DataFrame, 是否移除了序号列, 错误信息, 是否命中缓存)，
+    读取失败时DataFrame为None。HTML表格文件只做预扫描，返回StreamingTableSource代替DataFrame，
+    由主进程增量解析并逐行写出。
+    """
+    file_path, cache, memory_target, sheet, selection = task
+    try:
+        if FormatProbe.for_file(file_path).container == 'html':
+            source = StreamingTableSource(file_path, sheet=sheet, selection=selection)
+            return source, source.sequence_column_removed, None, False
+        # 使用统一的嗅探式读取
+        df, hit = ExcelFileProcessor.read_excel_cached(cache, file_path, memory_target, sheet, selection)
+        original_columns = len(df.columns)
+        df = ExcelFileProcessor._remove_sequence_columns(df)
+        return df, len(df.columns) != original_columns, None, hit
+    except Exception as e:
+        return None, False, str(e), False
+
+
+class _TableSheet:
+    """让表格写入器以工作表的方式追加行，DataFrame整块写出"""
+
+    def __init__(self, writer):
+        self.writer = writer
+
+    def append(self, row):
+        self.writer.append(row)
+
+    def append_data(self, data):
+        """写出DataFrame或StreamingTableSource的全部数据行，返回行数"""
+        if isinstance(data, StreamingTableSource):
+            rows = 0
+            for row in data.iter_data_rows():
+                self.writer.append(row)
+                rows += 1
+            return rows
+        self.writer.append_dataframe(data)
+        return len(data)
+
+
+def _list_excel_files(input_dir):
+    """获取目录中所有Excel文件"""
+    return glob.glob(os.path.join(input_dir, "*.xlsx")) + glob.glob(os.path.join(input_dir, "*.xls"))
+
+
+def merge_excel_files(input_dir, output_file, remove_duplicate_headers=False, workers=1, cache=None,
+                      memory_target=DtypeCompactor.DEFAULT_TARGET, output_format='xlsx', sheet=None, selection=None):
+    """合并目录中的Excel文件，sheet为要合并的工作表名（None为各文件的第一个工作表），不包含该工作表的文件被跳过
+
+    selection（见DataSelection）为每个输入文件要读取的列和数据行范围，下推给各读取器。
+    """
+    cache = cache or ParseCache(enabled=False)
+    selection = selection or DataSelection()
+    if selection.active:
+        print(f"只读取: {selection.describe()}")
     try:
         # 验证输入目录
         if not os.path.exists(input_dir):
@@ -25,6 +84,9 @@ def merge_excel_files(input_dir, output_file, remove_duplicate_headers=False):
         if not os.path.isdir(input_dir):
             raise ValueError(f"输入路径不是目录: {input_dir}")
         
+        FileValidator.validate_workers(workers)
+        FileValidator.validate_merge_output_format(output_format, remove_duplicate_headers)
+        
         # 验证输出文件路径
         output_dir = os.path.dirname(output_file)
         if output_dir and not os.path.exists(output_dir):
@@ -33,12 +95,17 @@ def merge_excel_files(input_dir, output_file, remove_duplicate_headers=False):
         
         print(f"扫描目录: {input_dir}")
         # 获取所有Excel文件
-        excel_files = glob.glob(os.path.join(input_dir, "*.xlsx")) + glob.glob(os.path.join(input_dir, "*.xls"))
+        excel_files = _list_excel_files(input_dir)
         
         if not excel_files:
             raise ValueError(f"在目录 {input_dir} 中未找到Excel文件(.xlsx/.xls)")
         
         print(f"找到 {len(excel_files)} 个文件")
+        if sheet is not None:
+            excel_files = [file for file in excel_files if sheet in FormatProbe.for_file(file).sheet_names()]
+            print(f"工作表“{sheet}”: {len(excel_files)}个文件包含该工作表")
+            if not excel_files:
+                raise ValueError(f"没有文件包含工作表: {sheet}")
         
     except FileNotFoundError as e:
         print(f"错误: {e}")
@@ -50,36 +117,40 @@ def merge_excel_files(input_dir, output_file, remove_duplicate_headers=False):
         print(f"初始化失败: {e}")
         sys.exit(1)
     
-    # 创建新工作簿作为模板
-    merged_wb = Workbook()
-    merged_ws = merged_wb.active
+    start_time = time.perf_counter()
+    
+    # 按文件顺序产出解析结果，workers大于1时后续文件在进程池中并行解析，与写出重叠
+    if workers > 1:
+        print(f"并行解析: {workers}个进程")
+    tasks = [(file, cache, memory_target, sheet, selection) for file in excel_files]
+    parsed_files = ParallelFileParser(workers).imap(_read_merge_input, tasks)
+    events.phase_start('merge', FormatProbe.estimate_data_rows(excel_files))
     
     # 复制第一个文件的格式作为模板
     try:
-        # 使用统一的嗅探式读取处理第一个文件
-        from utils import ExcelFileProcessor
-        first_df = ExcelFileProcessor.read_excel_with_optimization(excel_files[0])
+        first_df, removed, error, hit = next(parsed_files)
+        cache.record(hit)
+        if error is not None:
+            raise RuntimeError(error)
+        
+        # 确保输出文件扩展名与输出格式一致（默认.xlsx，即使输入包含.xls文件）
+        output_file = with_output_extension(output_file, output_format)
         
         # 检查并移除可能的序号列
-        original_columns = len(first_df.columns)
-        first_df = ExcelFileProcessor._remove_sequence_columns(first_df)
-        if len(first_df.columns) != original_columns:
+        if removed:
             print(f"移除序号列")
         print(f"读取文件: {os.path.basename(excel_files[0])} ({len(first_df)} 行数据)")
         
-        # 创建模板工作表并写入第一个文件的数据
-        from openpyxl.utils.dataframe import dataframe_to_rows
-        rows_written = 0
-        for r in dataframe_to_rows(first_df, index=False, header=True):
-            merged_ws.append(r)
-            rows_written += 1
-        
-        # 设置默认列宽
-        for col_num in range(1, len(first_df.columns) + 1):
-            col_letter = get_column_letter(col_num)
-            merged_ws.column_dimensions[col_letter].width = 15
-        
-        template_ws = merged_ws  # 使用合并工作表作为模板
+        from openpyxl.utils import get_column_letter
+
+        # .xlsx各列宽度为15（CSV/Parquet只包含单元格值，忽略列宽），由最快的可用写入后端写出
+        column_widths = {get_column_letter(col_num): 15 for col_num in range(1, len(first_df.columns) + 1)}
+        merged_wb = open_table_writer(output_file, output_format, list(first_df.columns), sheet_title='Sheet',
+                                      column_widths=column_widths if output_format == 'xlsx' else None)
+        merged_ws = _TableSheet(merged_wb)
+        merged_wb.write_header(list(first_df.columns))
+        rows_written = 1 + merged_ws.append_data(first_df)
+        events.advance(rows_written - 1)
         
     except Exception as e:
         print(f"处理第一个文件失败: {e}")
@@ -93,48 +164,35 @@ def merge_excel_files(input_dir, output_file, remove_duplicate_headers=False):
     print(f"开始合并 {total_files} 个文件")
     
     # 从第二个文件开始处理
-    for i, file in enumerate(excel_files[1:], 1):
+    for i, (file, (df_current, removed, error, hit)) in enumerate(zip(excel_files[1:], parsed_files), 1):
         try:
             print(f"处理文件 ({i+1}/{total_files}): {os.path.basename(file)}")
+            cache.record(hit)
             
-            # 使用统一的嗅探式读取
-            try:
-                df_current = ExcelFileProcessor.read_excel_with_optimization(file)
-                
-                # 检查并移除可能的序号列
-                original_columns = len(df_current.columns)
-                df_current = ExcelFileProcessor._remove_sequence_columns(df_current)
-                if len(df_current.columns) != original_columns:
-                    print(f"移除序号列")
-                if df_current.empty:
-                    print(f"文件为空，跳过")
-                    continue
-            except Exception as e:
-                print(f"读取失败: {e}")
+            if error is not None:
+                print(f"读取失败: {error}")
+                continue
+            # 检查并移除可能的序号列
+            if removed:
+                print(f"移除序号列")
+            if df_current.empty:
+                print(f"文件为空，跳过")
                 continue
         
             # 根据表头去重设置处理数据
+            rows_copied = 0
             if remove_duplicate_headers:
-                if len(df_current) > 0:
-                    data_to_add = df_current.copy()  # 保留所有数据行
-                    print(f"去重模式: 添加 {len(data_to_add)} 行数据")
-                else:
-                    data_to_add = pd.DataFrame()
-                    print(f"去重模式: 文件为空")
+                print(f"去重模式: 添加 {len(df_current)} 行数据")
             else:
-                # 关闭表头去重：将列名作为数据行添加，然后添加所有DataFrame数据
-                header_row = pd.DataFrame([df_current.columns.tolist()], columns=df_current.columns)
-                data_to_add = pd.concat([header_row, df_current], ignore_index=True)
-                print(f"保留表头模式: 添加 {len(data_to_add)} 行数据")
+                # 关闭表头去重：先将列名作为数据行写入，再写入所有数据行
+                merged_ws.append(list(df_current.columns))
+                rows_copied += 1
+                print(f"保留表头模式: 添加 {len(df_current) + 1} 行数据")
             
-            # 将数据写入合并工作表
-            rows_copied = 0
-            if not data_to_add.empty:
-                for _, row in data_to_add.iterrows():
-                    for col_idx, value in enumerate(row, 1):
-                        merged_ws.cell(row=current_row, column=col_idx, value=value)
-                    current_row += 1
-                    rows_copied += 1
+            # 将数据按整行批量写入合并工作表
+            rows_copied += merged_ws.append_data(df_current)
+            current_row += rows_copied
+            events.advance(rows_copied)
             
             print(f"完成文件: {os.path.basename(file)} ({rows_copied} 行)")
             
@@ -143,29 +201,80 @@ def merge_excel_files(input_dir, output_file, remove_duplicate_headers=False):
             continue
     
     try:
-        # 确保输出文件为.xlsx格式（即使输入包含.xls文件）
-        if not output_file.lower().endswith('.xlsx'):
-            if output_file.lower().endswith('.xls'):
-                output_file = output_file[:-4] + '.xlsx'
-            elif not output_file.lower().endswith(('.xlsx', '.xls')):
-                output_file += '.xlsx'
-        
+        events.phase_end()
         print(f"保存文件: {os.path.basename(output_file)}")
-        # 保存合并后的文件（openpyxl自动保存为.xlsx格式）
-        merged_wb.save(output_file)
+        events.phase_start('save')
+        # 保存合并后的文件
+        merged_wb.save()
         total_rows = current_row - 1
+        events.output_written(output_file, total_rows - 1)
+        events.phase_end()
+        elapsed = time.perf_counter() - start_time
+        rows_per_second = total_rows / elapsed if elapsed > 0 else 0
         print(f"合并完成: {len(excel_files)} 个文件，共 {total_rows} 行数据")
+        print(f"处理速度: {rows_per_second:.0f} 行/秒 (耗时 {elapsed:.2f} 秒)")
+        if cache.enabled:
+            print(cache.summary())
         
     except Exception as e:
         print(f"错误: 合并或保存文件失败: {e}")
         sys.exit(1)
 
-if __name__ == '__main__':
+
+def merge_excel_sheets(input_dir, output_file, sheets, workers=1, output_format='xlsx', **options):
+    """按--sheets合并多个工作表，options为merge_excel_files的其余参数
+
+    每个工作表分别合并所有包含该工作表的输入文件，输出到“输出文件名_工作表名”；
+    选中多个工作表且workers大于1时各工作表在进程池中并行合并（工作表内顺序解析）。
+    """
+    try:
+        names = FormatProbe.select_merge_sheets(_list_excel_files(input_dir), sheets)
+    except (OSError, ValueError) as e:
+        print(f"参数错误: {e}")
+        sys.exit(1)
+    print(f"工作表: {', '.join(names)}")
+    root, extension = os.path.splitext(with_output_extension(output_file, output_format))
+    sheet_workers = 1 if len(names) > 1 else workers
+    tasks = [(merge_excel_files, (input_dir, f'{root}{ExcelFileProcessor.sheet_suffix(name)}{extension}'),
+              dict(options, workers=sheet_workers, output_format=output_format, sheet=name)) for name in names]
+    if not run_sheet_tasks(tasks, workers):
+        sys.exit(1)
+
+
+def main(argv=None):
+    """命令行入口，argv为None时解析sys.argv（常驻工作进程会直接传入参数列表）"""
     parser = argparse.ArgumentParser(description='合并Excel文件（保留格式）')
     parser.add_argument('--input_dir', required=True, help='输入Excel文件所在目录')
     parser.add_argument('--output_file', required=True, help='输出文件路径')
     parser.add_argument('--remove_duplicate_headers', type=lambda x: x.lower() == 'true', default=False, help='是否移除重复的表头')
+    parser.add_argument('--workers', type=int, default=1, help='并行解析输入文件的进程数（默认：1）')
+    add_output_format_argument(parser)
+    add_xlsx_writer_argument(parser)
+    add_selection_arguments(parser)
+    add_sheets_argument(parser)
+    add_cache_arguments(parser)
+    add_memory_target_argument(parser)
+    add_events_argument(parser)
+    add_profile_argument(parser)
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    events.configure(args.events)
+    xlsx_backends.configure(args.xlsx_writer)
     
-    merge_excel_files(args.input_dir, args.output_file, args.remove_duplicate_headers)
\ No newline at end of file
+    profiler.configure(args.profile)
+    try:
+        if args.sheets is not None:
+            merge_excel_sheets(args.input_dir, args.output_file, args.sheets, args.workers, args.output_format,
+                               remove_duplicate_headers=args.remove_duplicate_headers,
+                               cache=ParseCache.from_args(args), memory_target=args.memory_target,
+                               selection=DataSelection.from_args(args))
+        else:
+            merge_excel_files(args.input_dir, args.output_file, args.remove_duplicate_headers, args.workers,
+                              ParseCache.from_args(args), args.memory_target, args.output_format,
+                              selection=DataSelection.from_args(args))
+    finally:
+        profiler.finish(f'{os.path.splitext(args.output_file)[0]}_profile')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+增量合并清单模块
+在合并输出文件旁记录已合并的输入文件（路径、大小、修改时间、内容哈希及其在输出中的行范围），
+再次合并同一目录时只解析并追加新增的文件
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from parse_cache import file_digest
+from utils import SequenceColumnTracker, atomic_output
+
+# 清单格式版本，字段含义变化时递增以使旧清单失效（触发完整重建）
+MANIFEST_VERSION = 1
+MANIFEST_SUFFIX = '.manifest.json'
+
+
+def _file_stat(file_path: str) -> Optional[Tuple[int, int]]:
+    """返回(文件大小, 纳秒修改时间)，文件不存在时返回None"""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class MergeManifest:
+    """增量合并清单
+
+    options为影响输出内容的合并选项（表头去重、输出格式、工作表），与上次合并不同时需要完整重建。
+    输入文件以绝对路径标识：大小和修改时间都未变化时视为未变化，否则再比较内容哈希。
+    每个输入文件记录其写出的数据行在输出中的范围rows=[起始, 结束)，从0开始、不含输出表头，
+    保留表头模式下包含作为数据行写入的该文件表头。
+    输出文件本身也记录大小和修改时间，被其他程序修改过时不在其后追加。
+    """
+
+    def __init__(self, output_file: str, options: Dict[str, Any]):
+        self.output_file = output_file
+        self.path = output_file + MANIFEST_SUFFIX
+        self.options = options
+        self.saved_options: Optional[Dict[str, Any]] = None
+        self.inputs: List[Dict[str, Any]] = []
+        self.column_count = 0
+        self.data_rows = 0
+        self.first_column_dropped = False
+        self._sequence: Dict[str, Any] = {}
+        self._output_stat: Optional[List[int]] = None
+
+    @classmethod
+    def load(cls, output_file: str, options: Dict[str, Any]) -> 'MergeManifest':
+        """读取输出文件旁的清单，不存在、版本不符或损坏时返回空清单"""
+        manifest = cls(output_file, options)
+        try:
+            with open(manifest.path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data['version'] != MANIFEST_VERSION:
+                return manifest
+            manifest.saved_options = data['options']
+            manifest.column_count = data['column_count']
+            manifest.data_rows = data['data_rows']
+            manifest.first_column_dropped = data['first_column_dropped']
+            manifest._sequence = data['sequence']
+            manifest._output_stat = data['output']
+            manifest.inputs = data['inputs']
+        except (OSError, ValueError, KeyError, TypeError):
+            return cls(output_file, options)
+        return manifest
+
+    def plan(self, file_paths: List[str]) -> Tuple[List[str], Optional[str]]:
+        """返回(需要追加的文件, 需要完整重建的原因)，原因为None时可以在已有输出之后追加
+
+        大小或修改时间变化但内容哈希一致的文件视为未变化，并更新其记录的大小和修改时间。
+        """
+        if not self.inputs:
+            return file_paths, "没有可用的合并清单"
+        if self.saved_options != self.options:
+            return file_paths, "合并选项与上次不同"
+        if self.first_column_dropped:
+            return file_paths, "上次合并时移除了序号列"
+        stat = _file_stat(self.output_file)
+        if stat is None or list(stat) != self._output_stat:
+            return file_paths, "输出文件不存在或在上次合并后被修改"
+
+        current = {os.path.abspath(path) for path in file_paths}
+        for entry in self.inputs:
+            name = os.path.basename(entry['path'])
+            stat = _file_stat(entry['path']) if entry['path'] in current else None
+            if stat is None:
+                return file_paths, f"已合并的文件已删除: {name}"
+            if stat != (entry['size'], entry['mtime_ns']):
+                if file_digest(entry['path']) != entry['hash']:
+                    return file_paths, f"已合并的文件已变化: {name}"
+                entry['size'], entry['mtime_ns'] = stat
+        merged = {entry['path'] for entry in self.inputs}
+        return [path for path in file_paths if os.path.abspath(path) not in merged], None
+
+    def reset(self) -> None:
+        """清空已合并文件的记录，用于完整重建"""
+        self.inputs = []
+        self.column_count = 0
+        self.data_rows = 0
+        self.first_column_dropped = False
+        self._sequence = {}
+
+    def sequence_tracker(self) -> SequenceColumnTracker:
+        """恢复上次合并结束时的序号列跟踪状态，使追加后的判断与完整合并一致"""
+        tracker = SequenceColumnTracker()
+        tracker.rows = self._sequence.get('rows', 0)
+        tracker.from_zero = self._sequence.get('from_zero', True)
+        tracker.from_one = self._sequence.get('from_one', True)
+        return tracker
+
+    def record(self, file_path: str, first_row: int, end_row: int) -> None:
+        """记录一个已写入输出的输入文件及其数据行范围"""
+        file_path = os.path.abspath(file_path)
+        size, mtime_ns = _file_stat(file_path)
+        self.inputs.append({
+            'path': file_path,
+            'size': size,
+            'mtime_ns': mtime_ns,
+            'hash': file_digest(file_path),
+            'rows': [first_row, end_row],
+        })
+
+    def finish(self, column_count: int, data_rows: int, tracker: SequenceColumnTracker,
+               first_column_dropped: bool) -> None:
+        """记录合并结果并保存清单（需在输出文件写完之后调用）"""
+        self.column_count = column_count
+        self.data_rows = data_rows
+        self.first_column_dropped = first_column_dropped
+        self._sequence = {'rows': tracker.rows, 'from_zero': tracker.from_zero, 'from_one': tracker.from_one}
+        self.save()
+
+    def save(self) -> None:
+        """写出清单"""
+        stat = _file_stat(self.output_file)
+        self._output_stat = list(stat) if stat else None
+        data = {
+            'version': MANIFEST_VERSION,
+            'options': self.options,
+            'column_count': self.column_count,
+            'data_rows': self.data_rows,
+            'first_column_dropped': self.first_column_dropped,
+            'sequence': self._sequence,
+            'output': self._output_stat,
+            'inputs': self.inputs,
+        }
+        with atomic_output(self.path) as temp_path, open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
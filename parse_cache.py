@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+解析结果磁盘缓存模块
+将读取并清理后的表格按列存储到缓存目录，重复拆分/合并同一源文件时直接加载，避免重复解析
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+import shutil
+import time
+from typing import TYPE_CHECKING, Callable, Optional, Tuple
+
+from utils import profiler
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# 缓存格式版本，存储布局变化时递增以使旧条目失效
+CACHE_VERSION = 1
+DEFAULT_MAX_MB = 2048
+_HASH_CHUNK = 1024 * 1024
+_META_FILE = 'meta.pkl'
+
+
+def _default_cache_dir() -> str:
+    """默认缓存目录：可通过环境变量EXCEL_PARSE_CACHE_DIR指定"""
+    override = os.environ.get('EXCEL_PARSE_CACHE_DIR')
+    if override:
+        return override
+    base = os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'ExcelSplitMerge', 'parse_cache')
+
+
+def file_digest(file_path: str) -> str:
+    """计算文件内容哈希"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(_HASH_CHUNK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _touch(path: str) -> None:
+    """以纳秒精度更新修改时间，作为LRU的最近使用时间（系统默认的当前时间精度可能不足以区分先后）"""
+    now = time.time_ns()
+    os.utime(path, ns=(now, now))
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for name in os.listdir(path):
+        try:
+            total += os.path.getsize(os.path.join(path, name))
+        except OSError:
+            pass
+    return total
+
+
+class ParseCache:
+    """解析结果缓存
+
+    条目以(绝对路径, 文件大小, 修改时间, 解析变体)定位，加载时再校验文件内容哈希。
+    数值/布尔/日期列保存为.npy并以内存映射方式加载，其余列以pickle保存；
+    缓存总大小超过上限时按最近使用时间淘汰最旧的条目。
+    命中统计由调用方通过record()汇总，以便并行解析时在主进程中统一计数。
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_mb: int = DEFAULT_MAX_MB, enabled: bool = True):
+        self.cache_dir = cache_dir or _default_cache_dir()
+        self.max_bytes = max(0, max_mb) * 1024 * 1024
+        self.enabled = enabled and self.max_bytes > 0
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_args(cls, args) -> 'ParseCache':
+        """根据add_cache_arguments添加的命令行参数创建缓存"""
+        return cls(args.cache_dir, args.cache_max_mb, not args.no_cache)
+
+    def get_or_parse(self, file_path: str, parse: Callable[[str], pd.DataFrame],
+                     variant: str = 'raw') -> Tuple[pd.DataFrame, bool]:
+        """返回(DataFrame, 是否命中)，未命中时调用parse解析并写入缓存
+
+        variant区分同一文件的不同解析结果（例如是否已移除序号列）。
+        """
+        if not self.enabled:
+            return parse(file_path), False
+
+        name = os.path.basename(file_path)
+        try:
+            with profiler.phase('cache_hash'):
+                entry_dir, content_hash = self._locate(file_path, variant)
+            with profiler.phase('cache_load'):
+                df = self._load(entry_dir, content_hash)
+        except OSError:
+            entry_dir, content_hash, df = None, None, None
+        if df is not None:
+            print(f"[缓存] 命中: {name}")
+            return df, True
+
+        df = parse(file_path)
+        if entry_dir is not None:
+            try:
+                with profiler.phase('cache_store'):
+                    self._store(entry_dir, content_hash, df)
+                print(f"[缓存] 未命中: {name}，解析结果已写入缓存")
+            except Exception as e:
+                print(f"[缓存] 未命中: {name}，写入缓存失败: {e}")
+        return df, False
+
+    def record(self, hit: bool) -> None:
+        """记录一次查询结果"""
+        if not self.enabled:
+            return
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def summary(self) -> str:
+        return f"[缓存] 命中 {self.hits} 次，未命中 {self.misses} 次"
+
+    def _locate(self, file_path: str, variant: str) -> Tuple[str, str]:
+        file_path = os.path.abspath(file_path)
+        stat = os.stat(file_path)
+        key = f"{CACHE_VERSION}|{file_path}|{stat.st_size}|{stat.st_mtime_ns}|{variant}"
+        entry = hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest()
+        return os.path.join(self.cache_dir, entry), file_digest(file_path)
+
+    def _load(self, entry_dir: str, content_hash: str) -> Optional[pd.DataFrame]:
+        meta_path = os.path.join(entry_dir, _META_FILE)
+        if not os.path.exists(meta_path):
+            return None
+        import numpy as np
+        import pandas as pd
+        try:
+            with open(meta_path, 'rb') as f:
+                meta = pickle.load(f)
+            if meta['content_hash'] != content_hash:
+                return None
+            data = {}
+            for i, kind in enumerate(meta['kinds']):
+                column_path = os.path.join(entry_dir, f'col_{i}.{kind}')
+                if kind == 'npy':
+                    data[i] = np.asarray(np.load(column_path, mmap_mode='r'))
+                else:
+                    with open(column_path, 'rb') as f:
+                        data[i] = pickle.load(f)
+            df = pd.DataFrame(data, index=meta['index'], copy=False)
+            df.columns = meta['columns']
+        except Exception:
+            # 条目损坏时视为未命中，随后会被新结果覆盖
+            return None
+        _touch(meta_path)
+        return df
+
+    def _store(self, entry_dir: str, content_hash: str, df: pd.DataFrame) -> None:
+        import numpy as np
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_dir = f"{entry_dir}.tmp{os.getpid()}"
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        os.makedirs(temp_dir)
+        try:
+            kinds = []
+            for i in range(df.shape[1]):
+                column = df.iloc[:, i]
+                if isinstance(column.dtype, np.dtype) and column.dtype.kind in 'biufcmM':
+                    np.save(os.path.join(temp_dir, f'col_{i}.npy'), column.to_numpy(), allow_pickle=False)
+                    kinds.append('npy')
+                else:
+                    with open(os.path.join(temp_dir, f'col_{i}.pkl'), 'wb') as f:
+                        pickle.dump(column.array, f, protocol=pickle.HIGHEST_PROTOCOL)
+                    kinds.append('pkl')
+            meta = {
+                'content_hash': content_hash,
+                'columns': df.columns,
+                'index': df.index,
+                'kinds': kinds,
+            }
+            with open(os.path.join(temp_dir, _META_FILE), 'wb') as f:
+                pickle.dump(meta, f, protocol=pickle.HIGHEST_PROTOCOL)
+            _touch(os.path.join(temp_dir, _META_FILE))
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(temp_dir, entry_dir)
+        except Exception:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+        self._evict()
+
+    def _evict(self) -> None:
+        """按最近使用时间淘汰条目，直到缓存总大小不超过上限"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            meta_path = os.path.join(path, _META_FILE)
+            if not os.path.isdir(path):
+                continue
+            try:
+                last_used = os.path.getmtime(meta_path)
+            except OSError:
+                # 其他进程正在写入的临时目录或损坏条目，一小时后再清理
+                last_used = os.path.getmtime(path)
+                if time.time() - last_used < 3600:
+                    continue
+            size = _dir_size(path)
+            entries.append((last_used, path, size))
+            total += size
+
+        entries.sort()
+        for _, path, size in entries:
+            if total <= self.max_bytes:
+                break
+            # Windows下仍被内存映射的文件无法删除，跳过即可
+            shutil.rmtree(path, ignore_errors=True)
+            if not os.path.exists(path):
+                total -= size
+
+
+def add_cache_arguments(parser) -> None:
+    """为命令行脚本添加缓存相关参数"""
+    parser.add_argument('--no-cache', action='store_true', help='不使用解析结果缓存')
+    parser.add_argument('--cache-dir', default=None, help='解析结果缓存目录（默认：用户缓存目录）')
+    parser.add_argument('--cache-max-mb', type=int, default=DEFAULT_MAX_MB,
+                        help=f'解析结果缓存大小上限，单位MB（默认：{DEFAULT_MAX_MB}）')
@@ -13,7 +13,12 @@ const pythonFiles = [
   'merge_excel.py',
   'split_excel_format.py',
   'merge_excel_format.py',
-  'utils.py'
+  'utils.py',
+  'xlsx_row_slicer.py',
+  'parse_cache.py',
+  'worker_daemon.py',
+  'merge_manifest.py',
+  'split_checkpoint.py'
 ];
 
 // 需要复制的其他文件
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+拆分断点清单模块
+在输出目录中记录已写完的分块（数据行范围和输出文件校验和），拆分被超时终止或崩溃后可用--resume从第一个缺失的分块继续
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+from parse_cache import file_digest
+from utils import atomic_output
+
+# 清单格式版本，字段含义变化时递增以使旧清单失效（从头拆分）
+CHECKPOINT_VERSION = 1
+CHECKPOINT_SUFFIX = 'Split.checkpoint.json'
+
+
+class SplitCheckpoint:
+    """拆分断点清单
+
+    记录输入文件的大小和修改时间、影响分块划分和输出内容的拆分选项，以及按顺序完成的分块：
+    序号、输出文件名、数据行范围rows=[起始, 结束)（从0开始，不含表头）、文件大小和内容哈希。
+    分块输出都是写完后原子重命名的，每完成一个分块立即保存清单，因此清单中只有完整的文件。
+    续拆时按顺序校验已完成的分块，遇到缺失或内容不符的文件即停止，从该分块的起始行继续拆分。
+    拆分全部完成后删除清单，输出目录中只留下输出文件。
+    """
+
+    def __init__(self, output_dir: str, base_name: str, input_file: str, options: Dict[str, Any],
+                 log_prefix: str = '[拆分]'):
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, f'{base_name}{CHECKPOINT_SUFFIX}')
+        self.options = options
+        self.log_prefix = log_prefix
+        stat = os.stat(input_file)
+        self.input = {'path': os.path.abspath(input_file), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+        self.chunks: List[Dict[str, Any]] = []
+
+    @classmethod
+    def open(cls, output_dir: str, base_name: str, input_file: str, options: Dict[str, Any],
+             resume: bool = False, log_prefix: str = '[拆分]') -> 'SplitCheckpoint':
+        """开始一次拆分：resume为True时载入已有清单中校验通过的分块，否则从头开始并覆盖旧清单"""
+        os.makedirs(output_dir, exist_ok=True)
+        checkpoint = cls(output_dir, base_name, input_file, options, log_prefix)
+        if resume:
+            reason = checkpoint._load()
+            if reason:
+                print(f"{log_prefix} 断点续拆: 从头开始拆分（{reason}）")
+            elif checkpoint.done:
+                print(f"{log_prefix} 断点续拆: 跳过已完成的{checkpoint.done}个文件，"
+                      f"从第{checkpoint.next_row + 1}行数据继续")
+        checkpoint.save()
+        return checkpoint
+
+    @property
+    def done(self) -> int:
+        """已完成的分块数，续拆时新的输出文件序号从其后开始"""
+        return len(self.chunks)
+
+    @property
+    def next_row(self) -> int:
+        """下一个分块的起始数据行（从0开始）"""
+        return self.chunks[-1]['rows'][1] if self.chunks else 0
+
+    def _load(self) -> Optional[str]:
+        """载入清单并校验，返回不能续拆的原因；部分分块校验失败时只保留其之前的分块"""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data['version'] != CHECKPOINT_VERSION:
+                return "断点清单版本不符"
+            if data['options'] != self.options:
+                return "拆分选项与上次不同"
+            if data['input'] != self.input:
+                return "输入文件已变化"
+            chunks = data['chunks']
+        except FileNotFoundError:
+            return "没有断点清单，上次拆分已完成或尚未开始"
+        except (OSError, ValueError, KeyError, TypeError):
+            return "断点清单已损坏"
+
+        for chunk in chunks:
+            output_file = os.path.join(self.output_dir, chunk['file'])
+            try:
+                valid = (chunk['index'] == self.done + 1 and os.path.getsize(output_file) == chunk['size']
+                         and file_digest(output_file) == chunk['hash'])
+            except OSError:
+                valid = False
+            if not valid:
+                print(f"{self.log_prefix} 断点续拆: {chunk['file']} 缺失或与记录不符，从该文件重新拆分")
+                return None
+            self.chunks.append(chunk)
+        return None
+
+    def record(self, output_file: str, rows: int, end: Optional[int] = None) -> None:
+        """记录一个已写完的分块（须按分块顺序调用），rows为其数据行数
+
+        end为下一分块的起始数据行，默认为起始行加rows；源工作表中缺少行元素（空行）时，
+        行切片引擎写出的行数少于分块跨越的源数据行，由引擎传入按源行号计算的end。
+        """
+        first = self.next_row
+        self.chunks.append({
+            'index': self.done + 1,
+            'file': os.path.basename(output_file),
+            'rows': [first, first + rows if end is None else end],
+            'size': os.path.getsize(output_file),
+            'hash': file_digest(output_file),
+        })
+        self.save()
+
+    def observer(self, *callbacks: Optional[Callable[[str, int], None]]) -> Callable[[str, int], None]:
+        """返回输出回调：依次调用callbacks(输出文件, 数据行数)（如ByteBudget.observe）后记录该分块，end见record"""
+        callbacks = [callback for callback in callbacks if callback is not None]
+
+        def on_output(output_file: str, rows: int, end: Optional[int] = None) -> None:
+            for callback in callbacks:
+                callback(output_file, rows)
+            self.record(output_file, rows, end)
+        return on_output
+
+    def rollback(self, done: int) -> None:
+        """撤销第done个分块之后记录的分块并删除其输出文件，用于某个拆分路径中途失败、改用其他路径重新拆分"""
+        for chunk in self.chunks[done:]:
+            try:
+                os.remove(os.path.join(self.output_dir, chunk['file']))
+            except OSError:
+                pass
+        del self.chunks[done:]
+        self.save()
+
+    def finish(self) -> None:
+        """拆分已全部完成，删除清单"""
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def save(self) -> None:
+        """写出清单"""
+        data = {
+            'version': CHECKPOINT_VERSION,
+            'options': self.options,
+            'input': self.input,
+            'chunks': self.chunks,
+        }
+        with atomic_output(self.path) as temp_path, open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
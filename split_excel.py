@@ -1,10 +1,18 @@
 # -*- coding: utf-8 -*-
-import pandas as pd
 import os
 import argparse
+import itertools
 import sys
 import warnings
-from utils import ExcelFileProcessor
+from utils import (ByteBudget, DataSelection, DtypeCompactor, ErrorHandler, ExcelFileProcessor, FileValidator,
+                   FormatProbe, ParallelChunkWriter, PartitionWriter, StreamingExcelReader, add_events_argument,
+                   add_memory_target_argument, add_output_format_argument, add_partition_arguments,
+                   add_profile_argument, add_resume_argument, add_selection_arguments, add_sheets_argument,
+                   add_xlsx_writer_argument,
+                   atomic_output, events, format_bytes, open_table_writer, output_extension, parse_byte_size, profiler,
+                   run_sheet_tasks, xlsx_backends)
+from parse_cache import ParseCache, add_cache_arguments
+from split_checkpoint import SplitCheckpoint
 
 # 设置输出编码为UTF-8
 sys.stdout.reconfigure(encoding='utf-8')
@@ -14,7 +22,221 @@ sys.stderr.reconfigure(encoding='utf-8')
 warnings.filterwarnings('ignore', category=UserWarning, module='openpyxl')
 warnings.filterwarnings('ignore', category=FutureWarning, module='xlrd')
 
-def split_excel_file(input_file, output_dir, rows_per_file, copy_headers=False):
+def _write_stream_chunk(index, output_file, header, rows, copy_headers, output_format='xlsx'):
+    """将流式读取的一个分块写入输出文件（.xlsx为只写模式工作簿），可在子进程中执行，返回日志信息"""
+    try:
+        with atomic_output(output_file) as temp_file:
+            writer = open_table_writer(temp_file, output_format, header)
+            if copy_headers:
+                writer.write_header(header)
+            for row in rows:
+                writer.append(row)
+            writer.save()
+    except Exception as e:
+        raise RuntimeError(f"处理第{index}个文件时失败: {e}")
+    return [f"[拆分] 完成: {os.path.basename(output_file)} ({len(rows)}行)"]
+
+
+def _dataframe_rows(df, block=10000):
+    """逐块取出DataFrame的行值，缺失值替换为None，避免一次性复制整个DataFrame"""
+    for start in range(0, len(df), block):
+        part = df.iloc[start:start + block]
+        yield from part.astype(object).where(part.notna(), None).itertuples(index=False, name=None)
+
+
+def _chunk_ranges(total_rows, rows_per_file, budget=None, encoded_rows=None, start=0):
+    """按行数或大小上限依次生成分块的(起始行, 结束行)
+
+    按大小拆分时逐块惰性计算边界，前一个文件写出后修正的缩放系数会用于后续分块。
+    start为第一个分块的起始行（断点续拆），encoded_rows须从该行开始。
+    """
+    row = None
+    while start < total_rows:
+        if budget is None:
+            end = min(start + rows_per_file, total_rows)
+        else:
+            end = start
+            while end < total_rows:
+                row = next(encoded_rows) if row is None else row
+                if not budget.fits(row):
+                    break
+                budget.add(row)
+                row = None
+                end += 1
+        yield start, end
+        start = end
+
+
+def split_excel_file_partitioned(input_file, output_dir, header, rows, column, copy_headers=False,
+                                 max_open=PartitionWriter.DEFAULT_MAX_OPEN, output_format='xlsx', sheet=None):
+    """按列值分区拆分
+
+    只遍历一次数据行，按分区列的值把每行写入对应的输出文件（源文件名_值.xlsx等，指定工作表时为源文件名_工作表名_值.xlsx），
+    同时打开的输出文件数和内存中缓存的行数都有上限，见PartitionWriter。
+    """
+    index = PartitionWriter.column_index(header, column)
+    os.makedirs(output_dir, exist_ok=True)
+    base_name = ExcelFileProcessor.get_base_filename(input_file, sheet)
+    header_mode = "包含表头" if copy_headers else "仅数据"
+    print(f"[拆分] 按列“{column}”分区拆分 ({header_mode})")
+
+    def open_output(output_file):
+        writer = open_table_writer(output_file, output_format, header)
+        if copy_headers:
+            writer.write_header(header)
+        return writer
+
+    events.phase_start('split', FormatProbe.estimate_data_rows([input_file]))
+    total_data_rows = 0
+    with PartitionWriter(output_dir, base_name, open_output, max_open,
+                         extension=output_extension(output_format)) as partitions:
+        for row in rows:
+            partitions.add(PartitionWriter.key_text(row[index] if index < len(row) else None), row)
+            total_data_rows += 1
+        partitions.close()
+    events.phase_end()
+
+    if total_data_rows == 0:
+        print("警告：没有数据行需要拆分")
+    print(f"[拆分] 分区拆分完成: {total_data_rows}行数据 → {partitions.summary()}")
+
+
+def split_excel_file_streaming(input_file, output_dir, rows_per_file, copy_headers=False, workers=1, probe=None,
+                               budget=None, output_format='xlsx', sheet=None, checkpoint=None, selection=None):
+    """流式拆分.xlsx文件或HTML表格文件
+
+    逐行读取源工作表（HTML文件默认为第一个表格），每攒满一个分块就写入只写模式的输出工作簿，峰值内存只与
+    同时在途的分块数相关，.xlsx的输出内容与DataFrame路径一致。源文件第一行作为列名，与pandas.read_excel相同。
+    指定budget时按估算的输出大小划分分块，rows_per_file为None或每个文件的行数上限。
+    指定checkpoint时记录完成的分块，并跳过其中已完成分块的数据行（仍需解析，但不再写出）。
+    指定selection（见DataSelection）时只读取选中的列和行范围内的数据行。
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    base_name = ExcelFileProcessor.get_base_filename(input_file, sheet)
+    header_mode = "包含表头" if copy_headers else "仅数据"
+    print(f"[拆分] 流式模式开始拆分 ({header_mode})")
+
+    rows = StreamingExcelReader.iter_rows(input_file, probe, sheet, selection)
+    first_row = next(rows, None)
+    header = StreamingExcelReader.normalize_header(first_row) if first_row is not None else []
+    done, start = (checkpoint.done, checkpoint.next_row) if checkpoint is not None else (0, 0)
+    if start:
+        rows = itertools.islice(rows, start, None)
+    # 流式读取前不知道确切行数，使用格式探测得到的大致行数估算剩余时间
+    events.phase_start('split', FormatProbe.estimate_data_rows([input_file]))
+
+    if budget is not None:
+        # 用开头的一段数据行校准固定开销和压缩比，再放回行迭代器
+        sample = list(itertools.islice(rows, ByteBudget.SAMPLE_ROWS))
+        budget.calibrate(header, sample, copy_headers)
+        rows = itertools.chain(sample, rows)
+
+    file_index = done
+    total_data_rows = start
+    chunk = []
+    extension = output_extension(output_format)
+    on_output = budget.observe if budget is not None else None
+    if checkpoint is not None:
+        on_output = checkpoint.observer(on_output)
+
+    try:
+        with ParallelChunkWriter(workers, on_output=on_output) as writer:
+            def submit_chunk():
+                output_file = os.path.join(output_dir, f'{base_name}Split{file_index}{extension}')
+                if budget is not None:
+                    budget.close_chunk(output_file)
+                writer.submit(_write_stream_chunk, file_index, output_file, header, chunk, copy_headers,
+                              output_format, output=(output_file, len(chunk)))
+
+            for row in rows:
+                if budget is not None:
+                    row_bytes = ByteBudget.encode_row(row)
+                    if not budget.fits(row_bytes):
+                        submit_chunk()
+                        chunk = []
+                    budget.add(row_bytes)
+                if not chunk:
+                    file_index += 1
+                    print(f"[拆分] 处理文件 {file_index}")
+                chunk.append(row)
+                total_data_rows += 1
+                if (total_data_rows - start) % events.ROW_STEP == 0:
+                    events.writing(events.ROW_STEP)
+                if budget is None and len(chunk) == rows_per_file:
+                    submit_chunk()
+                    chunk = []
+
+            if chunk:
+                submit_chunk()
+    except Exception as e:
+        print(f"错误：{e}")
+        raise
+
+    if total_data_rows == 0:
+        # 与DataFrame路径一致：没有数据行时仍创建一个（可能只含表头的）文件
+        output_file = os.path.join(output_dir, f'{base_name}Split1{extension}')
+        _write_stream_chunk(1, output_file, header, [], copy_headers and bool(header), output_format)
+        events.output_written(output_file, 0)
+        events.phase_end()
+        if checkpoint is not None:
+            checkpoint.record(output_file, 0)
+            checkpoint.finish()
+        print(f'已创建文件：{output_file}（行数：0）')
+        return
+
+    events.phase_end()
+    if checkpoint is not None:
+        checkpoint.finish()
+    print(f"[拆分] 流式拆分完成: {total_data_rows}行数据 → {file_index}个文件")
+
+
+def _write_dataframe_chunk(index, output_file, chunk, header_row, copy_headers, is_html_format,
+                           output_format='xlsx'):
+    """将DataFrame分块写入输出文件，可在子进程中执行，返回日志信息
+
+    .xlsx由最快的可用写入后端写出：标准格式的列名表头使用与pandas.to_excel相同的表头格式，
+    HTML格式的表头行按普通数据行写入。
+    """
+    # HTML格式的表头为单独的表头行，其余格式为列名
+    header = header_row.iloc[0].tolist() if is_html_format and header_row is not None else list(chunk.columns)
+    styled = copy_headers and not is_html_format
+    try:
+        # 先写入临时文件，完整写出后再重命名，中途被终止时不会留下截断的输出文件
+        with atomic_output(output_file) as temp_file:
+            writer = open_table_writer(temp_file, output_format, StreamingExcelReader.normalize_header(header),
+                                       needs=('header_style',) if styled else ())
+            if copy_headers:
+                writer.write_header(header, styled=styled)
+            # 分段追加，串行写出时进度事件随写出的行数更新（子进程中不输出进度事件）；
+            # Parquet每次追加至少写出一个行组，按行组大小分段
+            step = getattr(writer, 'ROW_GROUP_ROWS', events.ROW_STEP)
+            for begin in range(0, len(chunk), step):
+                writer.append_dataframe(chunk.iloc[begin:begin + step])
+                events.writing(min(step, len(chunk) - begin))
+            writer.save()
+    except Exception as e:
+        raise RuntimeError(f"处理第{index}个文件时失败: {e}")
+    return [f"[拆分] 完成: {os.path.basename(output_file)} ({len(chunk)}行)"]
+
+
+def split_excel_file(input_file, output_dir, rows_per_file, copy_headers=False, streaming=False, workers=1,
+                     cache=None, memory_target=DtypeCompactor.DEFAULT_TARGET, max_bytes=None, partition_by=None,
+                     max_open_files=PartitionWriter.DEFAULT_MAX_OPEN, output_format='xlsx', sheet=None,
+                     resume=False, selection=None):
+    """拆分Excel文件
+
+    指定max_bytes时按输出文件大小上限拆分，rows_per_file为None或每个文件的行数上限；
+    指定partition_by时按该列的值分区拆分，忽略行数参数。output_format为xlsx、csv或parquet。
+    sheet为要拆分的工作表名（None为默认工作表），指定时输出文件名包含工作表名。
+    按行数或大小拆分时在输出目录中记录断点清单（见SplitCheckpoint），resume为True时跳过上次已完成的分块。
+    selection（见DataSelection）为要读取的列和数据行范围，下推到各读取器，拆分只作用于选中的数据。
+    """
+    cache = cache or ParseCache(enabled=False)
+    selection = selection or DataSelection()
+    if sheet is not None:
+        print(f"[拆分] 工作表: {sheet}")
+    if selection.active:
+        print(f"[拆分] 只读取: {selection.describe()}")
     try:
         # 验证输入文件
         if not os.path.exists(input_file):
@@ -24,14 +246,66 @@ def split_excel_file(input_file, output_dir, rows_per_file, copy_headers=False):
             raise ValueError(f"不支持的文件格式: {input_file}，仅支持.xlsx和.xls格式")
         
         # 验证参数
-        if rows_per_file <= 0:
+        if rows_per_file is None and max_bytes is None:
+            raise ValueError("需要指定每个文件的行数或输出文件大小上限")
+        if rows_per_file is not None and rows_per_file <= 0:
             raise ValueError(f"每个文件的行数必须大于0，当前值: {rows_per_file}")
+        FileValidator.validate_workers(workers)
+        FileValidator.validate_max_bytes(max_bytes)
+        FileValidator.validate_max_open_files(max_open_files)
+        FileValidator.validate_output_format(output_format)
+        if partition_by is not None and max_bytes is not None:
+            raise ValueError("按列分区拆分不能与按大小拆分同时使用")
+        if partition_by is not None and resume:
+            raise ValueError("按列分区拆分不支持断点续拆")
+        budget = ByteBudget(max_bytes, rows_per_file, output_format) if max_bytes is not None else None
+        
+        # 探测一次实际容器类型，读取和后续的HTML表头处理共用该结果（同一文件的探测结果会被缓存）
+        probe = FormatProbe.for_file(input_file)
+        
+        # 分区拆分本身就是单遍处理，能流式读取的格式总是流式读取
+        if partition_by is not None and probe.container in StreamingExcelReader.STREAMABLE_CONTAINERS:
+            print(f"[拆分] 流式读取文件: {os.path.basename(input_file)}")
+            rows = StreamingExcelReader.iter_rows(input_file, probe, sheet, selection)
+            first_row = next(rows, None)
+            header = StreamingExcelReader.normalize_header(first_row) if first_row is not None else []
+            split_excel_file_partitioned(input_file, output_dir, header, rows, partition_by, copy_headers,
+                                         max_open_files, output_format, sheet)
+            return
+        
+        checkpoint = None
+        if partition_by is None:
+            options = {'script': 'split_excel', 'rows_per_file': rows_per_file, 'max_bytes': max_bytes,
+                       'copy_headers': copy_headers, 'output_format': output_format, 'sheet': sheet}
+            if selection.active:
+                options['selection'] = selection.key()
+            checkpoint = SplitCheckpoint.open(output_dir, ExcelFileProcessor.get_base_filename(input_file, sheet),
+                                              input_file, options, resume)
+        
+        if streaming:
+            if probe.container in StreamingExcelReader.STREAMABLE_CONTAINERS:
+                print(f"[拆分] 流式读取文件: {os.path.basename(input_file)}")
+                split_excel_file_streaming(input_file, output_dir, rows_per_file, copy_headers, workers, probe,
+                                           budget, output_format, sheet, checkpoint, selection)
+                return
+            print("[拆分] 流式模式仅支持.xlsx(Zip/OOXML)容器和HTML表格，回退到常规模式")
         
         print(f"[拆分] 开始读取文件: {os.path.basename(input_file)}")
         
         # 使用统一的嗅探式读取，自动兼容扩展名与实际容器不一致的.xls文件
-        df = ExcelFileProcessor.read_excel_with_optimization(input_file)
+        events.phase_start('read')
+        # HTML格式的第一行数据为表头行（见下文），行范围在分出表头行之后再截取
+        read_selection = selection.without_rows() if probe.container == 'html' else selection
+        df, hit = ExcelFileProcessor.read_excel_cached(cache, input_file, memory_target, sheet, read_selection)
+        cache.record(hit)
+        events.advance(len(df))
+        events.phase_end()
         print(f"[拆分] 文件读取完成: {len(df)}行数据")
+        
+        if partition_by is not None:
+            split_excel_file_partitioned(input_file, output_dir, list(df.columns), _dataframe_rows(df),
+                                         partition_by, copy_headers, max_open_files, output_format, sheet)
+            return
 
     except FileNotFoundError as e:
         print(f"错误: {e}")
@@ -39,27 +313,23 @@ def split_excel_file(input_file, output_dir, rows_per_file, copy_headers=False):
     except ValueError as e:
         print(f"参数错误: {e}")
         sys.exit(1)
-    except pd.errors.EmptyDataError:
-        print(f"错误: Excel文件为空或无法读取: {input_file}")
-        sys.exit(1)
     except Exception as e:
-        print(f"读取Excel文件失败: {e}")
+        if ErrorHandler.is_empty_data_error(e):
+            print(f"错误: Excel文件为空或无法读取: {input_file}")
+        else:
+            print(f"读取Excel文件失败: {e}")
         sys.exit(1)
 
-    # 检查是否为HTML格式文件（通过文件内容判断）
-    is_html_format = False
-    try:
-        with open(input_file, 'rb') as f:
-            magic = f.read(50)
-            if b'<html' in magic.lower() or b'<table' in magic.lower():
-                is_html_format = True
-    except:
-        pass
+    import pandas as pd
+
+    # HTML格式文件（由格式探测结果判断，允许BOM和前导空白）
+    is_html_format = probe.container == 'html'
     
     if is_html_format:
         # HTML格式：第一行是表头，其余是数据行
         header_row = df.iloc[0:1].copy() if len(df) > 0 else None
         data_df = df.iloc[1:].copy() if len(df) > 1 else pd.DataFrame(columns=df.columns)
+        data_df = selection.slice_rows(data_df)
         print(f"[拆分] HTML格式 - 数据行: {len(data_df)}行")
     else:
         # 其他格式：pandas已处理表头，所有DataFrame行都是数据行
@@ -71,92 +341,129 @@ def split_excel_file(input_file, output_dir, rows_per_file, copy_headers=False):
     total_data_rows = len(data_df)
     if total_data_rows == 0:
         os.makedirs(output_dir, exist_ok=True)
-        base_name = os.path.splitext(os.path.basename(input_file))[0]
-        output_file = os.path.join(output_dir, f'{base_name}Split1.xlsx')
-        # 创建空的DataFrame
-        if copy_headers:
-            if is_html_format and header_row is not None:
-                # HTML格式且需要复制表头，只包含表头行
-                empty_df = header_row.copy()
-            elif not is_html_format:
-                # 标准格式，创建带列名的空DataFrame
-                empty_df = pd.DataFrame(columns=df.columns if len(df.columns) > 0 else None)
-            else:
-                # HTML格式但无表头，创建空DataFrame
-                empty_df = pd.DataFrame(columns=df.columns if len(df.columns) > 0 else None)
-        else:
-            # 不复制表头，创建空DataFrame
-            empty_df = pd.DataFrame(columns=df.columns if len(df.columns) > 0 else None)
-        with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-            empty_df.to_excel(writer, index=False, header=copy_headers)
-        print(f'已创建文件：{output_file}（行数：{len(empty_df)}）')
+        base_name = ExcelFileProcessor.get_base_filename(input_file, sheet)
+        output_file = os.path.join(output_dir, f'{base_name}Split1{output_extension(output_format)}')
+        _write_dataframe_chunk(1, output_file, data_df, header_row, copy_headers, is_html_format, output_format)
+        events.phase_start('split', 0)
+        events.output_written(output_file, 0)
+        events.phase_end()
+        checkpoint.record(output_file, 0)
+        checkpoint.finish()
+        # 没有数据行时只写出表头行（不复制表头时为空文件）
+        print(f'已创建文件：{output_file}（行数：{1 if copy_headers else 0}）')
         return
 
-    num_files = (total_data_rows + rows_per_file - 1) // rows_per_file
     header_mode = "包含表头" if copy_headers else "仅数据"
-    print(f"[拆分] 开始拆分: {num_files}个文件 ({header_mode})")
+    encoded_rows = None
+    start = checkpoint.next_row
+    if budget is None:
+        num_files = (total_data_rows + rows_per_file - 1) // rows_per_file
+        print(f"[拆分] 开始拆分: {num_files}个文件 ({header_mode})")
+    else:
+        # 按大小拆分：文件数在拆分过程中确定
+        header = header_row.iloc[0].tolist() if header_row is not None else [str(c) for c in df.columns]
+        budget.calibrate(header, list(_dataframe_rows(data_df.head(ByteBudget.SAMPLE_ROWS))), copy_headers)
+        encoded_rows = (ByteBudget.encode_row(row) for row in _dataframe_rows(data_df.iloc[start:]))
+        print(f"[拆分] 开始按大小拆分: 每个文件不超过{format_bytes(max_bytes)} ({header_mode})")
 
     os.makedirs(output_dir, exist_ok=True)
-    base_name = os.path.splitext(os.path.basename(input_file))[0]
-
-    for i in range(num_files):
-        try:
-            start_idx = i * rows_per_file
-            end_idx = min((i + 1) * rows_per_file, total_data_rows)
-            
-            print(f"[拆分] 处理文件 {i+1}/{num_files}")
-            
-            # 获取当前分块的数据
-            chunk = data_df.iloc[start_idx:end_idx].copy()
-
-            # 将分块写入文件（统一输出为.xlsx格式以确保兼容性）
-            output_file = os.path.join(output_dir, f'{base_name}Split{i+1}.xlsx')
-            try:
-                with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-                    if copy_headers:
-                        if is_html_format and header_row is not None:
-                            # HTML格式：先写入表头行，再写入数据
-                            combined_df = pd.concat([header_row, chunk], ignore_index=True)
-                            combined_df.to_excel(writer, index=False, header=False)
-                        else:
-                            # 标准格式：使用列名作为表头
-                            chunk.to_excel(writer, index=False, header=True)
-                    else:
-                        # 不复制表头：只输出数据行，不包含列名
-                        chunk.to_excel(writer, index=False, header=False)
-            except Exception as e:
-                print(f"警告：保存文件 {output_file} 时出现问题，尝试备用方法: {e}")
-                # 备用保存方法
-                if copy_headers:
-                    if is_html_format and header_row is not None:
-                        # HTML格式：先写入表头行，再写入数据
-                        combined_df = pd.concat([header_row, chunk], ignore_index=True)
-                        combined_df.to_excel(output_file, index=False, header=False)
-                    else:
-                        # 标准格式：使用列名作为表头
-                        chunk.to_excel(output_file, index=False, header=True)
-                else:
-                    chunk.to_excel(output_file, index=False, header=False)
-            
-            # 计算实际行数
-            actual_data_rows = len(chunk)
-            output_filename = os.path.basename(output_file)
-            print(f"[拆分] 完成: {output_filename} ({actual_data_rows}行)")
-            
-            # 显式删除变量以释放内存
-            del chunk
-            
-        except Exception as e:
-            print(f"错误：处理第{i+1}个文件时失败: {e}")
-            raise
+    base_name = ExcelFileProcessor.get_base_filename(input_file, sheet)
 
-if __name__ == '__main__':
+    if workers > 1:
+        print(f"[拆分] 并行写出: {workers}个进程")
+
+    events.phase_start('split', total_data_rows - start)
+    try:
+        on_output = checkpoint.observer(budget.observe if budget is not None else None)
+        with ParallelChunkWriter(workers, on_output=on_output) as writer:
+            ranges = _chunk_ranges(total_data_rows, rows_per_file, budget, encoded_rows, start)
+            for i, (start_idx, end_idx) in enumerate(ranges, checkpoint.done):
+                print(f"[拆分] 处理文件 {i+1}/{num_files}" if budget is None else f"[拆分] 处理文件 {i+1}")
+                
+                # 获取当前分块的数据
+                chunk = data_df.iloc[start_idx:end_idx].copy()
+
+                # 将分块写入文件（默认统一输出为.xlsx格式以确保兼容性）
+                output_file = os.path.join(output_dir, f'{base_name}Split{i+1}{output_extension(output_format)}')
+                if budget is not None:
+                    budget.close_chunk(output_file)
+                writer.submit(_write_dataframe_chunk, i + 1, output_file, chunk, header_row, copy_headers, is_html_format,
+                              output_format, output=(output_file, len(chunk)))
+                
+                # 显式删除变量以释放内存（并行模式下分块已序列化给子进程）
+                del chunk
+    except Exception as e:
+        print(f"错误：{e}")
+        raise
+    events.phase_end()
+    checkpoint.finish()
+
+
+def split_excel_sheets(input_file, output_dir, rows_per_file, sheets, workers=1, **options):
+    """按--sheets拆分多个工作表，options为split_excel_file的其余参数
+
+    只解析选中的工作表；选中多个工作表且workers大于1时各工作表在进程池中并行拆分（工作表内不再并行写出），
+    只选中一个工作表时由该工作表的拆分使用全部进程。
+    """
+    try:
+        names = FormatProbe.for_file(input_file).select_sheets(sheets)
+    except (OSError, ValueError) as e:
+        print(f"参数错误: {e}")
+        sys.exit(1)
+    print(f"[拆分] 工作表: {', '.join(names)}")
+    sheet_workers = 1 if len(names) > 1 else workers
+    tasks = [(split_excel_file, (input_file, output_dir, rows_per_file),
+              dict(options, workers=sheet_workers, sheet=name)) for name in names]
+    if not run_sheet_tasks(tasks, workers):
+        sys.exit(1)
+
+
+def main(argv=None):
+    """命令行入口，argv为None时解析sys.argv（常驻工作进程会直接传入参数列表）"""
     parser = argparse.ArgumentParser(description='拆分Excel文件（基础版）')
     parser.add_argument('--input', required=True, help='输入Excel文件路径')
     parser.add_argument('--output', required=True, help='输出目录路径')
-    parser.add_argument('--rows', type=int, default=1000, help='每个文件的行数（默认：1000）')
+    parser.add_argument('--rows', type=int, default=None,
+                        help='每个文件的行数（默认：1000；指定--max-bytes时为可选的行数上限）')
+    parser.add_argument('--max-bytes', type=parse_byte_size, default=None,
+                        help='按输出文件大小拆分，每个文件不超过该大小，支持KB/MB/GB后缀（例如 20MB）')
     parser.add_argument('--copy_headers', type=lambda x: x.lower() == 'true', default=False, help='是否在每个拆分文件中复制表头')
+    parser.add_argument('--streaming', type=lambda x: x.lower() == 'true', default=False, help='是否使用流式拆分（.xlsx或HTML表格，内存占用与文件大小无关）')
+    parser.add_argument('--workers', type=int, default=1, help='并行写出文件的进程数（默认：1）')
+    add_output_format_argument(parser)
+    add_xlsx_writer_argument(parser)
+    add_selection_arguments(parser)
+    add_partition_arguments(parser)
+    add_resume_argument(parser)
+    add_sheets_argument(parser)
+    add_cache_arguments(parser)
+    add_memory_target_argument(parser)
+    add_events_argument(parser)
+    add_profile_argument(parser)
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    events.configure(args.events)
+    xlsx_backends.configure(args.xlsx_writer)
 
-    split_excel_file(args.input, args.output, args.rows, args.copy_headers)
\ No newline at end of file
+    rows = args.rows if args.rows is not None or args.max_bytes is not None else 1000
+
+    profiler.configure(args.profile)
+    try:
+        if args.sheets is not None:
+            split_excel_sheets(args.input, args.output, rows, args.sheets, args.workers,
+                               copy_headers=args.copy_headers, streaming=args.streaming,
+                               cache=ParseCache.from_args(args), memory_target=args.memory_target,
+                               max_bytes=args.max_bytes, partition_by=args.partition_by,
+                               max_open_files=args.max_open_files, output_format=args.output_format,
+                               resume=args.resume, selection=DataSelection.from_args(args))
+        else:
+            split_excel_file(args.input, args.output, rows, args.copy_headers, args.streaming, args.workers,
+                             ParseCache.from_args(args), args.memory_target, args.max_bytes, args.partition_by,
+                             args.max_open_files, args.output_format, resume=args.resume,
+                             selection=DataSelection.from_args(args))
+    finally:
+        profiler.finish(os.path.join(args.output, f'{ExcelFileProcessor.get_base_filename(args.input)}_profile'))
+
+
+if __name__ == '__main__':
+    main()
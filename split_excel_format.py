@@ -1,11 +1,19 @@
 # -*- coding: utf-8 -*-
-import pandas as pd
 import os
 import argparse
+import itertools
 import sys
 import warnings
-from openpyxl import load_workbook, Workbook
-from openpyxl.utils import get_column_letter
+from copy import copy
+from utils import (ByteBudget, DataSelection, DtypeCompactor, ExcelFileProcessor, FileValidator, FormatProbe,
+                   ParallelChunkWriter, PartitionWriter, StreamingExcelReader, add_events_argument,
+                   add_memory_target_argument, add_output_format_argument, add_partition_arguments,
+                   add_profile_argument, add_resume_argument, add_selection_arguments, add_sheets_argument,
+                   add_xlsx_writer_argument, atomic_output, events, format_bytes, open_table_writer,
+                   output_extension, parse_byte_size, profiler, run_sheet_tasks, xlsx_backends)
+from parse_cache import ParseCache, add_cache_arguments
+from split_checkpoint import SplitCheckpoint
+from xlsx_row_slicer import XlsxRowSlicer, XlsxSliceUnsupported, slice_chunk_range
 
 # 设置输出编码为UTF-8
 sys.stdout.reconfigure(encoding='utf-8')
@@ -16,7 +24,520 @@ warnings.filterwarnings('ignore', category=UserWarning, module='openpyxl')
 warnings.filterwarnings('ignore', category=FutureWarning, module='xlrd')
 
 
-def split_excel_file(input_file, output_dir, rows_per_file, copy_headers=True):
+class StyleRegistry:
+    """样式缓存
+
+    以源单元格的样式标识为键，在每个输出工作簿中只构建一次目标样式，
+    之后相同样式的单元格直接复用已登记的样式索引，避免逐单元格复制样式对象。
+    """
+
+    def __init__(self):
+        self._styles = {}
+        self.hits = 0
+        self.misses = 0
+
+    def reset(self):
+        """切换到新的输出工作簿时调用，样式索引只在同一工作簿内有效"""
+        self._styles.clear()
+
+    @staticmethod
+    def _style_key(cell):
+        # 只读单元格直接使用源工作簿中的样式ID，普通单元格使用其样式数组
+        style_id = getattr(cell, '_style_id', None)
+        if style_id is not None:
+            return style_id
+        return tuple(cell._style) if cell._style is not None else ()
+
+    def apply(self, source_cell, target_cell):
+        """将源单元格的样式应用到目标单元格"""
+        key = self._style_key(source_cell)
+        style = self._styles.get(key)
+        if style is not None:
+            self.hits += 1
+            target_cell._style = copy(style)
+            return
+
+        self.misses += 1
+        target_cell.font = copy(source_cell.font)
+        target_cell.border = copy(source_cell.border)
+        target_cell.fill = copy(source_cell.fill)
+        target_cell.number_format = source_cell.number_format
+        target_cell.protection = copy(source_cell.protection)
+        target_cell.alignment = copy(source_cell.alignment)
+        self._styles[key] = copy(target_cell._style)
+
+    def summary(self):
+        """返回缓存命中统计信息"""
+        total = self.hits + self.misses
+        hit_rate = (self.hits / total * 100) if total else 0.0
+        return f"样式缓存: 命中 {self.hits} 次, 未命中 {self.misses} 次, 命中率 {hit_rate:.1f}%"
+
+
+class SourceWindow:
+    """openpyxl逐单元格复制时读取源工作表的窗口（--columns、--row-range）
+
+    数据行从源工作表第2+skip行开始，到第1+stop行结束（stop为None时读到末尾）；
+    选中列时只以min_col/max_col读取选中列所在的区间，targets为{源列号: 输出列号}，区间内未选中的列被跳过。
+    """
+
+    def __init__(self, skip=0, stop=None, columns=None):
+        self.skip = skip
+        self.stop = stop
+        self.col_args = {}
+        self.targets = None
+        if columns is not None:
+            self.col_args = {'min_col': columns[0] + 1, 'max_col': columns[-1] + 1}
+            self.targets = {index + 1: position for position, index in enumerate(columns, 1)}
+
+    @classmethod
+    def for_sheet(cls, ws, selection):
+        """按源工作表的表头解析选中的列"""
+        columns = None
+        if selection.columns is not None:
+            header = next(ws.iter_rows(min_row=1, max_row=1, values_only=True), ())
+            columns = selection.resolve(StreamingExcelReader.normalize_header(header))
+        return cls(selection.skip, selection.stop, columns)
+
+    def row_count(self, total):
+        """源工作表共total个数据行时窗口内的数据行数"""
+        return max(0, min(total, self.stop if self.stop is not None else total) - self.skip)
+
+    def header(self, ws):
+        """表头行的单元格（限于选中列所在的区间）"""
+        return next(ws.iter_rows(min_row=1, max_row=1, **self.col_args), ())
+
+    def rows(self, ws, first, last=None, values_only=False):
+        """窗口内第first到last个数据行（从0开始，不含last，None为读到窗口末尾）"""
+        last = self.stop - self.skip if last is None and self.stop is not None else last
+        return ws.iter_rows(min_row=2 + self.skip + first, max_row=1 + self.skip + last if last is not None else None,
+                            values_only=values_only, **self.col_args)
+
+    def column(self, cell):
+        """源单元格在输出中的列号，未选中的列为None"""
+        return cell.column if self.targets is None else self.targets.get(cell.column)
+
+    def project(self, values):
+        """从iter_rows(values_only=True)的一行中取出选中列的值"""
+        if self.targets is None:
+            return values
+        first = self.col_args['min_col']
+        return tuple(value for column, value in enumerate(values, first) if column in self.targets)
+
+    def column_widths(self, widths):
+        """源工作表的{列字母: 列宽}换算为输出中的列"""
+        if self.targets is None:
+            return widths
+        from openpyxl.utils import column_index_from_string, get_column_letter
+        return {get_column_letter(self.targets[column_index_from_string(letter)]): width
+                for letter, width in widths.items() if column_index_from_string(letter) in self.targets}
+
+
+def _chunk_groups(num_files, workers, first=0):
+    """将分块序号first及之后的分块划分为不超过workers段的连续区间[first, last)"""
+    if first >= num_files:
+        return
+    groups = min(workers, num_files - first)
+    size, extra = divmod(num_files - first, groups)
+    for g in range(groups):
+        last = first + size + (1 if g < extra else 0)
+        yield first, last
+        first = last
+
+
+def _new_output_sheet(column_widths):
+    from openpyxl import Workbook
+    new_wb = Workbook()
+    new_ws = new_wb.active
+    for col_letter, width in column_widths.items():
+        new_ws.column_dimensions[col_letter].width = width
+    return new_wb, new_ws
+
+
+def _copy_chunk_range(ws, output_dir, base_name, rows_per_file, data_rows, num_files, copy_headers,
+                      column_widths, first, last, styles, log, on_output, window=None):
+    """复制[first, last)范围内的分块
+
+    只遍历一次该范围对应的源数据行并依次分派到各输出文件，避免只读模式下每个分块都从头解析源文件。
+    每个输出文件保存后以(路径, 数据行数)调用on_output。window（见SourceWindow）为读取源工作表的行列窗口，
+    data_rows为窗口内的数据行数。
+    """
+    from openpyxl.cell.read_only import EmptyCell
+    window = window or SourceWindow()
+    header_cells = [(window.column(cell), cell) for cell in window.header(ws)
+                    if not isinstance(cell, EmptyCell) and window.column(cell)] if copy_headers else []
+    source_rows = window.rows(ws, first * rows_per_file, min(last * rows_per_file, data_rows))
+    copied = 0
+
+    for i in range(first, last):
+        try:
+            # 计算当前文件的数据行范围（基于数据行索引，从0开始）
+            data_start_idx = i * rows_per_file
+            data_end_idx = min((i + 1) * rows_per_file, data_rows)
+            
+            log(f"[格式拆分] 处理文件 {i+1}/{num_files}")
+            
+            # 创建新工作簿
+            new_wb, new_ws = _new_output_sheet(column_widths)
+            styles.reset()
+        
+            current_write_row = 1
+            
+            with profiler.phase('copy_cells'):
+                # 复制表头（如果启用）
+                if copy_headers:
+                    for column, cell in header_cells:
+                        tgt = new_ws.cell(row=current_write_row, column=column, value=cell.value)
+                        styles.apply(cell, tgt)
+                    current_write_row = 2  # 表头占用第1行，数据从第2行开始
+
+                # 复制数据行（如果有数据）
+                for r_idx in range(data_end_idx - data_start_idx):
+                    for cell in next(source_rows, ()):
+                        # 只读模式下缺失的单元格（如合并区域）没有坐标，跳过即可
+                        if isinstance(cell, EmptyCell):
+                            continue
+                        column = window.column(cell)
+                        if column is None:
+                            continue
+                        new_cell = new_ws.cell(row=current_write_row + r_idx, column=column, value=cell.value)
+                        styles.apply(cell, new_cell)
+                    copied += 1
+                    if copied % events.ROW_STEP == 0:
+                        events.writing(events.ROW_STEP)
+            
+            # 保存为新的Excel文件，使用源文件名+Split+序号格式
+            output_file = os.path.join(output_dir, f'{base_name}Split{i+1}.xlsx')
+            with profiler.phase('save_workbook'), atomic_output(output_file) as temp_file:
+                new_wb.save(temp_file)
+
+            # 计算实际行数
+            actual_data_rows = data_end_idx - data_start_idx
+            output_filename = os.path.basename(output_file)
+            log(f"[格式拆分] 完成: {output_filename} ({actual_data_rows}行)")
+            on_output(output_file, actual_data_rows)
+        
+        except Exception as e:
+            raise RuntimeError(f"处理第{i+1}个文件时失败: {e}")
+
+
+def _copy_rows_by_bytes(ws, output_dir, base_name, copy_headers, column_widths, styles, budget, checkpoint,
+                        window=None):
+    """按输出文件大小上限复制数据行（保留格式），返回输出文件数
+
+    分块边界依赖已写出文件修正后的压缩比，因此按顺序写出。从checkpoint记录的下一分块起始行开始复制。
+    window（见SourceWindow）为读取源工作表的行列窗口。
+    """
+    from openpyxl.cell.read_only import EmptyCell
+    window = window or SourceWindow()
+    header_cells = [(window.column(cell), cell) for cell in window.header(ws)
+                    if not isinstance(cell, EmptyCell) and window.column(cell)] if copy_headers else []
+    sample = [window.project(row) for row in window.rows(ws, 0, ByteBudget.SAMPLE_ROWS, values_only=True)]
+    budget.calibrate([cell.value for _, cell in header_cells], sample, copy_headers, '[格式拆分]')
+    del sample
+
+    index = checkpoint.done
+    new_wb = new_ws = None
+    write_row = rows = copied = 0
+
+    def save_chunk():
+        output_file = os.path.join(output_dir, f'{base_name}Split{index}.xlsx')
+        with profiler.phase('save_workbook'), atomic_output(output_file) as temp_file:
+            new_wb.save(temp_file)
+        budget.close_chunk(output_file)
+        budget.observe(output_file, rows)
+        print(f"[格式拆分] 完成: {os.path.basename(output_file)} ({rows}行)")
+        events.output_written(output_file, rows)
+        checkpoint.record(output_file, rows)
+
+    for source_row in window.rows(ws, checkpoint.next_row):
+        # 只读模式下缺失的单元格（如合并区域）没有坐标，跳过即可
+        cells = [(window.column(cell), cell) for cell in source_row if not isinstance(cell, EmptyCell)]
+        cells = [(column, cell) for column, cell in cells if column is not None]
+        row_bytes = ByteBudget.encode_row(cell.value for _, cell in cells)
+        if new_wb is None or not budget.fits(row_bytes):
+            if new_wb is not None:
+                save_chunk()
+            index += 1
+            print(f"[格式拆分] 处理文件 {index}")
+            new_wb, new_ws = _new_output_sheet(column_widths)
+            styles.reset()
+            for column, cell in header_cells:
+                styles.apply(cell, new_ws.cell(row=1, column=column, value=cell.value))
+            write_row = 2 if copy_headers else 1
+            rows = 0
+        budget.add(row_bytes)
+        for column, cell in cells:
+            styles.apply(cell, new_ws.cell(row=write_row, column=column, value=cell.value))
+        write_row += 1
+        rows += 1
+        copied += 1
+        if copied % events.ROW_STEP == 0:
+            events.writing(events.ROW_STEP)
+    if new_wb is not None:
+        save_chunk()
+    return index - checkpoint.done
+
+
+def _copy_chunk_range_from_file(input_file, output_dir, base_name, rows_per_file, data_rows, num_files,
+                                copy_headers, column_widths, first, last, sheet=None, window=None):
+    """子进程任务：以只读模式打开源文件并复制一段连续分块，返回日志、样式缓存统计和输出文件列表"""
+    from openpyxl import load_workbook
+    wb = load_workbook(input_file, read_only=True)
+    try:
+        styles = StyleRegistry()
+        messages = []
+        outputs = []
+        _copy_chunk_range(wb.active if sheet is None else wb[sheet], output_dir, base_name, rows_per_file, data_rows, num_files,
+                          copy_headers, column_widths, first, last, styles, messages.append,
+                          lambda output_file, rows: outputs.append((output_file, rows)), window)
+        return messages, styles.hits, styles.misses, outputs
+    finally:
+        wb.close()
+
+
+def _copy_value_chunk(output_dir, base_name, rows_per_file, data_rows, num_files, copy_headers,
+                      column_widths, index, header, rows):
+    """子进程任务：写入不带源格式的单个分块（单元格值由主进程传入，由最快的可用写入后端写出）"""
+    messages = [f"[格式拆分] 处理文件 {index+1}/{num_files}"]
+    try:
+        output_file = os.path.join(output_dir, f'{base_name}Split{index+1}.xlsx')
+        with atomic_output(output_file) as temp_file:
+            writer = open_table_writer(temp_file, sheet_title='Sheet', column_widths=column_widths)
+            if copy_headers:
+                writer.write_header(header)
+            for row in rows:
+                writer.append(row)
+            writer.save()
+    except Exception as e:
+        raise RuntimeError(f"处理第{index+1}个文件时失败: {e}")
+    messages.append(f"[格式拆分] 完成: {os.path.basename(output_file)} ({len(rows)}行)")
+    return messages, 0, 0, [(output_file, len(rows))]
+
+
+def _write_rows_chunk(output_file, index, header, rows, copy_headers, output_format='xlsx'):
+    """子进程任务：将流式读取的一个分块写入只写模式工作簿（或CSV/Parquet文件），返回日志"""
+    try:
+        with atomic_output(output_file) as temp_file:
+            writer = open_table_writer(temp_file, output_format, header, sheet_title='Sheet')
+            if copy_headers:
+                writer.write_header(header)
+            for row in rows:
+                writer.append(row)
+            writer.save()
+    except Exception as e:
+        raise RuntimeError(f"处理第{index}个文件时失败: {e}")
+    return [f"[格式拆分] 完成: {os.path.basename(output_file)} ({len(rows)}行)"]
+
+
+def _read_source_rows(input_file, probe, cache, memory_target, sheet=None, selection=None):
+    """返回(表头, 数据行迭代器)：HTML表格和.xlsx流式读取，.xls读取为DataFrame，selection下推给读取器"""
+    if probe.container in StreamingExcelReader.STREAMABLE_CONTAINERS:
+        rows = StreamingExcelReader.iter_rows(input_file, probe, sheet, selection)
+        first_row = next(rows, None)
+        header = StreamingExcelReader.normalize_header(first_row) if first_row is not None else []
+        return header, rows
+    events.phase_start('read')
+    df, hit = ExcelFileProcessor.read_excel_cached(cache, input_file, memory_target, sheet, selection)
+    cache.record(hit)
+    events.advance(len(df))
+    events.phase_end()
+    rows = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+    return list(df.columns), rows
+
+
+def _split_rows_streaming(input_file, probe, output_dir, rows_per_file, copy_headers, workers, budget=None,
+                          output_format='xlsx', cache=None, memory_target=DtypeCompactor.DEFAULT_TARGET, sheet=None,
+                          checkpoint=None, selection=None):
+    """流式拆分单元格值
+
+    HTML表格没有可保留的单元格格式，增量解析第一个表格并逐块写出，不构建DataFrame和中间工作簿；
+    输出CSV/Parquet时其他输入也走这条路径。指定budget时按估算的输出大小划分分块。
+    指定checkpoint时记录完成的分块，并跳过其中已完成分块的数据行。
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    base_name = ExcelFileProcessor.get_base_filename(input_file, sheet)
+    extension = output_extension(output_format)
+    header_mode = "包含表头" if copy_headers else "仅数据"
+    if probe.container == 'html':
+        print(f"[格式拆分] HTML表格流式拆分 ({header_mode})")
+    else:
+        print(f"[格式拆分] 输出{output_format.upper()}只包含单元格值，流式拆分 ({header_mode})")
+
+    header, rows = _read_source_rows(input_file, probe, cache or ParseCache(enabled=False), memory_target, sheet,
+                                     selection)
+    done, start = (checkpoint.done, checkpoint.next_row) if checkpoint is not None else (0, 0)
+    if start:
+        rows = itertools.islice(rows, start, None)
+    events.phase_start('split', FormatProbe.estimate_data_rows([input_file]))
+
+    if budget is not None:
+        sample = list(itertools.islice(rows, ByteBudget.SAMPLE_ROWS))
+        budget.calibrate(header, sample, copy_headers, '[格式拆分]')
+        rows = itertools.chain(sample, rows)
+
+    file_index = done
+    total_data_rows = start
+    chunk = []
+    on_output = budget.observe if budget is not None else None
+    if checkpoint is not None:
+        on_output = checkpoint.observer(on_output)
+    with ParallelChunkWriter(workers, on_output=on_output) as writer:
+        def submit_chunk():
+            output_file = os.path.join(output_dir, f'{base_name}Split{file_index}{extension}')
+            if budget is not None:
+                budget.close_chunk(output_file)
+            writer.submit(_write_rows_chunk, output_file, file_index, header, chunk, copy_headers, output_format,
+                          output=(output_file, len(chunk)))
+
+        for row in rows:
+            if budget is not None:
+                row_bytes = ByteBudget.encode_row(row)
+                if not budget.fits(row_bytes):
+                    submit_chunk()
+                    chunk = []
+                budget.add(row_bytes)
+            if not chunk:
+                file_index += 1
+                print(f"[格式拆分] 处理文件 {file_index}")
+            chunk.append(row)
+            total_data_rows += 1
+            if (total_data_rows - start) % events.ROW_STEP == 0:
+                events.writing(events.ROW_STEP)
+            if budget is None and len(chunk) == rows_per_file:
+                submit_chunk()
+                chunk = []
+        if chunk:
+            submit_chunk()
+    events.phase_end()
+
+    if total_data_rows == 0:
+        print("警告：没有数据行需要拆分")
+        output_file = os.path.join(output_dir, f'{base_name}Split1{extension}')
+        _write_rows_chunk(output_file, 1, header, [], copy_headers and bool(header), output_format)
+        if checkpoint is not None:
+            checkpoint.record(output_file, 0)
+            checkpoint.finish()
+        print(f'已创建文件：{output_file}（总行数：{1 if copy_headers and header else 0}）')
+        return
+
+    if checkpoint is not None:
+        checkpoint.finish()
+    print(f"[格式拆分] 数据行: {total_data_rows}行")
+    print(f"[格式拆分] 流式拆分完成: {file_index}个文件")
+
+
+def _partition_with_slicer(input_file, output_dir, column, copy_headers, max_open, sheet=None, selection=None):
+    """使用行切片引擎按列值分区拆分，保留源文件样式；selection只能包含行范围"""
+    selection = selection or DataSelection()
+    base_name = ExcelFileProcessor.get_base_filename(input_file, sheet)
+    with XlsxRowSlicer(input_file, sheet) as slicer:
+        with profiler.phase('prescan'):
+            slicer.prescan()
+        data_rows = max(0, slicer.max_row - 1) if slicer.max_row is not None else None
+        print(f"[格式拆分] 按列“{column}”分区拆分 ({'包含表头' if copy_headers else '仅数据'})")
+        events.phase_start('split', data_rows)
+        outputs, partitions = slicer.partition(output_dir, base_name, column, copy_headers, max_open,
+                                               row_range=(selection.skip, selection.stop))
+        events.phase_end()
+    print(f"[格式拆分] 分区拆分完成: {partitions.summary()}")
+    return len(outputs)
+
+
+def _partition_rows(input_file, probe, output_dir, column, copy_headers, max_open, cache, memory_target,
+                    output_format='xlsx', sheet=None, selection=None):
+    """按列值分区拆分（仅单元格值）：HTML表格和行切片引擎不适用的.xlsx流式读取，.xls读取为DataFrame"""
+    header, rows = _read_source_rows(input_file, probe, cache, memory_target, sheet, selection)
+    if probe.container != 'html' and output_format == 'xlsx':
+        print("[格式拆分] 分区输出只包含单元格值，不保留源文件格式")
+    index = PartitionWriter.column_index(header, column)
+
+    os.makedirs(output_dir, exist_ok=True)
+    base_name = ExcelFileProcessor.get_base_filename(input_file, sheet)
+    print(f"[格式拆分] 按列“{column}”分区拆分 ({'包含表头' if copy_headers else '仅数据'})")
+
+    def open_output(output_file):
+        writer = open_table_writer(output_file, output_format, header, sheet_title='Sheet')
+        if copy_headers:
+            writer.write_header(header)
+        return writer
+
+    events.phase_start('split', FormatProbe.estimate_data_rows([input_file]))
+    with PartitionWriter(output_dir, base_name, open_output, max_open, log_prefix='[格式拆分]',
+                         extension=output_extension(output_format)) as partitions:
+        for row in rows:
+            partitions.add(PartitionWriter.key_text(row[index] if index < len(row) else None), row)
+        partitions.close()
+    events.phase_end()
+    print(f"[格式拆分] 分区拆分完成: {partitions.summary()}")
+
+
+def _split_with_slicer(input_file, output_dir, rows_per_file, copy_headers, workers, budget=None, sheet=None,
+                       checkpoint=None, selection=None):
+    """使用行切片引擎拆分，多进程时每个进程各自扫描源文件并负责一段连续分块；按大小拆分时顺序切分
+
+    指定checkpoint时记录完成的分块，并从其中第一个未完成的分块开始切分。
+    selection只能包含行范围，只切分范围内的数据行。
+    """
+    selection = selection or DataSelection()
+    row_range = (selection.skip, selection.stop)
+    base_name = ExcelFileProcessor.get_base_filename(input_file, sheet)
+    done, start = (checkpoint.done, checkpoint.next_row) if checkpoint is not None else (0, 0)
+    if checkpoint is not None:
+        on_output = checkpoint.observer(events.output_written)
+    else:
+        def on_output(output_file, rows, end=None):
+            events.output_written(output_file, rows)
+    with XlsxRowSlicer(input_file, sheet) as slicer:
+        with profiler.phase('prescan'):
+            slicer.prescan()
+        data_rows = selection.row_count(slicer.max_row - 1) if slicer.max_row is not None else None
+        if workers <= 1 or slicer.max_row is None or budget is not None:
+            events.phase_start('split', data_rows)
+            outputs = slicer.split(output_dir, base_name, rows_per_file, copy_headers,
+                                   on_output=on_output, budget=budget, start=(done, start), row_range=row_range)
+            events.phase_end()
+            return len(outputs)
+        num_files = max(1, (data_rows + rows_per_file - 1) // rows_per_file)
+
+    print(f"[格式拆分] 数据行: {data_rows}行")
+    print(f"[格式拆分] 开始拆分: {num_files}个文件 ({'包含表头' if copy_headers else '仅数据'})")
+    print(f"[格式拆分] 并行写出: {workers}个进程")
+    os.makedirs(output_dir, exist_ok=True)
+
+    def collect(result):
+        messages, outputs = result
+        ParallelChunkWriter.print_messages(messages)
+        for output_file, rows in outputs:
+            on_output(output_file, rows)
+
+    events.phase_start('split', data_rows)
+    with ParallelChunkWriter(workers, on_result=collect) as writer:
+        for first, last in _chunk_groups(num_files, workers, done):
+            writer.submit(slice_chunk_range, input_file, output_dir, base_name, rows_per_file, copy_headers, first, last,
+                          sheet, row_range)
+    events.phase_end()
+    return num_files - done
+
+
+def split_excel_file(input_file, output_dir, rows_per_file, copy_headers=True, engine='auto', workers=1,
+                     cache=None, memory_target=DtypeCompactor.DEFAULT_TARGET, max_bytes=None, partition_by=None,
+                     max_open_files=PartitionWriter.DEFAULT_MAX_OPEN, output_format='xlsx', sheet=None,
+                     resume=False, selection=None):
+    """拆分Excel文件并保留格式
+
+    指定max_bytes时按输出文件大小上限拆分，rows_per_file为None或每个文件的行数上限；
+    指定partition_by时按该列的值分区拆分，忽略行数参数。
+    output_format为csv或parquet时没有格式可保留，只流式写出单元格值。
+    sheet为要拆分的工作表名（None为默认工作表），指定时输出文件名包含工作表名。
+    按行数或大小拆分时在输出目录中记录断点清单（见SplitCheckpoint），resume为True时跳过上次已完成的分块。
+    selection（见DataSelection）为要读取的列和数据行范围：行切片引擎只支持行范围，选择列时使用openpyxl逐单元格复制。
+    """
+    cache = cache or ParseCache(enabled=False)
+    selection = selection or DataSelection()
+    if sheet is not None:
+        print(f"[格式拆分] 工作表: {sheet}")
+    if selection.active:
+        print(f"[格式拆分] 只读取: {selection.describe()}")
     try:
         # 验证输入文件
         if not os.path.exists(input_file):
@@ -26,21 +547,87 @@ def split_excel_file(input_file, output_dir, rows_per_file, copy_headers=True):
             raise ValueError(f"不支持的文件格式: {input_file}，仅支持.xlsx和.xls格式")
         
         # 验证参数
-        if rows_per_file <= 0:
+        if rows_per_file is None and max_bytes is None:
+            raise ValueError("需要指定每个文件的行数或输出文件大小上限")
+        if rows_per_file is not None and rows_per_file <= 0:
             raise ValueError(f"每个文件的行数必须大于0，当前值: {rows_per_file}")
+        FileValidator.validate_workers(workers)
+        FileValidator.validate_max_bytes(max_bytes)
+        FileValidator.validate_max_open_files(max_open_files)
+        FileValidator.validate_output_format(output_format)
+        if partition_by is not None and max_bytes is not None:
+            raise ValueError("按列分区拆分不能与按大小拆分同时使用")
+        if partition_by is not None and resume:
+            raise ValueError("按列分区拆分不支持断点续拆")
+        budget = ByteBudget(max_bytes, rows_per_file, output_format) if max_bytes is not None else None
+        
+        checkpoint = None
+        if partition_by is None:
+            options = {'script': 'split_excel_format', 'rows_per_file': rows_per_file, 'max_bytes': max_bytes,
+                       'copy_headers': copy_headers, 'output_format': output_format, 'sheet': sheet}
+            if selection.active:
+                options['selection'] = selection.key()
+            checkpoint = SplitCheckpoint.open(output_dir, ExcelFileProcessor.get_base_filename(input_file, sheet),
+                                              input_file, options, resume, '[格式拆分]')
         
         print(f"[格式拆分] 开始读取文件: {os.path.basename(input_file)}")
         
+        # .xlsx文件优先使用行切片引擎：直接切分工作表XML并复用源文件样式
+        use_slicer = engine != 'openpyxl' and output_format == 'xlsx' and input_file.lower().endswith('.xlsx')
+        if use_slicer and selection.columns is not None:
+            # 行切片引擎按行原样复制XML，无法只保留部分列
+            if engine == 'xml':
+                raise ValueError("行切片引擎按行原样复制，不支持--columns")
+            print("[格式拆分] 行切片引擎不支持选择列，使用openpyxl逐单元格复制")
+            use_slicer = False
+        if use_slicer:
+            done = checkpoint.done if checkpoint is not None else 0
+            try:
+                if partition_by is not None:
+                    num_outputs = _partition_with_slicer(input_file, output_dir, partition_by, copy_headers,
+                                                         max_open_files, sheet, selection)
+                else:
+                    num_outputs = _split_with_slicer(input_file, output_dir, rows_per_file, copy_headers, workers,
+                                                     budget, sheet, checkpoint, selection)
+                    checkpoint.finish()
+                print(f"[格式拆分] 行切片完成: {num_outputs}个文件")
+                return
+            except XlsxSliceUnsupported as e:
+                if engine == 'xml':
+                    raise ValueError(f"行切片引擎无法处理该文件: {e}")
+                print(f"[格式拆分] 行切片引擎不适用（{e}），使用openpyxl逐单元格复制")
+                if checkpoint is not None and checkpoint.done > done:
+                    # 行切片引擎已写完的分块由openpyxl路径重新生成，两条路径的输出不混在一起
+                    print(f"[格式拆分] 删除行切片引擎已写出的{checkpoint.done - done}个文件")
+                    checkpoint.rollback(done)
+        
+        # HTML表格文件（常见于系统导出的.xls）没有源格式可保留，直接流式拆分
+        probe = FormatProbe.for_file(input_file)
+        if partition_by is not None:
+            _partition_rows(input_file, probe, output_dir, partition_by, copy_headers, max_open_files, cache,
+                            memory_target, output_format, sheet, selection)
+            return
+        if probe.container == 'html' or output_format != 'xlsx':
+            _split_rows_streaming(input_file, probe, output_dir, rows_per_file, copy_headers, workers, budget,
+                                  output_format, cache, memory_target, sheet, checkpoint, selection)
+            return
+        
+        # 以下路径逐单元格复制格式，需要openpyxl
+        from openpyxl import load_workbook, Workbook
+        from openpyxl.cell.read_only import EmptyCell
+        
         # 检测文件格式并选择合适的处理方式
         if input_file.lower().endswith('.xls'):
             # 使用统一的嗅探式读取，自动兼容HTML格式的.xls文件
             try:
-                from utils import ExcelFileProcessor
-                df = ExcelFileProcessor.read_excel_with_optimization(input_file)
+                events.phase_start('read')
+                df, hit = ExcelFileProcessor.read_excel_cached(cache, input_file, memory_target, sheet, selection)
+                cache.record(hit)
+                events.advance(len(df))
+                events.phase_end()
                 print(f"[格式拆分] .xls文件读取完成: {len(df)}行数据")
                 
                 # 将DataFrame转换为openpyxl工作簿以保持格式处理的一致性
-                from openpyxl import Workbook
                 from openpyxl.utils.dataframe import dataframe_to_rows
                 
                 wb = Workbook()
@@ -52,6 +639,8 @@ def split_excel_file(input_file, output_dir, rows_per_file, copy_headers=True):
                 
                 # 对于HTML格式文件，df已经包含所有行（包括表头），不需要额外加1
                 total_rows_with_header = len(df)
+                # 列和行范围已在读取时选择
+                window = SourceWindow()
                 
             except Exception as e:
                 print(f"读取.xls文件失败: {e}")
@@ -59,20 +648,28 @@ def split_excel_file(input_file, output_dir, rows_per_file, copy_headers=True):
                 sys.exit(1)
         else:
             # 使用openpyxl读取Excel文件(.xlsx格式)
+            events.phase_start('read')
             wb = load_workbook(input_file, read_only=True)
-            ws = wb.active
+            ws = wb.active if sheet is None else wb[sheet]
+            # 部分导出工具不写dimension，只读模式下需要扫描一次才能得到行数
+            if ws.max_row is None:
+                ws.calculate_dimension(force=True)
             
             # 获取总行数（包含表头）
             total_rows_with_header = ws.max_row
+            window = SourceWindow.for_sheet(ws, selection)
+            events.advance(total_rows_with_header)
+            events.phase_end()
             print(f"[格式拆分] .xlsx文件读取完成: {total_rows_with_header}行数据")
         
         if total_rows_with_header == 0:
             print("警告：Excel文件为空")
+            checkpoint.finish()
             return
         
         # 分割计算时自动排除源文件第一行表头（默认第一行为表头）
         # 数据行数始终为总行数减1（排除表头行）
-        data_rows = max(0, total_rows_with_header - 1)
+        data_rows = window.row_count(max(0, total_rows_with_header - 1))
         
         print(f"[格式拆分] 数据行: {data_rows}行")
         
@@ -80,22 +677,23 @@ def split_excel_file(input_file, output_dir, rows_per_file, copy_headers=True):
             print("警告：没有数据行需要拆分")
             # 创建一个空文件
             os.makedirs(output_dir, exist_ok=True)
-            base_name = os.path.splitext(os.path.basename(input_file))[0]
+            base_name = ExcelFileProcessor.get_base_filename(input_file, sheet)
             output_file = os.path.join(output_dir, f'{base_name}Split1.xlsx')
             new_wb = Workbook()
             new_ws = new_wb.active
             # 如果要求复制表头，复制表头
             if copy_headers and total_rows_with_header >= 1:
-                for cell in ws[1]:
-                    new_ws[cell.coordinate].value = cell.value
+                styles = StyleRegistry()
+                for cell in window.header(ws):
+                    if isinstance(cell, EmptyCell) or window.column(cell) is None:
+                        continue
+                    target = new_ws.cell(row=1, column=window.column(cell), value=cell.value)
                     # 复制格式
-                    new_ws[cell.coordinate].font = cell.font.copy()
-                    new_ws[cell.coordinate].border = cell.border.copy()
-                    new_ws[cell.coordinate].fill = cell.fill.copy()
-                    new_ws[cell.coordinate].number_format = cell.number_format
-                    new_ws[cell.coordinate].protection = cell.protection.copy()
-                    new_ws[cell.coordinate].alignment = cell.alignment.copy()
-            new_wb.save(output_file)
+                    styles.apply(cell, target)
+            with atomic_output(output_file) as temp_file:
+                new_wb.save(temp_file)
+            checkpoint.record(output_file, 0)
+            checkpoint.finish()
             file_rows = 1 if copy_headers and total_rows_with_header >= 1 else 0
             print(f'已创建文件：{output_file}（总行数：{file_rows}）')
             return
@@ -110,87 +708,149 @@ def split_excel_file(input_file, output_dir, rows_per_file, copy_headers=True):
         print(f"读取Excel文件失败: {e}")
         sys.exit(1)
 
-    # 计算分割文件数量（按数据行数切分）
-    num_files = (data_rows + rows_per_file - 1) // rows_per_file
     header_mode = "包含表头" if copy_headers else "仅数据"
-    print(f"[格式拆分] 开始拆分: {num_files}个文件 ({header_mode})")
     
     # 创建输出目录（如果不存在）
     os.makedirs(output_dir, exist_ok=True)
+    # 获取源文件名（不含扩展名）
+    base_name = ExcelFileProcessor.get_base_filename(input_file, sheet)
 
-    # 复制列宽到后续新建工作簿
-    template_wb = Workbook()
-    template_ws = template_wb.active
-    for col in ws.columns:
-        col_letter = get_column_letter(col[0].column)
-        template_ws.column_dimensions[col_letter].width = ws.column_dimensions[col_letter].width
+    # 复制列宽到后续新建工作簿（只读工作表不加载列定义，此时沿用默认列宽）
+    column_widths = {}
+    for col_letter, dimension in getattr(ws, 'column_dimensions', {}).items():
+        if dimension.width:
+            column_widths[col_letter] = dimension.width
+    column_widths = window.column_widths(column_widths)
     
-    # 分割并保存文件
-    for i in range(num_files):
+    # 样式缓存在各输出文件间共享统计，但样式索引按工作簿重置
+    styles = StyleRegistry()
+
+    if budget is not None:
+        print(f"[格式拆分] 开始按大小拆分: 每个文件不超过{format_bytes(max_bytes)} ({header_mode})")
+        if workers > 1:
+            print("[格式拆分] 按大小拆分需顺序写出，忽略并行进程数")
+        events.phase_start('split', data_rows)
+        _copy_rows_by_bytes(ws, output_dir, base_name, copy_headers, column_widths, styles, budget, checkpoint,
+                            window)
+        events.phase_end()
+        checkpoint.finish()
+        print(f"[格式拆分] {styles.summary()}")
+        return
+
+    # 计算分割文件数量（按数据行数切分）
+    num_files = (data_rows + rows_per_file - 1) // rows_per_file
+    print(f"[格式拆分] 开始拆分: {num_files}个文件 ({header_mode})")
+    task_args = (output_dir, base_name, rows_per_file, data_rows, num_files, copy_headers, column_widths)
+
+    on_output = checkpoint.observer(events.output_written)
+    events.phase_start('split', data_rows)
+    if workers <= 1:
         try:
-            # 计算当前文件的数据行范围（基于数据行索引，从0开始）
-            data_start_idx = i * rows_per_file
-            data_end_idx = min((i + 1) * rows_per_file, data_rows)
-            
-            # 在源文件中的实际行号（数据从第2行开始，行号从1开始）
-            source_start_row = 2 + data_start_idx
-            source_end_row = 1 + data_end_idx
-            
-            print(f"[格式拆分] 处理文件 {i+1}/{num_files}")
-            
-            # 创建新工作簿
-            new_wb = Workbook()
-            new_ws = new_wb.active
-        
-            current_write_row = 1
-            
-            # 复制表头（如果启用）
-            if copy_headers:
-                for cell in ws[1]:
-                    tgt = new_ws.cell(row=current_write_row, column=cell.column, value=cell.value)
-                    tgt.font = cell.font.copy()
-                    tgt.border = cell.border.copy()
-                    tgt.fill = cell.fill.copy()
-                    tgt.number_format = cell.number_format
-                    tgt.protection = cell.protection.copy()
-                    tgt.alignment = cell.alignment.copy()
-                current_write_row = 2  # 表头占用第1行，数据从第2行开始
-
-            # 复制数据行（如果有数据）
-            if data_end_idx > data_start_idx:
-                for r_idx, row in enumerate(ws.iter_rows(min_row=source_start_row, max_row=source_end_row), start=0):
-                    for cell in row:
-                        new_cell = new_ws.cell(row=current_write_row + r_idx, column=cell.column, value=cell.value)
-                        new_cell.font = cell.font.copy()
-                        new_cell.border = cell.border.copy()
-                        new_cell.fill = cell.fill.copy()
-                        new_cell.number_format = cell.number_format
-                        new_cell.protection = cell.protection.copy()
-                        new_cell.alignment = cell.alignment.copy()
-            
-            # 获取源文件名（不含扩展名）
-            base_name = os.path.splitext(os.path.basename(input_file))[0]
-            
-            # 保存为新的Excel文件，使用源文件名+Split+序号格式
-            output_file = os.path.join(output_dir, f'{base_name}Split{i+1}.xlsx')
-            new_wb.save(output_file)
+            _copy_chunk_range(ws, *task_args, checkpoint.done, num_files, styles, print, on_output, window)
+        except Exception as e:
+            print(f"错误：{e}")
+            raise
+    else:
+        print(f"[格式拆分] 并行写出: {workers}个进程")
 
-            # 计算实际行数
-            actual_data_rows = data_end_idx - data_start_idx
-            output_filename = os.path.basename(output_file)
-            print(f"[格式拆分] 完成: {output_filename} ({actual_data_rows}行)")
-        
+        def collect(result):
+            messages, hits, misses, outputs = result
+            ParallelChunkWriter.print_messages(messages)
+            styles.hits += hits
+            styles.misses += misses
+            for output_file, rows in outputs:
+                on_output(output_file, rows)
+
+        try:
+            with ParallelChunkWriter(workers, on_result=collect) as writer:
+                if getattr(wb, 'read_only', False):
+                    # 只读源文件：每个进程自行打开源文件，负责一段连续的分块
+                    for first, last in _chunk_groups(num_files, workers, checkpoint.done):
+                        writer.submit(_copy_chunk_range_from_file, input_file, *task_args, first, last, sheet,
+                                      window)
+                else:
+                    # 内存中的工作簿（由.xls数据构建，无源格式）：逐个分块传递单元格值
+                    header = [cell.value for cell in ws[1]]
+                    for i in range(checkpoint.done, num_files):
+                        data_start_idx = i * rows_per_file
+                        data_end_idx = min((i + 1) * rows_per_file, data_rows)
+                        rows = [[cell.value for cell in row]
+                                for row in ws.iter_rows(min_row=2 + data_start_idx, max_row=1 + data_end_idx)]
+                        writer.submit(_copy_value_chunk, *task_args, i, header, rows)
         except Exception as e:
-            print(f"错误：处理第{i+1}个文件时失败: {e}")
+            print(f"错误：{e}")
             raise
 
-if __name__ == '__main__':
+    events.phase_end()
+    checkpoint.finish()
+    print(f"[格式拆分] {styles.summary()}")
+
+
+def split_excel_sheets(input_file, output_dir, rows_per_file, sheets, workers=1, **options):
+    """按--sheets拆分多个工作表，options为split_excel_file的其余参数
+
+    只解析选中的工作表；选中多个工作表且workers大于1时各工作表在进程池中并行拆分（工作表内不再并行写出），
+    只选中一个工作表时由该工作表的拆分使用全部进程。
+    """
+    try:
+        names = FormatProbe.for_file(input_file).select_sheets(sheets)
+    except (OSError, ValueError) as e:
+        print(f"参数错误: {e}")
+        sys.exit(1)
+    print(f"[格式拆分] 工作表: {', '.join(names)}")
+    sheet_workers = 1 if len(names) > 1 else workers
+    tasks = [(split_excel_file, (input_file, output_dir, rows_per_file),
+              dict(options, workers=sheet_workers, sheet=name)) for name in names]
+    if not run_sheet_tasks(tasks, workers):
+        sys.exit(1)
+
+
+def main(argv=None):
+    """命令行入口，argv为None时解析sys.argv（常驻工作进程会直接传入参数列表）"""
     parser = argparse.ArgumentParser(description='拆分Excel文件（保留格式）')
     parser.add_argument('--input', required=True, help='输入Excel文件路径')
     parser.add_argument('--output', required=True, help='输出目录路径')
-    parser.add_argument('--rows', type=int, default=1000, help='每个文件的行数（默认：1000）')
+    parser.add_argument('--rows', type=int, default=None,
+                        help='每个文件的行数（默认：1000；指定--max-bytes时为可选的行数上限）')
+    parser.add_argument('--max-bytes', type=parse_byte_size, default=None,
+                        help='按输出文件大小拆分，每个文件不超过该大小，支持KB/MB/GB后缀（例如 20MB）')
     parser.add_argument('--copy_headers', type=lambda x: x.lower() == 'true', default=False, help='是否在每个拆分文件中复制表头')
+    parser.add_argument('--engine', choices=['auto', 'xml', 'openpyxl'], default='auto', help='.xlsx拆分引擎：auto优先使用行切片引擎，不适用时回退openpyxl（默认：auto）')
+    parser.add_argument('--workers', type=int, default=1, help='并行写出文件的进程数（默认：1）')
+    add_output_format_argument(parser)
+    add_xlsx_writer_argument(parser)
+    add_selection_arguments(parser)
+    add_partition_arguments(parser)
+    add_resume_argument(parser)
+    add_sheets_argument(parser)
+    add_cache_arguments(parser)
+    add_memory_target_argument(parser)
+    add_events_argument(parser)
+    add_profile_argument(parser)
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    events.configure(args.events)
+    xlsx_backends.configure(args.xlsx_writer)
     
-    split_excel_file(args.input, args.output, args.rows, args.copy_headers)
\ No newline at end of file
+    rows = args.rows if args.rows is not None or args.max_bytes is not None else 1000
+
+    profiler.configure(args.profile)
+    try:
+        if args.sheets is not None:
+            split_excel_sheets(args.input, args.output, rows, args.sheets, args.workers,
+                               copy_headers=args.copy_headers, engine=args.engine, cache=ParseCache.from_args(args),
+                               memory_target=args.memory_target, max_bytes=args.max_bytes,
+                               partition_by=args.partition_by, max_open_files=args.max_open_files,
+                               output_format=args.output_format, resume=args.resume,
+                               selection=DataSelection.from_args(args))
+        else:
+            split_excel_file(args.input, args.output, rows, args.copy_headers, args.engine, args.workers,
+                             ParseCache.from_args(args), args.memory_target, args.max_bytes, args.partition_by,
+                             args.max_open_files, args.output_format, resume=args.resume,
+                             selection=DataSelection.from_args(args))
+    finally:
+        profiler.finish(os.path.join(args.output, f'{os.path.splitext(os.path.basename(args.input))[0]}_profile'))
+
+
+if __name__ == '__main__':
+    main()
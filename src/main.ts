@@ -82,6 +82,11 @@ app.on("window-all-closed", () => {
   }
 });
 
+// 退出时结束常驻Python工作进程
+app.on("will-quit", () => {
+  PythonLauncher.shutdown();
+});
+
 // IPC 通信接口
 
 // 选择Excel文件
@@ -232,6 +237,7 @@ ipcMain.handle("split-excel", async (_event, options) => {
       .addArg("output", outputDir)
       .addArg("rows", rowsPerFile)
       .addArg("copy_headers", copyHeaders)
+      .addArg("events", "json")
       .build();
 
     // 记录开始时间，用于后续按修改时间筛选新生成的文件
@@ -340,6 +346,7 @@ ipcMain.handle("merge-excel", async (_event, options) => {
       .addArg("input_dir", inputDir)
       .addArg("output_file", outputFile)
       .addArg("remove_duplicate_headers", removeDuplicateHeaders)
+      .addArg("events", "json")
       .build();
 
     console.log("执行合并命令:", scriptPath, args.join(" "));
@@ -7,6 +7,21 @@ import { ProcessManager } from './processUtils';
  */
 const PYTHON_INTERPRETERS = ['py', 'python3', 'python'] as const;
 
+/**
+ * 常驻工作进程脚本（与处理脚本位于同一目录）
+ */
+const WORKER_DAEMON_SCRIPT = 'worker_daemon.py';
+
+/**
+ * 常驻工作进程启动超时（毫秒），需覆盖首次导入pandas/openpyxl的时间
+ */
+const WORKER_READY_TIMEOUT = 30 * 1000;
+
+/**
+ * 取消超时任务后等待任务结束的时间（毫秒），超过后强制结束常驻工作进程
+ */
+const WORKER_CANCEL_GRACE = 10 * 1000;
+
 /**
  * Python进程启动配置
  */
@@ -28,15 +43,441 @@ interface PythonLaunchResult {
   outputFile?: string;
 }
 
+/**
+ * 处理脚本以--events json输出的结构化进度事件（见utils.ProgressEvents）
+ */
+interface ScriptEvent {
+  type: 'phase_start' | 'progress' | 'phase_end' | 'output';
+  phase: string | null;
+  rows?: number;
+  total_rows?: number | null;
+  bytes_written?: number;
+  rows_per_sec?: number | null;
+  eta_sec?: number | null;
+  peak_rss_mb?: number | null;
+  // output事件：写出完成的文件路径、数据行数和文件字节数
+  path?: string;
+  bytes?: number;
+}
+
+const PHASE_NAMES: Record<string, string> = {
+  read: '读取',
+  split: '拆分',
+  merge: '合并',
+  save: '保存',
+};
+
+/**
+ * 将脚本输出逐行转换为进度更新：结构化事件用于计算真实进度，其余行作为日志原样转发
+ */
+class ScriptOutputTracker {
+  private progress = 0;
+  private partial = '';
+
+  constructor(
+    private onProgress?: (data: { progress: number; message: string; type: string }) => void,
+  ) {}
+
+  /**
+   * 处理一段原始输出（可能包含多行或不完整的行）
+   */
+  feed(chunk: string): void {
+    const lines = (this.partial + chunk).split(/\r?\n/);
+    this.partial = lines.pop() ?? '';
+    this.handleLines(lines);
+  }
+
+  /**
+   * 输出结束时处理剩余的不完整行
+   */
+  flush(): void {
+    if (this.partial) {
+      this.handleLines([this.partial]);
+      this.partial = '';
+    }
+  }
+
+  /**
+   * 处理一行完整输出
+   */
+  handleLine(line: string): void {
+    this.handleLines([line]);
+  }
+
+  private handleLines(lines: string[]): void {
+    const logs: string[] = [];
+    const flushLogs = () => {
+      if (logs.length === 0) return;
+      this.onProgress?.({ progress: this.progress, message: logs.join('\n'), type: 'info' });
+      logs.length = 0;
+    };
+
+    for (const rawLine of lines) {
+      const line = rawLine.trim();
+      if (!line) continue;
+      const event = ScriptOutputTracker.parseEvent(line);
+      if (!event) {
+        logs.push(line);
+        continue;
+      }
+      flushLogs();
+      this.onProgress?.({ progress: this.update(event), message: ScriptOutputTracker.describe(event), type: 'info' });
+    }
+    flushLogs();
+  }
+
+  private update(event: ScriptEvent): number {
+    if (event.type === 'output') {
+      return this.progress;
+    }
+    if (event.type === 'phase_start') {
+      this.progress = 0;
+    } else if (event.total_rows) {
+      this.progress = Math.min(99, Math.floor(((event.rows ?? 0) / event.total_rows) * 100));
+    }
+    return this.progress;
+  }
+
+  private static parseEvent(line: string): ScriptEvent | null {
+    if (!line.startsWith('{"type"')) return null;
+    try {
+      const event = JSON.parse(line);
+      if (!event) return null;
+      const valid = event.type === 'output' ? typeof event.path === 'string' : typeof event.phase === 'string';
+      return valid ? (event as ScriptEvent) : null;
+    } catch {
+      return null;
+    }
+  }
+
+  private static describe(event: ScriptEvent): string {
+    if (event.type === 'output') {
+      const name = event.path?.split(/[\\/]/).pop() ?? '';
+      return `已写出文件：${name}（${event.rows ?? 0}行，${((event.bytes ?? 0) / 1024 / 1024).toFixed(1)}MB）`;
+    }
+    const phase = PHASE_NAMES[event.phase ?? ''] ?? event.phase;
+    if (event.type === 'phase_start') {
+      return `开始${phase}`;
+    }
+    const parts = [
+      event.total_rows ? `${event.rows ?? 0}/${event.total_rows}行` : `${event.rows ?? 0}行`,
+    ];
+    if (event.rows_per_sec) parts.push(`${Math.round(event.rows_per_sec)}行/秒`);
+    if (event.bytes_written) parts.push(`已写出${(event.bytes_written / 1024 / 1024).toFixed(1)}MB`);
+    if (event.type === 'progress' && event.eta_sec != null) parts.push(`预计剩余${Math.ceil(event.eta_sec)}秒`);
+    if (event.peak_rss_mb != null) parts.push(`峰值内存${Math.round(event.peak_rss_mb)}MB`);
+    return `${phase}${event.type === 'phase_end' ? '完成' : '中'}: ${parts.join('，')}`;
+  }
+}
+
+/**
+ * 常驻工作进程输出的事件（JSON行，协议见worker_daemon.py）
+ */
+interface WorkerEvent {
+  event: 'ready' | 'started' | 'log' | 'done' | 'error' | 'pong';
+  id?: string | null;
+  stream?: 'stdout' | 'stderr';
+  message?: string;
+  status?: 'success' | 'failed' | 'cancelled';
+  exit_code?: number | null;
+}
+
+/**
+ * 常驻工作进程中的任务
+ */
+interface WorkerJob {
+  onEvent: (event: WorkerEvent) => void;
+}
+
+/**
+ * 统一的环境配置
+ */
+function createPythonEnv(): NodeJS.ProcessEnv {
+  return {
+    ...process.env,
+    PYTHONIOENCODING: 'utf-8',
+    PYTHONUNBUFFERED: '1', // 确保输出不被缓冲
+  };
+}
+
+/**
+ * 常驻Python工作进程
+ * 只在首次任务时启动解释器并导入pandas/openpyxl，之后通过JSON行协议提交任务，
+ * 避免每个任务都重新启动解释器；进程意外退出后下一个任务会重新启动。
+ */
+class PythonWorkerDaemon {
+  private process: ChildProcess | null = null;
+  private starting: Promise<boolean> | null = null;
+  private jobs = new Map<string, WorkerJob>();
+  private buffer = '';
+  private nextJobId = 1;
+
+  /**
+   * 确保常驻工作进程已就绪，所有解释器都无法启动时返回false
+   */
+  ensureStarted(daemonPath: string): Promise<boolean> {
+    if (this.process) {
+      return Promise.resolve(true);
+    }
+    if (!this.starting) {
+      this.starting = this.startWithFallback(daemonPath).finally(() => {
+        this.starting = null;
+      });
+    }
+    return this.starting;
+  }
+
+  private async startWithFallback(daemonPath: string): Promise<boolean> {
+    for (const interpreter of PYTHON_INTERPRETERS) {
+      if (await this.start(interpreter, daemonPath)) {
+        console.log(`常驻工作进程已启动: ${interpreter}`);
+        return true;
+      }
+    }
+    return false;
+  }
+
+  private start(interpreter: string, daemonPath: string): Promise<boolean> {
+    return new Promise((resolve) => {
+      let settled = false;
+      const settle = (ok: boolean) => {
+        if (settled) return;
+        settled = true;
+        clearTimeout(readyTimer);
+        if (!ok) {
+          child.kill();
+        }
+        resolve(ok);
+      };
+
+      const child = spawn(interpreter, [daemonPath], {
+        env: createPythonEnv(),
+        cwd: process.cwd(),
+        stdio: ['pipe', 'pipe', 'pipe'],
+      });
+      const readyTimer = setTimeout(() => settle(false), WORKER_READY_TIMEOUT);
+
+      child.on('error', (error) => {
+        console.warn(`${interpreter} 启动常驻工作进程失败:`, error);
+        settle(false);
+      });
+
+      child.stderr?.on('data', (data) => {
+        console.error('常驻工作进程错误输出:', data.toString('utf8').trim());
+      });
+
+      child.stdout?.on('data', (data) => {
+        this.buffer += data.toString('utf8');
+        let newline = this.buffer.indexOf('\n');
+        while (newline >= 0) {
+          const line = this.buffer.slice(0, newline).trim();
+          this.buffer = this.buffer.slice(newline + 1);
+          newline = this.buffer.indexOf('\n');
+          if (!line) continue;
+
+          let event: WorkerEvent;
+          try {
+            event = JSON.parse(line);
+          } catch {
+            console.warn('无法解析常驻工作进程输出:', line);
+            continue;
+          }
+          if (event.event === 'ready') {
+            this.process = child;
+            settle(true);
+          } else {
+            this.dispatch(event);
+          }
+        }
+      });
+
+      child.on('close', (code) => {
+        settle(false);
+        if (this.process === child) {
+          console.warn(`常驻工作进程已退出，退出码: ${code}`);
+          this.process = null;
+          this.buffer = '';
+          // 进程退出时仍未结束的任务按失败处理
+          for (const [id, job] of this.jobs) {
+            job.onEvent({ event: 'done', id, status: 'failed', exit_code: code });
+          }
+          this.jobs.clear();
+        }
+      });
+    });
+  }
+
+  private dispatch(event: WorkerEvent): void {
+    if (event.id == null) {
+      if (event.event === 'error') {
+        console.error('常驻工作进程报告错误:', event.message);
+      }
+      return;
+    }
+    const job = this.jobs.get(event.id);
+    if (!job) return;
+    if (event.event === 'done' || event.event === 'error') {
+      this.jobs.delete(event.id);
+    }
+    job.onEvent(event);
+  }
+
+  /**
+   * 提交任务，返回任务ID；任务事件通过onEvent回调，done或error事件表示任务结束
+   */
+  run(scriptName: string, args: string[], onEvent: (event: WorkerEvent) => void): string {
+    const id = `job-${this.nextJobId++}`;
+    if (!this.process) {
+      setImmediate(() => onEvent({ event: 'error', id, message: '常驻工作进程未运行' }));
+      return id;
+    }
+    this.jobs.set(id, { onEvent });
+    this.send({ type: 'run', id, script: scriptName, args });
+    return id;
+  }
+
+  cancel(id: string): void {
+    this.send({ type: 'cancel', id });
+  }
+
+  /**
+   * 强制结束常驻工作进程（例如取消后任务仍未结束），下一个任务会重新启动
+   */
+  kill(): void {
+    this.process?.kill();
+  }
+
+  shutdown(): void {
+    if (this.process) {
+      this.send({ type: 'shutdown' });
+      this.process.stdin?.end();
+    }
+  }
+
+  private send(request: Record<string, unknown>): void {
+    this.process?.stdin?.write(JSON.stringify(request) + '\n', 'utf8');
+  }
+}
+
 /**
  * 统一的Python进程启动器
  * 提供解释器兜底、统一环境配置、准确的超时文案
  */
 export class PythonLauncher {
+  private static daemon = new PythonWorkerDaemon();
+
   /**
-   * 尝试启动Python进程，自动尝试多个解释器
+   * 执行Python脚本：优先提交给常驻工作进程，
+   * 常驻工作进程不可用（或设置了EXCEL_WORKER_DAEMON=0）时为每个任务单独启动解释器
    */
   static async launch(config: PythonLaunchConfig): Promise<PythonLaunchResult> {
+    if (process.env.EXCEL_WORKER_DAEMON !== '0') {
+      const daemonPath = path.join(path.dirname(config.scriptPath), WORKER_DAEMON_SCRIPT);
+      if (await this.daemon.ensureStarted(daemonPath)) {
+        return this.runInDaemon(config);
+      }
+      console.warn('常驻工作进程不可用，改为单独启动Python进程');
+    }
+    return this.launchProcess(config);
+  }
+
+  /**
+   * 应用退出时结束常驻工作进程
+   */
+  static shutdown(): void {
+    this.daemon.shutdown();
+  }
+
+  /**
+   * 在常驻工作进程中执行任务，输出与结果处理与单独启动进程时一致
+   */
+  private static runInDaemon(config: PythonLaunchConfig): Promise<PythonLaunchResult> {
+    const { scriptPath, args, taskType, onProgress } = config;
+    const taskName = taskType === 'split' ? '拆分' : '合并';
+
+    return new Promise((resolve) => {
+      let errorOutput = '';
+      let timedOut = false;
+      const tracker = new ScriptOutputTracker(onProgress);
+      let killTimer: NodeJS.Timeout | null = null;
+
+      const jobId = this.daemon.run(path.basename(scriptPath), args, (event) => {
+        if (event.event === 'log') {
+          const message = event.message ?? '';
+          if (event.stream === 'stderr') {
+            errorOutput += message + '\n';
+            console.error('Python错误输出:', message);
+            return;
+          }
+          console.log('Python输出:', message);
+          tracker.handleLine(message);
+          return;
+        }
+        if (event.event !== 'done' && event.event !== 'error') {
+          return;
+        }
+
+        timeoutHandler.clearTimeout();
+        if (killTimer) clearTimeout(killTimer);
+        if (timedOut) return;
+
+        if (event.event === 'done' && event.status === 'success') {
+          onProgress?.({
+            progress: 100,
+            message: `${taskName}完成！`,
+            type: 'success',
+          });
+          resolve({
+            success: true,
+            message: `${taskName}完成`,
+          });
+        } else {
+          const detail = event.event === 'error' ? event.message ?? '' : errorOutput;
+          onProgress?.({
+            progress: 0,
+            message: `${taskName}失败: ${detail || '未知错误'}`,
+            type: 'error',
+          });
+          resolve({
+            success: false,
+            message: detail || `${taskName}失败`,
+          });
+        }
+      });
+
+      // 超时后取消任务；任务在宽限时间内仍未结束时强制结束常驻工作进程
+      const timeoutHandler = ProcessManager.createTimeoutHandler(
+        {
+          kill: () => {
+            this.daemon.cancel(jobId);
+            killTimer = setTimeout(() => this.daemon.kill(), WORKER_CANCEL_GRACE);
+          },
+        },
+        ProcessManager.DEFAULT_TIMEOUT,
+        () => {
+          timedOut = true;
+          console.log(`Python${taskName}任务超时，正在取消...`);
+
+          const timeoutMessage = `${taskName}处理超时，请检查文件大小或网络连接`;
+          onProgress?.({
+            progress: 0,
+            message: timeoutMessage,
+            type: 'error',
+          });
+
+          resolve({
+            success: false,
+            message: timeoutMessage,
+          });
+        },
+      );
+    });
+  }
+
+  /**
+   * 单独启动Python进程执行脚本，自动尝试多个解释器
+   */
+  private static async launchProcess(config: PythonLaunchConfig): Promise<PythonLaunchResult> {
     const { scriptPath, args, taskType, onProgress, onError } = config;
     
     // 尝试不同的Python解释器
@@ -91,15 +532,8 @@ export class PythonLauncher {
     const { interpreter, scriptPath, args, taskType, onProgress, onError } = config;
     
     return new Promise((resolve) => {
-      // 统一的环境配置
-      const env = {
-        ...process.env,
-        PYTHONIOENCODING: 'utf-8',
-        PYTHONUNBUFFERED: '1', // 确保输出不被缓冲
-      };
-      
       const pythonProcess = spawn(interpreter, [scriptPath, ...args], {
-        env,
+        env: createPythonEnv(),
         cwd: process.cwd(),
         stdio: ['pipe', 'pipe', 'pipe'],
       });
@@ -107,6 +541,7 @@ export class PythonLauncher {
       let output = '';
       let errorOutput = '';
       const startTime = Date.now();
+      const tracker = new ScriptOutputTracker(onProgress);
       
       // 统一的超时处理
       const timeoutHandler = ProcessManager.createTimeoutHandler(
@@ -136,12 +571,8 @@ export class PythonLauncher {
         output += message;
         console.log('Python输出:', message.trim());
         
-        // 发送进度更新
-        onProgress?.({
-          progress: 50, // 简化的进度计算，后续可扩展为解析Python输出的进度信息
-          message: message.trim(),
-          type: 'info',
-        });
+        // 发送进度更新（结构化进度事件换算为真实进度）
+        tracker.feed(message);
       });
       
       // 处理错误输出
@@ -171,6 +602,7 @@ export class PythonLauncher {
       // 处理进程退出
       pythonProcess.on('close', async (code) => {
         timeoutHandler.clearTimeout();
+        tracker.flush();
         
         const taskName = taskType === 'split' ? '拆分' : '合并';
         console.log(`Python进程退出，退出码: ${code}`);
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+测试基准测试合成输入生成与结果对比的脚本
+"""
+
+import os
+import tempfile
+import xlrd
+from openpyxl import load_workbook
+from bench_suite import SyntheticTable, compare, write_xls, write_xlsx
+from utils import FormatProbe, StreamingExcelReader
+
+
+def test_synthetic_inputs():
+    """测试合成输入可被各解析路径读取、内容确定，以及基准对比的回归判断"""
+    print("=" * 60)
+    print("测试基准测试合成输入")
+    print("=" * 60)
+
+    table = SyntheticTable(300, 9, 0.5)
+    rows = [values for values, _ in table.iter_rows()]
+    assert rows == [values for values, _ in SyntheticTable(300, 9, 0.5).iter_rows()]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        xls_file = os.path.join(tmp, 'input.xls')
+        write_xls(xls_file, table)
+        assert FormatProbe.for_file(xls_file).container == 'xls'
+        sheet = xlrd.open_workbook(xls_file).sheet_by_index(0)
+        print(f"OLE2 .xls: {sheet.nrows}行 x {sheet.ncols}列")
+        assert sheet.row_values(0) == table.header
+        assert sheet.row_values(300)[:3] == [300.0, rows[-1][1], rows[-1][2]]
+        assert sheet.cell(1, 5).ctype == xlrd.XL_CELL_DATE
+
+        xlsx_file = os.path.join(tmp, 'input.xlsx')
+        write_xlsx(xlsx_file, table)
+        streamed = list(StreamingExcelReader.iter_rows(xlsx_file))
+        assert len(streamed) == 301 and list(streamed[1][:3]) == rows[0][:3]
+        styled = sum(cell.has_style for row in load_workbook(xlsx_file).active.iter_rows(min_row=2, max_col=5)
+                     for cell in row)
+        print(f".xlsx: 前5列带样式单元格 {styled}个")
+        assert 0 < styled < 300 * 5
+
+    baseline = {'results': [
+        {'case': 'c', 'script': 'a.py', 'status': 'ok', 'wall_sec': 1.0},
+        {'case': 'c', 'script': 'b.py', 'status': 'ok', 'wall_sec': 1.0},
+        {'case': 'c', 'script': 'd.py', 'status': 'ok', 'wall_sec': 1.0},
+    ]}
+    results = [
+        {'case': 'c', 'script': 'a.py', 'status': 'ok', 'wall_sec': 1.1},
+        {'case': 'c', 'script': 'b.py', 'status': 'ok', 'wall_sec': 1.5},
+        {'case': 'c', 'script': 'd.py', 'status': 'failed'},
+    ]
+    regressions = compare(results, baseline, tolerance=0.25)
+    assert len(regressions) == 2 and results[0]['change'] == 0.1
+
+
+if __name__ == '__main__':
+    test_synthetic_inputs()
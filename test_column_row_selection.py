@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+测试列投影与行范围（--columns、--row-range）下推到各读取器的脚本
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Font
+import merge_excel
+import merge_excel_format
+import split_excel
+import split_excel_format
+from utils import DataSelection, ExcelFileProcessor, StreamingExcelReader, parse_row_range
+
+
+def _values(path):
+    wb = load_workbook(path)
+    try:
+        return [[cell.value for cell in row] for row in wb.active.iter_rows()]
+    finally:
+        wb.close()
+
+
+def _run(main, argv):
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        main(argv)
+    return output.getvalue()
+
+
+def test_column_row_selection():
+    """测试各读取器得到相同的选择结果，以及拆分、合并脚本只处理选中的列和数据行"""
+    print("=" * 60)
+    print("测试列投影与行范围")
+    print("=" * 60)
+
+    assert parse_row_range('500000:600000') == (500000, 600000)
+    assert parse_row_range(':1000') == (1, 1000) and parse_row_range('7:') == (7, None)
+    assert parse_row_range('5') == (5, 5)
+    for text in ('0:3', '9:2', 'a'):
+        try:
+            parse_row_range(text)
+            raise AssertionError(f"应拒绝无效的行范围: {text}")
+        except ValueError:
+            pass
+
+    header = ['编号', '名称', '金额', '日期', '备注']
+    with tempfile.TemporaryDirectory() as tmp:
+        input_file = os.path.join(tmp, 'input.xlsx')
+        wb = Workbook()
+        ws = wb.active
+        ws.append(header)
+        for cell in ws[1]:
+            cell.font = Font(bold=True)
+        for i in range(1, 41):
+            ws.append([f'A{i}', f'名称{i}', i * 10, f'2024-01-{i % 28 + 1:02d}', None if i % 3 else f'备注{i}'])
+        wb.save(input_file)
+        html_file = os.path.join(tmp, 'input.html')
+        rows = ''.join(f'<tr><td>A{i}</td><td>名称{i}</td><td>{i * 10}</td></tr>' for i in range(1, 41))
+        with open(html_file, 'w', encoding='utf-8') as f:
+            f.write(f'<html><body><table><tr><th>编号</th><th>名称</th><th>金额</th></tr>{rows}</table></body></html>')
+
+        # 列名与列字母（含区间）混用，按源文件中的列顺序输出
+        selection = DataSelection(['金额', 'A', 'E:E'], (11, 14))
+        assert selection.resolve(header) == [0, 2, 4]
+        expected = [('编号', '金额', '备注'), ('A11', 110), ('A12', 120, '备注12'), ('A13', 130), ('A14', 140)]
+        assert list(StreamingExcelReader.iter_rows(input_file, selection=selection)) == expected
+        with contextlib.redirect_stdout(io.StringIO()):
+            df = ExcelFileProcessor.read_excel_with_optimization(input_file, selection=selection)
+        assert list(df.columns) == ['编号', '金额', '备注'] and df['编号'].tolist() == ['A11', 'A12', 'A13', 'A14']
+        print(f"xlsx: {expected[1:3]}")
+
+        # HTML增量解析：读到范围末尾即停止，只转换选中列的单元格
+        selection = DataSelection(['名称'], (39, None))
+        assert list(StreamingExcelReader.iter_rows(html_file, selection=selection)) == [('名称',), ('名称39',), ('名称40',)]
+        with contextlib.redirect_stdout(io.StringIO()):
+            df = ExcelFileProcessor.read_excel_with_optimization(html_file, selection=selection)
+        assert list(df.columns) == ['名称'] and df['名称'].tolist() == ['名称39', '名称40']
+        try:
+            DataSelection(['不存在']).resolve(header)
+            raise AssertionError("应拒绝不存在的列")
+        except ValueError as e:
+            print(f"不存在的列: {e}")
+
+        select = ['--columns', '编号,C', '--row-range', '6:30', '--no-cache']
+        expected_rows = [[f'A{i}', i * 10] for i in range(6, 31)]
+
+        # 拆分：DataFrame路径、流式路径、行切片引擎（只有行范围）和openpyxl逐单元格复制（选择列）
+        for name, main, extra in (('split', split_excel.main, []),
+                                  ('split_stream', split_excel.main, ['--streaming=true']),
+                                  ('format', split_excel_format.main, []),
+                                  ('format_parallel', split_excel_format.main, ['--workers', '2'])):
+            output_dir = os.path.join(tmp, name)
+            _run(main, ['--input', input_file, '--output', output_dir, '--rows', '10',
+                        '--copy_headers=true'] + select + extra)
+            outputs = [_values(os.path.join(output_dir, f'inputSplit{i}.xlsx')) for i in (1, 2, 3)]
+            assert not os.path.exists(os.path.join(output_dir, 'inputSplit4.xlsx'))
+            assert all(values[0] == ['编号', '金额'] for values in outputs)
+            assert [row for values in outputs for row in values[1:]] == expected_rows, name
+            print(f"{name}: 3个文件, {[len(values) - 1 for values in outputs]}行")
+
+        output_dir = os.path.join(tmp, 'slicer')
+        _run(split_excel_format.main, ['--input', input_file, '--output', output_dir, '--rows', '10',
+                                       '--copy_headers=true', '--row-range', '36:', '--engine', 'xml'])
+        values = _values(os.path.join(output_dir, 'inputSplit1.xlsx'))
+        assert [row[0] for row in values] == ['编号', 'A36', 'A37', 'A38', 'A39', 'A40']
+        wb = load_workbook(os.path.join(output_dir, 'inputSplit1.xlsx'))
+        assert wb.active['A1'].font.b
+        wb.close()
+        print(f"行切片引擎: {values[1]}")
+
+        # 合并：每个输入文件都只读取选中的列和数据行
+        merge_dir = os.path.join(tmp, 'merge_input')
+        os.makedirs(merge_dir)
+        for i in range(2):
+            wb = Workbook()
+            wb.active.append(header)
+            for j in range(1, 11):
+                wb.active.append([f'F{i}-{j}', f'名称{j}', j, None, None])
+            wb.save(os.path.join(merge_dir, f'part{i}.xlsx'))
+        for name, main, extra in (('merge', merge_excel.main, []),
+                                  ('merge_stream', merge_excel.main, ['--streaming=true']),
+                                  ('merge_format', merge_excel_format.main, [])):
+            output_file = os.path.join(tmp, f'{name}.xlsx')
+            _run(main, ['--input_dir', merge_dir, '--output_file', output_file, '--remove_duplicate_headers', 'true',
+                        '--columns', '名称,编号', '--row-range', '9:', '--no-cache'] + extra)
+            values = _values(output_file)
+            # 输入文件的顺序取决于目录列举顺序
+            assert values[0] == ['编号', '名称'], name
+            assert sorted(values[1:]) == [['F0-10', '名称10'], ['F0-9', '名称9'],
+                                          ['F1-10', '名称10'], ['F1-9', '名称9']], name
+            print(f"{name}: {values[1:]}")
+
+    print("\n列投影与行范围测试通过")
+
+
+if __name__ == '__main__':
+    test_column_row_selection()
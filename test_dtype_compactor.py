@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+测试读取后数据类型压缩的脚本
+"""
+
+import os
+import tempfile
+import pandas as pd
+from openpyxl import load_workbook
+from utils import DtypeCompactor, ExcelFileProcessor
+
+
+def _build_input(path, rows=300):
+    pd.DataFrame({
+        '序号': range(1, rows + 1),
+        '箱号': [f'CTN{i % 12:05d}' for i in range(rows)],
+        '状态': ['已发货' if i % 3 else None for i in range(rows)],
+        '数量': [i % 90 for i in range(rows)],
+        '重量': [i * 0.25 for i in range(rows)],
+        '单价': [i * 0.1 for i in range(rows)],
+        '备注': [f'备注{i}' for i in range(rows)],
+    }).to_excel(path, index=False)
+
+
+def _dump(path):
+    ws = load_workbook(path).active
+    return [[cell.value for cell in row] for row in ws.iter_rows()]
+
+
+def test_compaction_keeps_written_values():
+    """测试压缩后的数据类型，以及压缩前后写出的单元格值一致"""
+    print("=" * 60)
+    print("测试数据类型压缩")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_file = os.path.join(tmp, 'input.xlsx')
+        _build_input(input_file)
+
+        plain = ExcelFileProcessor.read_excel_with_optimization(input_file, memory_target='off')
+        # 默认目标只压缩1万行以上的文件
+        assert ExcelFileProcessor.read_excel_with_optimization(input_file).dtypes.equals(plain.dtypes)
+        compacted = ExcelFileProcessor.read_excel_with_optimization(input_file, memory_target='aggressive')
+
+        dtypes = compacted.dtypes.astype(str).to_dict()
+        print(f"压缩后数据类型: {dtypes}")
+        assert dtypes['序号'] == 'int16' and dtypes['数量'] == 'int8'
+        assert dtypes['箱号'] == 'category' and dtypes['状态'] == 'category'
+        assert dtypes['重量'] == 'float32'
+        # 0.1等无法被float32精确表示的值保持float64，备注列唯一值过多保持文本
+        assert dtypes['单价'] == 'float64' and dtypes['备注'] == plain.dtypes['备注']
+        assert ExcelFileProcessor._is_sequence_column(compacted['序号'])
+
+        outputs = []
+        for name, df in (('plain', plain), ('compacted', compacted)):
+            output_file = os.path.join(tmp, f'{name}.xlsx')
+            df.to_excel(output_file, index=False)
+            outputs.append(_dump(output_file))
+        assert outputs[0] == outputs[1]
+        print("压缩前后写出结果一致")
+
+        assert DtypeCompactor.compact(plain, 'off') is plain
+
+
+if __name__ == '__main__':
+    test_compaction_keeps_written_values()
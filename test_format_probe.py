@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+测试FormatProbe格式探测与单一解析器选择的脚本
+"""
+
+import codecs
+import os
+import tempfile
+from openpyxl import Workbook
+from utils import ExcelFileProcessor, FormatProbe
+
+
+def _html(charset):
+    rows = ''.join(f'<tr><td>{i}</td><td>名称{i}</td></tr>' for i in range(1, 31))
+    return (f'<html><head><meta charset="{charset}"></head><body>'
+            f'<table><tr><td>编号</td><td>名称</td></tr>{rows}</table></body></html>')
+
+
+def test_probe_detects_container_and_encoding():
+    """测试带BOM/前导空白的HTML、GBK编码HTML和扩展名为.xls的.xlsx文件"""
+    print("=" * 60)
+    print("测试格式探测")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bom_file = os.path.join(tmp, 'bom.xls')
+        with open(bom_file, 'wb') as f:
+            f.write(codecs.BOM_UTF8 + ('\r\n  ' + _html('utf-8')).encode('utf-8'))
+
+        gbk_file = os.path.join(tmp, 'gbk.xls')
+        with open(gbk_file, 'wb') as f:
+            f.write(_html('gbk').encode('gbk'))
+
+        zip_file = os.path.join(tmp, 'zip.xls')
+        wb = Workbook()
+        wb.active.append(['编号', '名称'])
+        for i in range(1, 31):
+            wb.active.append([f'A{i}', f'名称{i}'])
+        wb.create_sheet('第二页')
+        wb.save(zip_file)
+
+        expected = {
+            bom_file: ('html', 'utf-8', True, 'html'),
+            gbk_file: ('html', 'gbk', False, 'html'),
+            zip_file: ('xlsx', None, False, 'openpyxl'),
+        }
+        for path, (container, encoding, bom, parser) in expected.items():
+            probe = FormatProbe.for_file(path)
+            print(f"{os.path.basename(path)}: {probe}")
+            assert (probe.container, probe.encoding, probe.bom, probe.parser) == (container, encoding, bom, parser)
+            assert FormatProbe.for_file(path) is probe
+
+            df = ExcelFileProcessor.read_excel_with_optimization(path)
+            assert list(df.columns) == ['编号', '名称']
+            assert len(df) == 30 and df.iloc[-1, 1] == '名称30'
+
+        probe = FormatProbe.for_file(zip_file)
+        assert probe.sheet_count == 2 and probe.approx_rows == 31
+
+
+if __name__ == '__main__':
+    test_probe_detects_container_and_encoding()
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+测试HTML表格流式读取与pandas.read_html结果一致性的脚本
+"""
+
+import math
+import os
+import tempfile
+import pandas as pd
+from openpyxl import load_workbook
+from split_excel import split_excel_file
+from utils import StreamingExcelReader
+
+
+def _build_html(path):
+    """生成包含合并单元格、缺失值、多余空白和第二个表格的HTML导出文件"""
+    rows = []
+    for i in range(1, 121):
+        note = 'N/A' if i % 9 == 0 else f'  备注\n{i}  '
+        rows.append(f'<tr><td>SN{i:05d}</td><td>{note}</td><td>{i}</td><td>{i * 1.25}</td></tr>')
+    rows.insert(10, '<tr><td colspan="2">合并A</td><td rowspan="2">7</td><td>7.5</td></tr>'
+                    '<tr><td>SN-R</td><td>y</td><td>0.5</td></tr>')
+    html = ('<html><body><table><tr><th>编号</th><th>备注</th><th>数量</th><th>金额</th></tr>'
+            + ''.join(rows)
+            + '</table><table><tr><td>第二个表格</td></tr></table></body></html>')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(html)
+
+
+def _normalize(value):
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def test_html_rows_match_read_html():
+    """测试流式读取的表头和数据行与pandas.read_html读取第一个表格的结果一致"""
+    print("=" * 60)
+    print("测试HTML表格流式读取")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_file = os.path.join(tmp, 'export.xls')
+        _build_html(input_file)
+
+        df = pd.read_html(input_file, encoding='utf-8', header=0)[0]
+        expected = [tuple(df.columns)]
+        for row in df.itertuples(index=False):
+            values = [_normalize(value) for value in row]
+            while values and values[-1] is None:
+                values.pop()
+            expected.append(tuple(values))
+
+        rows = list(StreamingExcelReader.iter_html_rows(input_file, 'utf-8'))
+        assert rows == expected
+        print(f"流式读取 {len(rows) - 1} 行数据，与read_html一致")
+
+        output_dir = os.path.join(tmp, 'out')
+        split_excel_file(input_file, output_dir, 50, True, streaming=True)
+        outputs = sorted(os.listdir(output_dir))
+        assert len(outputs) == 3
+        ws = load_workbook(os.path.join(output_dir, outputs[0])).active
+        assert [cell.value for cell in ws[1]] == list(df.columns)
+        print(f"流式拆分输出 {len(outputs)} 个文件")
+
+
+if __name__ == '__main__':
+    test_html_rows_match_read_html()
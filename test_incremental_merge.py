@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+测试增量合并（--incremental）的脚本
+"""
+
+import contextlib
+import csv
+import io
+import json
+import os
+import tempfile
+import time
+from openpyxl import Workbook
+import merge_excel
+
+
+def _write_input(path, name, rows):
+    wb = Workbook()
+    wb.active.append(['名称', '数量'])
+    for i in range(rows):
+        wb.active.append([f'{name}{i}', i])
+    wb.save(path)
+
+
+def _merge(input_dir, output_file, *extra):
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        merge_excel.main(['--input_dir', input_dir, '--output_file', output_file, '--no-cache',
+                          '--incremental', 'true', '--output-format', 'csv'] + list(extra))
+    return output.getvalue()
+
+
+def _read_names(path):
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        return [row[0] for row in csv.reader(f)]
+
+
+def test_incremental_merge():
+    """测试增量合并：只追加新文件、内容未变的文件不触发重建、已合并文件变化或删除时完整重建"""
+    print("=" * 60)
+    print("测试增量合并")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_dir = os.path.join(tmp, 'in')
+        os.makedirs(input_dir)
+        output_file = os.path.join(tmp, 'merged.csv')
+        _write_input(os.path.join(input_dir, 'a.xlsx'), 'a', 3)
+        _write_input(os.path.join(input_dir, 'b.xlsx'), 'b', 2)
+
+        log = _merge(input_dir, output_file, '--remove_duplicate_headers', 'true')
+        assert '完整重建（没有可用的合并清单）' in log
+        first_names = _read_names(output_file)
+        assert len(first_names) == 6
+
+        # 新增文件：只解析新文件，已有行保持不变
+        _write_input(os.path.join(input_dir, 'c.xlsx'), 'c', 4)
+        log = _merge(input_dir, output_file, '--remove_duplicate_headers', 'true')
+        print(log.strip().splitlines()[2])
+        assert '追加1个新文件' in log and '读取文件 1/1: c.xlsx' in log and 'a.xlsx' not in log
+        names = _read_names(output_file)
+        assert names == first_names + ['c0', 'c1', 'c2', 'c3']
+        with open(output_file + '.manifest.json', encoding='utf-8') as f:
+            manifest = json.load(f)
+        ranges = {os.path.basename(entry['path']): entry['rows'] for entry in manifest['inputs']}
+        assert ranges['c.xlsx'] == [5, 9] and manifest['data_rows'] == 9
+
+        # 只更新修改时间：内容哈希一致，不重建
+        later = time.time() + 5
+        os.utime(os.path.join(input_dir, 'a.xlsx'), (later, later))
+        log = _merge(input_dir, output_file, '--remove_duplicate_headers', 'true')
+        assert '没有新增的文件' in log and _read_names(output_file) == names
+
+        # 已合并的文件内容变化或被删除：完整重建
+        _write_input(os.path.join(input_dir, 'b.xlsx'), 'b', 1)
+        log = _merge(input_dir, output_file, '--remove_duplicate_headers', 'true')
+        assert '已合并的文件已变化: b.xlsx' in log
+        assert sorted(_read_names(output_file)[1:]) == ['a0', 'a1', 'a2', 'b0', 'c0', 'c1', 'c2', 'c3']
+        os.remove(os.path.join(input_dir, 'c.xlsx'))
+        log = _merge(input_dir, output_file, '--remove_duplicate_headers', 'true')
+        assert '已合并的文件已删除: c.xlsx' in log and len(_read_names(output_file)) == 5
+
+        # 保留表头模式下追加的文件表头作为数据行写入，与完整合并一致
+        log = _merge(input_dir, output_file)
+        assert '合并选项与上次不同' in log
+        _write_input(os.path.join(input_dir, 'd.xlsx'), 'd', 1)
+        _merge(input_dir, output_file)
+        assert _read_names(output_file)[-2:] == ['名称', 'd0']
+
+    print("增量合并测试通过")
+
+
+if __name__ == '__main__':
+    test_incremental_merge()
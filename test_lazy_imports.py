@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+测试处理脚本按需导入重量级依赖的脚本
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+from openpyxl import Workbook
+import bench_startup
+
+SCRIPTS = ('split_excel', 'split_excel_format', 'merge_excel', 'merge_excel_format', 'utils', 'parse_cache')
+
+
+def test_scripts_defer_heavy_imports():
+    """测试导入各脚本时不加载pandas/openpyxl等依赖，行切片拆分全程不导入pandas"""
+    print("=" * 60)
+    print("测试按需导入")
+    print("=" * 60)
+
+    code = ('import sys\n'
+            f'import {", ".join(SCRIPTS)}\n'
+            f'print(",".join(m for m in {bench_startup.HEAVY_MODULES!r} if m in sys.modules))')
+    result = subprocess.run([sys.executable, '-c', code], cwd=bench_startup.HERE,
+                            capture_output=True, text=True, check=True)
+    print(f"导入脚本后已加载的依赖: {result.stdout.strip() or '无'}")
+    assert result.stdout.strip() == ''
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_file = os.path.join(tmp, 'input.xlsx')
+        wb = Workbook()
+        wb.active.append(['编号', '名称'])
+        for i in range(30):
+            wb.active.append([f'A{i}', f'名称{i}'])
+        wb.save(input_file)
+
+        args = ['--input', input_file, '--output', os.path.join(tmp, 'out'), '--rows', '10', '--no-cache']
+        first_read, total, heavy = bench_startup.measure('split_excel_format.py', args, input_file,
+                                                         os.path.join(tmp, 'report.json'))
+        print(f"行切片拆分: 首次读取 {first_read}ms，总计 {total}ms，首次读取前已导入: {heavy or '无'}")
+        assert heavy == []
+        assert len(os.listdir(os.path.join(tmp, 'out'))) == 3
+
+        code = ('import sys, split_excel_format\n'
+                f'split_excel_format.split_excel_file({input_file!r}, {os.path.join(tmp, "out2")!r}, 10)\n'
+                'assert "pandas" not in sys.modules')
+        subprocess.run([sys.executable, '-c', code], cwd=bench_startup.HERE, capture_output=True, check=True)
+
+
+if __name__ == '__main__':
+    test_scripts_defer_heavy_imports()
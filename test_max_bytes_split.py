@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+测试按输出文件大小拆分（--max-bytes）的脚本
+"""
+
+import contextlib
+import io
+import os
+import random
+import tempfile
+from openpyxl import Workbook, load_workbook
+import split_excel
+import split_excel_format
+from utils import parse_byte_size
+
+
+def _output_stats(output_dir):
+    """返回各输出文件的(大小, 数据行数)，按文件序号排序"""
+    names = sorted((name for name in os.listdir(output_dir) if name.endswith('.xlsx')),
+                   key=lambda name: int(name.rsplit('Split', 1)[1][:-5]))
+    stats = []
+    for name in names:
+        path = os.path.join(output_dir, name)
+        stats.append((os.path.getsize(path), load_workbook(path).active.max_row - 1))
+    return stats
+
+
+def test_max_bytes_split():
+    """测试行宽前后变化时各拆分路径的输出都不超过上限、行数完整，以及--rows作为行数上限"""
+    print("=" * 60)
+    print("测试按输出文件大小拆分")
+    print("=" * 60)
+
+    assert parse_byte_size('20MB') == 20 * 1024 ** 2 and parse_byte_size('1.5k') == 1536
+
+    limit = 40 * 1024
+    with tempfile.TemporaryDirectory() as tmp:
+        input_file = os.path.join(tmp, 'input.xlsx')
+        rng = random.Random(7)
+        wb = Workbook()
+        wb.active.append(['序号', '名称', '备注'])
+        for i in range(4000):
+            # 后半部分的行明显更宽，分块边界需要随之调整
+            width = 8 if i < 2000 else 80
+            note = ''.join(rng.choice('abcdefghij甲乙丙丁') for _ in range(width))
+            wb.active.append([i + 1, f'名称{i}', note])
+        wb.save(input_file)
+
+        cases = [
+            ('split_excel 流式', split_excel.main, ['--streaming=true']),
+            ('split_excel 常规', split_excel.main, []),
+            ('split_excel_format 行切片', split_excel_format.main, ['--engine', 'xml']),
+            ('split_excel_format openpyxl', split_excel_format.main, ['--engine', 'openpyxl']),
+        ]
+        for name, main, extra in cases:
+            output_dir = os.path.join(tmp, name)
+            with contextlib.redirect_stdout(io.StringIO()):
+                main(['--input', input_file, '--output', output_dir, '--max-bytes', '40KB',
+                      '--copy_headers=true', '--no-cache'] + extra)
+            stats = _output_stats(output_dir)
+            print(f"{name}: {len(stats)}个文件，最大 {max(size for size, _ in stats)}字节，"
+                  f"每个文件行数 {[rows for _, rows in stats]}")
+            assert all(size <= limit for size, _ in stats)
+            assert sum(rows for _, rows in stats) == 4000
+            assert stats[0][1] > stats[-2][1]
+
+        output_dir = os.path.join(tmp, 'capped')
+        with contextlib.redirect_stdout(io.StringIO()):
+            split_excel_format.main(['--input', input_file, '--output', output_dir, '--max-bytes', '40KB',
+                                     '--rows', '300', '--copy_headers=true', '--no-cache'])
+        assert max(rows for _, rows in _output_stats(output_dir)) == 300
+
+
+if __name__ == '__main__':
+    test_max_bytes_split()
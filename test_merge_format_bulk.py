@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+测试格式合并整行批量写出路径的脚本
+"""
+
+import contextlib
+import io
+import os
+import re
+import tempfile
+from openpyxl import Workbook, load_workbook
+import merge_excel_format
+
+
+def _values(path):
+    wb = load_workbook(path)
+    try:
+        return [[cell.value for cell in row] for row in wb.active.iter_rows()]
+    finally:
+        wb.close()
+
+
+def test_merge_format_bulk():
+    """测试两种表头模式下的合并结果（不去重时后续文件的表头按数据行写入），并输出处理速度"""
+    print("=" * 60)
+    print("测试格式合并批量写出")
+    print("=" * 60)
+
+    header = ['编号', '名称', '金额']
+    with tempfile.TemporaryDirectory() as tmp:
+        input_dir = os.path.join(tmp, 'inputs')
+        os.makedirs(input_dir)
+        data = []
+        for i in range(3):
+            wb = Workbook()
+            wb.active.append(header)
+            for j in range(4):
+                row = [f'F{i}-{j}', f'名称{j}', i * 10 + j]
+                wb.active.append(row)
+                data.append(row)
+            wb.save(os.path.join(input_dir, f'part{i}.xlsx'))
+
+        for remove, header_rows in (('true', 0), ('false', 2)):
+            output_file = os.path.join(tmp, f'merged_{remove}.xlsx')
+            with contextlib.redirect_stdout(io.StringIO()) as output:
+                merge_excel_format.main(['--input_dir', input_dir, '--output_file', output_file,
+                                         '--remove_duplicate_headers', remove])
+            log = output.getvalue()
+            values = _values(output_file)
+            assert values[0] == header, remove
+            # 输入文件的顺序取决于目录列举顺序，表头行之外的数据行按内容比较
+            assert values[1:].count(header) == header_rows, remove
+            assert sorted(row for row in values[1:] if row != header) == sorted(data), remove
+            assert f'共 {len(values)} 行数据' in log, remove
+            speed = re.search(r'处理速度: (\d+) 行/秒 \(耗时 [\d.]+ 秒\)', log)
+            assert speed is not None and int(speed.group(1)) > 0, log
+            print(f"去重={remove}: {len(values)}行, {speed.group(0)}")
+
+    print("\n格式合并批量写出测试通过")
+
+
+if __name__ == '__main__':
+    test_merge_format_bulk()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+测试CSV/Parquet输出格式（--output-format）的脚本
+"""
+
+import contextlib
+import csv
+import datetime
+import importlib.util
+import io
+import os
+import tempfile
+from openpyxl import Workbook
+import merge_excel
+import merge_excel_format
+import split_excel
+import split_excel_format
+
+
+def _read_csv(path):
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        return list(csv.reader(f))
+
+
+def test_output_formats():
+    """测试四个脚本的CSV输出（命名、表头处理、行数据），以及安装pyarrow时的Parquet列类型"""
+    print("=" * 60)
+    print("测试CSV/Parquet输出格式")
+    print("=" * 60)
+
+    formats = ['csv'] + (['parquet'] if importlib.util.find_spec('pyarrow') else [])
+    with tempfile.TemporaryDirectory() as tmp:
+        input_file = os.path.join(tmp, 'input.xlsx')
+        wb = Workbook()
+        wb.active.append(['编号', '名称', '数量', '日期'])
+        for i in range(25):
+            wb.active.append([f'A{i}', f'名称{i}', i * 1.5, datetime.datetime(2024, 1, 1 + i)])
+        wb.save(input_file)
+
+        for output_format in formats:
+            for name, main in (('split_excel', split_excel.main), ('split_excel_format', split_excel_format.main)):
+                output_dir = os.path.join(tmp, f'{name}_{output_format}')
+                with contextlib.redirect_stdout(io.StringIO()):
+                    main(['--input', input_file, '--output', output_dir, '--rows', '10', '--copy_headers=true',
+                          '--no-cache', '--output-format', output_format])
+                names = sorted(os.listdir(output_dir))
+                print(f"{name} {output_format}: {names}")
+                assert names == [f'inputSplit{i}.{output_format}' for i in (1, 2, 3)]
+
+            split_dir = os.path.join(tmp, f'split_excel_{output_format}')
+            if output_format == 'csv':
+                rows = _read_csv(os.path.join(split_dir, 'inputSplit3.csv'))
+                assert rows[0] == ['编号', '名称', '数量', '日期']
+                assert rows[1] == ['A20', '名称20', '30.0', '2024-01-21 00:00:00'] and len(rows) == 6
+            else:
+                import pyarrow.parquet as pq
+                table = pq.read_table(os.path.join(split_dir, 'inputSplit1.parquet'))
+                print(f"Parquet列类型: {[str(t) for t in table.schema.types]}")
+                assert table.column_names == ['编号', '名称', '数量', '日期'] and table.num_rows == 10
+                assert [str(t) for t in table.schema.types] == ['string', 'string', 'double', 'timestamp[us]']
+
+        # 合并：以拆分结果为输入，输出扩展名随格式调整
+        merge_input = os.path.join(tmp, 'merge_input')
+        with contextlib.redirect_stdout(io.StringIO()):
+            split_excel.main(['--input', input_file, '--output', merge_input, '--rows', '10',
+                              '--copy_headers=true', '--no-cache'])
+        for name, main, extra in (('merge_excel', merge_excel.main, []),
+                                  ('merge_excel 流式', merge_excel.main, ['--streaming=true']),
+                                  ('merge_excel_format', merge_excel_format.main, [])):
+            for dedup, expected_rows in (('true', 26), ('false', 28)):
+                output_file = os.path.join(tmp, f'{name}_{dedup}.xls')
+                with contextlib.redirect_stdout(io.StringIO()):
+                    main(['--input_dir', merge_input, '--output_file', output_file, '--no-cache',
+                          '--remove_duplicate_headers', dedup, '--output-format', 'csv'] + extra)
+                rows = _read_csv(output_file[:-4] + '.csv')
+                print(f"{name} 表头去重={dedup}: {len(rows)}行")
+                assert len(rows) == expected_rows and rows[0] == ['编号', '名称', '数量', '日期']
+                assert sorted(row[0] for row in rows[1:] if row[0] != '编号') == sorted(f'A{i}' for i in range(25))
+
+        # Parquet各列类型固定，保留重复表头时报参数错误
+        if 'parquet' in formats:
+            with contextlib.redirect_stdout(io.StringIO()) as out:
+                try:
+                    merge_excel.main(['--input_dir', merge_input, '--output_file', os.path.join(tmp, 'm.parquet'),
+                                      '--no-cache', '--output-format', 'parquet'])
+                except SystemExit:
+                    pass
+            assert 'Parquet输出不能保留重复表头' in out.getvalue()
+
+
+if __name__ == '__main__':
+    test_output_formats()
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+测试并行解析合并与串行合并结果一致性的脚本
+"""
+
+import os
+import tempfile
+from openpyxl import Workbook, load_workbook
+import merge_excel
+import merge_excel_format
+
+
+def _build_inputs(directory, count=5):
+    """生成多个列结构相同、行数不同的输入文件"""
+    for n in range(count):
+        wb = Workbook()
+        ws = wb.active
+        ws.append(['编号', '名称', '数量'])
+        for i in range(40 + n * 7):
+            ws.append([f'F{n}-{i}', f'名称{i % 4}', i * (n + 1)])
+        wb.save(os.path.join(directory, f'input_{n}.xlsx'))
+
+
+def _dump(path):
+    ws = load_workbook(path).active
+    return [[cell.value for cell in row] for row in ws.iter_rows()]
+
+
+def test_parallel_merge_matches_serial():
+    """测试多进程解析时输出仍按文件顺序拼接，且与串行结果逐单元格一致"""
+    print("=" * 60)
+    print("测试并行解析合并一致性")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_dir = os.path.join(tmp, 'inputs')
+        os.makedirs(input_dir)
+        _build_inputs(input_dir)
+
+        cases = [
+            ('常规合并', lambda out, w: merge_excel.merge_excel_files(input_dir, out, workers=w)),
+            ('流式合并', lambda out, w: merge_excel.merge_excel_files(input_dir, out, streaming=True, workers=w)),
+            ('格式合并', lambda out, w: merge_excel_format.merge_excel_files(input_dir, out, workers=w)),
+        ]
+        for name, merge in cases:
+            serial_file = os.path.join(tmp, f'{name}_serial.xlsx')
+            parallel_file = os.path.join(tmp, f'{name}_parallel.xlsx')
+            merge(serial_file, 1)
+            merge(parallel_file, 3)
+            assert _dump(serial_file) == _dump(parallel_file), name
+            print(f"{name}: 串行与并行输出一致")
+
+
+if __name__ == '__main__':
+    test_parallel_merge_matches_serial()
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+测试解析结果缓存的命中、失效和淘汰逻辑的脚本
+"""
+
+import os
+import tempfile
+import pandas as pd
+from parse_cache import ParseCache
+
+
+def _parse(path):
+    """模拟解析：读取CSV，包含整数、浮点、文本和日期列"""
+    return pd.read_csv(path, parse_dates=['日期'])
+
+
+def _write_source(path, rows, label='名称'):
+    pd.DataFrame({
+        '编号': range(rows),
+        '数值': [i * 0.5 for i in range(rows)],
+        '名称': [f'{label}{i % 5}' if i % 7 else None for i in range(rows)],
+        '日期': pd.date_range('2024-01-01', periods=rows),
+    }).to_csv(path, index=False)
+
+
+def test_cache_hit_and_invalidation():
+    """测试命中时结果与重新解析一致，文件内容变化（即使修改时间不变）后不再命中"""
+    print("=" * 60)
+    print("测试解析缓存命中与失效")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'source.csv')
+        _write_source(source, 200)
+        cache = ParseCache(os.path.join(tmp, 'cache'))
+
+        first, hit = cache.get_or_parse(source, _parse)
+        assert not hit
+        second, hit = cache.get_or_parse(source, _parse)
+        assert hit
+        pd.testing.assert_frame_equal(first, second)
+        print("命中结果与解析结果一致")
+
+        # 相同大小、相同修改时间但内容不同：依靠内容哈希识别
+        stat = os.stat(source)
+        _write_source(source, 200, label='名字')
+        os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        assert os.path.getsize(source) == stat.st_size
+        third, hit = cache.get_or_parse(source, _parse)
+        assert not hit
+        assert third['名称'].iloc[1] == '名字1'
+        print("内容变化后缓存失效")
+
+
+def test_cache_lru_eviction():
+    """测试超过大小上限时淘汰最久未使用的条目"""
+    print("=" * 60)
+    print("测试解析缓存LRU淘汰")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_dir = os.path.join(tmp, 'cache')
+        cache = ParseCache(cache_dir, max_mb=1)
+        sources = []
+        for n in range(3):
+            source = os.path.join(tmp, f'source_{n}.csv')
+            _write_source(source, 16000)
+            sources.append(source)
+
+        cache.get_or_parse(sources[0], _parse)
+        cache.get_or_parse(sources[1], _parse)
+        # 再次访问第一个文件，使第二个文件成为最久未使用的条目
+        _, hit = cache.get_or_parse(sources[0], _parse)
+        assert hit
+        cache.get_or_parse(sources[2], _parse)
+
+        assert cache.get_or_parse(sources[0], _parse)[1]
+        assert not cache.get_or_parse(sources[1], _parse)[1]
+        print(f"缓存条目数: {len(os.listdir(cache_dir))}")
+
+
+if __name__ == '__main__':
+    test_cache_hit_and_invalidation()
+    test_cache_lru_eviction()
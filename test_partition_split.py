@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+测试按列值分区拆分（--partition-by）的脚本
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Font
+import split_excel
+import split_excel_format
+from utils import PartitionWriter
+
+
+def test_partition_split():
+    """测试分区路由、溢出到临时文件后行顺序不变、文件名规整，以及行切片路径保留样式"""
+    print("=" * 60)
+    print("测试按列值分区拆分")
+    print("=" * 60)
+
+    keys = ['北京', '上海', 'A/B', 'a/b', None, 101.0, '广州']
+    with tempfile.TemporaryDirectory() as tmp:
+        input_file = os.path.join(tmp, 'input.xlsx')
+        wb = Workbook()
+        ws = wb.active
+        ws.append(['序号', '仓库', '数量'])
+        expected = {}
+        for i in range(700):
+            key = keys[(i + i // 50) % len(keys)]
+            ws.append([i + 1, key, i % 13])
+            ws.cell(row=i + 2, column=3).font = Font(bold=i % 2 == 0)
+            expected.setdefault(PartitionWriter.key_text(key), []).append(i + 1)
+        wb.save(input_file)
+
+        original = PartitionWriter.DEFAULT_MAX_BUFFERED_ROWS
+        PartitionWriter.DEFAULT_MAX_BUFFERED_ROWS = 50
+        try:
+            for name, main in (('split_excel', split_excel.main), ('split_excel_format', split_excel_format.main)):
+                output_dir = os.path.join(tmp, name)
+                log = io.StringIO()
+                with contextlib.redirect_stdout(log):
+                    main(['--input', input_file, '--output', output_dir, '--partition-by', '仓库',
+                          '--max-open-files', '2', '--copy_headers=true', '--no-cache'])
+                print(log.getvalue().strip().splitlines()[-2 if name == 'split_excel_format' else -1])
+                files = sorted(os.listdir(output_dir))
+                assert files == sorted(['input_北京.xlsx', 'input_上海.xlsx', 'input_A_B.xlsx', 'input_a_b_2.xlsx',
+                                        'input_空值.xlsx', 'input_101.xlsx', 'input_广州.xlsx'])
+                for key, file_name in (('北京', 'input_北京.xlsx'), ('a/b', 'input_a_b_2.xlsx'),
+                                       ('', 'input_空值.xlsx'), ('101', 'input_101.xlsx')):
+                    out = load_workbook(os.path.join(output_dir, file_name)).active
+                    assert [c.value for c in out[1]] == ['序号', '仓库', '数量']
+                    assert [row[0] for row in out.iter_rows(min_row=2, values_only=True)] == expected[key]
+                    if name == 'split_excel_format':
+                        assert out.cell(row=2, column=3).font.b == (expected[key][0] % 2 == 1)
+        finally:
+            PartitionWriter.DEFAULT_MAX_BUFFERED_ROWS = original
+
+
+if __name__ == '__main__':
+    test_partition_split()
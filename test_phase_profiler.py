@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+测试--profile阶段耗时统计的脚本
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+from openpyxl import Workbook
+import split_excel
+from utils import profiler
+
+
+def test_profile_report():
+    """测试未启用时无开销路径、阶段报告内容，以及cProfile数据文件写在输出旁"""
+    print("=" * 60)
+    print("测试阶段耗时统计")
+    print("=" * 60)
+
+    assert profiler.phase('parse') is profiler.phase('split')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_file = os.path.join(tmp, 'input.xlsx')
+        wb = Workbook()
+        wb.active.append(['序号', '名称', '数量'])
+        for i in range(50):
+            wb.active.append([i + 1, f'名称{i}', i * 3])
+        wb.save(input_file)
+
+        for mode in ('phases', 'cprofile'):
+            output_dir = os.path.join(tmp, mode)
+            with contextlib.redirect_stdout(io.StringIO()):
+                split_excel.main(['--input', input_file, '--output', output_dir, '--rows', '20',
+                                  '--no-cache', '--profile', mode])
+            with open(os.path.join(output_dir, 'input_profile.txt'), encoding='utf-8') as f:
+                report = f.read()
+            print(report.split('\n\n')[1])
+            phases = {line.split()[0] for line in report.split('\n\n')[1].splitlines()[1:]}
+            assert {'read', 'split', 'parse', 'dtype_compaction', 'write_chunk'} <= phases
+            assert os.path.exists(os.path.join(output_dir, 'input_profile.prof')) == (mode == 'cprofile')
+            assert len([name for name in os.listdir(output_dir) if name.endswith('.xlsx')]) == 3
+
+        assert not profiler.enabled
+
+
+if __name__ == '__main__':
+    test_profile_report()
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+测试--events json结构化进度事件的脚本
+"""
+
+import contextlib
+import io
+import itertools
+import json
+import os
+import tempfile
+from unittest import mock
+from openpyxl import Workbook
+import merge_excel
+import split_excel
+import split_excel_format
+from utils import ProgressEvents, events
+
+
+def _build_input(path, rows):
+    wb = Workbook()
+    wb.active.append(['编号', '名称'])
+    for i in range(rows):
+        wb.active.append([f'A{i}', f'名称{i % 7}'])
+    wb.save(path)
+
+
+def _run(main, argv):
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        main(argv)
+    events.configure()
+    return [json.loads(line) for line in output.getvalue().splitlines() if line.startswith('{')]
+
+
+def test_events_json():
+    """测试阶段事件成对出现，最终行数、写出字节数和每个文件的output事件与实际输出一致，默认text模式不输出事件"""
+    print("=" * 60)
+    print("测试结构化进度事件")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_dir = os.path.join(tmp, 'inputs')
+        os.makedirs(input_dir)
+        input_file = os.path.join(input_dir, 'input.xlsx')
+        _build_input(input_file, 95)
+
+        output_dir = os.path.join(tmp, 'split')
+        argv = ['--input', input_file, '--output', output_dir, '--rows', '20', '--no-cache']
+        assert _run(split_excel.main, argv) == []
+
+        for streaming in ('false', 'true'):
+            received = _run(split_excel.main, argv + [f'--streaming={streaming}', '--events', 'json'])
+            starts = [e['phase'] for e in received if e['type'] == 'phase_start']
+            ends = [e for e in received if e['type'] == 'phase_end']
+            assert starts == [e['phase'] for e in ends]
+            split_end = ends[-1]
+            sizes = sum(os.path.getsize(os.path.join(output_dir, name)) for name in os.listdir(output_dir))
+            assert split_end['phase'] == 'split' and split_end['rows'] == 95 and split_end['total_rows'] == 95
+            assert split_end['bytes_written'] == sizes
+            # 每个输出文件各有一个output事件，路径、行数和字节数与实际输出一致
+            outputs = [e for e in received if e['type'] == 'output']
+            assert sorted(os.path.basename(e['path']) for e in outputs) == sorted(os.listdir(output_dir))
+            assert sum(e['rows'] for e in outputs) == 95 and all(e['phase'] == 'split' for e in outputs)
+            assert all(e['bytes'] == os.path.getsize(e['path']) for e in outputs)
+            print(f"流式={streaming}: {starts}, 写出 {split_end['bytes_written']} 字节")
+
+        output_file = os.path.join(tmp, 'merged.xlsx')
+        received = _run(merge_excel.main, ['--input_dir', input_dir, '--output_file', output_file,
+                                           '--no-cache', '--events', 'json'])
+        save_end = [e for e in received if e['type'] == 'phase_end'][-1]
+        assert save_end['phase'] == 'save' and save_end['bytes_written'] == os.path.getsize(output_file)
+
+
+def test_progress_while_writing():
+    """测试只有一个输出文件时，文件写完之前的progress事件行数也随写出的行递增，最终行数不重复统计"""
+    print("=" * 60)
+    print("测试写出过程中的进度事件")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_file = os.path.join(tmp, 'input.xlsx')
+        _build_input(input_file, 95)
+        runs = [(split_excel.main, ['--streaming=false']), (split_excel.main, ['--streaming=true']),
+                (split_excel_format.main, ['--engine', 'openpyxl'])]
+        # 每次取时间都前进1秒，使每次更新都输出progress事件
+        clock = itertools.count()
+        with mock.patch.object(ProgressEvents, 'ROW_STEP', 10), \
+                mock.patch('utils.time.perf_counter', side_effect=lambda: float(next(clock))):
+            for n, (main, extra) in enumerate(runs):
+                output_dir = os.path.join(tmp, f'split{n}')
+                received = _run(main, ['--input', input_file, '--output', output_dir, '--rows', '200',
+                                       '--no-cache', '--events', 'json'] + extra)
+                split = [e for e in received if e.get('phase') == 'split']
+                first_output = next(i for i, e in enumerate(split) if e['type'] == 'output')
+                progress = [e['rows'] for e in split[:first_output] if e['type'] == 'progress']
+                assert progress and 0 < progress[0] < 95 and progress == sorted(progress), (extra, progress)
+                assert all(e['rows'] <= 95 for e in split if e['type'] == 'progress')
+                assert split[-1]['type'] == 'phase_end' and split[-1]['rows'] == 95
+                print(f"{main.__module__} {' '.join(extra)}: 写完前的进度 {progress}")
+
+
+if __name__ == '__main__':
+    test_events_json()
+    test_progress_while_writing()
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+测试断点续拆（--resume）与原子写出的脚本
+"""
+
+import contextlib
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+from openpyxl import Workbook, load_workbook
+import split_excel
+import split_excel_format
+from split_checkpoint import SplitCheckpoint
+
+
+class _Interrupted(Exception):
+    """模拟拆分进程在写完若干个文件后被终止"""
+
+
+def _split(main, input_file, output_dir, *extra, stop_after=None):
+    output = io.StringIO()
+    record = SplitCheckpoint.record
+
+    def interrupted_record(checkpoint, output_file, rows, end=None):
+        record(checkpoint, output_file, rows, end)
+        if checkpoint.done == stop_after:
+            raise _Interrupted()
+
+    with contextlib.redirect_stdout(output), mock.patch.object(SplitCheckpoint, 'record', interrupted_record):
+        try:
+            main(['--input', input_file, '--output', output_dir, '--rows', '10', '--no-cache'] + list(extra))
+        except (_Interrupted, RuntimeError, SystemExit):
+            assert stop_after is not None
+    return output.getvalue()
+
+
+def _first_values(path):
+    wb = load_workbook(path, read_only=True)
+    try:
+        return [row[0] if row else None for row in wb.active.iter_rows(values_only=True)]
+    finally:
+        wb.close()
+
+
+def test_resumable_split():
+    """测试中断后的断点清单、跳过已完成分块、缺失的分块从该分块重新拆分，以及选项变化时从头拆分"""
+    print("=" * 60)
+    print("测试断点续拆")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_file = os.path.join(tmp, 'input.xlsx')
+        wb = Workbook()
+        wb.active.append(['编号', '名称'])
+        for i in range(45):
+            wb.active.append([i, f'名称{i}'])
+        wb.save(input_file)
+
+        for name, main, extra in (('split_excel', split_excel.main, []),
+                                  ('split_excel 流式', split_excel.main, ['--streaming=true']),
+                                  ('split_excel_format', split_excel_format.main, []),
+                                  ('split_excel_format openpyxl', split_excel_format.main, ['--engine', 'openpyxl'])):
+            output_dir = os.path.join(tmp, name)
+            checkpoint_file = os.path.join(output_dir, 'inputSplit.checkpoint.json')
+
+            # 写完3个文件后中断：清单中只有完整的文件，没有遗留临时文件
+            _split(main, input_file, output_dir, *extra, stop_after=3)
+            with open(checkpoint_file, encoding='utf-8') as f:
+                checkpoint = json.load(f)
+            assert [c['rows'] for c in checkpoint['chunks']] == [[0, 10], [10, 20], [20, 30]]
+            assert not [f for f in os.listdir(output_dir) if f.startswith('.')]
+
+            # 第3个文件丢失：从第3个文件（第21行数据）继续，完成后删除清单
+            os.remove(os.path.join(output_dir, 'inputSplit3.xlsx'))
+            log = _split(main, input_file, output_dir, '--resume=true', *extra)
+            print(f"{name}: {[line for line in log.splitlines() if '断点续拆' in line][-1]}")
+            assert '跳过已完成的2个文件，从第21行数据继续' in log and '处理文件 1' not in log
+            assert _first_values(os.path.join(output_dir, 'inputSplit3.xlsx')) == list(range(20, 30))
+            assert _first_values(os.path.join(output_dir, 'inputSplit5.xlsx')) == list(range(40, 45))
+            assert not os.path.exists(checkpoint_file)
+
+            # 行数变化：已完成的分块不再适用，从头拆分
+            _split(main, input_file, output_dir, *extra, stop_after=1)
+            log = _split(main, input_file, output_dir, '--resume=true', '--rows', '20', *extra)
+            assert '拆分选项与上次不同' in log and _first_values(os.path.join(output_dir, 'inputSplit1.xlsx'))[-1] == 19
+
+    print("断点续拆测试通过")
+
+
+def test_resume_by_size_with_blank_rows():
+    """测试源工作表缺少行元素（空行）时，行切片引擎按大小拆分的续拆从上一分块的末行之后继续，不重复写出"""
+    with tempfile.TemporaryDirectory() as tmp:
+        input_file = os.path.join(tmp, 'input.xlsx')
+        wb = Workbook()
+        ws = wb.active
+        ws.append(['编号', '名称'])
+        # 数据只写在偶数行，奇数行没有行元素
+        for i in range(30):
+            ws.cell(row=2 + 2 * i, column=1, value=i)
+            ws.cell(row=2 + 2 * i, column=2, value=f'名称{i}')
+        wb.save(input_file)
+
+        output_dir = os.path.join(tmp, 'out')
+        extra = ['--max-bytes', '1MB', '--engine', 'xml']
+        _split(split_excel_format.main, input_file, output_dir, *extra, stop_after=2)
+        with open(os.path.join(output_dir, 'inputSplit.checkpoint.json'), encoding='utf-8') as f:
+            # 每个分块写出10行，跨越19个源数据行
+            assert [c['rows'] for c in json.load(f)['chunks']] == [[0, 19], [19, 39]]
+        _split(split_excel_format.main, input_file, output_dir, '--resume=true', *extra)
+        # 输出不含表头，保留源文件中的空行，只比较有数据的行
+        values = [[value for value in _first_values(os.path.join(output_dir, f'inputSplit{n}.xlsx')) if value is not None]
+                  for n in (1, 2, 3)]
+        assert values == [list(range(0, 10)), list(range(10, 20)), list(range(20, 30))]
+        assert not os.path.exists(os.path.join(output_dir, 'inputSplit4.xlsx'))
+
+
+if __name__ == '__main__':
+    test_resumable_split()
+    test_resume_by_size_with_blank_rows()
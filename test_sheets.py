@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+测试多工作表处理（--sheets）的脚本
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Font
+import merge_excel
+import merge_excel_format
+import split_excel
+import split_excel_format
+from utils import FormatProbe, StreamingExcelReader
+
+
+def _values(path):
+    return [list(row) for row in load_workbook(path).active.iter_rows(values_only=True)]
+
+
+def test_sheets():
+    """测试工作表列举与选择、各拆分路径按工作表输出、HTML多表格，以及合并按工作表分别输出"""
+    print("=" * 60)
+    print("测试多工作表处理")
+    print("=" * 60)
+
+    sizes = {'北京': 25, '上海': 7, 'A&B': 12}
+    with tempfile.TemporaryDirectory() as tmp:
+        input_file = os.path.join(tmp, 'input.xlsx')
+        wb = Workbook()
+        wb.active.title = '北京'
+        for name, rows in sizes.items():
+            ws = wb[name] if name in wb.sheetnames else wb.create_sheet(name)
+            ws.append(['编号', '名称', '数量'])
+            for i in range(rows):
+                ws.append([f'{name}{i}', f'名称{i}', i])
+        wb['A&B']['B2'].font = Font(bold=True)
+        wb.active = 1
+        wb.save(input_file)
+
+        probe = FormatProbe.for_file(input_file)
+        assert probe.sheet_names() == list(sizes)
+        assert probe.select_sheets(None) == [None] and probe.select_sheets('all') == list(sizes)
+        assert probe.select_sheets(' A&B ,北京,A&B') == ['A&B', '北京']
+        try:
+            probe.select_sheets('不存在')
+            assert False, "不存在的工作表应报错"
+        except ValueError as e:
+            print(f"不存在的工作表: {e}")
+
+        cases = [
+            ('split_excel 常规', split_excel.main, []),
+            ('split_excel 流式', split_excel.main, ['--streaming=true']),
+            ('split_excel_format 行切片', split_excel_format.main, ['--engine', 'xml']),
+            ('split_excel_format openpyxl', split_excel_format.main, ['--engine', 'openpyxl']),
+        ]
+        for name, main, extra in cases:
+            output_dir = os.path.join(tmp, name)
+            with contextlib.redirect_stdout(io.StringIO()):
+                main(['--input', input_file, '--output', output_dir, '--rows', '10', '--copy_headers=true',
+                      '--sheets', 'all', '--workers', '2', '--no-cache'] + extra)
+            names = sorted(os.listdir(output_dir))
+            print(f"{name}: {names}")
+            assert names == sorted(f'input_{sheet}Split{i}.xlsx' for sheet, rows in sizes.items()
+                                   for i in range(1, (rows + 9) // 10 + 1))
+            assert _values(os.path.join(output_dir, 'input_上海Split1.xlsx'))[1] == ['上海0', '名称0', 0]
+            assert _values(os.path.join(output_dir, 'input_A&BSplit2.xlsx'))[-1] == ['A&B11', '名称11', 11]
+        styled = load_workbook(os.path.join(tmp, 'split_excel_format 行切片', 'input_A&BSplit1.xlsx')).active
+        assert styled['B2'].font.b
+
+        # HTML表格文件中的表格依次作为Table1、Table2
+        html_file = os.path.join(tmp, 'report.xls')
+        with open(html_file, 'w', encoding='utf-8') as f:
+            f.write('<html><body><table><tr><th>a</th></tr><tr><td>1</td></tr></table>'
+                    '<table><tr><th>b</th><th>c</th></tr>'
+                    + ''.join(f'<tr><td>x{i}</td><td>{i}</td></tr>' for i in range(6)) + '</table></body></html>')
+        assert FormatProbe.for_file(html_file).sheet_names() == ['Table1', 'Table2']
+        assert list(StreamingExcelReader.iter_html_rows(html_file, None, 1))[:2] == [('b', 'c'), ('x0', 0)]
+        output_dir = os.path.join(tmp, 'html')
+        with contextlib.redirect_stdout(io.StringIO()):
+            split_excel.main(['--input', html_file, '--output', output_dir, '--rows', '4', '--sheets', 'Table2',
+                              '--streaming=true', '--no-cache'])
+        assert sorted(os.listdir(output_dir)) == ['report_Table2Split1.xlsx', 'report_Table2Split2.xlsx']
+
+        # 合并：每个工作表分别合并所有包含该工作表的文件
+        merge_input = os.path.join(tmp, 'merge_input')
+        os.makedirs(merge_input)
+        wb.save(os.path.join(merge_input, 'a.xlsx'))
+        other = Workbook()
+        other.active.title = '上海'
+        other.active.append(['编号', '名称', '数量'])
+        other.active.append(['补充', '名称', 99])
+        other.save(os.path.join(merge_input, 'b.xlsx'))
+        for name, main, extra in (('merge_excel', merge_excel.main, []),
+                                  ('merge_excel 流式', merge_excel.main, ['--streaming=true']),
+                                  ('merge_excel_format', merge_excel_format.main, [])):
+            output_file = os.path.join(tmp, name, 'merged.xlsx')
+            with contextlib.redirect_stdout(io.StringIO()):
+                main(['--input_dir', merge_input, '--output_file', output_file, '--sheets', '上海,北京',
+                      '--remove_duplicate_headers=true', '--workers', '2', '--no-cache'] + extra)
+            names = sorted(os.listdir(os.path.dirname(output_file)))
+            shanghai = _values(os.path.join(tmp, name, 'merged_上海.xlsx'))
+            print(f"{name}: {names}，上海 {len(shanghai) - 1}行")
+            assert names == ['merged_上海.xlsx', 'merged_北京.xlsx']
+            assert len(shanghai) == 1 + 7 + 1 and ['补充', '名称', 99] in shanghai
+            assert len(_values(os.path.join(tmp, name, 'merged_北京.xlsx'))) == 1 + 25
+
+
+if __name__ == '__main__':
+    test_sheets()
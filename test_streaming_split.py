@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+测试流式拆分与DataFrame拆分结果一致性的脚本
+"""
+
+import os
+import tempfile
+from datetime import datetime, timedelta
+from openpyxl import Workbook, load_workbook
+from split_excel import split_excel_file
+
+
+def _build_sample(path):
+    """生成包含空列名、重复列名、日期和中间空行的样例文件"""
+    wb = Workbook()
+    ws = wb.active
+    ws.append(['id', 'name', None, 'name', 'date'])
+    for i in range(250):
+        ws.append([float(i), f'N{i % 7}', None if i % 5 else 'x', i % 3, datetime(2024, 1, 1) + timedelta(days=i)])
+    ws.append([])
+    ws.append([999, 'tail'])
+    ws.append([])
+    wb.save(path)
+
+
+def _dump(path):
+    ws = load_workbook(path).active
+    return [[(cell.value, cell.number_format) for cell in row] for row in ws.iter_rows()]
+
+
+def test_streaming_matches_dataframe_path():
+    """测试流式拆分输出与常规拆分输出逐单元格一致"""
+    print("=" * 60)
+    print("测试流式拆分一致性")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_file = os.path.join(tmp, 'sample.xlsx')
+        _build_sample(input_file)
+
+        for copy_headers in (True, False):
+            normal_dir = os.path.join(tmp, f'normal_{copy_headers}')
+            stream_dir = os.path.join(tmp, f'stream_{copy_headers}')
+            split_excel_file(input_file, normal_dir, 100, copy_headers)
+            split_excel_file(input_file, stream_dir, 100, copy_headers, streaming=True)
+
+            normal_files = sorted(os.listdir(normal_dir))
+            assert normal_files == sorted(os.listdir(stream_dir))
+            for name in normal_files:
+                assert _dump(os.path.join(normal_dir, name)) == _dump(os.path.join(stream_dir, name)), name
+            print(f"复制表头={copy_headers}: {len(normal_files)}个文件一致")
+
+
+if __name__ == '__main__':
+    test_streaming_matches_dataframe_path()
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+测试格式拆分样式缓存（StyleRegistry）的脚本
+"""
+
+import os
+import tempfile
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Alignment, Font, PatternFill
+from split_excel_format import _copy_chunk_range_from_file, split_excel_file
+
+
+def _build_sample(path, rows):
+    """生成只有少数几种重复样式的样例：粗体表头、黄色填充的编号列、无样式的名称列、两位小数的金额列"""
+    wb = Workbook()
+    ws = wb.active
+    ws.append(['编号', '名称', '金额'])
+    for cell in ws[1]:
+        cell.font = Font(bold=True)
+    for i in range(rows):
+        ws.append([i, f'名称{i}', i * 1.5])
+        ws.cell(row=i + 2, column=1).fill = PatternFill('solid', fgColor='FFFF00')
+        ws.cell(row=i + 2, column=3).number_format = '0.00'
+        ws.cell(row=i + 2, column=3).alignment = Alignment(horizontal='right')
+    wb.save(path)
+
+
+def _styles(path):
+    wb = load_workbook(path)
+    try:
+        return [[(cell.value, cell.font.b, cell.fill.fgColor.rgb, cell.number_format, cell.alignment.horizontal)
+                 for cell in row] for row in wb.active.iter_rows()]
+    finally:
+        wb.close()
+
+
+def test_style_registry_hits():
+    """测试每个输出工作簿中每种样式只构建一次，其余单元格命中缓存，输出样式与源文件一致"""
+    print("=" * 60)
+    print("测试样式缓存")
+    print("=" * 60)
+
+    rows_per_file, data_rows = 10, 25
+    with tempfile.TemporaryDirectory() as tmp:
+        input_file = os.path.join(tmp, 'styled.xlsx')
+        _build_sample(input_file, data_rows)
+        num_files = (data_rows + rows_per_file - 1) // rows_per_file
+
+        # 每个输出工作簿中有4种样式：粗体表头、填充、默认样式、数字格式
+        output_dir = os.path.join(tmp, 'chunks')
+        os.makedirs(output_dir)
+        for i in range(num_files):
+            _, hits, misses, outputs = _copy_chunk_range_from_file(
+                input_file, output_dir, 'styled', rows_per_file, data_rows, num_files, True, {}, i, i + 1)
+            [(_, rows)] = outputs
+            assert misses == 4, (i, misses)
+            assert hits == 3 + rows * 3 - misses, (i, hits)
+            print(f"第{i + 1}个文件: 命中 {hits} 次, 未命中 {misses} 次")
+
+        output_dir = os.path.join(tmp, 'split')
+        split_excel_file(input_file, output_dir, rows_per_file, True, engine='openpyxl')
+        source = _styles(input_file)
+        for i in range(num_files):
+            output = _styles(os.path.join(output_dir, f'styledSplit{i + 1}.xlsx'))
+            assert output[0] == source[0]
+            assert output[1:] == source[1 + i * rows_per_file:1 + (i + 1) * rows_per_file], i
+        print(f"输出样式与源文件一致: {num_files}个文件")
+
+    print("\n样式缓存测试通过")
+
+
+if __name__ == '__main__':
+    test_style_registry_hits()
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+测试常驻工作进程JSON行协议的脚本
+"""
+
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from openpyxl import Workbook
+from utils import ParallelChunkWriter, ParallelFileParser
+
+DAEMON = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'worker_daemon.py')
+
+
+def _build_inputs(directory):
+    for n in range(3):
+        wb = Workbook()
+        wb.active.append(['编号', '名称'])
+        for i in range(20):
+            wb.active.append([f'F{n}-{i}', f'名称{i}'])
+        wb.save(os.path.join(directory, f'input_{n}.xlsx'))
+
+
+def test_daemon_runs_and_cancels_jobs():
+    """测试连续执行多个任务、取消排队中的任务，以及参数错误不影响后续任务"""
+    print("=" * 60)
+    print("测试常驻工作进程")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_dir = os.path.join(tmp, 'inputs')
+        os.makedirs(input_dir)
+        _build_inputs(input_dir)
+
+        merge_args = ['--input_dir', input_dir, '--no-cache']
+        requests = [
+            {'type': 'ping'},
+            {'type': 'run', 'id': 'merge', 'script': 'merge_excel.py',
+             'args': merge_args + ['--output_file', os.path.join(tmp, 'merged.xlsx')]},
+            {'type': 'run', 'id': 'queued', 'script': 'merge_excel_format.py',
+             'args': merge_args + ['--output_file', os.path.join(tmp, 'queued.xlsx')]},
+            {'type': 'cancel', 'id': 'queued'},
+            {'type': 'run', 'id': 'bad', 'script': 'split_excel.py', 'args': ['--rows', '10']},
+            {'type': 'run', 'id': 'split', 'script': 'split_excel.py',
+             'args': ['--input', os.path.join(input_dir, 'input_0.xlsx'), '--output', os.path.join(tmp, 'split'),
+                      '--rows', '8', '--copy_headers=true', '--no-cache']},
+            {'type': 'shutdown'},
+        ]
+        stdin = ''.join(json.dumps(request, ensure_ascii=False) + '\n' for request in requests)
+        result = subprocess.run([sys.executable, DAEMON], input=stdin, capture_output=True,
+                                text=True, encoding='utf-8', timeout=120)
+        assert result.returncode == 0, result.stderr
+        events = [json.loads(line) for line in result.stdout.splitlines()]
+
+        assert events[0]['event'] == 'ready' and events[1]['event'] == 'pong'
+        done = {event['id']: event for event in events if event['event'] == 'done'}
+        print(f"任务结果: { {job_id: event['status'] for job_id, event in done.items()} }")
+        assert done['merge']['status'] == 'success' and os.path.exists(os.path.join(tmp, 'merged.xlsx'))
+        assert done['queued']['status'] == 'cancelled' and not os.path.exists(os.path.join(tmp, 'queued.xlsx'))
+        assert done['bad']['status'] == 'failed' and done['bad']['exit_code'] == 2
+        assert done['split']['status'] == 'success' and len(os.listdir(os.path.join(tmp, 'split'))) == 3
+
+        logs = [event['message'] for event in events if event['event'] == 'log' and event['id'] == 'merge']
+        assert any('[合并] 完成' in message for message in logs)
+
+
+def _uses_original_streams():
+    return sys.stdout is sys.__stdout__ and sys.stderr is sys.__stderr__
+
+
+def _stderr_is_original(_):
+    return sys.stderr is sys.__stderr__
+
+
+def test_pool_children_restore_streams():
+    """测试进程池子进程不沿用父进程替换过的sys.stdout/sys.stderr（fork方式启动时会被继承）"""
+    saved = sys.stdout, sys.stderr
+    sys.stdout, sys.stderr = io.StringIO(), io.StringIO()
+    try:
+        # ParallelFileParser在子进程中临时重定向标准输出以收集日志，只检查标准错误
+        parsed = list(ParallelFileParser(2).imap(_stderr_is_original, range(4)))
+        written = []
+        with ParallelChunkWriter(2, on_result=written.append) as writer:
+            for _ in range(4):
+                writer.submit(_uses_original_streams)
+    finally:
+        sys.stdout, sys.stderr = saved
+    assert parsed == [True] * 4 and written == [True] * 4
+
+
+if __name__ == '__main__':
+    test_daemon_runs_and_cancels_jobs()
+    test_pool_children_restore_streams()
@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""
+测试行切片引擎的脚本
+"""
+
+import contextlib
+import io
+import os
+import re
+import tempfile
+import zipfile
+from unittest import mock
+from openpyxl import Workbook, load_workbook
+from openpyxl.formatting.rule import CellIsRule
+from openpyxl.styles import Font, PatternFill
+from openpyxl.worksheet.datavalidation import DataValidation
+from split_excel_format import split_excel_file
+from xlsx_row_slicer import XlsxRowSlicer, XlsxSliceUnsupported, _SharedStringSubset
+
+
+def _build_sample(path, with_formula=False):
+    """生成带样式、合并单元格和列宽的样例文件"""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = '明细'
+    ws.append(['编号', '名称', '金额'])
+    for cell in ws[1]:
+        cell.font = Font(bold=True)
+    ws.column_dimensions['B'].width = 28
+    for i in range(25):
+        ws.append([i, f'名称{i}', f'=A{i + 2}*2' if with_formula else i * 1.5])
+        ws.cell(row=i + 2, column=1).fill = PatternFill('solid', fgColor='FFFF00')
+        ws.cell(row=i + 2, column=3).number_format = '0.00'
+    ws.merge_cells('A3:B3')
+    ws.merge_cells('A11:A12')
+    wb.save(path)
+
+
+def _dump(path):
+    ws = load_workbook(path).active
+    return [[(cell.value, cell.font.b, cell.fill.fgColor.rgb, cell.number_format) for cell in row]
+            for row in ws.iter_rows()]
+
+
+def test_slicer_matches_openpyxl_path():
+    """测试行切片输出的值和样式与openpyxl逐单元格复制一致，并保留列宽和工作表名"""
+    with tempfile.TemporaryDirectory() as tmp:
+        input_file = os.path.join(tmp, 'sample.xlsx')
+        _build_sample(input_file)
+        split_excel_file(input_file, os.path.join(tmp, 'xml'), 10, True, engine='xml')
+        split_excel_file(input_file, os.path.join(tmp, 'cell'), 10, True, engine='openpyxl')
+
+        names = sorted(os.listdir(os.path.join(tmp, 'cell')))
+        assert names == sorted(os.listdir(os.path.join(tmp, 'xml')))
+        for name in names:
+            xml_rows = _dump(os.path.join(tmp, 'xml', name))
+            cell_rows = _dump(os.path.join(tmp, 'cell', name))
+            assert [row[0] for row in xml_rows] == [row[0] for row in cell_rows], name
+            assert [row[2] for row in xml_rows] == [row[2] for row in cell_rows], name
+
+        ws = load_workbook(os.path.join(tmp, 'xml', names[0])).active
+        assert ws.title == '明细'
+        assert ws.column_dimensions['B'].width == 28
+        # 跨越分块边界的合并单元格（A11:A12）被丢弃，完整落在分块内的被平移
+        assert [str(r) for r in ws.merged_cells.ranges] == ['A3:B3']
+        print(f"行切片输出一致: {len(names)}个文件")
+
+
+def test_formula_sheet_falls_back():
+    """测试包含公式的工作表自动回退到openpyxl路径"""
+    with tempfile.TemporaryDirectory() as tmp:
+        input_file = os.path.join(tmp, 'formula.xlsx')
+        _build_sample(input_file, with_formula=True)
+        output_dir = os.path.join(tmp, 'out')
+        split_excel_file(input_file, output_dir, 10, True)
+        ws = load_workbook(os.path.join(output_dir, 'formulaSplit1.xlsx')).active
+        assert ws['C2'].value == '=A2*2'
+
+
+def test_parallel_split_matches_serial():
+    """测试多进程拆分的输出文件名和内容与单进程一致"""
+    with tempfile.TemporaryDirectory() as tmp:
+        input_file = os.path.join(tmp, 'sample.xlsx')
+        _build_sample(input_file)
+        for engine in ('xml', 'openpyxl'):
+            serial_dir = os.path.join(tmp, f'{engine}_serial')
+            parallel_dir = os.path.join(tmp, f'{engine}_parallel')
+            split_excel_file(input_file, serial_dir, 4, True, engine=engine)
+            split_excel_file(input_file, parallel_dir, 4, True, engine=engine, workers=3)
+
+            names = sorted(os.listdir(serial_dir))
+            assert names == sorted(os.listdir(parallel_dir))
+            for name in names:
+                assert _dump(os.path.join(serial_dir, name)) == _dump(os.path.join(parallel_dir, name)), name
+            print(f"{engine}: 并行输出一致 ({len(names)}个文件)")
+
+
+def _build_shared_strings_sample(path):
+    """生成使用共享字符串表的样例文件：带命名空间前缀、富文本、注音和空字符串"""
+    ns = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+    strings = ['<x:si><x:t>编号</x:t></x:si>', '<x:si><x:t>类别</x:t></x:si>',
+               '<x:si><x:r><x:rPr><x:b/></x:rPr><x:t>甲</x:t></x:r><x:r><x:t xml:space="preserve"> 类</x:t></x:r></x:si>',
+               '<x:si><x:t>乙类</x:t><x:rPh sb="0" eb="1"><x:t>おつ</x:t></x:rPh></x:si>',
+               '<x:si/>']
+    strings += [f'<x:si><x:t>说明{i}&amp;</x:t></x:si>' for i in range(30)]
+    rows = ['<x:row r="1"><x:c r="A1" t="s"><x:v>0</x:v></x:c><x:c r="B1" t="s"><x:v>1</x:v></x:c></x:row>']
+    for i in range(30):
+        category = 2 + i % 3
+        rows.append(f'<x:row r="{i + 2}"><x:c r="A{i + 2}" t="s"><x:v>{5 + i}</x:v></x:c>'
+                    f'<x:c r="B{i + 2}" t="s"><x:v>{category}</x:v></x:c></x:row>')
+    rels = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.writestr('[Content_Types].xml', (
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/worksheets/sheet1.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            '<Override PartName="/xl/sharedStrings.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+            '</Types>'))
+        archive.writestr('_rels/.rels', (
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f'<Relationship Id="rId1" Type="{rels}/officeDocument" Target="xl/workbook.xml"/></Relationships>'))
+        archive.writestr('xl/workbook.xml', (
+            f'<x:workbook xmlns:x="{ns}" xmlns:r="{rels}"><x:sheets>'
+            '<x:sheet name="数据" sheetId="1" r:id="rId1"/></x:sheets></x:workbook>'))
+        archive.writestr('xl/_rels/workbook.xml.rels', (
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f'<Relationship Id="rId1" Type="{rels}/worksheet" Target="worksheets/sheet1.xml"/>'
+            f'<Relationship Id="rId2" Type="{rels}/sharedStrings" Target="sharedStrings.xml"/></Relationships>'))
+        archive.writestr('xl/worksheets/sheet1.xml',
+                         f'<x:worksheet xmlns:x="{ns}"><x:sheetData>{"".join(rows)}</x:sheetData></x:worksheet>')
+        archive.writestr('xl/sharedStrings.xml',
+                         f'<x:sst xmlns:x="{ns}" count="62" uniqueCount="{len(strings)}">\n'
+                         + '\n'.join(strings) + '</x:sst>')
+
+
+def test_shared_strings_subset():
+    """测试每个输出只包含其用到的共享字符串，索引重新编号后值不变（含富文本、注音和命名空间前缀）"""
+    with tempfile.TemporaryDirectory() as tmp:
+        input_file = os.path.join(tmp, 'shared.xlsx')
+        _build_shared_strings_sample(input_file)
+        with XlsxRowSlicer(input_file) as slicer:
+            assert len(slicer.shared_strings()) == 35
+            assert slicer.shared_strings()[2] == '甲 类' and slicer.shared_strings()[3] == '乙类'
+            outputs = slicer.split(os.path.join(tmp, 'split'), 'shared', 10, True, log=lambda message: None)
+        assert [rows for _, rows in outputs] == [10, 10, 10]
+        for n, (output_file, _) in enumerate(outputs):
+            values = [[cell.value for cell in row] for row in load_workbook(output_file).active.iter_rows()]
+            assert values[0] == ['编号', '类别']
+            assert [row[0] for row in values[1:]] == [f'说明{i}&' for i in range(n * 10, n * 10 + 10)]
+            assert [row[1] for row in values[1:]] == [['甲 类', '乙类', ''][i % 3] for i in range(n * 10, n * 10 + 10)]
+            with zipfile.ZipFile(output_file) as archive:
+                shared = archive.read('xl/sharedStrings.xml')
+            # 表头2个、本分块10个说明和3个类别中用到的字符串
+            assert len(re.findall(rb'<x:si[ >/]', shared)) == 2 + 10 + 3 and b'uniqueCount="15"' in shared
+            assert b'<x:rPh' in shared and '说明{}&amp;'.format(n * 10).encode() in shared
+        print(f"共享字符串按输出子集化: {[os.path.getsize(path) for path, _ in outputs]}")
+
+        with XlsxRowSlicer(input_file) as slicer:
+            outputs, _ = slicer.partition(os.path.join(tmp, 'part'), 'shared', '类别', True)
+        for output_file, rows in outputs:
+            values = [[cell.value for cell in row] for row in load_workbook(output_file).active.iter_rows()]
+            assert len({row[1] for row in values[1:]}) == 1 and len(values) == rows + 1
+        assert sorted(os.path.basename(path) for path, _ in outputs) == \
+            ['shared_乙类.xlsx', 'shared_甲 类.xlsx', 'shared_空值.xlsx']
+
+
+def test_inline_string_text_untouched():
+    """测试只改写<c>标签中的行号，内联字符串中形如 r="A5" 的文本保持原样"""
+    with tempfile.TemporaryDirectory() as tmp:
+        input_file = os.path.join(tmp, 'inline.xlsx')
+        wb = Workbook()
+        ws = wb.active
+        ws.append(['编号', '说明'])
+        for i in range(12):
+            ws.append([i, f' r="A{i + 5}" 与<c r="B9">'])
+        wb.save(input_file)
+        with XlsxRowSlicer(input_file) as slicer:
+            outputs = slicer.split(os.path.join(tmp, 'out'), 'inline', 5, True, log=lambda message: None)
+        for n, (output_file, _) in enumerate(outputs):
+            ws = load_workbook(output_file).active
+            values = [[cell.value for cell in row] for row in ws.iter_rows(min_row=2)]
+            assert values == [[i, f' r="A{i + 5}" 与<c r="B9">'] for i in range(n * 5, min(n * 5 + 5, 12))]
+            assert [cell.coordinate for cell in ws['B']][1:] == [f'B{r}' for r in range(2, len(values) + 2)]
+        print(f"内联字符串未被改写: {len(outputs)}个文件")
+
+
+def test_sheet_tail_elements():
+    """测试sheetData之后的页面设置等元素原样复制，依赖单元格区域的元素（条件格式、数据验证等）回退到openpyxl路径"""
+    with tempfile.TemporaryDirectory() as tmp:
+        input_file = os.path.join(tmp, 'tail.xlsx')
+        _build_sample(input_file)
+        wb = load_workbook(input_file)
+        ws = wb.active
+        ws.page_setup.orientation = 'landscape'
+        ws.print_options.gridLines = True
+        ws.oddHeader.center.text = '明细表'
+        wb.save(input_file)
+        with XlsxRowSlicer(input_file) as slicer:
+            outputs = slicer.split(os.path.join(tmp, 'xml'), 'tail', 10, True, log=lambda message: None)
+        ws = load_workbook(outputs[0][0]).active
+        assert ws.page_setup.orientation == 'landscape' and ws.print_options.gridLines
+        assert ws.oddHeader.center.text == '明细表' and [str(r) for r in ws.merged_cells.ranges] == ['A3:B3']
+
+        red = PatternFill('solid', fgColor='FF0000')
+        for name, add in (
+                ('conditional', lambda ws: ws.conditional_formatting.add(
+                    'C2:C26', CellIsRule(operator='greaterThan', formula=['10'], fill=red))),
+                ('validation', lambda ws: ws.add_data_validation(DataValidation(type='whole', sqref='A2:A26'))),
+                ('hyperlink', lambda ws: setattr(ws['B5'], 'hyperlink', 'https://example.com')),
+                ('filter', lambda ws: setattr(ws.auto_filter, 'ref', 'A1:C26'))):
+            path = os.path.join(tmp, f'{name}.xlsx')
+            wb = load_workbook(input_file)
+            add(wb.active)
+            wb.save(path)
+            with XlsxRowSlicer(path) as slicer:
+                try:
+                    slicer.prescan()
+                    raise AssertionError(f"应拒绝切分: {name}")
+                except XlsxSliceUnsupported as e:
+                    print(f"{name}: {e}")
+            # 自动选择引擎时回退到openpyxl逐单元格复制，输出的值不变
+            output_dir = os.path.join(tmp, name)
+            split_excel_file(path, output_dir, 10, True)
+            assert [row[0][0] for row in _dump(os.path.join(output_dir, f'{name}Split3.xlsx'))] == \
+                ['编号'] + list(range(20, 25))
+
+
+def test_fallback_discards_partial_outputs():
+    """测试行切片中途遇到无法切分的内容时删除未写完和已写完的输出，回退到openpyxl路径从头拆分"""
+    with tempfile.TemporaryDirectory() as tmp:
+        input_file = os.path.join(tmp, 'shared.xlsx')
+        _build_shared_strings_sample(input_file)
+        remap = _SharedStringSubset.remap
+
+        def failing_remap(self, segment):
+            if b'r="25"' in segment:
+                raise XlsxSliceUnsupported("模拟无法切分的单元格")
+            return remap(self, segment)
+
+        output_dir = os.path.join(tmp, 'out')
+        with mock.patch.object(_SharedStringSubset, 'remap', failing_remap):
+            with XlsxRowSlicer(input_file) as slicer:
+                try:
+                    slicer.split(output_dir, 'shared', 10, True, log=lambda message: None)
+                    raise AssertionError("应在第25行失败")
+                except XlsxSliceUnsupported:
+                    pass
+            # 未写完的第3个分块不留下临时文件
+            assert sorted(os.listdir(output_dir)) == ['sharedSplit1.xlsx', 'sharedSplit2.xlsx']
+
+            with contextlib.redirect_stdout(io.StringIO()) as output:
+                split_excel_file(input_file, output_dir, 10, True, resume=True)
+        assert '删除行切片引擎已写出的2个文件' in output.getvalue()
+        assert sorted(os.listdir(output_dir)) == ['sharedSplit1.xlsx', 'sharedSplit2.xlsx', 'sharedSplit3.xlsx']
+        values = [row[0] for name in sorted(os.listdir(output_dir))
+                  for row in load_workbook(os.path.join(output_dir, name)).active.iter_rows(min_row=2, values_only=True)]
+        assert values == [f'说明{i}&' for i in range(30)]
+
+
+if __name__ == '__main__':
+    test_slicer_matches_openpyxl_path()
+    test_formula_sheet_falls_back()
+    test_parallel_split_matches_serial()
+    test_shared_strings_subset()
+    test_inline_string_text_untouched()
+    test_sheet_tail_elements()
+    test_fallback_discards_partial_outputs()
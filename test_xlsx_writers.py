@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+测试.xlsx写入后端（--xlsx-writer）的脚本
+"""
+
+import contextlib
+import datetime
+import io
+import os
+import tempfile
+from unittest import mock
+from openpyxl import Workbook, load_workbook
+import merge_excel
+import merge_excel_format
+import split_excel
+import split_excel_format
+from utils import (RawXmlExcelWriter, StreamingExcelReader, StreamingExcelWriter, XlsxBackendRegistry,
+                   XlsxWriterExcelWriter, xlsx_backends)
+from xlsx_row_slicer import XlsxRowSlicer
+
+
+def _values(path):
+    wb = load_workbook(path)
+    try:
+        return [[cell.value for cell in row] for row in wb.active.iter_rows()]
+    finally:
+        wb.close()
+
+
+def test_xlsx_writers():
+    """测试各后端写出相同的单元格值和格式、按能力选择后端，以及四个脚本使用指定后端写出"""
+    print("=" * 60)
+    print("测试.xlsx写入后端")
+    print("=" * 60)
+
+    rows = [['  文本<&>', 1, 2.5, True, datetime.datetime(2024, 1, 2, 3, 4, 5), datetime.date(2024, 5, 6)],
+            ['=A1', None, -3, False, datetime.time(12, 30), 12345678901234]]
+    backends = [backend for backend in XlsxBackendRegistry.BACKENDS if backend.available()]
+    print(f"可用后端: {[backend.NAME for backend in backends]}")
+    for line in xlsx_backends.describe():
+        print(f"  {line}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in backends:
+            path = os.path.join(tmp, f'{backend.NAME}.xlsx')
+            writer = backend(path, sheet_title='数据', column_widths={'A': 20})
+            writer.write_header(['名称', '数量', '金额', '标记', '时间', '日期'], styled=True)
+            for row in rows:
+                writer.append(row)
+            writer.save()
+            assert writer.rows_written == 3 and writer.header_rows == 1
+
+            wb = load_workbook(path)
+            ws = wb.active
+            assert ws.title == '数据' and ws.column_dimensions['A'].width >= 20
+            assert ws['A1'].font.b and ws['A1'].border.left.style == 'thin' and ws['A1'].alignment.horizontal == 'center'
+            assert not ws['A2'].font.b
+            assert ws['E2'].number_format == 'YYYY-MM-DD HH:MM:SS' and ws['F2'].number_format == 'YYYY-MM-DD'
+            wb.close()
+            values = _values(path)
+            print(f"{backend.NAME}: {values[1]}")
+            assert values[1] == ['  文本<&>', 1, 2.5, True, datetime.datetime(2024, 1, 2, 3, 4, 5),
+                                 datetime.datetime(2024, 5, 6)]
+            assert values[2] == ['=A1', None, -3, False, datetime.time(12, 30), 12345678901234]
+            # 各后端都按openpyxl的规则把以=开头的文本写为公式（没有缓存值，按值读取时为空）
+            assert list(StreamingExcelReader.iter_xlsx_rows(path))[2][0] is None
+
+        # 原始XML后端转义非法控制字符，输出可被行切片引擎切分
+        path = os.path.join(tmp, 'slice.xlsx')
+        writer = RawXmlExcelWriter(path)
+        writer.write_header(['编号', '说明'])
+        for i in range(25):
+            writer.append([i, f'行\x01{i}'])
+        writer.save()
+        assert _values(path)[1] == [0, '行_x0001_0']
+        outputs = XlsxRowSlicer(path).split(os.path.join(tmp, 'sliced'), 'slice', 10, True, log=lambda message: None)
+        assert [rows for _, rows in outputs] == [10, 10, 5]
+
+        # 按能力选择：默认选择最快的后端；指定的后端不具备所需能力时改为自动选择
+        assert xlsx_backends.choose(('header_style',)) is RawXmlExcelWriter
+        assert xlsx_backends.choose(('formulas',)) is RawXmlExcelWriter
+        with mock.patch.dict(os.environ, {XlsxBackendRegistry.ENV_VAR: 'openpyxl'}):
+            assert xlsx_backends.choose() is StreamingExcelWriter
+            assert xlsx_backends.choose(('formulas',)) is StreamingExcelWriter
+        with mock.patch.dict(os.environ, {XlsxBackendRegistry.ENV_VAR: 'rawxml'}), \
+                mock.patch.dict(RawXmlExcelWriter.CAPABILITIES, {'formulas': False}), \
+                mock.patch.dict(XlsxWriterExcelWriter.CAPABILITIES, {'formulas': False}):
+            with contextlib.redirect_stdout(io.StringIO()) as output:
+                assert xlsx_backends.choose(('formulas',)) is StreamingExcelWriter
+            print(output.getvalue().strip())
+            assert '改为自动选择' in output.getvalue()
+        if not XlsxWriterExcelWriter.available():
+            with mock.patch.dict(os.environ, {XlsxBackendRegistry.ENV_VAR: 'xlsxwriter'}):
+                with contextlib.redirect_stdout(io.StringIO()) as output:
+                    assert xlsx_backends.choose() is RawXmlExcelWriter
+                assert '未安装' in output.getvalue()
+
+        # 四个脚本使用指定的后端写出（并行写出的子进程沿用主进程的设置）
+        input_file = os.path.join(tmp, 'input.xlsx')
+        wb = Workbook()
+        wb.active.append(['编号', '名称', '日期'])
+        for i in range(25):
+            wb.active.append([f'A{i}', f'名称{i}', datetime.datetime(2024, 1, 1 + i)])
+        wb.save(input_file)
+        with mock.patch.dict(os.environ):
+            for backend in backends:
+                for name, main in (('split_excel', split_excel.main), ('split_excel_format', split_excel_format.main)):
+                    output_dir = os.path.join(tmp, f'{name}_{backend.NAME}')
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        main(['--input', input_file, '--output', output_dir, '--rows', '10', '--copy_headers=true',
+                              '--no-cache', '--workers', '2', '--xlsx-writer', backend.NAME])
+                    values = _values(os.path.join(output_dir, 'inputSplit3.xlsx'))
+                    assert values[0] == ['编号', '名称', '日期'] and len(values) == 6
+                    assert values[1] == ['A20', '名称20', datetime.datetime(2024, 1, 21)]
+
+                merge_input = os.path.join(tmp, f'split_excel_{backend.NAME}')
+                for name, main, extra in (('merge_excel', merge_excel.main, []),
+                                          ('merge_excel 流式', merge_excel.main, ['--streaming=true']),
+                                          ('merge_excel_format', merge_excel_format.main, [])):
+                    output_file = os.path.join(tmp, f'{name}_{backend.NAME}.xlsx')
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        main(['--input_dir', merge_input, '--output_file', output_file, '--no-cache',
+                              '--remove_duplicate_headers', 'true', '--xlsx-writer', backend.NAME] + extra)
+                    values = _values(output_file)
+                    assert values[0] == ['编号', '名称', '日期'] and len(values) == 26
+                    assert sorted(row[0] for row in values[1:]) == sorted(f'A{i}' for i in range(25))
+                print(f"{backend.NAME}: 四个脚本输出一致")
+
+    print("\n.xlsx写入后端测试通过")
+
+
+if __name__ == '__main__':
+    test_xlsx_writers()
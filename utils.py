@@ -2,13 +2,40 @@
 """
 公共工具函数模块
 提供文件处理、错误处理、进度报告等通用功能
+
+pandas、numpy、openpyxl、xlrd和lxml都在实际需要时才在函数内导入，
+使只走行切片或流式路径的脚本启动时不必加载这些依赖（见bench_startup.py）。
 """
 
+from __future__ import annotations
+
+import codecs
+import contextlib
+import functools
+import html
+import io
+import itertools
+import json
 import os
+import posixpath
+import re
 import sys
-import pandas as pd
+import threading
+import time
+import zipfile
 import warnings
-from typing import List, Optional, Tuple
+from abc import ABC, abstractmethod
+from collections import Counter, deque
+from datetime import date, datetime
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
 
 # 设置输出编码为UTF-8
 sys.stdout.reconfigure(encoding='utf-8')
@@ -47,6 +74,439 @@ class FileValidator:
         """验证每个文件的行数参数"""
         if rows_per_file <= 0:
             raise ValueError(f"每个文件的行数必须大于0，当前值: {rows_per_file}")
+    
+    @staticmethod
+    def validate_workers(workers: int) -> None:
+        """验证并行进程数参数"""
+        if workers <= 0:
+            raise ValueError(f"并行进程数必须大于0，当前值: {workers}")
+    
+    @staticmethod
+    def validate_max_open_files(max_open: int) -> None:
+        """验证分区拆分同时打开的输出文件数参数"""
+        if max_open <= 0:
+            raise ValueError(f"同时打开的输出文件数必须大于0，当前值: {max_open}")
+    
+    @staticmethod
+    def validate_max_bytes(max_bytes: Optional[int]) -> None:
+        """验证输出文件大小上限参数（None表示按行数拆分）"""
+        if max_bytes is not None and max_bytes < ByteBudget.MIN_BYTES:
+            raise ValueError(f"输出文件大小上限不能小于{ByteBudget.MIN_BYTES}字节，当前值: {max_bytes}")
+    
+    @staticmethod
+    def validate_output_format(output_format: str) -> None:
+        """验证输出格式参数，Parquet输出在开始处理前检查pyarrow是否可用"""
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"不支持的输出格式: {output_format}，可选: {', '.join(OUTPUT_FORMATS)}")
+        if output_format == 'parquet':
+            import importlib.util
+            if importlib.util.find_spec('pyarrow') is None:
+                raise ValueError("Parquet输出需要安装pyarrow（pip install pyarrow）")
+    
+    @staticmethod
+    def validate_merge_output_format(output_format: str, remove_duplicate_headers: bool) -> None:
+        """验证合并输出格式：Parquet各列类型固定，不能把其他文件的表头作为数据行保留"""
+        FileValidator.validate_output_format(output_format)
+        if output_format == 'parquet' and not remove_duplicate_headers:
+            raise ValueError("Parquet输出不能保留重复表头，请开启表头去重（--remove_duplicate_headers=true）")
+
+
+class FormatProbe:
+    """文件格式探测结果
+
+    只读取文件开头的有限字节判断实际容器类型（与扩展名无关）、HTML编码与BOM、
+    工作表数量和大致行数，并据此确定唯一的解析器。同一文件的探测结果会被缓存，
+    拆分、合并和读取流程共用一次探测，不再逐个引擎试错。
+    """
+
+    PREFIX_SIZE = 64 * 1024
+
+    _BOMS = (
+        (codecs.BOM_UTF8, 'utf-8'),
+        (codecs.BOM_UTF16_LE, 'utf-16'),
+        (codecs.BOM_UTF16_BE, 'utf-16'),
+    )
+    _CHARSET = re.compile(rb'charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+    _TABLE_ROW = re.compile(r'<tr[\s>]', re.IGNORECASE)
+    _OFFICE_DOCUMENT = re.compile(rb'Type="[^"]*/officeDocument"[^>]*?Target="([^"]+)"|'
+                                  rb'Target="([^"]+)"[^>]*?Type="[^"]*/officeDocument"')
+    _SHEET = re.compile(rb'<(?:[\w.-]+:)?sheet\b[^>]*?\s(?:[\w.-]+:)?id="([^"]+)"')
+    _SHEET_NAME = re.compile(rb'<(?:[\w.-]+:)?sheet\b[^>]*?\sname="([^"]*)"')
+    _RELATIONSHIP = re.compile(rb'<(?:[\w.-]+:)?Relationship\b[^>]*?/?>')
+    _DIMENSION_REF = re.compile(rb'<(?:[\w.-]+:)?dimension\b[^>]*?\sref="[A-Z]*\d*:?[A-Z]*(\d+)"')
+
+    _probes: Dict[Tuple[str, int, int], 'FormatProbe'] = {}
+
+    def __init__(self, file_path: str, container: str, encoding: Optional[str] = None, bom: bool = False,
+                 sheet_count: Optional[int] = None, approx_rows: Optional[int] = None):
+        self.file_path = file_path
+        self.container = container  # 'xlsx'（Zip/OOXML）、'xls'（OLE2）、'html' 或 'unknown'
+        self.encoding = encoding
+        self.bom = bom
+        self.sheet_count = sheet_count
+        self.approx_rows = approx_rows
+        self._sheet_names: Optional[List[str]] = None
+
+    def __repr__(self):
+        return (f"FormatProbe(container={self.container!r}, encoding={self.encoding!r}, bom={self.bom}, "
+                f"sheet_count={self.sheet_count}, approx_rows={self.approx_rows})")
+
+    @property
+    def parser(self) -> str:
+        """选择唯一的解析器：'openpyxl'、'xlrd' 或 'html'"""
+        if self.container == 'xlsx':
+            return 'openpyxl'
+        if self.container == 'xls':
+            return 'xlrd'
+        if self.container == 'html':
+            return 'html'
+        # 无法识别容器时按扩展名选择
+        return 'openpyxl' if self.file_path.lower().endswith('.xlsx') else 'xlrd'
+
+    @classmethod
+    def for_file(cls, file_path: str) -> 'FormatProbe':
+        """返回文件的探测结果，文件未变化时复用之前的结果"""
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return cls(file_path, 'unknown')
+        key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+        probe = cls._probes.get(key)
+        if probe is None:
+            with profiler.phase('probe'):
+                probe = cls._probe(file_path, stat.st_size)
+            cls._probes[key] = probe
+        return probe
+
+    def sheet_names(self) -> List[str]:
+        """列出工作表名称，只读取目录信息，不解析工作表数据
+
+        .xlsx读取工作簿部件，OLE2 .xls按需加载（只读取工作簿目录），
+        HTML文件中的顶层表格依次命名为Table1、Table2……
+        """
+        if self._sheet_names is None:
+            with profiler.phase('probe'):
+                self._sheet_names = self._list_sheet_names()
+        return self._sheet_names
+
+    def _list_sheet_names(self) -> List[str]:
+        if self.container == 'html':
+            count = StreamingExcelReader.count_html_tables(self.file_path, self.encoding)
+            return [f'{StreamingExcelReader.HTML_TABLE_PREFIX}{i}' for i in range(1, count + 1)]
+        if self.parser == 'xlrd':
+            import xlrd
+            book = xlrd.open_workbook(self.file_path, on_demand=True)
+            try:
+                return book.sheet_names()
+            finally:
+                book.release_resources()
+        with zipfile.ZipFile(self.file_path) as archive:
+            workbook = archive.read(self._workbook_path(archive))
+        return [html.unescape(name.decode('utf-8')) for name in self._SHEET_NAME.findall(workbook)]
+
+    def select_sheets(self, sheets: Optional[str]) -> List[Optional[str]]:
+        """按--sheets参数选择工作表
+
+        None表示只处理默认工作表（返回[None]，读取方式与之前一致），all表示全部工作表，其余为逗号分隔的工作表名。
+        """
+        if sheets is None:
+            return [None]
+        return self._pick_sheets(sheets, self.sheet_names(), "工作表不存在")
+
+    @classmethod
+    def select_merge_sheets(cls, file_paths: List[str], sheets: str) -> List[str]:
+        """合并时按--sheets选择工作表名：all为所有输入文件中出现过的工作表（按首次出现的顺序），
+        其余为逗号分隔的工作表名，每个都必须至少存在于一个输入文件中"""
+        available = []
+        for file_path in file_paths:
+            for name in cls.for_file(file_path).sheet_names():
+                if name not in available:
+                    available.append(name)
+        return cls._pick_sheets(sheets, available, "所有输入文件中都没有工作表")
+
+    @staticmethod
+    def _pick_sheets(sheets: str, available: List[str], missing: str) -> List[str]:
+        if sheets.strip().lower() == 'all':
+            if not available:
+                raise ValueError("没有可处理的工作表")
+            return list(available)
+        selected = []
+        for name in sheets.split(','):
+            name = name.strip()
+            if not name or name in selected:
+                continue
+            if name not in available:
+                raise ValueError(f"{missing}: {name}（可选: {', '.join(available)}）")
+            selected.append(name)
+        if not selected:
+            raise ValueError("未指定要处理的工作表")
+        return selected
+
+    @classmethod
+    def estimate_data_rows(cls, file_paths: Iterable[str]) -> Optional[int]:
+        """估算多个文件的数据行数之和（不含表头），任一文件无法估算时返回None"""
+        total = 0
+        for file_path in file_paths:
+            approx_rows = cls.for_file(file_path).approx_rows
+            if approx_rows is None:
+                return None
+            total += max(0, approx_rows - 1)
+        return total
+
+    @classmethod
+    def _probe(cls, file_path: str, file_size: int) -> 'FormatProbe':
+        try:
+            with open(file_path, 'rb') as f:
+                prefix = f.read(cls.PREFIX_SIZE)
+        except OSError:
+            return cls(file_path, 'unknown')
+
+        if prefix.startswith(b'PK'):
+            sheet_count, approx_rows = cls._probe_xlsx(file_path)
+            return cls(file_path, 'xlsx', sheet_count=sheet_count, approx_rows=approx_rows)
+        if prefix.startswith(b'\xD0\xCF\x11\xE0'):
+            # OLE2复合文档需完整解析目录才能得到工作表信息，这里只确定容器类型
+            return cls(file_path, 'xls')
+
+        bom = False
+        encoding = None
+        body = prefix
+        for marker, name in cls._BOMS:
+            if prefix.startswith(marker):
+                bom, encoding, body = True, name, prefix[len(marker):]
+                break
+        if encoding is None:
+            match = cls._CHARSET.search(prefix)
+            encoding = 'utf-8'
+            if match:
+                try:
+                    encoding = codecs.lookup(match.group(1).decode('ascii')).name
+                except (LookupError, UnicodeDecodeError):
+                    pass
+
+        text = body.decode(encoding if bom else 'latin-1', errors='ignore')
+        head = text.lstrip()[:1024].lower()
+        if head.startswith('<') and ('<html' in head or '<table' in head):
+            rows = len(cls._TABLE_ROW.findall(text))
+            if len(prefix) < file_size and len(prefix) > 0:
+                rows = int(rows * file_size / len(prefix))
+            # 读取时只使用第一个表格
+            return cls(file_path, 'html', encoding=encoding, bom=bom, sheet_count=1, approx_rows=rows)
+        return cls(file_path, 'unknown')
+
+    @classmethod
+    def _workbook_path(cls, archive: zipfile.ZipFile) -> str:
+        """从包关系中找到工作簿部件的路径"""
+        match = cls._OFFICE_DOCUMENT.search(archive.read('_rels/.rels'))
+        if match:
+            return (match.group(1) or match.group(2)).decode('utf-8').lstrip('/')
+        return 'xl/workbook.xml'
+
+    @classmethod
+    def _probe_xlsx(cls, file_path: str) -> Tuple[Optional[int], Optional[int]]:
+        """读取工作簿部件得到工作表数量，并从第一个工作表（与pandas默认一致）的dimension得到行数"""
+        try:
+            with zipfile.ZipFile(file_path) as archive:
+                workbook_path = cls._workbook_path(archive)
+                sheet_ids = cls._SHEET.findall(archive.read(workbook_path))
+                if not sheet_ids:
+                    return 0, None
+
+                workbook_dir = posixpath.dirname(workbook_path)
+                rels_path = posixpath.join(workbook_dir, '_rels', posixpath.basename(workbook_path) + '.rels')
+                sheet_path = None
+                for rel in cls._RELATIONSHIP.findall(archive.read(rels_path)):
+                    if f'Id="{sheet_ids[0].decode("utf-8")}"'.encode('utf-8') in rel:
+                        target = re.search(rb'Target="([^"]+)"', rel).group(1).decode('utf-8')
+                        sheet_path = (target.lstrip('/') if target.startswith('/')
+                                      else posixpath.normpath(posixpath.join(workbook_dir, target)))
+                        break
+                approx_rows = None
+                if sheet_path:
+                    with archive.open(sheet_path) as sheet:
+                        dimension = cls._DIMENSION_REF.search(sheet.read(cls.PREFIX_SIZE))
+                    if dimension:
+                        approx_rows = int(dimension.group(1))
+                return len(sheet_ids), approx_rows
+        except (KeyError, OSError, zipfile.BadZipFile, AttributeError):
+            return None, None
+
+
+class DtypeCompactor:
+    """DataFrame数据类型压缩工具类
+
+    按内存目标对读取结果做一次性压缩：
+    - 整数列降为能容纳其取值的最小整数类型
+    - 浮点列在所有取值都能无损表示时降为float32
+    - 只含数字的object列转换为数值列
+    - 重复度高的文本列（如箱号、单位、状态）转换为分类类型
+    写出到Excel的单元格值与压缩前完全一致。
+    """
+
+    TARGETS = ('off', 'balanced', 'aggressive')
+    DEFAULT_TARGET = 'balanced'
+    # 内存目标 -> (触发压缩的最小行数, 转为分类类型时唯一值占比上限)
+    _SETTINGS = {
+        'balanced': (10000, 0.5),
+        'aggressive': (0, 0.9),
+    }
+    _NUMERIC_OBJECT_TYPES = ('integer', 'floating', 'mixed-integer-float')
+
+    @staticmethod
+    def compact(df: pd.DataFrame, target: str = DEFAULT_TARGET) -> pd.DataFrame:
+        """按内存目标压缩数据类型，并打印压缩前后的内存使用"""
+        if target not in DtypeCompactor._SETTINGS:
+            return df
+        min_rows, category_ratio = DtypeCompactor._SETTINGS[target]
+        if df.empty or len(df) < min_rows:
+            return df
+
+        print(f"检测到大文件({len(df)}行)，正在优化内存使用...")
+        before = MemoryManager.get_memory_usage_info(df)
+        counts = {'integer': 0, 'float': 0, 'category': 0}
+        columns = {}
+        for i in range(df.shape[1]):
+            col = df.iloc[:, i]
+            compacted, kind = DtypeCompactor._compact_column(col, category_ratio)
+            if kind:
+                columns[i] = compacted
+                counts[kind] += 1
+        if columns:
+            df = df.copy(deep=False)
+            for i, col in columns.items():
+                df.isetitem(i, col)
+        after = MemoryManager.get_memory_usage_info(df)
+        print(f"[内存] 压缩前 {before}，压缩后 {after}"
+              f"（整数列 {counts['integer']}，浮点列 {counts['float']}，分类列 {counts['category']}）")
+        return df
+
+    @staticmethod
+    def _compact_column(col: pd.Series, category_ratio: float) -> Tuple[pd.Series, Optional[str]]:
+        """返回(压缩后的列, 压缩类别)，无法压缩时类别为None"""
+        import pandas as pd
+        dtype = original_dtype = col.dtype
+        if dtype == object:
+            inferred = pd.api.types.infer_dtype(col, skipna=True)
+            if inferred in DtypeCompactor._NUMERIC_OBJECT_TYPES:
+                try:
+                    col = pd.to_numeric(col)
+                except (TypeError, ValueError):
+                    return col, None
+                dtype = col.dtype
+            elif inferred != 'string':
+                return col, None
+
+        if pd.api.types.is_bool_dtype(dtype) or isinstance(dtype, pd.CategoricalDtype):
+            return col, None
+        if pd.api.types.is_integer_dtype(dtype):
+            compacted = pd.to_numeric(col, downcast='integer')
+            return compacted, 'integer' if compacted.dtype != original_dtype else None
+        if pd.api.types.is_float_dtype(dtype):
+            compacted = DtypeCompactor._downcast_float(col)
+            return compacted, 'float' if compacted.dtype != original_dtype else None
+        if pd.api.types.is_string_dtype(dtype):
+            unique = col.nunique(dropna=True)
+            if 0 < unique <= len(col) * category_ratio:
+                return col.astype('category'), 'category'
+        return col, None
+
+    @staticmethod
+    def _downcast_float(col: pd.Series) -> pd.Series:
+        """所有取值都能被float32精确表示时才降级，避免写出的数值发生变化"""
+        import numpy as np
+        import pandas as pd
+        values = col.to_numpy()
+        if values.dtype != np.float64:
+            return col
+        with np.errstate(over='ignore', invalid='ignore'):
+            narrowed = values.astype(np.float32)
+        if not np.array_equal(narrowed.astype(np.float64), values, equal_nan=True):
+            return col
+        return pd.Series(narrowed, index=col.index, name=col.name)
+
+
+class DataSelection:
+    """列投影与行范围（--columns、--row-range）
+
+    columns为列名或列字母（B:D表示字母区间）的列表，按表头解析为列序号，与列名相同时按列名处理，
+    选中的列按源文件中的顺序输出。行范围为从1开始的数据行序号（不含表头行），两端都包含，可省略任一端。
+    选择下推到各读取器：pandas的usecols/skiprows/nrows、openpyxl的min_col/max_col/min_row/max_row，
+    HTML增量解析读到范围末尾即停止；范围之外的单元格不转换为值。
+    """
+
+    _LETTERS = re.compile(r'([A-Z]{1,3})(?::([A-Z]{1,3}))?')
+
+    def __init__(self, columns: Optional[List[str]] = None, row_range: Optional[Tuple[int, Optional[int]]] = None):
+        self.columns = list(columns) if columns else None
+        first, last = row_range or (1, None)
+        # skip为范围之前的数据行数，stop为范围末尾之后的第一个数据行序号（从0开始），None表示读到末尾
+        self.skip = first - 1
+        self.stop = last
+
+    @classmethod
+    def from_args(cls, args) -> 'DataSelection':
+        """根据add_selection_arguments添加的命令行参数创建选择"""
+        columns = [name.strip() for name in args.columns.split(',') if name.strip()] if args.columns else None
+        return cls(columns, args.row_range)
+
+    @property
+    def active(self) -> bool:
+        return self.columns is not None or self.rows_selected
+
+    @property
+    def rows_selected(self) -> bool:
+        return self.skip > 0 or self.stop is not None
+
+    def without_rows(self) -> 'DataSelection':
+        """只保留列投影的选择"""
+        return DataSelection(self.columns)
+
+    def key(self) -> Optional[str]:
+        """选择的文本表示，用于区分解析缓存和记录到断点/合并清单，未选择时为None"""
+        if not self.active:
+            return None
+        rows = f"{self.skip + 1}:{self.stop if self.stop is not None else ''}"
+        return f"columns={','.join(self.columns or [])};rows={rows}"
+
+    def describe(self) -> str:
+        parts = []
+        if self.columns is not None:
+            parts.append(f"列 {', '.join(self.columns)}")
+        if self.rows_selected:
+            parts.append(f"数据行 {self.skip + 1}-{self.stop if self.stop is not None else '末尾'}")
+        return '，'.join(parts)
+
+    def resolve(self, header: List[Any]) -> Optional[List[int]]:
+        """按表头（已按pandas规则命名）解析选中的列，返回从0开始的列序号（升序），未选择列时为None"""
+        if self.columns is None:
+            return None
+        names = {}
+        for i, name in enumerate(header):
+            names.setdefault(str(name), i)
+        indexes = set()
+        for spec in self.columns:
+            if spec in names:
+                indexes.add(names[spec])
+                continue
+            match = self._LETTERS.fullmatch(spec.upper())
+            if match is None:
+                raise ValueError(f"未找到列: {spec}")
+            first = _column_index(match.group(1))
+            last = _column_index(match.group(2) or match.group(1))
+            if first > last or last > len(header):
+                raise ValueError(f"列 {spec} 超出表头范围（共{len(header)}列）")
+            indexes.update(range(first - 1, last))
+        return sorted(indexes)
+
+    def row_count(self, total: int) -> int:
+        """共total个数据行时范围内的数据行数"""
+        return max(0, min(total, self.stop if self.stop is not None else total) - self.skip)
+
+    def slice_rows(self, df: pd.DataFrame) -> pd.DataFrame:
+        """按行范围截取已读取的DataFrame（用于不支持下推的读取器）"""
+        if not self.rows_selected:
+            return df
+        return df.iloc[self.skip:self.stop].reset_index(drop=True)
 
 
 class ExcelFileProcessor:
@@ -69,112 +529,121 @@ class ExcelFileProcessor:
         return sorted(excel_files)
     
     @staticmethod
-    def read_excel_with_optimization(file_path: str) -> pd.DataFrame:
-        """读取Excel文件并进行内存优化，支持.xls、.xlsx和HTML格式"""
+    def read_excel_with_optimization(file_path: str, probe: Optional[FormatProbe] = None,
+                                     memory_target: str = DtypeCompactor.DEFAULT_TARGET,
+                                     sheet: Optional[str] = None,
+                                     selection: Optional[DataSelection] = None) -> pd.DataFrame:
+        """读取Excel文件并进行内存优化，支持.xls、.xlsx和HTML格式
+
+        根据FormatProbe探测到的实际容器类型只选择一种解析器，
+        解决"扩展名为.xls但实际是其他格式"的兼容问题，且失败时不再用其他引擎重复解析。
+        读取结果按memory_target（见DtypeCompactor.TARGETS）压缩数据类型。
+        sheet为工作表名（HTML文件为Table1、Table2……），None时读取第一个工作表或表格；
+        只解析选中的工作表，OLE2 .xls按需加载，不读取其他工作表。
+        selection（见DataSelection）以usecols/skiprows/nrows传给pandas.read_excel；
+        pandas.read_html不支持这些参数，HTML表格读取后再截取。
+        """
+        import pandas as pd
+
         try:
-            # 基于文件头进行容器嗅探，解决"扩展名为.xls但实际是其他格式"的兼容问题
-            magic = b""
-            try:
-                with open(file_path, 'rb') as f:
-                    magic = f.read(16)  # 读取更多字节以便更好地检测
-            except Exception:
-                magic = b""
-
-            # 根据文件扩展名与嗅探结果选择合适的引擎
-            engine = None
-            if file_path.lower().endswith('.xls'):
-                if magic.startswith(b'PK'):
-                    # 实际是.xlsx（Zip/OOXML）
-                    engine = 'openpyxl'
+            probe = probe or FormatProbe.for_file(file_path)
+            parser = probe.parser
+            is_xls = file_path.lower().endswith('.xls')
+
+            if parser == 'html':
+                # HTML格式的表格文件（常见于某些系统导出的.xls文件）
+                print("检测到 HTML 格式的表格文件，使用 pandas.read_html 读取")
+                with profiler.phase('parse'):
+                    df = ExcelFileProcessor._read_html_table(file_path, probe.encoding,
+                                                             StreamingExcelReader.html_table_index(sheet))
+                    if selection is not None and selection.active:
+                        indexes = selection.resolve([str(col) for col in df.columns])
+                        if indexes is not None:
+                            df = df.iloc[:, indexes]
+                        df = selection.slice_rows(df)
+            else:
+                if probe.container == 'unknown':
+                    print(f"无法明确识别文件容器类型，按扩展名使用 {parser} 引擎")
+                elif parser == 'openpyxl' and is_xls:
                     print("检测到扩展名为 .xls 但实际为 .xlsx (Zip/OOXML) 容器，自动使用 openpyxl 引擎")
-                elif magic.startswith(b'\xD0\xCF\x11\xE0'):
-                    # 经典OLE2二进制.xls
-                    engine = 'xlrd'
+                elif parser == 'xlrd':
                     print("检测到真实二进制 .xls (OLE2)，使用 xlrd 引擎")
-                elif magic.startswith(b'<html') or magic.startswith(b'<HTML') or b'<html' in magic[:50]:
-                    # HTML格式的表格文件（常见于某些系统导出的.xls文件）
-                    print("检测到 HTML 格式的表格文件，使用 pandas.read_html 读取")
-                    try:
-                        # 使用read_html读取HTML表格，header=0将第一行作为表头
-                        tables = pd.read_html(file_path, encoding='utf-8', header=0)
-                        if tables:
-                            df = tables[0]  # 取第一个表格
-                            # 重置索引以避免产生序号列
-                            df = df.reset_index(drop=True)
-                            print(f"HTML表格读取成功: {len(df)}行 x {len(df.columns)}列")
-                            print(f"列名: {list(df.columns)}")
-                            # 只有当列名确实是数字序号时才进行处理
-                            if all(isinstance(col, (int, float)) for col in df.columns):
-                                print("检测到数字列名，可能需要处理序号列")
-                                df = ExcelFileProcessor._remove_sequence_columns(df)
-                            return df
-                        else:
-                            raise ValueError("HTML文件中未找到表格")
-                    except Exception as html_e:
-                        print(f"HTML读取失败，尝试其他方法: {html_e}")
-                        # 如果HTML读取失败，继续尝试其他引擎
-                        engine = 'xlrd'
-                else:
-                    # 无法明确识别，优先尝试xlrd
-                    engine = 'xlrd'
-                    print("无法明确识别 .xls 容器类型，优先尝试 xlrd 引擎")
-            elif file_path.lower().endswith('.xlsx'):
-                engine = 'openpyxl'  # 使用openpyxl引擎处理.xlsx文件
-                print(f"检测到.xlsx格式文件，使用openpyxl引擎")
-            
-            # 尝试使用选择的引擎读取
-            try:
-                df = pd.read_excel(file_path, engine=engine)
-            except Exception as e:
-                print(f"使用{engine}引擎失败，尝试自动检测引擎: {e}")
-                # 针对.xls但嗅探为Zip的场景，再显式尝试 openpyxl
-                if file_path.lower().endswith('.xls') and magic.startswith(b'PK'):
-                    try:
-                        print("再次显式使用 openpyxl 引擎尝试读取 .xls(Zip) ...")
-                        df = pd.read_excel(file_path, engine='openpyxl')
-                    except Exception as e2:
-                        print(f"显式 openpyxl 仍失败: {e2}")
-                        raise e2
                 else:
-                    # 最后尝试HTML读取（如果之前没有尝试过）
-                    if not (magic.startswith(b'<html') or magic.startswith(b'<HTML') or b'<html' in magic[:50]):
-                        df = pd.read_excel(file_path)
-                    else:
+                    print(f"检测到.xlsx格式文件，使用openpyxl引擎")
+                with profiler.phase('parse'):
+                    sheet_name = 0 if sheet is None else sheet
+                    if parser == 'xlrd' and (sheet is not None or (selection is not None and selection.columns)):
+                        # 按需加载选中的工作表，读取列名和数据共用同一个已打开的工作簿
+                        import xlrd
+                        book = xlrd.open_workbook(file_path, on_demand=True)
                         try:
-                            print("最后尝试使用 pandas.read_html 读取...")
-                            tables = pd.read_html(file_path, encoding='utf-8', header=0)
-                            if tables:
-                                df = tables[0]
-                                # 重置索引以避免产生序号列
-                                df = df.reset_index(drop=True)
-                                print(f"HTML表格读取成功: {len(df)}行 x {len(df.columns)}列")
-                                print(f"列名: {list(df.columns)}")
-                                # 只有当列名确实是数字序号时才进行处理
-                                if all(isinstance(col, (int, float)) for col in df.columns):
-                                    print("检测到数字列名，可能需要处理序号列")
-                                    df = ExcelFileProcessor._remove_sequence_columns(df)
-                            else:
-                                raise ValueError("HTML文件中未找到表格")
-                        except Exception as final_e:
-                            print(f"所有方法都失败了: {final_e}")
-                            raise final_e
+                            df = ExcelFileProcessor._read_excel_selected(book, parser, sheet_name, selection)
+                        finally:
+                            book.release_resources()
+                    else:
+                        df = ExcelFileProcessor._read_excel_selected(file_path, parser, sheet_name, selection)
             
             # 对大文件进行内存优化
-            if len(df) > 10000:
-                print(f"检测到大文件({len(df)}行)，正在优化内存使用...")
-                # 尝试优化数据类型以减少内存使用
-                for col in df.select_dtypes(include=['object']).columns:
-                    try:
-                        df[col] = pd.to_numeric(df[col], downcast='integer', errors='ignore')
-                    except:
-                        pass
-            
-            return df
+            with profiler.phase('dtype_compaction'):
+                return DtypeCompactor.compact(df, memory_target)
         except pd.errors.EmptyDataError:
             raise ValueError(f"文件 {file_path} 为空或无有效数据")
         except Exception as e:
             raise ValueError(f"读取文件 {file_path} 失败: {e}")
     
+    @staticmethod
+    def _read_excel_selected(source, parser: str, sheet_name, selection: Optional[DataSelection]) -> pd.DataFrame:
+        """调用pandas.read_excel，把列投影和行范围下推为usecols、skiprows和nrows
+
+        列名只有读到表头后才能解析为列序号，因此先以nrows=0只读取表头行。
+        """
+        import pandas as pd
+        kwargs = {}
+        if selection is not None and selection.columns is not None:
+            header = pd.read_excel(source, engine=parser, sheet_name=sheet_name, nrows=0)
+            kwargs['usecols'] = selection.resolve([str(col) for col in header.columns])
+        if selection is not None and selection.rows_selected:
+            if selection.skip:
+                kwargs['skiprows'] = range(1, 1 + selection.skip)
+            if selection.stop is not None:
+                kwargs['nrows'] = selection.stop - selection.skip
+        return pd.read_excel(source, engine=parser, sheet_name=sheet_name, **kwargs)
+
+    @staticmethod
+    def read_excel_cached(cache, file_path: str, memory_target: str = DtypeCompactor.DEFAULT_TARGET,
+                          sheet: Optional[str] = None,
+                          selection: Optional[DataSelection] = None) -> Tuple[pd.DataFrame, bool]:
+        """通过解析缓存（parse_cache.ParseCache）读取文件，返回(DataFrame, 是否命中缓存)
+
+        不同内存目标的读取结果数据类型不同，分别缓存；不同工作表、不同的列投影和行范围也分别缓存。
+        """
+        parse = functools.partial(ExcelFileProcessor.read_excel_with_optimization, memory_target=memory_target,
+                                  sheet=sheet, selection=selection)
+        variant = f'raw-{memory_target}' if sheet is None else f'raw-{memory_target}-sheet:{sheet}'
+        if selection is not None and selection.active:
+            variant = f'{variant}-{selection.key()}'
+        return cache.get_or_parse(file_path, parse, variant=variant)
+
+    @staticmethod
+    def _read_html_table(file_path: str, encoding: Optional[str], table_index: int = 0) -> pd.DataFrame:
+        """读取HTML文件中的指定表格（默认第一个），第一行作为表头"""
+        import pandas as pd
+        tables = pd.read_html(file_path, encoding=encoding or 'utf-8', header=0)
+        if not tables:
+            raise ValueError("HTML文件中未找到表格")
+        if table_index >= len(tables):
+            raise ValueError(f"HTML文件中只有{len(tables)}个表格")
+        df = tables[table_index]
+        # 重置索引以避免产生序号列
+        df = df.reset_index(drop=True)
+        print(f"HTML表格读取成功: {len(df)}行 x {len(df.columns)}列")
+        print(f"列名: {list(df.columns)}")
+        # 只有当列名确实是数字序号时才进行处理
+        if all(isinstance(col, (int, float)) for col in df.columns):
+            print("检测到数字列名，可能需要处理序号列")
+            df = ExcelFileProcessor._remove_sequence_columns(df)
+        return df
+    
     @staticmethod
     def _remove_sequence_columns(df: pd.DataFrame) -> pd.DataFrame:
         """移除DataFrame中的序号列
@@ -185,33 +654,34 @@ class ExcelFileProcessor:
         Returns:
             pd.DataFrame: 移除序号列后的DataFrame
         """
-        if df.empty or len(df.columns) <= 1:
-            return df
+        with profiler.phase('remove_sequence_columns'):
+            if df.empty or len(df.columns) <= 1:
+                return df
+        
+            # 检查列名是否为数字序号（pandas.read_html生成的列名）
+            columns = list(df.columns)
+            if all(isinstance(col, (int, float)) for col in columns):
+                # 如果所有列名都是数字，检查是否为连续序号
+                if columns == list(range(len(columns))):
+                    print("检测到pandas自动生成的数字列名，这通常表示HTML表格没有表头")
+                    # 检查第一列是否为序号列
+                    first_col = df.iloc[:, 0]
+                    if ExcelFileProcessor._is_sequence_column(first_col):
+                        df = df.iloc[:, 1:]  # 移除第一列
+                        print("检测到并移除了第一列序号列")
+                    # 重新设置列名为更有意义的名称
+                    if len(df.columns) > 0:
+                        df.columns = [f'Column_{i+1}' for i in range(len(df.columns))]
+                        print(f"重新设置列名为: {list(df.columns)}")
         
-        # 检查列名是否为数字序号（pandas.read_html生成的列名）
-        columns = list(df.columns)
-        if all(isinstance(col, (int, float)) for col in columns):
-            # 如果所有列名都是数字，检查是否为连续序号
-            if columns == list(range(len(columns))):
-                print("检测到pandas自动生成的数字列名，这通常表示HTML表格没有表头")
-                # 检查第一列是否为序号列
+            # 检查第一列是否为序号列（数据内容检查）
+            if len(df.columns) > 1:
                 first_col = df.iloc[:, 0]
                 if ExcelFileProcessor._is_sequence_column(first_col):
-                    df = df.iloc[:, 1:]  # 移除第一列
-                    print("检测到并移除了第一列序号列")
-                # 重新设置列名为更有意义的名称
-                if len(df.columns) > 0:
-                    df.columns = [f'Column_{i+1}' for i in range(len(df.columns))]
-                    print(f"重新设置列名为: {list(df.columns)}")
+                    df = df.iloc[:, 1:]  # 移除第一列序号
+                    print("检测到并移除了数据内容为序号的第一列")
         
-        # 检查第一列是否为序号列（数据内容检查）
-        if len(df.columns) > 1:
-            first_col = df.iloc[:, 0]
-            if ExcelFileProcessor._is_sequence_column(first_col):
-                df = df.iloc[:, 1:]  # 移除第一列序号
-                print("检测到并移除了数据内容为序号的第一列")
-        
-        return df
+            return df
     
     @staticmethod
     def _is_sequence_column(col: pd.Series) -> bool:
@@ -223,11 +693,13 @@ class ExcelFileProcessor:
         Returns:
             bool: 如果是序号列返回True，否则返回False
         """
+        import pandas as pd
+
         if len(col) == 0:
             return False
         
-        # 检查数字类型的序号列
-        if col.dtype in ['int64', 'float64']:
+        # 检查数字类型的序号列（包括内存优化后降级的整数/浮点类型）
+        if pd.api.types.is_numeric_dtype(col.dtype) and not pd.api.types.is_bool_dtype(col.dtype):
             # 检查是否为连续序号（0开始或1开始）
             return ((col == range(len(col))).all() or 
                    (col == range(1, len(col) + 1)).all())
@@ -246,9 +718,1595 @@ class ExcelFileProcessor:
         return False
     
     @staticmethod
-    def get_base_filename(file_path: str) -> str:
-        """获取文件的基础名称（不含扩展名）"""
-        return os.path.splitext(os.path.basename(file_path))[0]
+    def get_base_filename(file_path: str, sheet: Optional[str] = None) -> str:
+        """获取文件的基础名称（不含扩展名），指定工作表时追加“_工作表名”"""
+        return os.path.splitext(os.path.basename(file_path))[0] + ExcelFileProcessor.sheet_suffix(sheet)
+
+    @staticmethod
+    def sheet_suffix(sheet: Optional[str]) -> str:
+        """输出文件名中的工作表部分：“_工作表名”（替换文件名中不允许的字符），未指定工作表时为空"""
+        if sheet is None:
+            return ''
+        return f"_{PartitionWriter._INVALID_CHARS.sub('_', sheet).strip(' .') or 'Sheet'}"
+
+
+class SequenceColumnTracker:
+    """流式跟踪第一列是否为连续序号
+
+    与对整体数据执行ExcelFileProcessor._remove_sequence_columns时的第一列判断等价，
+    但只需逐批查看第一列的值，不需要保留已读取或已写出的数据。
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.from_zero = True
+        self.from_one = True
+
+    def update(self, values) -> None:
+        count = len(values)
+        if count and (self.from_zero or self.from_one):
+            import numpy as np
+            import pandas as pd
+            numeric = pd.to_numeric(pd.Series(list(values), dtype=object), errors='coerce')
+            if numeric.isna().any():
+                self.from_zero = self.from_one = False
+            else:
+                expected = np.arange(self.rows, self.rows + count)
+                actual = numeric.to_numpy()
+                self.from_zero = self.from_zero and bool((actual == expected).all())
+                self.from_one = self.from_one and bool((actual == expected + 1).all())
+        self.rows += count
+
+    def is_sequence(self) -> bool:
+        return self.rows > 0 and (self.from_zero or self.from_one)
+
+
+class StreamingExcelReader:
+    """流式读取工具类
+
+    以只读模式逐行读取.xlsx工作表，或以增量解析方式读取HTML文件中的第一个表格，
+    不构建DataFrame，内存占用与文件行数无关。
+    .xlsx行值的规整规则与pandas.read_excel(engine='openpyxl')保持一致。
+    """
+
+    # 支持流式读取的容器类型（见FormatProbe.container）
+    STREAMABLE_CONTAINERS = ('xlsx', 'html')
+
+    # HTML文件中的顶层表格按顺序命名为Table1、Table2……，作为工作表名使用
+    HTML_TABLE_PREFIX = 'Table'
+
+    # 与pandas.read_html默认一致的缺失值文本
+    _HTML_NA_VALUES = frozenset([
+        '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+        '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+    ])
+    _HTML_WHITESPACE = re.compile(r'[\r\n]+|\s{2,}')
+    _HTML_INT = re.compile(r'-?(?:0|[1-9]\d*)\Z')
+    _HTML_FLOAT = re.compile(r'-?(?:\d+\.\d*|\.\d+)(?:[eE][-+]?\d+)?\Z')
+
+    @staticmethod
+    def normalize_header(row: tuple) -> List:
+        """按pandas规则生成列名：空列名为"Unnamed: n"，重复列名追加".1"、".2"后缀"""
+        values = list(row)
+        while values and values[-1] is None:
+            values.pop()
+
+        header = [f'Unnamed: {i}' if value is None else value for i, value in enumerate(values)]
+        counts = {}
+        for i, name in enumerate(header):
+            cur_count = counts.get(name, 0)
+            while cur_count > 0:
+                counts[name] = cur_count + 1
+                name = f'{name}.{cur_count}'
+                cur_count = counts.get(name, 0)
+            header[i] = name
+            counts[name] = cur_count + 1
+        return header
+
+    @staticmethod
+    def iter_rows(file_path: str, probe: Optional[FormatProbe] = None, sheet: Optional[str] = None,
+                  selection: Optional[DataSelection] = None) -> Iterator[tuple]:
+        """按探测到的容器类型逐行读取工作表或表格（第一行为表头），sheet为None时读取默认工作表或第一个表格
+
+        指定selection时表头和数据行都只包含选中的列，数据行只包含行范围内的行。
+        """
+        probe = probe or FormatProbe.for_file(file_path)
+        if selection is not None and not selection.active:
+            selection = None
+        if probe.container == 'xlsx':
+            return StreamingExcelReader.iter_xlsx_rows(file_path, sheet, selection)
+        if probe.container == 'html':
+            return StreamingExcelReader.iter_html_rows(file_path, probe.encoding,
+                                                       StreamingExcelReader.html_table_index(sheet), selection)
+        raise ValueError(f"流式读取仅支持.xlsx和HTML表格文件: {file_path}")
+
+    @staticmethod
+    def _project(row: tuple, indexes: Optional[List[int]]) -> tuple:
+        """取出选中列的值，indexes为None时返回整行"""
+        if indexes is None:
+            return row
+        width = len(row)
+        return tuple(row[i] if i < width else None for i in indexes)
+
+    @staticmethod
+    def html_table_index(sheet: Optional[str]) -> int:
+        """HTML表格名（Table1、Table2……）对应的表格序号，None为第一个表格"""
+        if sheet is None:
+            return 0
+        prefix = StreamingExcelReader.HTML_TABLE_PREFIX
+        if sheet.startswith(prefix) and sheet[len(prefix):].isdigit() and int(sheet[len(prefix):]) > 0:
+            return int(sheet[len(prefix):]) - 1
+        raise ValueError(f"HTML表格名应为{prefix}1、{prefix}2等，当前值: {sheet}")
+
+    @staticmethod
+    def count_html_tables(file_path: str, encoding: Optional[str] = None) -> int:
+        """统计HTML文件中顶层<table>的数量，增量解析并随时释放已处理的元素"""
+        from lxml import etree
+
+        count = 0
+        table_depth = 0
+        with open(file_path, 'rb') as f:
+            parser = etree.iterparse(f, events=('start', 'end'), tag=('table', 'tr'),
+                                     html=True, encoding=encoding, recover=True, huge_tree=True)
+            for event, element in parser:
+                if element.tag == 'table':
+                    table_depth += 1 if event == 'start' else -1
+                    if event == 'start' and table_depth == 1:
+                        count += 1
+                if event == 'end' and table_depth <= 1:
+                    StreamingExcelReader._release(element)
+        return count
+
+    @staticmethod
+    def _release(element) -> None:
+        """释放已处理的元素及其之前的兄弟元素，保持增量解析的内存占用恒定"""
+        element.clear()
+        parent = element.getparent()
+        if parent is not None:
+            while element.getprevious() is not None:
+                del parent[0]
+
+    @staticmethod
+    def _html_value(text: str) -> Any:
+        """按pandas.read_html的规则规整单元格文本：压缩空白、识别缺失值，数值文本转换为数字"""
+        # 只有含换行、制表、不间断空格等或连续空格时才需要压缩空白
+        if '  ' in text or not text.isprintable():
+            text = StreamingExcelReader._HTML_WHITESPACE.sub(' ', text)
+        text = text.strip()
+        if text in StreamingExcelReader._HTML_NA_VALUES:
+            return None
+        if StreamingExcelReader._HTML_INT.match(text):
+            value = int(text)
+            # 超出int64范围的数字（如长编号）保留为文本，避免精度丢失
+            return value if -2 ** 63 <= value < 2 ** 63 else text
+        if StreamingExcelReader._HTML_FLOAT.match(text):
+            return float(text)
+        return text
+
+    @staticmethod
+    def _html_blank(text: str) -> bool:
+        """单元格文本是否为空值（与_html_value返回None的条件相同，但不做类型转换）"""
+        if '  ' in text or not text.isprintable():
+            text = StreamingExcelReader._HTML_WHITESPACE.sub(' ', text)
+        return text.strip() in StreamingExcelReader._HTML_NA_VALUES
+
+    @staticmethod
+    def iter_html_rows(file_path: str, encoding: Optional[str] = None, table_index: int = 0,
+                       selection: Optional[DataSelection] = None) -> Iterator[tuple]:
+        """增量解析HTML文件，逐行读取第table_index个（从0开始）顶层<table>的单元格值
+
+        只保留当前行的元素，处理完即释放；目标表格结束后立即停止解析，
+        不会构建整个文档树。colspan/rowspan按pandas.read_html的方式展开，
+        全空行被跳过，每行末尾的空单元格被去除。
+        单元格按文本逐个转换类型（pandas按整列推断），同一列混有数字和文本时，数字文本也会写为数字。
+        指定selection时只转换选中列的单元格，范围之前的行只判断是否为空行，读到范围末尾即停止解析；
+        选中列全为空的行输出为空元组，数据行序号不受列投影影响。
+        """
+        from lxml import etree
+
+        table_depth = 0
+        tables_seen = 0
+        spans = {}  # 列序号 -> [剩余行数, 文本]，用于展开rowspan
+        indexes = None
+        data_row = -1  # 已读到的数据行序号（从0开始），-1表示尚未读到表头行
+        skip = selection.skip if selection is not None else 0
+        stop = selection.stop if selection is not None else None
+        with open(file_path, 'rb') as f:
+            parser = etree.iterparse(f, events=('start', 'end'), tag=('table', 'tr'),
+                                     html=True, encoding=encoding, recover=True, huge_tree=True)
+            for event, element in parser:
+                if element.tag == 'table':
+                    if event == 'start':
+                        table_depth += 1
+                        if table_depth == 1:
+                            tables_seen += 1
+                        continue
+                    table_depth -= 1
+                    if table_depth == 0:
+                        if tables_seen > table_index:
+                            break
+                        # 跳过目标之前的表格
+                        StreamingExcelReader._release(element)
+                    continue
+                if event == 'start' or table_depth != 1:
+                    continue
+                if tables_seen != table_index + 1:
+                    StreamingExcelReader._release(element)
+                    continue
+
+                texts = []
+                col = 0
+                for cell in element:
+                    if cell.tag not in ('td', 'th'):
+                        continue
+                    while col in spans:
+                        texts.append(StreamingExcelReader._take_span(spans, col))
+                        col += 1
+                    text = (cell.text or '') if len(cell) == 0 else ''.join(cell.itertext())
+                    colspan = StreamingExcelReader._span_count(cell.get('colspan'))
+                    rowspan = StreamingExcelReader._span_count(cell.get('rowspan'))
+                    for _ in range(colspan):
+                        texts.append(text)
+                        if rowspan > 1:
+                            spans[col] = [rowspan - 1, text]
+                        col += 1
+                while col in spans:
+                    texts.append(StreamingExcelReader._take_span(spans, col))
+                    col += 1
+
+                # 释放已处理的行，保持内存占用恒定
+                StreamingExcelReader._release(element)
+
+                if data_row >= 0 and selection is not None:
+                    # 数据行序号按整行是否为空计算，只转换范围内选中列的单元格
+                    if all(StreamingExcelReader._html_blank(text) for text in texts):
+                        continue
+                    data_row += 1
+                    if data_row <= skip:
+                        continue
+                    values = [None if text is None else StreamingExcelReader._html_value(text)
+                              for text in StreamingExcelReader._project(texts, indexes)]
+                else:
+                    values = [StreamingExcelReader._html_value(text) for text in texts]
+                while values and values[-1] is None:
+                    values.pop()
+
+                if data_row < 0 and selection is not None:
+                    if not values:
+                        continue
+                    # 第一个非空行为表头行，据此解析选中的列
+                    indexes = selection.resolve(StreamingExcelReader.normalize_header(values))
+                    data_row = 0
+                    yield StreamingExcelReader._project(tuple(values), indexes)
+                    continue
+                if values or selection is not None:
+                    yield tuple(values)
+                if stop is not None and data_row >= stop:
+                    break
+
+    @staticmethod
+    def _span_count(value: Optional[str]) -> int:
+        if value is None:
+            return 1
+        try:
+            return max(1, int(value))
+        except (TypeError, ValueError):
+            return 1
+
+    @staticmethod
+    def _take_span(spans: Dict[int, list], col: int) -> Any:
+        remaining, value = spans[col]
+        if remaining <= 1:
+            del spans[col]
+        else:
+            spans[col][0] = remaining - 1
+        return value
+
+    @staticmethod
+    def iter_xlsx_rows(file_path: str, sheet: Optional[str] = None,
+                       selection: Optional[DataSelection] = None) -> Iterator[tuple]:
+        """逐行读取.xlsx工作表的单元格值，sheet为None时读取活动工作表
+
+        只读模式只解析选中的工作表，其他工作表不会被读取。
+
+        与pandas一致：整数值的浮点数转换为int，去除每行末尾空单元格，
+        丢弃工作表末尾的空行（中间空行保留为空元组）。
+        指定selection时先只读取表头行以解析选中的列，数据行以min_row/max_row/min_col/max_col读取，
+        范围之前的行不构建单元格，读到范围末尾即停止解析。
+        """
+        from openpyxl import load_workbook
+
+        wb = load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+        try:
+            ws = wb.active if sheet is None else wb[sheet]
+            # 导出文件中的dimension信息常常不可靠，交由解析器按实际内容确定行宽
+            ws.reset_dimensions()
+
+            if selection is None:
+                rows = ws.iter_rows(values_only=True)
+            else:
+                header = next(ws.iter_rows(min_row=1, max_row=1, values_only=True), ())
+                indexes = selection.resolve(StreamingExcelReader.normalize_header(header))
+                window = {}
+                if indexes is not None:
+                    # 只读取选中列所在的区间，行内位置相对于区间的第一列
+                    window = {'min_col': indexes[0] + 1, 'max_col': indexes[-1] + 1}
+                    offset = indexes[0]
+                    indexes = [i - offset for i in indexes]
+                    header = header[offset:]
+                data = ws.iter_rows(min_row=2 + selection.skip,
+                                    max_row=1 + selection.stop if selection.stop is not None else None,
+                                    values_only=True, **window)
+                rows = itertools.chain([StreamingExcelReader._project(header, indexes)],
+                                       (StreamingExcelReader._project(row, indexes) for row in data))
+
+            pending_empty = 0
+            for row in rows:
+                values = list(row)
+                while values and values[-1] is None:
+                    values.pop()
+                if not values:
+                    # 暂不输出空行，只有后面还有数据行时才补回
+                    pending_empty += 1
+                    continue
+
+                for _ in range(pending_empty):
+                    yield ()
+                pending_empty = 0
+
+                for i, value in enumerate(values):
+                    if isinstance(value, float) and value.is_integer():
+                        values[i] = int(value)
+                yield tuple(values)
+        finally:
+            wb.close()
+
+
+class StreamingTableSource:
+    """流式表格数据源
+
+    对支持流式读取的文件（.xlsx或HTML表格）先做一次只看第一列的预扫描，
+    得到列名、数据行数以及第一列是否为序号列（判断规则同ExcelFileProcessor._remove_sequence_columns），
+    再通过iter_data_rows()第二次流式读取数据行。两次读取都不在内存中保留整表，
+    可替代DataFrame作为合并的输入。selection（见DataSelection）在两次读取中都下推给读取器。
+    """
+
+    def __init__(self, file_path: str, probe: Optional[FormatProbe] = None, sheet: Optional[str] = None,
+                 selection: Optional[DataSelection] = None):
+        self.file_path = file_path
+        self.probe = probe or FormatProbe.for_file(file_path)
+        self.sheet = sheet
+        self.selection = selection
+
+        rows = StreamingExcelReader.iter_rows(file_path, self.probe, sheet, selection)
+        first_row = next(rows, None)
+        header = StreamingExcelReader.normalize_header(first_row) if first_row is not None else []
+        tracker = SequenceColumnTracker()
+        batch = []
+        for row in rows:
+            batch.append(row[0] if row else None)
+            if len(batch) >= 10000:
+                tracker.update(batch)
+                batch = []
+        tracker.update(batch)
+
+        self.row_count = tracker.rows
+        self.sequence_column_removed = len(header) > 1 and tracker.is_sequence()
+        self.columns = header[1:] if self.sequence_column_removed else header
+
+    def __len__(self) -> int:
+        return self.row_count
+
+    @property
+    def empty(self) -> bool:
+        return self.row_count == 0 or not self.columns
+
+    def iter_data_rows(self) -> Iterator[tuple]:
+        """逐行产出数据行（不含表头），已移除序号列"""
+        rows = StreamingExcelReader.iter_rows(self.file_path, self.probe, self.sheet, self.selection)
+        next(rows, None)
+        if self.sequence_column_removed:
+            for row in rows:
+                yield row[1:]
+        else:
+            yield from rows
+
+
+class ExcelWriterBackend(ABC):
+    """.xlsx写入后端基类
+
+    各后端提供与StreamingCsvWriter相同的write_header/append/append_dataframe/save接口，
+    并以CAPABILITIES声明能表达的输出特性和内存特征，由XlsxBackendRegistry按作业需要选择：
+    header_style  表头行加粗、细边框、居中（与pandas.to_excel的表头格式相同）
+    column_widths 设置列宽
+    formulas      以=开头的文本写为公式（规则与openpyxl相同：长度大于1且以=开头），否则写为文本
+    memory        内存占用：constant为与行数无关
+    temp_file     是否先写临时文件、保存时再复制到压缩包（需要额外一遍磁盘读写）
+    单元格级样式（字体、填充、合并单元格等）不属于任何流式后端的能力，保留样式的拆分仍使用openpyxl常规模式。
+    """
+
+    NAME = ''
+    REQUIRES: Optional[str] = None
+    CAPABILITIES: Dict[str, Any] = {}
+
+    # 与pandas.to_excel相同的日期格式
+    DATETIME_FORMAT = 'YYYY-MM-DD HH:MM:SS'
+    DATE_FORMAT = 'YYYY-MM-DD'
+
+    @classmethod
+    def available(cls) -> bool:
+        """后端依赖的包是否已安装"""
+        if cls.REQUIRES is None:
+            return True
+        import importlib.util
+        return importlib.util.find_spec(cls.REQUIRES) is not None
+
+    @classmethod
+    def supports(cls, needs: Iterable[str]) -> bool:
+        """是否具备needs中的全部能力"""
+        return all(cls.CAPABILITIES.get(need) for need in needs)
+
+    @staticmethod
+    def is_formula(value: Any) -> bool:
+        """单元格值是否按公式写出"""
+        return isinstance(value, str) and len(value) > 1 and value[0] == '='
+
+    def write_header(self, header, styled: bool = False) -> None:
+        """写入表头行，styled为True时使用表头格式（需要header_style能力）"""
+        self._append(header, styled)
+        self.header_rows = 1
+
+    def append(self, row) -> None:
+        """追加一行"""
+        self._append(row, False)
+
+    def append_dataframe(self, df: pd.DataFrame) -> None:
+        """逐行追加DataFrame数据（不含列名），缺失值写为空单元格"""
+        values = df.astype(object).where(df.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            self._append(row, False)
+
+    @abstractmethod
+    def _append(self, row, styled: bool) -> None:
+        """写出一行，styled为True时使用表头格式"""
+
+
+class StreamingExcelWriter(ExcelWriterBackend):
+    """openpyxl只写模式后端
+
+    逐行追加，行数据写入后即落盘到临时文件，保存时再复制到压缩包，内存占用与行数无关。
+    以=开头的文本按openpyxl的规则写为公式。
+    """
+
+    NAME = 'openpyxl'
+    REQUIRES = 'openpyxl'
+    CAPABILITIES = {'header_style': True, 'column_widths': True, 'formulas': True,
+                    'memory': 'constant', 'temp_file': True}
+
+    def __init__(self, output_file: str, sheet_title: str = 'Sheet1',
+                 column_widths: Optional[Dict[str, float]] = None):
+        from openpyxl import Workbook
+
+        self.output_file = output_file
+        self.rows_written = 0
+        self.header_rows = 0
+        self._wb = Workbook(write_only=True)
+        self._ws = self._wb.create_sheet(title=sheet_title)
+        for letter, width in (column_widths or {}).items():
+            self._ws.column_dimensions[letter].width = width
+
+    def _append(self, row, styled: bool) -> None:
+        if styled:
+            row = self._styled_cells(row)
+        elif any(isinstance(value, date) for value in row):
+            row = self._format_dates(row)
+        self._ws.append(row)
+        self.rows_written += 1
+
+    def _styled_cells(self, row) -> list:
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Alignment, Border, Font, Side
+
+        thin = Side(style='thin')
+        out = []
+        for value in row:
+            cell = WriteOnlyCell(self._ws, value=value)
+            cell.font = Font(bold=True)
+            cell.border = Border(left=thin, right=thin, top=thin, bottom=thin)
+            cell.alignment = Alignment(horizontal='center', vertical='top')
+            out.append(cell)
+        return out
+
+    def _format_dates(self, row) -> list:
+        from openpyxl.cell import WriteOnlyCell
+
+        out = []
+        for value in row:
+            if isinstance(value, date):
+                cell = WriteOnlyCell(self._ws, value=value)
+                cell.number_format = self.DATETIME_FORMAT if isinstance(value, datetime) else self.DATE_FORMAT
+                out.append(cell)
+            else:
+                out.append(value)
+        return out
+
+    def save(self) -> None:
+        """保存输出文件"""
+        with profiler.phase('save_workbook'):
+            self._wb.save(self.output_file)
+
+
+class XlsxWriterExcelWriter(ExcelWriterBackend):
+    """xlsxwriter常量内存后端
+
+    constant_memory模式下每写完一行即刷出到临时文件，保存时再压缩，内存占用与行数无关；
+    单元格写出比openpyxl快。以=开头的文本按openpyxl的规则写为公式，其余文本一律写为文本
+    （不转换为数字或超链接）。需要安装xlsxwriter。
+    """
+
+    NAME = 'xlsxwriter'
+    REQUIRES = 'xlsxwriter'
+    CAPABILITIES = {'header_style': True, 'column_widths': True, 'formulas': True,
+                    'memory': 'constant', 'temp_file': True}
+
+    def __init__(self, output_file: str, sheet_title: str = 'Sheet1',
+                 column_widths: Optional[Dict[str, float]] = None):
+        import xlsxwriter
+
+        self.output_file = output_file
+        self.rows_written = 0
+        self.header_rows = 0
+        self._wb = xlsxwriter.Workbook(output_file, {
+            'constant_memory': True, 'strings_to_formulas': False, 'strings_to_urls': False,
+            'nan_inf_to_errors': True})
+        self._ws = self._wb.add_worksheet(sheet_title)
+        self._datetime = self._wb.add_format({'num_format': self.DATETIME_FORMAT})
+        self._date = self._wb.add_format({'num_format': self.DATE_FORMAT})
+        self._time = self._wb.add_format({'num_format': 'h:mm:ss'})
+        self._header = self._wb.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+        for letter, width in (column_widths or {}).items():
+            index = _column_index(letter) - 1
+            self._ws.set_column(index, index, width)
+
+    def _append(self, row, styled: bool) -> None:
+        from datetime import time as time_of_day
+
+        ws, r = self._ws, self.rows_written
+        for c, value in enumerate(row):
+            if value is None:
+                if styled:
+                    ws.write_blank(r, c, None, self._header)
+            elif self.is_formula(value):
+                # 与openpyxl一样不写缓存值，由Excel打开时计算
+                ws.write_formula(r, c, value, self._header if styled else None, '')
+            elif styled:
+                ws.write(r, c, value if isinstance(value, (str, int, float)) else str(value), self._header)
+            elif isinstance(value, datetime):
+                if value.tzinfo is not None:
+                    raise TypeError("Excel不支持带时区的日期时间，请先移除时区信息")
+                ws.write_datetime(r, c, value, self._datetime)
+            elif isinstance(value, date):
+                ws.write_datetime(r, c, value, self._date)
+            elif isinstance(value, time_of_day):
+                ws.write_datetime(r, c, value, self._time)
+            else:
+                ws.write(r, c, value)
+        self.rows_written += 1
+
+    def save(self) -> None:
+        """保存输出文件"""
+        with profiler.phase('save_workbook'):
+            self._wb.close()
+
+
+def _column_letter(index: int) -> str:
+    """列序号（从1开始）转换为列字母"""
+    letters = ''
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _column_index(letters: str) -> int:
+    """列字母转换为列序号（从1开始）"""
+    index = 0
+    for letter in letters.upper():
+        index = index * 26 + ord(letter) - 64
+    return index
+
+
+class RawXmlExcelWriter(ExcelWriterBackend):
+    """原始XML后端
+
+    直接生成工作表XML并流式写入压缩包：文本写为内联字符串（inlineStr），不建共享字符串表，
+    不经过单元格对象和临时文件，是最快的后端，内存占用与行数无关。
+    输出只包含工作簿、一张工作表和样式部件，样式表固定为默认、日期时间、日期、时间、时长和表头六种格式。
+    以=开头的文本按openpyxl的规则写为公式（不写缓存值），其余文本写为文本；XML中非法的控制字符按OOXML的_xHHHH_转义写出。
+    """
+
+    NAME = 'rawxml'
+    CAPABILITIES = {'header_style': True, 'column_widths': True, 'formulas': True,
+                    'memory': 'constant', 'temp_file': False}
+
+    _FLUSH_SIZE = 256 * 1024
+    _COMPRESS_LEVEL = 1
+    _EPOCH = datetime(1899, 12, 30)
+    # 样式表中cellXfs的序号
+    _STYLE_DATETIME, _STYLE_DATE, _STYLE_TIME, _STYLE_DURATION, _STYLE_HEADER = 1, 2, 3, 4, 5
+    _ILLEGAL_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+    _NS_MAIN = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+    _NS_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+    _NS_PKG_REL = 'http://schemas.openxmlformats.org/package/2006/relationships'
+    _CONTENT_TYPES = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>')
+    _ROOT_RELS = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        f'<Relationships xmlns="{_NS_PKG_REL}">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>')
+    _WORKBOOK_RELS = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        f'<Relationships xmlns="{_NS_PKG_REL}">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '<Relationship Id="rId2" Target="styles.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles"/>'
+        '</Relationships>')
+    _STYLES = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        f'<styleSheet xmlns="{_NS_MAIN}">'
+        '<numFmts count="3">'
+        '<numFmt numFmtId="164" formatCode="YYYY-MM-DD HH:MM:SS"/>'
+        '<numFmt numFmtId="165" formatCode="YYYY-MM-DD"/>'
+        '<numFmt numFmtId="166" formatCode="[h]:mm:ss"/>'
+        '</numFmts>'
+        '<fonts count="2">'
+        '<font><sz val="11"/><name val="Calibri"/><family val="2"/></font>'
+        '<font><b/><sz val="11"/><name val="Calibri"/><family val="2"/></font>'
+        '</fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+        '<fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="2"><border><left/><right/><top/><bottom/><diagonal/></border>'
+        '<border><left style="thin"/><right style="thin"/><top style="thin"/><bottom style="thin"/><diagonal/>'
+        '</border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="6">'
+        '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '<xf numFmtId="165" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '<xf numFmtId="21" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '<xf numFmtId="166" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '<xf numFmtId="0" fontId="1" fillId="0" borderId="1" xfId="0" applyFont="1" applyBorder="1" '
+        'applyAlignment="1"><alignment horizontal="center" vertical="top"/></xf>'
+        '</cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        '</styleSheet>')
+
+    def __init__(self, output_file: str, sheet_title: str = 'Sheet1',
+                 column_widths: Optional[Dict[str, float]] = None):
+        self.output_file = output_file
+        self.rows_written = 0
+        self.header_rows = 0
+        self._letters: List[str] = []
+        self._pending: List[str] = []
+        self._pending_size = 0
+        self._archive = zipfile.ZipFile(output_file, 'w', zipfile.ZIP_DEFLATED, compresslevel=self._COMPRESS_LEVEL)
+        try:
+            self._archive.writestr('[Content_Types].xml', self._CONTENT_TYPES)
+            self._archive.writestr('_rels/.rels', self._ROOT_RELS)
+            self._archive.writestr('xl/workbook.xml', (
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                f'<workbook xmlns="{self._NS_MAIN}" xmlns:r="{self._NS_REL}"><sheets>'
+                f'<sheet name="{html.escape(sheet_title)}" sheetId="1" r:id="rId1"/></sheets></workbook>'))
+            self._archive.writestr('xl/_rels/workbook.xml.rels', self._WORKBOOK_RELS)
+            self._archive.writestr('xl/styles.xml', self._STYLES)
+            self._stream = self._archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True)
+        except BaseException:
+            self._archive.close()
+            raise
+        cols = ''.join(f'<col min="{i}" max="{i}" width="{width}" customWidth="1"/>' for i, width in
+                       sorted((_column_index(letter), width) for letter, width in (column_widths or {}).items()))
+        self._write('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                    f'<worksheet xmlns="{self._NS_MAIN}" xmlns:r="{self._NS_REL}">'
+                    + (f'<cols>{cols}</cols>' if cols else '') + '<sheetData>')
+
+    def _write(self, text: str) -> None:
+        self._pending.append(text)
+        self._pending_size += len(text)
+        if self._pending_size >= self._FLUSH_SIZE:
+            self._flush()
+
+    def _flush(self) -> None:
+        with profiler.phase('write_xml'):
+            self._stream.write(''.join(self._pending).encode('utf-8'))
+        self._pending = []
+        self._pending_size = 0
+
+    def _letter(self, index: int) -> str:
+        letters = self._letters
+        while len(letters) <= index:
+            letters.append(_column_letter(len(letters) + 1))
+        return letters[index]
+
+    @classmethod
+    def _text(cls, value: str) -> str:
+        text = html.escape(value, quote=False)
+        if cls._ILLEGAL_CHARS.search(text):
+            text = cls._ILLEGAL_CHARS.sub(lambda m: f'_x{ord(m.group()):04X}_', text)
+        return text
+
+    def _cell(self, ref: str, value: Any, style: int) -> str:
+        """单元格XML，style为0时按值的类型选择日期格式"""
+        from datetime import time as time_of_day, timedelta
+
+        if isinstance(value, str):
+            s = f' s="{style}"' if style else ''
+            if self.is_formula(value):
+                return f'<c r="{ref}"{s}><f>{self._text(value[1:])}</f><v></v></c>'
+            space = ' xml:space="preserve"' if value[:1].isspace() or value[-1:].isspace() else ''
+            return f'<c r="{ref}"{s} t="inlineStr"><is><t{space}>{self._text(value)}</t></is></c>'
+        if isinstance(value, bool):
+            kind, number = ' t="b"', str(int(value))
+        elif isinstance(value, (int, float)):
+            if value != value or value in (float('inf'), float('-inf')):
+                return self._cell(ref, str(value), style)
+            kind, number = '', repr(value) if isinstance(value, float) else str(value)
+        elif isinstance(value, datetime):
+            if value.tzinfo is not None:
+                raise TypeError("Excel不支持带时区的日期时间，请先移除时区信息")
+            kind, number = '', repr((value - self._EPOCH) / timedelta(days=1))
+            style = style or self._STYLE_DATETIME
+        elif isinstance(value, date):
+            kind, number = '', str((value - self._EPOCH.date()).days)
+            style = style or self._STYLE_DATE
+        elif isinstance(value, time_of_day):
+            seconds = value.hour * 3600 + value.minute * 60 + value.second + value.microsecond / 1e6
+            kind, number = '', repr(seconds / 86400)
+            style = style or self._STYLE_TIME
+        elif isinstance(value, timedelta):
+            kind, number = '', repr(value / timedelta(days=1))
+            style = style or self._STYLE_DURATION
+        else:
+            try:
+                # numpy/Decimal等数值类型
+                return self._cell(ref, float(value), style)
+            except (TypeError, ValueError):
+                return self._cell(ref, str(value), style)
+        s = f' s="{style}"' if style else ''
+        return f'<c r="{ref}"{s}{kind}><v>{number}</v></c>'
+
+    def _append(self, row, styled: bool) -> None:
+        self.rows_written += 1
+        r = self.rows_written
+        style = self._STYLE_HEADER if styled else 0
+        cells = []
+        for i, value in enumerate(row):
+            if value is not None:
+                cells.append(self._cell(f'{self._letter(i)}{r}', value, style))
+            elif styled:
+                cells.append(f'<c r="{self._letter(i)}{r}" s="{style}"/>')
+        self._write(f'<row r="{r}">{"".join(cells)}</row>')
+
+    def save(self) -> None:
+        """写完工作表XML并关闭压缩包"""
+        with profiler.phase('save_workbook'):
+            self._write('</sheetData></worksheet>')
+            self._flush()
+            self._stream.close()
+            self._archive.close()
+
+
+class XlsxBackendRegistry:
+    """.xlsx写入后端注册表
+
+    BACKENDS按写出速度从快到慢排列，默认（auto）选择第一个已安装且具备作业所需全部能力的后端。
+    通过--xlsx-writer指定的后端缺少所需能力或未安装时，改为自动选择并给出提示。
+    选择保存在环境变量中，并行写出的子进程会沿用主进程的设置。
+    """
+
+    BACKENDS = (RawXmlExcelWriter, XlsxWriterExcelWriter, StreamingExcelWriter)
+    ENV_VAR = 'EXCEL_XLSX_WRITER'
+    AUTO = 'auto'
+
+    def names(self) -> List[str]:
+        return [backend.NAME for backend in self.BACKENDS]
+
+    def configure(self, name: str = AUTO) -> None:
+        """设置要使用的后端（auto为自动选择）"""
+        if name != self.AUTO and name not in self.names():
+            raise ValueError(f"未知的.xlsx写入后端: {name}（可选：{self.AUTO}、{'、'.join(self.names())}）")
+        os.environ[self.ENV_VAR] = name
+
+    def choose(self, needs: Iterable[str] = ()) -> type:
+        """返回满足needs的后端类"""
+        needs = tuple(needs)
+        preferred = os.environ.get(self.ENV_VAR, self.AUTO)
+        if preferred != self.AUTO:
+            backend = next((backend for backend in self.BACKENDS if backend.NAME == preferred), None)
+            if backend is not None and backend.available() and backend.supports(needs):
+                return backend
+            reason = "未安装" if backend is not None and not backend.available() else f"不支持{'、'.join(needs)}"
+            print(f"[写入] .xlsx写入后端{preferred}{reason}，改为自动选择")
+        for backend in self.BACKENDS:
+            if backend.available() and backend.supports(needs):
+                return backend
+        raise RuntimeError(f"没有可用的.xlsx写入后端支持: {'、'.join(needs)}")
+
+    def describe(self) -> List[str]:
+        """各后端的能力说明"""
+        lines = []
+        for backend in self.BACKENDS:
+            caps = backend.CAPABILITIES
+            features = [name for name in ('header_style', 'column_widths', 'formulas') if caps.get(name)]
+            state = '' if backend.available() else f"（未安装{backend.REQUIRES}）"
+            lines.append(f"{backend.NAME}{state}: 支持{'、'.join(features)}；内存{caps['memory']}，"
+                         f"{'经临时文件' if caps['temp_file'] else '直接写入压缩包'}")
+        return lines
+
+
+xlsx_backends = XlsxBackendRegistry()
+
+
+class StreamingCsvWriter:
+    """CSV流式写入工具类
+
+    接口与.xlsx写入后端（ExcelWriterBackend）一致，逐行写入带BOM的UTF-8 CSV（Excel可直接识别中文），行数据直接落盘。
+    日期按与.xlsx输出相同的显示格式写为文本，缺失值写为空字段。
+    """
+
+    DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+    def __init__(self, output_file: str, append: bool = False):
+        import csv
+
+        self.output_file = output_file
+        self.rows_written = 0
+        self.header_rows = 0
+        # 追加到非空文件时不会再写入BOM
+        self._file = open(output_file, 'a' if append else 'w', encoding='utf-8-sig', newline='')
+        self._writer = csv.writer(self._file)
+
+    def write_header(self, header, styled: bool = False) -> None:
+        """写入表头行（CSV没有格式，忽略styled）"""
+        self.append(header)
+        self.header_rows = 1
+
+    def append(self, row) -> None:
+        """追加一行"""
+        if any(isinstance(value, date) for value in row):
+            row = [value.strftime(self.DATETIME_FORMAT) if isinstance(value, datetime)
+                   else value.isoformat() if isinstance(value, date) else value for value in row]
+        self._writer.writerow(row)
+        self.rows_written += 1
+
+    def append_dataframe(self, df: pd.DataFrame) -> None:
+        """追加DataFrame数据（不含列名），由pandas整块格式化写出"""
+        df.to_csv(self._file, header=False, index=False, lineterminator='\r\n', date_format=self.DATETIME_FORMAT)
+        self.rows_written += len(df)
+
+    def save(self) -> None:
+        """关闭输出文件"""
+        self._file.close()
+
+
+class StreamingParquetWriter:
+    """Parquet流式写入工具类
+
+    接口与.xlsx写入后端（ExcelWriterBackend）一致，行数据每攒够ROW_GROUP_ROWS行写出一个行组，内存占用与文件行数无关。
+    列名取自构造时传入的表头：Parquet的列名属于schema，write_header不写入数据行。
+    各列类型在第一次写出时确定：布尔、数值（统一为float64，与Excel的数值存储一致）、日期时间，其余为文本；
+    之后写出的数据按该类型转换，无法转换时报错。需要安装pyarrow。
+    """
+
+    ROW_GROUP_ROWS = 65536
+
+    def __init__(self, output_file: str, columns: List[Any]):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise RuntimeError("Parquet输出需要安装pyarrow（pip install pyarrow）")
+        self.output_file = output_file
+        self.columns = [str(name) for name in columns]
+        self.rows_written = 0
+        self.header_rows = 0
+        self._rows = []
+        self._kinds: Optional[List[str]] = None
+        self._writer = None
+
+    def write_header(self, header, styled: bool = False) -> None:
+        """列名已在构造时确定，不写入数据行"""
+
+    def append(self, row) -> None:
+        """追加一行"""
+        self._rows.append(row)
+        self.rows_written += 1
+        if len(self._rows) >= self.ROW_GROUP_ROWS:
+            self._flush_rows()
+
+    @staticmethod
+    def _infer_kind(values) -> str:
+        """推断列类型：bool、float64、timestamp或string。values为值列表，或数值/布尔/日期类型的pandas.Series"""
+        dtype = getattr(values, 'dtype', None)
+        if dtype is not None:
+            return {'b': 'bool', 'i': 'float64', 'u': 'float64', 'f': 'float64', 'M': 'timestamp'}[dtype.kind]
+        kinds = set()
+        for value in values:
+            if value is None or (isinstance(value, float) and value != value):
+                continue
+            if isinstance(value, bool):
+                kinds.add('bool')
+            elif isinstance(value, (int, float)):
+                kinds.add('float64')
+            elif isinstance(value, date):
+                kinds.add('timestamp')
+            else:
+                return 'string'
+        return kinds.pop() if len(kinds) == 1 else 'string'
+
+    def _array(self, values, kind: str, column: str):
+        import pyarrow as pa
+
+        try:
+            dtype = getattr(values, 'dtype', None)
+            if dtype is not None:
+                # pandas.Series整列转换，不逐个处理值
+                if kind == 'float64' and dtype.kind in 'iufb':
+                    return pa.array(values.astype('float64'), from_pandas=True)
+                if kind == 'timestamp' and dtype.kind == 'M':
+                    return pa.array(values, from_pandas=True).cast(pa.timestamp('us'), safe=False)
+                if kind == 'bool' and dtype.kind == 'b':
+                    return pa.array(values, from_pandas=True)
+                values = values.astype(object).where(values.notna(), None).tolist()
+            if kind == 'float64':
+                return pa.array([None if value is None else float(value) for value in values], type=pa.float64(),
+                                from_pandas=True)
+            if kind == 'bool':
+                return pa.array(values, type=pa.bool_())
+            if kind == 'timestamp':
+                return pa.array([datetime(v.year, v.month, v.day) if isinstance(v, date) and not isinstance(v, datetime)
+                                 else v for v in values], type=pa.timestamp('us'))
+        except (TypeError, ValueError, pa.ArrowException) as e:
+            raise ValueError(f"Parquet输出的列“{column}”类型为{kind}，后续数据中出现了无法转换的值: {e}")
+        return pa.array([None if value is None or (isinstance(value, float) and value != value)
+                         else value if isinstance(value, str) else str(value) for value in values], type=pa.string())
+
+    def _write_columns(self, columns: List[List[Any]]) -> None:
+        """按已确定的列类型写出一个行组，第一次写出时推断列类型并创建文件"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self._kinds is None:
+            self._kinds = [self._infer_kind(values) for values in columns]
+        types = {'float64': pa.float64(), 'bool': pa.bool_(), 'timestamp': pa.timestamp('us'), 'string': pa.string()}
+        schema = pa.schema([pa.field(name, types[kind]) for name, kind in zip(self.columns, self._kinds)])
+        arrays = [self._array(values, kind, name) for values, kind, name in zip(columns, self._kinds, self.columns)]
+        with profiler.phase('write_parquet'):
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.output_file, schema, compression='snappy')
+            self._writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+    def _flush_rows(self) -> None:
+        if not self._rows:
+            return
+        width = len(self.columns)
+        for row in self._rows:
+            if len(row) > width and any(value is not None for value in row[width:]):
+                raise ValueError(f"Parquet输出的数据行列数({len(row)})多于表头({width})")
+        columns = [[row[i] if i < len(row) else None for row in self._rows] for i in range(width)]
+        self._rows = []
+        self._write_columns(columns)
+
+    def append_dataframe(self, df: pd.DataFrame) -> None:
+        """追加DataFrame数据（不含列名），缺失值写为空值
+
+        数值、布尔和日期列整列转换，其余列（文本、分类、混合类型）按值转换。
+        """
+        self._flush_rows()
+        for start in range(0, len(df), self.ROW_GROUP_ROWS):
+            part = df.iloc[start:start + self.ROW_GROUP_ROWS]
+            columns = []
+            for i in range(len(self.columns)):
+                column = part.iloc[:, i]
+                if column.dtype.kind not in 'biufM':
+                    column = column.astype(object).where(column.notna(), None).tolist()
+                columns.append(column)
+            self._write_columns(columns)
+        self.rows_written += len(df)
+
+    def copy_from(self, source) -> None:
+        """复制已有Parquet文件（pyarrow.parquet.ParquetFile）的全部行组并沿用其列类型，之后可继续追加"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        kinds = {pa.float64(): 'float64', pa.bool_(): 'bool', pa.timestamp('us'): 'timestamp'}
+        schema = source.schema_arrow
+        self._kinds = [kinds.get(field.type, 'string') for field in schema]
+        self._writer = pq.ParquetWriter(self.output_file, schema, compression='snappy')
+        for i in range(source.num_row_groups):
+            table = source.read_row_group(i)
+            self._writer.write_table(table)
+            self.rows_written += table.num_rows
+
+    def save(self) -> None:
+        """写出剩余的行并关闭文件，没有数据行时写出只有列定义的文件"""
+        self._flush_rows()
+        if self._writer is None:
+            self._write_columns([[] for _ in self.columns])
+        self._writer.close()
+
+
+OUTPUT_FORMATS = ('xlsx', 'csv', 'parquet')
+
+
+def open_table_writer(output_file: str, output_format: str = 'xlsx', columns: Optional[List[Any]] = None,
+                      sheet_title: str = 'Sheet1', needs: Iterable[str] = (),
+                      column_widths: Optional[Dict[str, float]] = None):
+    """按输出格式创建流式写入器，各写入器都提供write_header/append/append_dataframe/save
+
+    columns为Parquet的列名，.xlsx和CSV忽略该参数（是否写入表头行由调用方通过write_header决定）。
+    .xlsx由xlsx_backends选择满足needs（如header_style）的最快后端，column_widths为{列字母: 列宽}；
+    CSV/Parquet只包含单元格值，忽略格式相关的参数。
+    """
+    if output_format == 'csv':
+        return StreamingCsvWriter(output_file)
+    if output_format == 'parquet':
+        return StreamingParquetWriter(output_file, columns or [])
+    needs = tuple(needs) + (('column_widths',) if column_widths else ())
+    backend = xlsx_backends.choose(needs)
+    return backend(output_file, sheet_title=sheet_title, column_widths=column_widths)
+
+
+def reopen_table_writer(output_file: str, output_format: str = 'xlsx', rows: int = 0):
+    """重新打开已有的输出文件以追加数据行，返回的写入器已计入原有的全部行
+
+    CSV以追加模式直接打开原文件，rows为原文件的总行数（含表头行）；.xlsx和Parquet无法原地追加，
+    先将原有的行流式复制到临时文件再继续写入，保存后由调用方用写入器的output_file替换原文件。
+    """
+    if output_format == 'csv':
+        writer = StreamingCsvWriter(output_file, append=True)
+        writer.rows_written, writer.header_rows = rows, 1
+        return writer
+    temp_file = os.path.splitext(output_file)[0] + '.tmp' + output_extension(output_format)
+    if output_format == 'parquet':
+        import pyarrow.parquet as pq
+
+        source = pq.ParquetFile(output_file)
+        writer = StreamingParquetWriter(temp_file, source.schema_arrow.names)
+        writer.copy_from(source)
+        return writer
+
+    writer = open_table_writer(temp_file, output_format)
+    for i, row in enumerate(StreamingExcelReader.iter_xlsx_rows(output_file)):
+        if i == 0:
+            writer.write_header(row)
+        else:
+            writer.append(row)
+    return writer
+
+
+def output_extension(output_format: str) -> str:
+    """输出格式对应的文件扩展名"""
+    return f'.{output_format}'
+
+
+def with_output_extension(output_file: str, output_format: str = 'xlsx') -> str:
+    """返回扩展名与输出格式一致的输出路径：已有表格类扩展名（.xls/.csv等）时替换，否则追加"""
+    extension = output_extension(output_format)
+    root, current = os.path.splitext(output_file)
+    if current.lower() == extension:
+        return output_file
+    if current.lower() in ('.xls',) + tuple(output_extension(fmt) for fmt in OUTPUT_FORMATS):
+        return root + extension
+    return output_file + extension
+
+
+def temp_output_path(output_file: str) -> str:
+    """输出文件写入过程中使用的临时路径
+
+    位于同一目录（重命名不跨文件系统），以.开头（glob('*.xlsx')等不会匹配到），并保留扩展名（pandas按扩展名选择写入引擎）。
+    """
+    directory, name = os.path.split(output_file)
+    root, extension = os.path.splitext(name)
+    return os.path.join(directory, f'.{root}.tmp{extension}')
+
+
+@contextlib.contextmanager
+def atomic_output(output_file: str) -> Iterator[str]:
+    """原子写出：产出临时路径供写入，写完后重命名为output_file，写入失败时删除临时文件
+
+    进程在写入中途被终止时只会留下隐藏的临时文件，不会出现截断的输出文件。
+    """
+    temp_file = temp_output_path(output_file)
+    try:
+        yield temp_file
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temp_file)
+        raise
+    os.replace(temp_file, output_file)
+
+
+class ByteBudget:
+    """按输出文件大小上限划分分块
+
+    每行渲染成近似的单元格XML后送入与输出相同级别的deflate压缩流，每攒够FLUSH_SIZE字节同步刷新一次，
+    得到当前分块压缩后的字节数；乘以缩放系数并加上与行数无关的固定开销（样式、包结构等）即为输出大小的估算值。
+    压缩量随内容实时变化，行宽或内容变化时分块边界随之调整，不需要写出后再二次拆分。
+    缩放系数先由样本校准，之后每写完一个文件按实际大小修正：变大时立即采用，变小时逐步回落。
+    """
+
+    MIN_BYTES = 4096
+    # 估算值只使用上限的一部分，为缩放系数的波动留出余量
+    SAFETY = 0.9
+    FLUSH_SIZE = 4096
+    SAMPLE_ROWS = 500
+
+    def __init__(self, max_bytes: int, max_rows: Optional[int] = None, output_format: str = 'xlsx'):
+        self.max_bytes = max_bytes
+        self.max_rows = max_rows
+        self.output_format = output_format
+        # CSV不压缩，以不压缩的deflate流（级别0）按原始字节数估算
+        self.level = 0 if output_format == 'csv' else 1
+        self.overhead = 0
+        self.scale = 1.0
+        self._chunks = {}
+        # 最近一个刷新窗口的压缩比，用于估算尚未刷新的部分
+        self._window_ratio = 1.0
+        self._reset()
+
+    def _reset(self) -> None:
+        import zlib
+        self._compressor = zlib.compressobj(self.level)
+        self._compressed = 0
+        self._unflushed = 0
+        self._window_start = 0
+        self._rows = 0
+
+    @staticmethod
+    def encode_row(values: Iterable[Any]) -> bytes:
+        """将一行单元格值渲染成近似的工作表XML，用于估算大小"""
+        return ('<row>' + ''.join(f'<c><v>{value}</v></c>' for value in values
+                                  if value is not None and value != '') + '</row>').encode('utf-8')
+
+    def estimate(self) -> float:
+        """当前分块压缩后的估算字节数（未缩放）"""
+        return self._compressed + self._unflushed * self._window_ratio
+
+    def fits(self, row: bytes) -> bool:
+        """当前分块加入该行后是否仍在上限内；空分块总能加入一行（单行超过上限时单独成为一个文件）"""
+        if self._rows == 0:
+            return True
+        if self.max_rows is not None and self._rows >= self.max_rows:
+            return False
+        size = self.overhead + (self.estimate() + len(row) * self._window_ratio) * self.scale
+        return size <= self.max_bytes * self.SAFETY
+
+    def add(self, row: bytes) -> None:
+        import zlib
+        self._compressed += len(self._compressor.compress(row))
+        self._unflushed += len(row)
+        self._rows += 1
+        if self._unflushed >= self.FLUSH_SIZE:
+            self._compressed += len(self._compressor.flush(zlib.Z_SYNC_FLUSH))
+            self._window_ratio = (self._compressed - self._window_start) / self._unflushed
+            self._window_start = self._compressed
+            self._unflushed = 0
+
+    def add_extra(self, data: bytes) -> None:
+        """计入与行无关、随分块内容增长的字节（如分块新用到的共享字符串），不计为一行"""
+        rows = self._rows
+        self.add(data)
+        self._rows = rows
+
+    def close_chunk(self, output_file: str) -> None:
+        """结束当前分块，记录其估算字节数，待文件写出后由observe修正缩放系数"""
+        self._chunks[output_file] = self.estimate()
+        self._reset()
+
+    def observe(self, output_file: str, rows: int = 0) -> None:
+        """按写出文件的实际大小修正缩放系数，参数与进度事件的output_written一致"""
+        estimate = self._chunks.pop(output_file, 0)
+        try:
+            size = os.path.getsize(output_file)
+        except OSError:
+            return
+        if size > self.max_bytes:
+            print(f"警告：{os.path.basename(output_file)} 实际大小 {size} 字节，超过上限 {self.max_bytes} 字节")
+        # 数据太少时固定开销占主导，修正结果不可靠
+        if estimate < self.FLUSH_SIZE:
+            return
+        observed = max(size - self.overhead, 0) / estimate
+        self.scale = observed if observed > self.scale else (self.scale + observed) / 2
+
+    def calibrate(self, header: List[Any], sample_rows: List[Any], copy_headers: bool,
+                  log_prefix: str = '[拆分]') -> None:
+        """将表头和样本行写入与输出格式相同的临时文件，测得固定开销和缩放系数"""
+        import tempfile
+        with tempfile.TemporaryDirectory() as tmp:
+            sizes = []
+            for rows in ([], sample_rows):
+                path = os.path.join(tmp, f'sample{len(sizes)}{output_extension(self.output_format)}')
+                writer = open_table_writer(path, self.output_format, header)
+                if copy_headers:
+                    writer.write_header(header)
+                for row in rows:
+                    writer.append(row)
+                writer.save()
+                sizes.append(os.path.getsize(path))
+        self.overhead = sizes[0]
+        for row in sample_rows:
+            self.add(ByteBudget.encode_row(row))
+        estimate = self.estimate()
+        self._reset()
+        if estimate:
+            self.scale = max(sizes[1] - sizes[0], 0) / estimate or self.scale
+        print(f"{log_prefix} 按大小拆分: 上限 {format_bytes(self.max_bytes)}，"
+              f"估算固定开销 {format_bytes(self.overhead)}，缩放系数 {self.scale:.2f}")
+
+
+def parse_byte_size(text: str) -> int:
+    """解析字节数参数，支持KB/MB/GB后缀（按1024进位），例如 20MB、512KB、1.5GB"""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMG]?)I?B?\s*', str(text), re.IGNORECASE)
+    if not match:
+        raise ValueError(f"无法识别的大小: {text}")
+    unit = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}[match.group(2).upper()]
+    return int(float(match.group(1)) * unit)
+
+
+def parse_row_range(text: str) -> Tuple[int, Optional[int]]:
+    """解析数据行范围参数，例如 500000:600000、:1000、500000:，单个数字表示只选一行"""
+    match = re.fullmatch(r'\s*(\d*)\s*(?::\s*(\d*))?\s*', str(text))
+    if not match or not (match.group(1) or match.group(2)):
+        raise ValueError(f"无法识别的行范围: {text}")
+    first = int(match.group(1)) if match.group(1) else 1
+    if match.group(2) is None:
+        last = first
+    else:
+        last = int(match.group(2)) if match.group(2) else None
+    if first < 1 or (last is not None and last < first):
+        raise ValueError(f"无效的行范围: {text}（行号从1开始，结束行不能小于起始行）")
+    return first, last
+
+
+def format_bytes(size: int) -> str:
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.0f}{unit}" if unit == 'B' else f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}GB"
+
+
+class PartitionWriter:
+    """按键分区写出工具类
+
+    输入只遍历一次，每行按键路由到对应的输出文件。最多同时打开max_open个输出（只写模式，行数据随写随落盘），
+    其余键的行先缓存在内存中，缓存总行数达到max_buffered_rows时按键追加到临时溢出文件；
+    结束时先保存已打开的输出，再逐个键回放溢出文件和缓存生成其余输出。同一键内的行顺序与输入一致。
+    输出对象由open_output(输出文件)创建，需提供append(行)和save()。
+    """
+
+    DEFAULT_MAX_OPEN = 32
+    DEFAULT_MAX_BUFFERED_ROWS = 100000
+    # Windows文件名中不允许的字符
+    _INVALID_CHARS = re.compile(r'[\\/:*?"<>|\x00-\x1f]')
+    _MAX_NAME_LENGTH = 80
+
+    def __init__(self, output_dir: str, base_name: str, open_output: Callable[[str], Any],
+                 max_open: int = DEFAULT_MAX_OPEN, max_buffered_rows: Optional[int] = None,
+                 log_prefix: str = '[拆分]', extension: str = '.xlsx'):
+        self.output_dir = output_dir
+        self.extension = extension
+        self.base_name = base_name
+        self.open_output = open_output
+        self.max_open = max_open
+        self.max_buffered_rows = max_buffered_rows or self.DEFAULT_MAX_BUFFERED_ROWS
+        self.log_prefix = log_prefix
+        # 键 -> 数据行数，按首次出现的顺序
+        self._counts: Dict[str, int] = {}
+        self._files: Dict[str, str] = {}
+        self._used_names = set()
+        self._open: Dict[str, Any] = {}
+        self._buffers: Dict[str, List[Any]] = {}
+        self._buffered = 0
+        self._added = 0
+        self._spilled: Dict[str, str] = {}
+        self._spill_dir: Optional[str] = None
+
+    @staticmethod
+    def key_text(value: Any) -> str:
+        """将分区列的值规整为键：缺失值为空字符串，整数值的浮点数去掉小数部分"""
+        if value is None:
+            return ''
+        if isinstance(value, float):
+            if value != value:
+                return ''
+            if value.is_integer():
+                return str(int(value))
+        if isinstance(value, datetime) and value == datetime(value.year, value.month, value.day):
+            return value.date().isoformat()
+        return str(value).strip()
+
+    @staticmethod
+    def column_index(header: List[Any], column: str) -> int:
+        """按列名查找分区列的位置"""
+        names = [str(name) for name in header]
+        if column not in names:
+            raise ValueError(f"未找到分区列: {column}，可用的列: {', '.join(names)}")
+        return names.index(column)
+
+    def _output_file(self, key: str) -> str:
+        """为键生成不重复的输出文件路径（文件名忽略大小写比较）"""
+        name = self._INVALID_CHARS.sub('_', key)[:self._MAX_NAME_LENGTH].strip(' .') or '空值'
+        candidate, n = name, 1
+        while candidate.lower() in self._used_names:
+            n += 1
+            candidate = f'{name}_{n}'
+        self._used_names.add(candidate.lower())
+        return os.path.join(self.output_dir, f'{self.base_name}_{candidate}{self.extension}')
+
+    def add(self, key: str, row: Any) -> None:
+        """将一行写入键对应的输出"""
+        if key not in self._counts:
+            self._counts[key] = 0
+            self._files[key] = self._output_file(key)
+            if len(self._open) < self.max_open:
+                self._open[key] = self.open_output(self._files[key])
+        self._counts[key] += 1
+        self._added += 1
+        if self._added % events.ROW_STEP == 0:
+            events.writing(events.ROW_STEP)
+        output = self._open.get(key)
+        if output is not None:
+            output.append(row)
+            return
+        self._buffers.setdefault(key, []).append(row)
+        self._buffered += 1
+        if self._buffered >= self.max_buffered_rows:
+            self._spill()
+
+    def _spill(self) -> None:
+        """把各键缓存的行追加到各自的溢出文件"""
+        import pickle
+        import tempfile
+
+        with profiler.phase('partition_spill'):
+            if self._spill_dir is None:
+                self._spill_dir = tempfile.mkdtemp(prefix='.partition_', dir=self.output_dir)
+            for key, rows in self._buffers.items():
+                path = self._spilled.setdefault(key, os.path.join(self._spill_dir, f'{len(self._spilled)}.pkl'))
+                with open(path, 'ab') as f:
+                    pickle.dump(rows, f, protocol=pickle.HIGHEST_PROTOCOL)
+            self._buffers.clear()
+            self._buffered = 0
+
+    def _replay(self, key: str) -> Iterator[Any]:
+        import pickle
+
+        path = self._spilled.get(key)
+        if path is not None:
+            with open(path, 'rb') as f:
+                while True:
+                    try:
+                        yield from pickle.load(f)
+                    except EOFError:
+                        break
+        yield from self._buffers.pop(key, ())
+
+    def _finish(self, key: str, output: Any) -> Tuple[str, int]:
+        output.save()
+        output_file, rows = self._files[key], self._counts[key]
+        print(f"{self.log_prefix} 完成: {os.path.basename(output_file)} ({rows}行)")
+        events.output_written(output_file, rows)
+        return output_file, rows
+
+    def close(self) -> List[Tuple[str, int]]:
+        """保存所有分区输出，返回各输出文件的(路径, 数据行数)，顺序与键首次出现的顺序一致"""
+        outputs = {}
+        try:
+            for key, output in self._open.items():
+                outputs[key] = self._finish(key, output)
+            self._open.clear()
+            for key in self._counts:
+                if key in outputs:
+                    continue
+                output = self.open_output(self._files[key])
+                for row in self._replay(key):
+                    output.append(row)
+                outputs[key] = self._finish(key, output)
+        finally:
+            self.cleanup()
+        return [outputs[key] for key in self._counts]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cleanup()
+
+    def cleanup(self) -> None:
+        """删除溢出文件"""
+        import shutil
+
+        if self._spill_dir is not None:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+
+    def summary(self) -> str:
+        return (f"{len(self._counts)}个分区，同时打开的输出不超过{self.max_open}个，"
+                f"溢出到临时文件的分区 {len(self._spilled)}个")
+
+
+class ParallelChunkWriter:
+    """有界并行写出工具类
+
+    将分块写出任务交给进程池执行，同时在途的任务数不超过进程数，
+    以控制内存占用；结果按提交顺序交给回调处理，保证日志顺序确定。
+    workers为1时直接在当前进程中执行。
+    提交时指定output=(输出文件, 数据行数)的任务，完成后上报进度事件，并调用on_output(输出文件, 数据行数)。
+    """
+
+    def __init__(self, workers: int, on_result: Optional[Callable[[Any], None]] = None,
+                 on_output: Optional[Callable[[str, int], None]] = None):
+        self.workers = workers
+        self.on_result = on_result or ParallelChunkWriter.print_messages
+        self.on_output = on_output
+        self._executor = None
+        if workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            self._executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_pool_process)
+        self._pending = deque()
+
+    @staticmethod
+    def print_messages(messages: List[str]) -> None:
+        """默认回调：依次输出任务返回的日志"""
+        for message in messages:
+            print(message)
+
+    def submit(self, func: Callable, *args, output: Optional[Tuple[str, int]] = None) -> None:
+        """提交任务，在途任务已满时先等待最早提交的任务完成"""
+        if self._executor is None:
+            with profiler.phase('write_chunk'):
+                result = func(*args)
+            self._complete(result, output)
+            return
+        while len(self._pending) >= self.workers:
+            self._complete(*self._pop_result())
+        self._pending.append((self._executor.submit(func, *args), output))
+
+    def close(self) -> None:
+        """等待所有任务完成并关闭进程池"""
+        try:
+            while self._pending:
+                self._complete(*self._pop_result())
+        finally:
+            self._shutdown()
+
+    def _pop_result(self) -> Tuple[Any, Optional[Tuple[str, int]]]:
+        future, output = self._pending.popleft()
+        with profiler.phase('wait_workers'):
+            return future.result(), output
+
+    def _complete(self, result: Any, output: Optional[Tuple[str, int]]) -> None:
+        self.on_result(result)
+        if output is not None:
+            events.output_written(*output)
+            if self.on_output is not None:
+                self.on_output(*output)
+
+    def _shutdown(self) -> None:
+        if self._executor is not None:
+            for future, _ in self._pending:
+                future.cancel()
+            self._pending.clear()
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._shutdown()
+
+
+def _init_pool_process() -> None:
+    """进程池子进程的初始化函数：恢复解释器原始的标准输出/标准错误，并关闭继承来的进度事件
+
+    fork方式启动的子进程会继承父进程中替换过的sys.stdout/sys.stderr（如常驻工作进程的_JobOutput，
+    其写入的是协议流），恢复后子进程中意外的输出写到原始句柄，不会混入父进程的协议流；
+    进度统一由主进程在输出文件写完时上报，子进程不输出进度事件。
+    """
+    sys.stdout = sys.__stdout__
+    sys.stderr = sys.__stderr__
+    events.configure()
+
+
+def _call_capturing_output(func: Callable, item: Any) -> Tuple[str, Any]:
+    """在子进程中执行func(item)，同时收集其标准输出，以便由主进程按顺序回放"""
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        result = func(item)
+    return buffer.getvalue(), result
+
+
+def _call_sheet_task(task: Tuple[Callable, tuple, Dict[str, Any]]) -> bool:
+    """执行单个工作表的处理任务，返回是否成功（入口函数以sys.exit结束或抛出异常时错误信息已输出）"""
+    func, args, kwargs = task
+    try:
+        func(*args, **kwargs)
+    except SystemExit as e:
+        return not e.code
+    except Exception as e:
+        print(f"错误: {e}")
+        return False
+    return True
+
+
+def run_sheet_tasks(tasks: List[Tuple[Callable, tuple, Dict[str, Any]]], workers: int) -> bool:
+    """处理多个工作表，tasks为(函数, 位置参数, 关键字参数)列表，返回是否全部成功
+
+    workers大于1时各工作表在进程池中并行处理，日志按工作表顺序输出；一个工作表失败不影响其他工作表。
+    """
+    results = ParallelFileParser(min(workers, len(tasks))).imap(_call_sheet_task, tasks)
+    return all([ok for ok in results])
+
+
+class ParallelFileParser:
+    """有序并行解析工具类
+
+    在进程池中预先解析后续文件，结果按输入顺序逐个产出。调用方处理（写出）
+    当前结果时，进程池继续解析后面的文件，解析与写出互相重叠；
+    在途任务数限制为进程数的两倍，避免解析结果在内存中无限堆积。
+    workers为1时在当前进程中逐个解析。
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+
+    def imap(self, func: Callable, items: List[Any]) -> Iterator[Any]:
+        """按items顺序产出func(item)的结果"""
+        if self.workers <= 1:
+            for item in items:
+                yield func(item)
+            return
+
+        max_pending = self.workers * 2
+        pending = deque()
+        item_iter = iter(items)
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_pool_process) as executor:
+            try:
+                for item in item_iter:
+                    pending.append(executor.submit(_call_capturing_output, func, item))
+                    if len(pending) >= max_pending:
+                        break
+                while pending:
+                    output, result = pending.popleft().result()
+                    # 先补充新任务再交出结果，使进程池在调用方写出期间保持忙碌
+                    for item in item_iter:
+                        pending.append(executor.submit(_call_capturing_output, func, item))
+                        break
+                    if output:
+                        sys.stdout.write(output)
+                    yield result
+            finally:
+                for future in pending:
+                    future.cancel()
 
 
 class ProgressReporter:
@@ -267,6 +2325,301 @@ class ProgressReporter:
         print(f"正在处理第{current}/{total}个文件{file_info}...")
 
 
+def _peak_rss_mb() -> Optional[float]:
+    """当前进程的峰值常驻内存（MB），无法获取时返回None"""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS以字节为单位，Linux以KB为单位
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD)] + [
+                (name, ctypes.c_size_t) for name in (
+                    'PeakWorkingSetSize', 'WorkingSetSize', 'QuotaPeakPagedPoolUsage', 'QuotaPagedPoolUsage',
+                    'QuotaPeakNonPagedPoolUsage', 'QuotaNonPagedPoolUsage', 'PagefileUsage', 'PeakPagefileUsage')]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        handle = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            return counters.PeakWorkingSetSize / (1024 * 1024)
+    except (AttributeError, OSError):
+        pass
+    return None
+
+
+class ProgressEvents:
+    """结构化进度事件
+
+    --events json时以JSON行输出阶段开始/结束事件、节流后的进度事件和每个输出文件写出后的output事件，
+    便于界面显示真实进度，也便于在日志中定位耗时的阶段；默认的text模式不输出任何事件，日志与原来一致。
+    进度事件每隔interval秒最多输出一次，阶段结束事件总是输出并带有该阶段的最终统计。
+    行数只统计已写出（或已读取）的数据行；峰值内存为主进程的峰值常驻内存。
+    """
+
+    INTERVAL = 0.5
+    MODES = ('text', 'json')
+    # 拆分的逐行循环每处理ROW_STEP行调用一次writing
+    ROW_STEP = 2000
+
+    def __init__(self):
+        self.configure()
+
+    def configure(self, mode: str = 'text', interval: float = INTERVAL) -> None:
+        """设置输出模式并清空状态，每次运行入口脚本时调用"""
+        self.enabled = mode == 'json'
+        self.interval = interval
+        self._phase = None
+
+    def phase_start(self, phase: str, total_rows: Optional[int] = None) -> None:
+        """开始一个阶段（读取、拆分、合并、保存等），total_rows已知时用于计算预计剩余时间"""
+        if self._phase is not None:
+            self.phase_end()
+        now = time.perf_counter()
+        self._phase = phase
+        self._total_rows = total_rows
+        self._rows = 0
+        self._writing = 0
+        self._bytes = 0
+        self._started = now
+        self._last_emit = now
+        profiler.begin(phase)
+        self._emit({'type': 'phase_start', 'phase': phase, 'total_rows': total_rows})
+
+    def advance(self, rows: int = 0, bytes_written: int = 0) -> None:
+        """累计当前阶段处理的行数和写出的字节数，距上次进度事件超过interval时输出进度事件"""
+        if self._phase is None:
+            return
+        self._rows += rows
+        self._bytes += bytes_written
+        self._tick()
+
+    def writing(self, rows: int) -> None:
+        """又有rows行数据分派到尚未写完的输出文件，使单个大分块写出期间的进度事件也随之更新
+
+        这些行在所属文件写完、调用output_written时转为已完成的行数，不会重复统计；
+        调用方可以每隔若干行汇报一次，未汇报的行在output_written时抵扣。
+        """
+        if self._phase is None:
+            return
+        self._writing += rows
+        self._tick()
+
+    def output_written(self, output_file: str, rows: int) -> None:
+        """一个输出文件写出完成，累计到当前阶段并输出该文件的output事件"""
+        try:
+            size = os.path.getsize(output_file)
+        except OSError:
+            size = 0
+        if self._phase is not None:
+            self._writing -= rows
+        self.advance(rows, size)
+        self._emit({'type': 'output', 'phase': self._phase, 'path': output_file, 'rows': rows, 'bytes': size})
+
+    def phase_end(self) -> None:
+        """结束当前阶段并输出该阶段的最终统计"""
+        if self._phase is None:
+            return
+        self._emit(self._stats('phase_end', time.perf_counter()))
+        profiler.end(self._phase)
+        self._phase = None
+
+    def _tick(self) -> None:
+        now = time.perf_counter()
+        if now - self._last_emit >= self.interval:
+            self._last_emit = now
+            self._emit(self._stats('progress', now))
+
+    def _stats(self, event_type: str, now: float) -> Dict[str, Any]:
+        elapsed = now - self._started
+        rows = self._rows + max(0, self._writing)
+        rows_per_sec = rows / elapsed if elapsed > 0 else None
+        eta = None
+        if self._total_rows is not None and rows_per_sec:
+            eta = round(max(0, self._total_rows - rows) / rows_per_sec, 1)
+        peak_rss = _peak_rss_mb()
+        return {
+            'type': event_type,
+            'phase': self._phase,
+            'rows': rows,
+            'total_rows': self._total_rows,
+            'bytes_written': self._bytes,
+            'elapsed_sec': round(elapsed, 3),
+            'rows_per_sec': round(rows_per_sec, 1) if rows_per_sec is not None else None,
+            'eta_sec': eta,
+            'peak_rss_mb': round(peak_rss, 1) if peak_rss is not None else None,
+        }
+
+    def _emit(self, event: Dict[str, Any]) -> None:
+        if self.enabled:
+            print(json.dumps(event, ensure_ascii=False), flush=True)
+
+
+# 入口脚本共用的进度事件输出
+events = ProgressEvents()
+
+
+class _StackSampler(threading.Thread):
+    """定时采样指定线程的调用栈，按完整调用栈计数"""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+
+class PhaseProfiler:
+    """按命名阶段统计墙钟和CPU耗时，可选同时采集cProfile或采样调用栈
+
+    未启用时phase()直接返回共享的空上下文，开销可以忽略，因此各处理路径常驻埋点。
+    阶段可以嵌套，嵌套阶段的耗时同时计入外层阶段；进度事件的阶段（read/split/merge/save）自动记录。
+    只统计当前进程，并行写出/解析的子进程耗时体现为主进程中的等待阶段。
+    """
+
+    MODES = ('off', 'phases', 'cprofile', 'sample')
+    SAMPLE_INTERVAL = 0.005
+    _DISABLED = contextlib.nullcontext()
+
+    def __init__(self):
+        self.mode = 'off'
+        self.enabled = False
+        self._stats = {}
+        self._open = {}
+        self._cprofile = None
+        self._sampler = None
+
+    def configure(self, mode: str = 'off') -> None:
+        """开始新一次统计（常驻工作进程中每个任务都会重新配置）"""
+        self._stop_collectors()
+        self.mode = mode
+        self.enabled = mode != 'off'
+        self._stats = {}
+        self._open = {}
+        self._started = (time.perf_counter(), time.process_time())
+        if mode == 'cprofile':
+            import cProfile
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        elif mode == 'sample':
+            self._sampler = _StackSampler(threading.get_ident(), self.SAMPLE_INTERVAL)
+            self._sampler.start()
+
+    def phase(self, name: str):
+        """返回统计name阶段耗时的上下文管理器"""
+        if not self.enabled:
+            return PhaseProfiler._DISABLED
+        return self._measure(name)
+
+    @contextlib.contextmanager
+    def _measure(self, name: str):
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self._add(name, wall, cpu)
+
+    def begin(self, name: str) -> None:
+        """开始一个不便用with包裹的阶段，由end(name)结束"""
+        if self.enabled:
+            self._open[name] = (time.perf_counter(), time.process_time())
+
+    def end(self, name: str) -> None:
+        started = self._open.pop(name, None)
+        if started is not None:
+            self._add(name, *started)
+
+    def _add(self, name: str, wall: float, cpu: float) -> None:
+        stats = self._stats.setdefault(name, [0, 0.0, 0.0])
+        stats[0] += 1
+        stats[1] += time.perf_counter() - wall
+        stats[2] += time.process_time() - cpu
+
+    def _stop_collectors(self) -> None:
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        if self._sampler is not None:
+            self._sampler.stop()
+
+    def finish(self, report_base: str) -> Optional[str]:
+        """结束统计并写出报告（report_base加.txt，cProfile另存.prof，采样另存.folded），返回报告路径"""
+        if not self.enabled:
+            return None
+        self._stop_collectors()
+        self.enabled = False
+        total_wall = time.perf_counter() - self._started[0]
+        total_cpu = time.process_time() - self._started[1]
+
+        lines = [f"性能分析报告: {os.path.basename(sys.argv[0])}（模式: {self.mode}）",
+                 f"总耗时: 墙钟 {total_wall:.3f}s，CPU {total_cpu:.3f}s",
+                 "阶段可以嵌套，嵌套阶段的耗时同时计入外层阶段；并行子进程中的耗时不计入", "",
+                 f"{'阶段':<24}{'次数':>8}{'墙钟(s)':>12}{'CPU(s)':>12}{'占比':>8}"]
+        for name, (count, wall, cpu) in sorted(self._stats.items(), key=lambda item: -item[1][1]):
+            share = wall / total_wall * 100 if total_wall else 0
+            lines.append(f"{name:<24}{count:>8}{wall:>12.3f}{cpu:>12.3f}{share:>7.1f}%")
+
+        os.makedirs(os.path.dirname(os.path.abspath(report_base)), exist_ok=True)
+        if self._cprofile is not None:
+            import pstats
+            self._cprofile.dump_stats(f"{report_base}.prof")
+            buffer = io.StringIO()
+            pstats.Stats(self._cprofile, stream=buffer).sort_stats('cumulative').print_stats(30)
+            lines += ["", f"cProfile（完整数据: {os.path.basename(report_base)}.prof）", buffer.getvalue()]
+            self._cprofile = None
+        if self._sampler is not None:
+            lines += ["", *self._sample_report(self._sampler.stacks, f"{report_base}.folded")]
+            self._sampler = None
+
+        report_path = f"{report_base}.txt"
+        with open(report_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        print(f"[性能] 分析报告已写入: {report_path}")
+        return report_path
+
+    @staticmethod
+    def _sample_report(stacks: Counter, folded_path: str) -> List[str]:
+        """写出折叠调用栈文件（可用于火焰图），返回按包含/自身采样数排序的函数列表"""
+        with open(folded_path, 'w', encoding='utf-8') as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+        total = sum(stacks.values())
+        inclusive, own = Counter(), Counter()
+        for stack, count in stacks.items():
+            for frame in set(stack):
+                inclusive[frame] += count
+            own[stack[-1]] += count
+        lines = [f"采样调用栈（{total}个样本，间隔{PhaseProfiler.SAMPLE_INTERVAL * 1000:.0f}ms，"
+                 f"折叠调用栈: {os.path.basename(folded_path)}）"]
+        for title, counter in (('包含子调用', inclusive), ('自身', own)):
+            lines.append(f"{title}:")
+            for frame, count in counter.most_common(20):
+                lines.append(f"  {count / total * 100 if total else 0:6.1f}%  {frame}")
+        return lines
+
+
+# 入口脚本共用的阶段耗时统计
+profiler = PhaseProfiler()
+
+
 class ErrorHandler:
     """错误处理工具类"""
     
@@ -282,7 +2635,7 @@ class ErrorHandler:
         Returns:
             bool: 是否应该继续处理
         """
-        if isinstance(error, pd.errors.EmptyDataError):
+        if ErrorHandler.is_empty_data_error(error):
             print(f"警告：文件 {file_path} 为空或无有效数据，跳过")
         elif isinstance(error, FileNotFoundError):
             print(f"错误：文件 {file_path} 不存在")
@@ -294,6 +2647,15 @@ class ErrorHandler:
         
         return continue_on_error
     
+    @staticmethod
+    def is_empty_data_error(error: BaseException) -> bool:
+        """判断是否为pandas的EmptyDataError
+
+        该异常只可能由已导入的pandas抛出，因此未导入pandas时直接返回False，不为判断而导入pandas。
+        """
+        pandas = sys.modules.get('pandas')
+        return pandas is not None and isinstance(error, pandas.errors.EmptyDataError)
+    
     @staticmethod
     def handle_validation_error(error: Exception) -> None:
         """处理验证错误"""
@@ -323,6 +2685,74 @@ class MemoryManager:
         return f"内存使用: {memory_mb:.2f} MB"
 
 
+def add_memory_target_argument(parser) -> None:
+    """为命令行脚本添加内存目标参数"""
+    parser.add_argument('--memory-target', choices=DtypeCompactor.TARGETS, default=DtypeCompactor.DEFAULT_TARGET,
+                        help='读取后的数据类型压缩：off不压缩，balanced仅对1万行以上的文件压缩，'
+                             'aggressive总是压缩且更积极地使用分类类型（默认：balanced）')
+
+
+def add_profile_argument(parser) -> None:
+    """为命令行脚本添加性能分析参数"""
+    parser.add_argument('--profile', choices=PhaseProfiler.MODES, default='off',
+                        help='性能分析：phases记录各阶段墙钟/CPU耗时，cprofile额外保存cProfile数据，'
+                             'sample额外采样调用栈；报告写在输出文件旁（默认：off）')
+
+
+def add_output_format_argument(parser) -> None:
+    """为命令行脚本添加输出格式参数"""
+    parser.add_argument('--output-format', choices=OUTPUT_FORMATS, default='xlsx',
+                        help='输出格式：xlsx（默认）、csv（UTF-8带BOM）或parquet（需要pyarrow），'
+                             'csv/parquet只包含单元格值，不包含格式')
+
+
+def add_xlsx_writer_argument(parser) -> None:
+    """为命令行脚本添加.xlsx写入后端参数"""
+    parser.add_argument('--xlsx-writer', choices=[XlsxBackendRegistry.AUTO] + xlsx_backends.names(),
+                        default=XlsxBackendRegistry.AUTO,
+                        help='.xlsx写入后端：auto按作业需要选择最快的可用后端（默认），rawxml直接生成XML（最快），'
+                             'xlsxwriter为常量内存模式（需要xlsxwriter），openpyxl为只写模式；'
+                             '保留源格式的拆分始终使用openpyxl')
+
+
+def add_partition_arguments(parser) -> None:
+    """为拆分脚本添加按列分区参数"""
+    parser.add_argument('--partition-by', default=None,
+                        help='按该列的值拆分，每个不同的值输出一个文件（只遍历一次输入，忽略--rows）')
+    parser.add_argument('--max-open-files', type=int, default=PartitionWriter.DEFAULT_MAX_OPEN,
+                        help=f'分区拆分时同时打开的输出文件数上限，其余分区暂存到临时文件'
+                             f'（默认：{PartitionWriter.DEFAULT_MAX_OPEN}）')
+
+
+def add_selection_arguments(parser) -> None:
+    """为命令行脚本添加列投影和行范围参数"""
+    parser.add_argument('--columns', default=None,
+                        help='只读取这些列：以逗号分隔的列名或列字母（如 编号,名称,F 或 B:D），按源文件中的列顺序输出'
+                             '（默认：全部列）')
+    parser.add_argument('--row-range', type=parse_row_range, default=None,
+                        help='只读取这些数据行（从1开始，不含表头行，两端包含），例如 500000:600000、:1000、500000:'
+                             '（默认：全部数据行）')
+
+
+def add_resume_argument(parser) -> None:
+    """为拆分脚本添加--resume参数"""
+    parser.add_argument('--resume', type=lambda x: x.lower() == 'true', default=False,
+                        help='是否断点续拆（跳过上次已完成并校验通过的输出文件，从第一个缺失的分块继续）')
+
+
+def add_sheets_argument(parser) -> None:
+    """为命令行脚本添加多工作表参数"""
+    parser.add_argument('--sheets', default=None,
+                        help='要处理的工作表：all为全部工作表，或以逗号分隔的工作表名（HTML表格文件依次为Table1、Table2…）；'
+                             '输出文件名包含工作表名，多个工作表由--workers个进程并行处理（默认：只处理默认工作表）')
+
+
+def add_events_argument(parser) -> None:
+    """为命令行脚本添加进度事件输出参数"""
+    parser.add_argument('--events', choices=ProgressEvents.MODES, default='text',
+                        help='进度输出方式：text仅输出文本日志，json额外输出JSON行格式的阶段与进度事件（默认：text）')
+
+
 def print_separator(title: str = "") -> None:
     """打印分隔线"""
     separator = "=" * 50
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""
+常驻工作进程
+启动时导入pandas、openpyxl和各处理脚本，之后通过标准输入接收JSON行格式的任务，
+避免每次拆分/合并都重新启动解释器并重新导入依赖。
+
+请求（标准输入，每行一个JSON对象）：
+    {"type": "run", "id": "任务ID", "script": "split_excel.py", "args": ["--input", "...", ...]}
+    {"type": "cancel", "id": "任务ID"}
+    {"type": "ping"}
+    {"type": "shutdown"}
+args与直接运行脚本时的命令行参数完全相同。
+
+事件（标准输出，每行一个JSON对象）：
+    {"event": "ready", "pid": 1234, "protocol": 1, "scripts": [...]}
+    {"event": "started", "id": "任务ID"}
+    {"event": "log", "id": "任务ID", "stream": "stdout", "message": "..."}
+    {"event": "done", "id": "任务ID", "status": "success|failed|cancelled", "exit_code": 0, "elapsed": 1.23}
+    {"event": "error", "id": "任务ID或null", "message": "..."}
+    {"event": "pong"}
+
+任务按接收顺序逐个执行。取消正在执行的任务时，任务在下一次输出日志时中止
+（各脚本在每个文件/分块处理前后都会输出日志）；尚未开始的任务直接取消。
+标准输入关闭时取消当前任务并退出。
+"""
+
+import importlib
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+
+import merge_excel
+import merge_excel_format
+import split_excel
+import split_excel_format
+
+PROTOCOL_VERSION = 1
+
+SCRIPTS = {
+    'split_excel.py': split_excel.main,
+    'split_excel_format.py': split_excel_format.main,
+    'merge_excel.py': merge_excel.main,
+    'merge_excel_format.py': merge_excel_format.main,
+}
+
+
+# 各脚本在需要时才导入的重量级依赖，常驻进程启动时预先导入，使每个任务都不再承担导入耗时
+PRELOAD_MODULES = ('numpy', 'pandas', 'openpyxl', 'xlrd', 'lxml.etree', 'concurrent.futures')
+
+
+def _preload():
+    for name in PRELOAD_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+
+
+class JobCancelled(BaseException):
+    """任务被取消（继承BaseException，避免被脚本中的except Exception捕获）"""
+
+
+class _Job:
+    def __init__(self, job_id, script, args):
+        self.id = job_id
+        self.script = script
+        self.args = args
+        self.cancelled = threading.Event()
+
+
+class _JobOutput:
+    """替换sys.stdout/sys.stderr：把任务输出按行转换为log事件，并在任务被取消时中止任务"""
+
+    def __init__(self, daemon, stream):
+        self._daemon = daemon
+        self._stream = stream
+        self._buffer = ''
+        self.encoding = 'utf-8'
+
+    def write(self, text):
+        job = self._daemon.current_job
+        if job is not None and job.cancelled.is_set() and threading.current_thread() is self._daemon.runner:
+            raise JobCancelled()
+        self._buffer += text
+        while '\n' in self._buffer:
+            line, self._buffer = self._buffer.split('\n', 1)
+            self._emit(job, line)
+        return len(text)
+
+    def flush(self):
+        if self._buffer:
+            line, self._buffer = self._buffer, ''
+            self._emit(self._daemon.current_job, line)
+
+    def _emit(self, job, line):
+        line = line.rstrip('\r')
+        if line:
+            self._daemon.send('log', job.id if job else None, stream=self._stream, message=line)
+
+    def reconfigure(self, **kwargs):
+        pass
+
+    def isatty(self):
+        return False
+
+
+class WorkerDaemon:
+    """常驻工作进程：主线程读取请求，任务线程按顺序执行任务"""
+
+    def __init__(self, protocol_stream):
+        self._protocol = protocol_stream
+        self._send_lock = threading.Lock()
+        self._jobs = queue.Queue()
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self.current_job = None
+        self.runner = threading.Thread(target=self._run_jobs, name='job-runner', daemon=True)
+
+    def send(self, event, job_id=None, **fields):
+        """输出一个事件（线程安全）"""
+        message = {'event': event}
+        if job_id is not None or event in ('started', 'log', 'done', 'error'):
+            message['id'] = job_id
+        message.update(fields)
+        with self._send_lock:
+            self._protocol.write(json.dumps(message, ensure_ascii=False) + '\n')
+            self._protocol.flush()
+
+    def serve(self, requests):
+        """处理请求直到收到shutdown或输入结束"""
+        self.runner.start()
+        self.send('ready', pid=os.getpid(), protocol=PROTOCOL_VERSION, scripts=sorted(SCRIPTS))
+        shutdown = False
+        for line in requests:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError('请求必须是JSON对象')
+            except ValueError as e:
+                self.send('error', None, message=f'无法解析请求: {e}')
+                continue
+            if request.get('type') == 'shutdown':
+                shutdown = True
+                break
+            self._handle(request)
+
+        if not shutdown:
+            # 输入结束（通常是父进程已退出），不再执行剩余任务
+            self._cancel_all()
+        self._jobs.put(None)
+        self.runner.join()
+
+    def _handle(self, request):
+        kind = request.get('type')
+        job_id = request.get('id')
+        if kind == 'ping':
+            self.send('pong')
+        elif kind == 'run':
+            script = request.get('script')
+            args = request.get('args', [])
+            if script not in SCRIPTS:
+                self.send('error', job_id, message=f'未知脚本: {script}')
+            elif job_id is None or not isinstance(args, list):
+                self.send('error', job_id, message='run请求需要id和参数列表args')
+            else:
+                job = _Job(job_id, script, [str(arg) for arg in args])
+                with self._pending_lock:
+                    self._pending[job_id] = job
+                self._jobs.put(job)
+        elif kind == 'cancel':
+            with self._pending_lock:
+                job = self._pending.get(job_id)
+            if job is None:
+                self.send('error', job_id, message=f'任务不存在或已结束: {job_id}')
+            else:
+                job.cancelled.set()
+        else:
+            self.send('error', job_id, message=f'未知请求类型: {kind}')
+
+    def _cancel_all(self):
+        with self._pending_lock:
+            for job in self._pending.values():
+                job.cancelled.set()
+
+    def _run_jobs(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            start_time = time.perf_counter()
+            if job.cancelled.is_set():
+                status, exit_code = 'cancelled', None
+            else:
+                self.send('started', job.id)
+                self.current_job = job
+                try:
+                    status, exit_code = self._execute(job)
+                finally:
+                    sys.stdout.flush()
+                    sys.stderr.flush()
+                    self.current_job = None
+            with self._pending_lock:
+                self._pending.pop(job.id, None)
+            self.send('done', job.id, status=status, exit_code=exit_code,
+                      elapsed=round(time.perf_counter() - start_time, 3))
+
+    @staticmethod
+    def _execute(job):
+        """执行任务，返回(状态, 退出码)，退出码与直接运行脚本时一致"""
+        sys.argv = [job.script] + job.args
+        try:
+            SCRIPTS[job.script](job.args)
+            return 'success', 0
+        except JobCancelled:
+            return 'cancelled', None
+        except SystemExit as e:
+            code = e.code
+            if code is None:
+                code = 0
+            elif not isinstance(code, int):
+                print(code, file=sys.stderr)
+                code = 1
+            return ('success' if code == 0 else 'failed'), code
+        except Exception:
+            traceback.print_exc()
+            return 'failed', 1
+
+
+def main():
+    sys.stdin.reconfigure(encoding='utf-8')
+    # 协议使用复制出的标准输出句柄；原标准输出指向标准错误，进程池子进程启动时恢复原始的sys.stdout/sys.stderr
+    # （见utils._init_pool_process），使子进程（并行写出/解析）中意外的输出不会混入协议流
+    protocol_stream = open(os.dup(sys.stdout.fileno()), 'w', encoding='utf-8', newline='\n')
+    sys.stdout.flush()
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    _preload()
+    daemon = WorkerDaemon(protocol_stream)
+    sys.stdout = _JobOutput(daemon, 'stdout')
+    sys.stderr = _JobOutput(daemon, 'stderr')
+    daemon.serve(sys.stdin)
+
+
+if __name__ == '__main__':
+    main()
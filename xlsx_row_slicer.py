@@ -0,0 +1,842 @@
+# -*- coding: utf-8 -*-
+"""
+.xlsx 行切片引擎
+直接在字节层面按<row>边界切分源工作表XML，输出文件复用源文件的styles.xml、主题和列定义，
+格式完全保留，速度接近文件复制；共享字符串表按输出文件只保留其用到的字符串
+"""
+
+import contextlib
+import html
+import os
+import posixpath
+import re
+import shutil
+import zipfile
+from array import array
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from xml.etree import ElementTree as ET
+from utils import PartitionWriter, events, format_bytes, temp_output_path
+
+NS_MAIN = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+NS_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+NS_PKG_REL = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+CT_WORKBOOK = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml'
+CT_WORKSHEET = 'application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml'
+CT_STYLES = 'application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml'
+CT_THEME = 'application/vnd.openxmlformats-officedocument.theme+xml'
+CT_SHARED_STRINGS = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml'
+
+_READ_SIZE = 1024 * 1024
+# 输出以速度优先，压缩级别1的耗时约为默认级别的一半，文件约大两成
+_COMPRESS_LEVEL = 1
+
+_PREFIX = rb'((?:[\w.-]+:)?)'
+_SHEET_DATA_START = re.compile(rb'<' + _PREFIX + rb'sheetData\b[^>]*?(/?)>')
+_SHEET_DATA_END = re.compile(rb'</(?:[\w.-]+:)?sheetData>')
+_ROW_START = re.compile(rb'<' + _PREFIX + rb'row\b[^>]*?(/?)>')
+_ROW_NUM = re.compile(rb'\sr="(\d+)"')
+# 只匹配<c>开始标签内的r属性；内联字符串等元素内容中的"<"必然被转义，不会被误改
+_CELL_REF = re.compile(rb'(<(?:[\w.-]+:)?c\b[^>]*?\sr="[A-Z]{1,3})\d+')
+_DIMENSION = re.compile(rb'<(?:[\w.-]+:)?dimension\b[^>]*?/>')
+_MERGE_CELL = re.compile(rb'<(?:[\w.-]+:)?mergeCell\b[^>]*?\sref="([A-Z]+)(\d+)(?::([A-Z]+)(\d+))?"')
+_CELL_START = re.compile(rb'<((?:[\w.-]+:)?)c\b([^>]*?)(/?)>')
+_CELL_COLUMN = re.compile(rb'\sr="([A-Z]{1,3})\d+"')
+_CELL_TYPE = re.compile(rb'\st="(\w+)"')
+_CELL_VALUE = re.compile(rb'<(?:[\w.-]+:)?v>([^<]*)</')
+_INLINE_TEXT = re.compile(rb'<(?:[\w.-]+:)?t(?:\s[^>]*)?>([^<]*)</')
+# sheetData之后的顶层元素：与行号和其他包部件无关的元素原样复制，mergeCells按分块平移，
+# 其余元素（条件格式、数据验证、超链接、筛选、绘图、表格等）依赖单元格区域或关联部件，改用openpyxl路径
+_TAIL_ELEMENT = re.compile(rb'<((?:[\w.-]+:)?)([\w.-]+)\b[^>]*?(/?)>')
+_TAIL_COPIED = {b'sheetCalcPr', b'sheetProtection', b'phoneticPr', b'printOptions', b'pageMargins', b'pageSetup',
+                b'headerFooter'}
+_RELATIONSHIP_ID = re.compile(rb'\s[\w.-]+:id="[^"]*"')
+_ROOT_END = re.compile(rb'</(?:[\w.-]+:)?worksheet>')
+# 公式与富数据单元格依赖行号或额外的包部件，无法安全地按字节切分
+_FORMULA = re.compile(rb'<(?:[\w.-]+:)?f[\s>/]')
+_CELL_METADATA = re.compile(rb'\s[cv]m="')
+_WHITESPACE = b' \t\r\n'
+# 共享字符串表：<si>元素原样保留（富文本、注音），单元格按t="s"和<v>中的索引改写
+_SST_ROOT = re.compile(rb'<' + _PREFIX + rb'sst\b[^>]*?(/?)>')
+_SST_COUNTS = re.compile(rb'\s(?:count|uniqueCount)="[^"]*"')
+_SST_ITEM_END = re.compile(rb'</(?:[\w.-]+:)?si>|<(?:[\w.-]+:)?si\b[^>]*?/>')
+# 以字面量开头的模式比先匹配<c再查找t属性快一倍多；t="s"只会出现在单元格标签中（文本中的<已转义）
+_SHARED_CELL = re.compile(rb'(t="s"[^>]*>\s*<(?:[\w.-]+:)?v>)\s*(\d+)')
+_PHONETIC = re.compile(rb'<((?:[\w.-]+:)?)rPh\b.*?</\1rPh>', re.S)
+
+
+class XlsxSliceUnsupported(Exception):
+    """源文件包含行切片引擎无法处理的内容，调用方应回退到openpyxl逐单元格路径"""
+
+
+class SharedStringIndex:
+    """源工作簿共享字符串表的紧凑索引
+
+    每个输入文件只读取一次：各<si>元素的原始XML依次拼接在一个字节串中，另以数组记录偏移，
+    不为每个字符串创建Python对象。各输出文件通过_SharedStringSubset只写出其用到的字符串。
+    """
+
+    def __init__(self, root: bytes, items: bytearray, offsets: array, close: bytes):
+        self._root = root
+        self._items = items
+        self._offsets = offsets
+        self._close = close
+        self._texts: Dict[int, str] = {}
+
+    @classmethod
+    def read(cls, archive: zipfile.ZipFile, path: Optional[str]) -> Optional['SharedStringIndex']:
+        """流式读取共享字符串部件，不存在或为空时返回None
+
+        只查找每个<si>元素的结束位置，元素原样保留，相邻元素之间的空白计入后一个元素。
+        """
+        if not path or path not in archive.NameToInfo:
+            return None
+        items = bytearray()
+        offsets = array('Q', [0])
+        with archive.open(path) as src:
+            buf = src.read(_READ_SIZE)
+            root = _SST_ROOT.search(buf)
+            if root is None or root.group(2):
+                return None
+            buf = buf[root.end():]
+            while True:
+                base = len(items)
+                end = 0
+                for m in _SST_ITEM_END.finditer(buf):
+                    end = m.end()
+                    offsets.append(base + end)
+                items += buf[:end]
+                data = src.read(_READ_SIZE)
+                if not data:
+                    break
+                buf = buf[end:] + data
+        if len(offsets) == 1:
+            return None
+        head = _SST_COUNTS.sub(b'', root.group(0))
+        return cls(head[:-1], items, offsets, b'</' + root.group(1) + b'sst>')
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def item(self, index: int) -> bytes:
+        """第index个<si>元素的原始XML"""
+        if not 0 <= index < len(self):
+            raise XlsxSliceUnsupported(f"共享字符串索引超出范围: {index}")
+        return self._items[self._offsets[index]:self._offsets[index + 1]]
+
+    def __getitem__(self, index: int) -> str:
+        """第index个字符串的文本，注音文字（rPh）不计入单元格的值"""
+        text = self._texts.get(index)
+        if text is None:
+            item = _PHONETIC.sub(b'', self.item(index))
+            text = self._texts[index] = html.unescape(b''.join(_INLINE_TEXT.findall(item)).decode('utf-8'))
+        return text
+
+    def part(self, indexes: List[int]) -> Iterator[bytes]:
+        """按indexes的顺序产出只包含这些字符串的共享字符串部件（索引须已经过范围检查）"""
+        items, offsets = self._items, self._offsets
+        yield b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        yield self._root + b' uniqueCount="' + str(len(indexes)).encode() + b'">'
+        for start in range(0, len(indexes), 4096):
+            yield b''.join([items[offsets[index]:offsets[index + 1]] for index in indexes[start:start + 4096]])
+        yield self._close
+
+
+class _SharedStringSubset:
+    """一个输出文件的共享字符串表：该输出用到的源字符串按首次出现的顺序重新编号
+
+    on_new在每个新用到的字符串加入时以其XML调用，用于按大小拆分时计入输出大小。
+    """
+
+    def __init__(self, index: SharedStringIndex, on_new: Optional[Callable[[bytes], None]] = None):
+        self._index = index
+        self._size = len(index)
+        self._on_new = on_new
+        self._mapping: Dict[bytes, bytes] = {}
+        self._order: List[int] = []
+
+    def _add(self, old: bytes) -> bytes:
+        """为本输出第一次用到的源字符串分配新索引"""
+        index = int(old)
+        if index >= self._size:
+            raise XlsxSliceUnsupported(f"共享字符串索引超出范围: {index}")
+        new = self._mapping[old] = str(len(self._order)).encode()
+        self._order.append(index)
+        if self._on_new is not None:
+            self._on_new(self._index.item(index))
+        return new
+
+    def remap(self, segment: bytes) -> bytes:
+        """将行XML中共享字符串单元格的索引改写为本输出中的索引"""
+        if b't="s"' not in segment:
+            return segment
+        # split后每三项依次为：其他内容、单元格开头到<v>、源索引
+        pieces = _SHARED_CELL.split(segment)
+        if len(pieces) // 3 != segment.count(b't="s"'):
+            raise XlsxSliceUnsupported("无法识别的共享字符串单元格")
+        mapping = self._mapping
+        pieces[2::3] = [mapping.get(old) or self._add(old) for old in pieces[2::3]]
+        return b''.join(pieces)
+
+    def write(self, archive: zipfile.ZipFile) -> None:
+        with archive.open('xl/sharedStrings.xml', 'w') as dest:
+            for block in self._index.part(self._order):
+                dest.write(block)
+
+
+class XlsxRowSlicer:
+    """按行切分.xlsx工作表XML的引擎，sheet为None时切分活动工作表"""
+
+    def __init__(self, input_file: str, sheet: Optional[str] = None):
+        self.input_file = input_file
+        self._sheet = sheet
+        try:
+            self._zip = zipfile.ZipFile(input_file)
+        except zipfile.BadZipFile as e:
+            raise XlsxSliceUnsupported(f"不是有效的Zip/OOXML容器: {e}")
+        try:
+            self._resolve_parts()
+        except XlsxSliceUnsupported:
+            self._zip.close()
+            raise
+        except (KeyError, ET.ParseError) as e:
+            self._zip.close()
+            raise XlsxSliceUnsupported(f"无法解析工作簿结构: {e}")
+
+        self._tail = b''
+        self._root_end = b'</worksheet>'
+        self._merges: List[Tuple[bytes, int, bytes, int]] = []
+        # sheetData之后要写出的元素，None为mergeCells的位置
+        self._tail_parts: List[Optional[bytes]] = []
+        self.max_row: Optional[int] = None
+        self._prescanned = False
+        self._strings: Optional[SharedStringIndex] = None
+        self._strings_read = False
+
+    def close(self) -> None:
+        self._zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def _resolve_target(base_dir: str, target: str) -> str:
+        if target.startswith('/'):
+            return target.lstrip('/')
+        return posixpath.normpath(posixpath.join(base_dir, target))
+
+    def _read_rels(self, rels_path: str) -> Dict[str, Tuple[str, str]]:
+        root = ET.fromstring(self._zip.read(rels_path))
+        return {rel.get('Id'): (rel.get('Type', ''), rel.get('Target', ''))
+                for rel in root.iter(f'{{{NS_PKG_REL}}}Relationship')}
+
+    def _resolve_parts(self) -> None:
+        """定位工作簿、要切分的工作表（默认为当前活动工作表）以及样式、主题、共享字符串部件"""
+        workbook_path = None
+        for rel_type, target in self._read_rels('_rels/.rels').values():
+            if rel_type.endswith('/officeDocument'):
+                workbook_path = self._resolve_target('', target)
+                break
+        if workbook_path is None:
+            raise XlsxSliceUnsupported("未找到工作簿部件")
+
+        workbook = ET.fromstring(self._zip.read(workbook_path))
+        if workbook.tag != f'{{{NS_MAIN}}}workbook':
+            raise XlsxSliceUnsupported("仅支持Transitional OOXML工作簿")
+
+        workbook_dir = posixpath.dirname(workbook_path)
+        rels_path = posixpath.join(workbook_dir, '_rels', posixpath.basename(workbook_path) + '.rels')
+        rels = self._read_rels(rels_path)
+
+        sheets = workbook.findall(f'{{{NS_MAIN}}}sheets/{{{NS_MAIN}}}sheet')
+        if not sheets:
+            raise XlsxSliceUnsupported("工作簿中没有工作表")
+        # 与openpyxl的wb.active一致，优先使用activeTab指定的工作表
+        active = 0
+        view = workbook.find(f'{{{NS_MAIN}}}bookViews/{{{NS_MAIN}}}workbookView')
+        if view is not None and view.get('activeTab', '').isdigit():
+            active = min(int(view.get('activeTab')), len(sheets) - 1)
+        sheet = sheets[active]
+        if self._sheet is not None:
+            matches = [item for item in sheets if item.get('name') == self._sheet]
+            if not matches:
+                raise XlsxSliceUnsupported(f"未找到工作表“{self._sheet}”")
+            sheet = matches[0]
+        rel_type, target = rels[sheet.get(f'{{{NS_REL}}}id')]
+        if not rel_type.endswith('/worksheet'):
+            raise XlsxSliceUnsupported("要切分的工作表不是普通工作表")
+        self.sheet_name = sheet.get('name') or 'Sheet1'
+        self.sheet_path = self._resolve_target(workbook_dir, target)
+
+        pr = workbook.find(f'{{{NS_MAIN}}}workbookPr')
+        self.date1904 = pr is not None and pr.get('date1904') in ('1', 'true')
+
+        self.styles_path = self.theme_path = self.shared_strings_path = None
+        for rel_type, target in rels.values():
+            path = self._resolve_target(workbook_dir, target)
+            if rel_type.endswith('/styles'):
+                self.styles_path = path
+            elif rel_type.endswith('/theme'):
+                self.theme_path = path
+            elif rel_type.endswith('/sharedStrings'):
+                self.shared_strings_path = path
+
+    def prescan(self) -> None:
+        """预扫描工作表：检查不支持的内容，记录最大行号，并取出sheetData之后的尾部元素
+
+        合并单元格等信息位于sheetData之后，必须在输出第一个分块前获得。
+        """
+        overlap = b''
+        tail = None
+        with self._zip.open(self.sheet_path) as src:
+            while True:
+                block = src.read(_READ_SIZE)
+                if not block:
+                    break
+                if tail is not None:
+                    tail += block
+                    continue
+                data = overlap + block
+                # 先用子串查找做快速预判，只有可能命中时才运行正则
+                end = _SHEET_DATA_END.search(data) if b'sheetData>' in data else None
+                body = data[:end.start()] if end else data
+                if ((b'<f' in body or b':f' in body) and _FORMULA.search(body)) or \
+                        (b'm="' in body and _CELL_METADATA.search(body)):
+                    raise XlsxSliceUnsupported("工作表包含公式或富数据单元格")
+                row_pos = body.rfind(b'row ')
+                if row_pos >= 0:
+                    tag_start = body.rfind(b'<', 0, row_pos + 1)
+                    m = _ROW_START.match(body, tag_start) if tag_start >= 0 else None
+                    num = _ROW_NUM.search(m.group(0)) if m else None
+                    if num:
+                        self.max_row = int(num.group(1))
+                if end:
+                    tail = data[end.end():]
+                else:
+                    overlap = data[-64:]
+
+        self._tail = tail or b''
+        root_end = _ROOT_END.search(self._tail)
+        if root_end:
+            self._root_end = root_end.group(0)
+        self._merges = [(m.group(1), int(m.group(2)), m.group(3) or m.group(1), int(m.group(4) or m.group(2)))
+                        for m in _MERGE_CELL.finditer(self._tail)]
+        self._tail_parts = self._split_tail(self._tail)
+        self._prescanned = True
+
+    @staticmethod
+    def _split_tail(tail: bytes) -> List[Optional[bytes]]:
+        """按顶层元素拆分sheetData之后的内容，遇到无法按行切分的元素时抛出XlsxSliceUnsupported"""
+        parts = []
+        pos = 0
+        while True:
+            while pos < len(tail) and tail[pos] in _WHITESPACE:
+                pos += 1
+            if pos >= len(tail) or tail.startswith(b'</', pos):
+                return parts
+            m = _TAIL_ELEMENT.match(tail, pos)
+            if not m:
+                raise XlsxSliceUnsupported("无法识别的工作表尾部内容")
+            name = m.group(2)
+            if m.group(3):
+                end = m.end()
+            else:
+                close_tag = b'</' + m.group(1) + name + b'>'
+                end = tail.find(close_tag, m.end())
+                if end < 0:
+                    raise XlsxSliceUnsupported("工作表XML不完整")
+                end += len(close_tag)
+            if name == b'mergeCells':
+                parts.append(None)
+            elif name in _TAIL_COPIED:
+                # 打印机设置等关联部件不复制，去掉对它的引用
+                parts.append(_RELATIONSHIP_ID.sub(b'', tail[pos:end]))
+            else:
+                raise XlsxSliceUnsupported(f"工作表包含行切片引擎不支持的元素: {name.decode()}")
+            pos = end
+
+    def _iter_sheet(self):
+        """流式解析工作表XML，依次产出('head', 字节, 前缀)、('row', 行号, 字节)"""
+        with self._zip.open(self.sheet_path) as src:
+            buf = b''
+            pos = 0
+            eof = False
+
+            def fill():
+                nonlocal buf, pos, eof
+                data = src.read(_READ_SIZE)
+                if not data:
+                    eof = True
+                buf = buf[pos:] + data
+                pos = 0
+
+            while True:
+                m = _SHEET_DATA_START.search(buf)
+                if m or eof:
+                    break
+                fill()
+            if not m:
+                raise XlsxSliceUnsupported("工作表中未找到sheetData")
+            yield 'head', buf[:m.start()], m.group(1)
+            if m.group(2):
+                return
+            pos = m.end()
+
+            row_num = 0
+            close_tag = None
+            while True:
+                while pos < len(buf) and buf[pos] in _WHITESPACE:
+                    pos += 1
+                if len(buf) - pos < 2:
+                    if eof:
+                        raise XlsxSliceUnsupported("工作表XML不完整")
+                    fill()
+                    continue
+                if buf.startswith(b'</', pos):
+                    return
+
+                m = _ROW_START.match(buf, pos)
+                end = -1
+                if m:
+                    if m.group(2):
+                        end = m.end()
+                    else:
+                        close_tag = b'</' + m.group(1) + b'row>'
+                        close = buf.find(close_tag, m.end())
+                        if close >= 0:
+                            end = close + len(close_tag)
+                if end < 0:
+                    if eof:
+                        raise XlsxSliceUnsupported("无法识别的sheetData内容")
+                    fill()
+                    continue
+
+                num = _ROW_NUM.search(m.group(0))
+                row_num = int(num.group(1)) if num else row_num + 1
+                yield 'row', row_num, buf[pos:end]
+                pos = end
+
+    @staticmethod
+    def _renumber_row(segment: bytes, new_row: int) -> bytes:
+        """将<row>及其单元格的行号改写为输出文件中的行号"""
+        m = _ROW_START.match(segment)
+        number = str(new_row).encode()
+        start_tag = m.group(0)
+        num = _ROW_NUM.search(start_tag)
+        if num:
+            start_tag = start_tag[:num.start(1)] + number + start_tag[num.end(1):]
+        else:
+            start_tag = start_tag.replace(b'row', b'row r="' + number + b'"', 1)
+        # split后奇数位置为<c>标签中行号之前的部分，直接拼接新行号，避免逐个匹配展开替换模板
+        pieces = _CELL_REF.split(segment[m.end():])
+        pieces[1::2] = [piece + number for piece in pieces[1::2]]
+        return start_tag + b''.join(pieces)
+
+    def _merge_cells_xml(self, prefix: bytes, ranges: List[Tuple[int, int, int]]) -> bytes:
+        """根据源行区间生成输出文件中的mergeCells元素
+
+        Args:
+            ranges: (源起始行, 源结束行, 行偏移) 列表，只保留完全落在某个区间内的合并单元格
+        """
+        items = []
+        for col1, row1, col2, row2 in self._merges:
+            for first, last, offset in ranges:
+                if first <= row1 and row2 <= last:
+                    ref = col1 + str(row1 + offset).encode() + b':' + col2 + str(row2 + offset).encode()
+                    items.append(b'<' + prefix + b'mergeCell ref="' + ref + b'"/>')
+                    break
+        if not items:
+            return b''
+        return (b'<' + prefix + b'mergeCells count="' + str(len(items)).encode() + b'">'
+                + b''.join(items) + b'</' + prefix + b'mergeCells>')
+
+    def shared_strings(self) -> Optional[SharedStringIndex]:
+        """源工作簿的共享字符串索引，只读取一次并由所有输出文件共用；没有共享字符串表时为None"""
+        if not self._strings_read:
+            self._strings = SharedStringIndex.read(self._zip, self.shared_strings_path)
+            self._strings_read = True
+        return self._strings
+
+    def _write_package(self, archive: zipfile.ZipFile, with_strings: bool) -> None:
+        """写入输出文件中除工作表以外的部件，样式和主题原样复制
+
+        with_strings为True时声明共享字符串部件，其内容在工作表写完后由_SharedStringSubset写出。
+        """
+        overrides = [('/xl/workbook.xml', CT_WORKBOOK), ('/xl/worksheets/sheet1.xml', CT_WORKSHEET)]
+        rels = [('rId1', 'worksheet', 'worksheets/sheet1.xml')]
+        copies = []
+        for src_path, name, rel_type, content_type in (
+                (self.styles_path, 'styles.xml', 'styles', CT_STYLES),
+                (self.theme_path, 'theme/theme1.xml', 'theme', CT_THEME)):
+            if src_path and src_path in self._zip.NameToInfo:
+                rels.append((f'rId{len(rels) + 1}', rel_type, name))
+                overrides.append((f'/xl/{name}', content_type))
+                copies.append((src_path, f'xl/{name}'))
+        if with_strings:
+            rels.append((f'rId{len(rels) + 1}', 'sharedStrings', 'sharedStrings.xml'))
+            overrides.append(('/xl/sharedStrings.xml', CT_SHARED_STRINGS))
+
+        archive.writestr('[Content_Types].xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            + ''.join(f'<Override PartName="{part}" ContentType="{ct}"/>' for part, ct in overrides)
+            + '</Types>'))
+        archive.writestr('_rels/.rels', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<Relationships xmlns="{NS_PKG_REL}">'
+            '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+            'relationships/officeDocument" Target="xl/workbook.xml"/>'
+            '</Relationships>'))
+        workbook_pr = '<workbookPr date1904="1"/>' if self.date1904 else ''
+        archive.writestr('xl/workbook.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<workbook xmlns="{NS_MAIN}" xmlns:r="{NS_REL}">{workbook_pr}'
+            f'<sheets><sheet name="{html.escape(self.sheet_name)}" sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>'))
+        archive.writestr('xl/_rels/workbook.xml.rels', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<Relationships xmlns="{NS_PKG_REL}">'
+            + ''.join(f'<Relationship Id="{rid}" Type="{NS_REL}/{rel_type}" Target="{target}"/>'
+                      for rid, rel_type, target in rels)
+            + '</Relationships>'))
+        for src_path, dest_path in copies:
+            with self._zip.open(src_path) as src, archive.open(dest_path, 'w') as dest:
+                shutil.copyfileobj(src, dest, _READ_SIZE)
+
+    def _open_output(self, output_file: str, head: bytes, prefix: bytes, header_row: Optional[bytes],
+                     strings: Optional[_SharedStringSubset]) -> Tuple[zipfile.ZipFile, object]:
+        """创建输出文件并写入包部件、工作表开头和表头行，返回(压缩包, 工作表写入流)"""
+        archive = zipfile.ZipFile(output_file, 'w', zipfile.ZIP_DEFLATED, compresslevel=_COMPRESS_LEVEL)
+        self._write_package(archive, strings is not None)
+        stream = archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True)
+        stream.write(head)
+        stream.write(b'<' + prefix + b'sheetData>')
+        if header_row is not None:
+            stream.write(self._renumber_row(strings.remap(header_row) if strings else header_row, 1))
+        return archive, stream
+
+    @staticmethod
+    def _discard_chunk(state: Dict) -> None:
+        """关闭未写完的输出文件并删除其临时文件"""
+        if state['archive'] is None:
+            return
+        with contextlib.suppress(Exception):
+            state['stream'].close()
+        with contextlib.suppress(Exception):
+            state['archive'].close()
+        with contextlib.suppress(OSError):
+            os.remove(temp_output_path(state['file']))
+        state['archive'] = None
+
+    def _close_output(self, archive: zipfile.ZipFile, stream, prefix: bytes,
+                      ranges: List[Tuple[int, int, int]], strings: Optional[_SharedStringSubset]) -> None:
+        """写入工作表结尾（平移后的合并单元格和原样复制的页面设置等元素）和本输出用到的共享字符串，并关闭输出文件"""
+        stream.write(b'</' + prefix + b'sheetData>')
+        for part in self._tail_parts:
+            stream.write(self._merge_cells_xml(prefix, ranges) if part is None else part)
+        stream.write(self._root_end)
+        stream.close()
+        if strings is not None:
+            strings.write(archive)
+        archive.close()
+
+    @staticmethod
+    def _cell_value(segment: bytes, column: bytes, shared: Optional[SharedStringIndex]):
+        """取出行XML中指定列的单元格值：共享字符串和行内字符串为文本，其余可转换为数字时为浮点数"""
+        ref = b' r="' + column
+        pos = segment.find(ref)
+        while pos >= 0 and not segment[pos + len(ref):pos + len(ref) + 1].isdigit():
+            pos = segment.find(ref, pos + 1)
+        if pos < 0:
+            return None
+        m = _CELL_START.match(segment, segment.rfind(b'<', 0, pos))
+        if not m or m.group(3):
+            return None
+        body = segment[m.end():segment.find(b'</' + m.group(1) + b'c>', m.end())]
+        cell_type = _CELL_TYPE.search(m.group(2))
+        cell_type = cell_type.group(1) if cell_type else b'n'
+        if cell_type == b'inlineStr':
+            return html.unescape(b''.join(_INLINE_TEXT.findall(body)).decode('utf-8'))
+        value = _CELL_VALUE.search(body)
+        if not value:
+            return None
+        text = html.unescape(value.group(1).decode('utf-8'))
+        if cell_type == b's' and shared is not None:
+            return shared[int(text)]
+        if cell_type in (b'str', b'e', b'b'):
+            return text
+        try:
+            return float(text)
+        except ValueError:
+            return text
+
+    def _find_column(self, header_row: bytes, column: str, shared: Optional[SharedStringIndex]) -> bytes:
+        """按表头行中的列名找到分区列的列字母"""
+        letters, names = [], []
+        for m in _CELL_START.finditer(header_row):
+            ref = _CELL_COLUMN.search(m.group(2))
+            if ref is None:
+                raise XlsxSliceUnsupported("表头单元格缺少引用")
+            letters.append(ref.group(1))
+            names.append(PartitionWriter.key_text(self._cell_value(header_row, ref.group(1), shared)))
+        return letters[PartitionWriter.column_index(names, column)]
+
+    def partition(self, output_dir: str, base_name: str, column: str, copy_headers: bool = True,
+                  max_open: int = PartitionWriter.DEFAULT_MAX_OPEN,
+                  log_prefix: str = '[格式拆分]',
+                  row_range: Tuple[int, Optional[int]] = (0, None)) -> Tuple[List[Tuple[str, int]], PartitionWriter]:
+        """按分区列的值切分工作表，第1行视为表头，只遍历一次工作表XML
+
+        每行原样写入其分区的输出文件（行号和共享字符串索引重新编号），样式与行切分相同地整体复用；
+        只保留表头行内的合并单元格。打开的输出数与溢出策略见PartitionWriter。
+        row_range为(跳过的数据行数, 结束数据行序号或None)，只切分范围内的数据行，读到范围末尾即停止。
+
+        Returns:
+            (各输出文件的(路径, 数据行数), 分区写出器)，后者用于输出统计信息
+        """
+        if not self._prescanned:
+            self.prescan()
+        os.makedirs(output_dir, exist_ok=True)
+        shared = self.shared_strings()
+        sheet = self._iter_sheet()
+        _, head, prefix = next(sheet)
+        head = _DIMENSION.sub(b'', head)
+        header_row = None
+        letter = None
+
+        def open_output(output_file):
+            return _PartitionOutput(self, output_file, head, prefix, header_row if copy_headers else None,
+                                    shared)
+
+        skip, stop = row_range
+        with PartitionWriter(output_dir, base_name, open_output, max_open, log_prefix=log_prefix) as partitions:
+            for _, row_num, segment in sheet:
+                if row_num == 1:
+                    header_row = segment
+                    letter = self._find_column(segment, column, shared)
+                    continue
+                if row_num < 2 + skip:
+                    continue
+                if stop is not None and row_num > 1 + stop:
+                    break
+                if letter is None:
+                    raise ValueError(f"未找到分区列: {column}，工作表缺少表头行")
+                partitions.add(PartitionWriter.key_text(self._cell_value(segment, letter, shared)), segment)
+            sheet.close()
+            if letter is None:
+                raise ValueError(f"未找到分区列: {column}，工作表缺少表头行")
+            return partitions.close(), partitions
+
+    def split(self, output_dir: str, base_name: str, rows_per_file: Optional[int],
+              copy_headers: bool = True, log_prefix: str = '[格式拆分]',
+              chunk_range: Optional[Tuple[int, int]] = None,
+              log: Callable[[str], None] = print,
+              on_output: Optional[Callable[[str, int], None]] = None,
+              budget=None, start: Tuple[int, int] = (0, 0),
+              row_range: Tuple[int, Optional[int]] = (0, None)) -> List[Tuple[str, int]]:
+        """按数据行数切分工作表，第1行视为表头，与openpyxl逐单元格路径的行划分一致
+
+        Args:
+            chunk_range: 只输出[first, last)范围内的分块，用于多进程并行切分
+            log: 日志输出函数，子进程中用于收集日志
+            on_output: 每个输出文件写完后以(路径, 数据行数, end=下一分块的起始数据行)调用，用于上报进度和记录断点；
+                源工作表缺少行元素（空行）时数据行数少于分块跨越的源数据行，续拆须从end继续
+            budget: utils.ByteBudget，指定时按输出文件大小划分分块（顺序切分，不支持chunk_range），
+                rows_per_file为None或每个文件的行数上限；直接以行XML估算大小
+            start: (已完成的分块数, 下一分块的起始数据行)，用于断点续拆：跳过之前的数据行，输出序号接着已完成的分块
+            row_range: (跳过的数据行数, 结束数据行序号或None)，只切分范围内的数据行，分块从范围的第一行开始划分，
+                读到范围末尾即停止解析；start中的数据行相对于范围的第一行
+
+        Returns:
+            List[Tuple[str, int]]: 每个输出文件的路径及其数据行数
+        """
+        if not self._prescanned:
+            self.prescan()
+        skip, stop = row_range
+        if self.max_row is not None and chunk_range is None:
+            data_rows = max(0, self.max_row - 1)
+            data_rows = max(0, min(data_rows, stop if stop is not None else data_rows) - skip)
+            header_mode = "包含表头" if copy_headers else "仅数据"
+            print(f"{log_prefix} 数据行: {data_rows}行")
+            if budget is None:
+                num_files = max(1, (data_rows + rows_per_file - 1) // rows_per_file)
+                print(f"{log_prefix} 开始拆分: {num_files}个文件 ({header_mode})")
+            else:
+                print(f"{log_prefix} 开始按大小拆分: 每个文件不超过{format_bytes(budget.max_bytes)} ({header_mode})")
+        os.makedirs(output_dir, exist_ok=True)
+        shared = self.shared_strings()
+        sheet = self._iter_sheet()
+        _, head, prefix = next(sheet)
+        head = _DIMENSION.sub(b'', head)
+        header_row = None
+
+        outputs = []
+        done, first_data_row = start
+        # 范围内第一个数据行的源行号
+        origin = 2 + skip
+        state = {'archive': None, 'stream': None, 'rows': 0, 'last': origin - 1 + first_data_row}
+        header_offset = 1 if copy_headers else 0
+
+        def open_chunk(index, first):
+            """first为分块第一行对应的源行号"""
+            output_file = os.path.join(output_dir, f'{base_name}Split{index + 1}.xlsx')
+            # 只保留本分块用到的共享字符串，按大小拆分时新用到的字符串计入输出大小
+            strings = None
+            if shared is not None:
+                strings = _SharedStringSubset(shared, budget.add_extra if budget is not None else None)
+            # 先写入临时文件，关闭时再重命名，中途被终止时不会留下截断的输出文件
+            archive, stream = self._open_output(temp_output_path(output_file), head, prefix,
+                                                header_row if copy_headers else None, strings)
+            if budget is not None:
+                # 复制的样式等部件与行数无关，另加中央目录和工作表尾部的余量
+                budget.overhead = archive.fp.tell() + len(head) + len(self._tail) + 1024
+            state.update(archive=archive, stream=stream, strings=strings, rows=0, file=output_file, index=index,
+                         first=first)
+
+        # 行数据攒够一个块再写入压缩流，避免逐行调用压缩器
+        pending = []
+        pending_size = 0
+
+        def flush():
+            nonlocal pending_size
+            state['stream'].write(b''.join(pending))
+            events.writing(len(pending))
+            pending.clear()
+            pending_size = 0
+
+        def close_chunk():
+            flush()
+            first = state['first']
+            last = first + rows_per_file - 1 if budget is None else state['last']
+            if stop is not None:
+                last = min(last, 1 + stop)
+            ranges = [(first, last, header_offset + 1 - first)]
+            if copy_headers:
+                ranges.insert(0, (1, 1, 0))
+            self._close_output(state['archive'], state['stream'], prefix, ranges, state['strings'])
+            os.replace(temp_output_path(state['file']), state['file'])
+            outputs.append((state['file'], state['rows']))
+            log(f"{log_prefix} 完成: {os.path.basename(state['file'])} ({state['rows']}行)")
+            if budget is not None:
+                budget.close_chunk(state['file'])
+                budget.observe(state['file'], state['rows'])
+            if on_output is not None:
+                end = state['last'] + 1 if budget is not None else state['first'] + rows_per_file
+                on_output(state['file'], state['rows'], end=end - origin)
+            state['archive'] = None
+
+        first_index, last_index = chunk_range or (done, None)
+        current = first_index - 1
+        try:
+            reached_end = True
+            for _, row_num, segment in sheet:
+                if row_num == 1:
+                    header_row = segment
+                    continue
+                if row_num < origin + first_data_row:
+                    continue
+                if stop is not None and row_num > 1 + stop:
+                    break
+                if budget is not None:
+                    # 按大小划分：当前分块放不下该行时换到下一个文件，新分块从上一分块末行之后开始
+                    if state['archive'] is None or not budget.fits(segment):
+                        if state['archive'] is not None:
+                            close_chunk()
+                        current += 1
+                        log(f"{log_prefix} 处理文件 {current + 1}")
+                        open_chunk(current, state['last'] + 1)
+                    budget.add(segment)
+                else:
+                    index = (row_num - origin) // rows_per_file
+                    if index < first_index:
+                        continue
+                    if last_index is not None and index >= last_index:
+                        reached_end = False
+                        break
+                    while current < index:
+                        # 稀疏行跨越分块时也为中间的分块生成文件，与逐行切分保持一致
+                        if state['archive'] is not None:
+                            close_chunk()
+                        current += 1
+                        log(f"{log_prefix} 处理文件 {current + 1}")
+                        open_chunk(current, origin + current * rows_per_file)
+                out_row = header_offset + row_num - state['first'] + 1
+                if shared is not None:
+                    segment = state['strings'].remap(segment)
+                pending.append(self._renumber_row(segment, out_row))
+                pending_size += len(segment)
+                state['rows'] += 1
+                state['last'] = row_num
+                if pending_size >= _READ_SIZE:
+                    flush()
+            if state['archive'] is not None:
+                close_chunk()
+            if not reached_end:
+                # 本范围末尾的分块没有数据行，但后续仍有数据，同样需要生成文件
+                while current < last_index - 1:
+                    current += 1
+                    open_chunk(current, origin + current * rows_per_file)
+                    close_chunk()
+            elif not outputs and first_index == 0:
+                # 没有数据行时仍创建一个（可能只含表头的）文件
+                open_chunk(0, origin)
+                close_chunk()
+        except BaseException:
+            # 中途失败（如遇到无法切分的内容）时关闭并删除未写完的输出，已写完的输出由调用方处理
+            self._discard_chunk(state)
+            raise
+        finally:
+            sheet.close()
+        return outputs
+
+
+class _PartitionOutput:
+    """分区切分的一个输出文件：行XML按输出中的行号和共享字符串索引重新编号后写入"""
+
+    # 同时打开的输出较多，每个输出缓存的行数据比行切分时小
+    _FLUSH_SIZE = 64 * 1024
+
+    def __init__(self, slicer: XlsxRowSlicer, output_file: str, head: bytes, prefix: bytes,
+                 header_row: Optional[bytes], shared: Optional[SharedStringIndex]):
+        self._slicer = slicer
+        self._prefix = prefix
+        self._strings = _SharedStringSubset(shared) if shared is not None else None
+        self._archive, self._stream = slicer._open_output(output_file, head, prefix, header_row, self._strings)
+        self._ranges = [(1, 1, 0)] if header_row is not None else []
+        self._next_row = len(self._ranges) + 1
+        self._pending = []
+        self._pending_size = 0
+
+    def append(self, segment: bytes) -> None:
+        if self._strings is not None:
+            segment = self._strings.remap(segment)
+        self._pending.append(self._slicer._renumber_row(segment, self._next_row))
+        self._pending_size += len(segment)
+        self._next_row += 1
+        if self._pending_size >= self._FLUSH_SIZE:
+            self._flush()
+
+    def _flush(self) -> None:
+        self._stream.write(b''.join(self._pending))
+        self._pending.clear()
+        self._pending_size = 0
+
+    def save(self) -> None:
+        self._flush()
+        self._slicer._close_output(self._archive, self._stream, self._prefix, self._ranges, self._strings)
+
+
+def slice_chunk_range(input_file: str, output_dir: str, base_name: str, rows_per_file: int,
+                      copy_headers: bool, first: int, last: int, sheet: Optional[str] = None,
+                      row_range: Tuple[int, Optional[int]] = (0, None)) -> Tuple[List[str], List[Tuple[str, int]]]:
+    """子进程任务：切分[first, last)范围内的分块，返回日志信息和各输出文件的(路径, 数据行数)"""
+    messages = []
+    with XlsxRowSlicer(input_file, sheet) as slicer:
+        outputs = slicer.split(output_dir, base_name, rows_per_file, copy_headers,
+                               chunk_range=(first, last), log=messages.append, row_range=row_range)
+    return messages, outputs